@@ -0,0 +1,49 @@
+"""
+bench_analyze_records.py — latency ของ analyze_skin.handler เมื่อ S3 event มีหลาย record
+เทียบ MAX_WORKERS=1 (เหมือนลูปเดิม) กับ thread pool
+
+    python bench_analyze_records.py --records 8 --workers 4 --s3-latency-ms 15 --rek-latency-ms 300
+"""
+import os, sys, json, argparse
+
+from bench_utils import load_module, timed
+from local_aws import FakeS3, FakeRekognition, s3_put_event
+
+ANALYZERS = {
+    "frontend": ("Frontend/Py/analyze_skin.py", {"MODEL_ARN": "arn:bench", "RESULT_BUCKET": "bench-out"}),
+    "byNam": ("UserUpload/byNam/analyze_skin.py", {"PROJECT_VERSION_ARN": "arn:bench"}),
+}
+
+
+def run(n_records, workers, s3_ms, rek_ms, tps):
+    report = {"records": n_records, "rekognition_tps": tps}
+    for name, (path, env) in ANALYZERS.items():
+        mod = load_module(path, env=dict(env, REKOGNITION_TPS=tps))
+        mod.logger.setLevel("WARNING")
+        row = {}
+        for w in (1, workers):
+            s3 = FakeS3(latency_ms=s3_ms)
+            keys = [f"uploads/user=bench/dt=2025/01/01/{i}.jpg" for i in range(n_records)]
+            for k in keys:
+                s3.put_object(Bucket="bench-in", Key=k, Body=os.urandom(200_000))
+            s3.calls.clear()
+            mod.s3, mod.rekognition = s3, FakeRekognition(latency_ms=rek_ms, s3=s3)
+            sa = sys.modules["skin_analyzer"]
+            sa.MAX_WORKERS = w
+            Throttle = sys.modules["inference_dispatch"].Throttle
+            mod._throttle, mod._cache = Throttle(rate=tps, burst=tps), None
+            out, ms = timed(mod.handler, s3_put_event("bench-in", keys), None)
+            row[f"workers={w}"] = {"handler_ms": round(ms, 1), "s3_requests": dict(s3.calls)}
+        report[name] = row
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--s3-latency-ms", type=float, default=15.0)
+    ap.add_argument("--rek-latency-ms", type=float, default=300.0)
+    ap.add_argument("--tps", type=float, default=5.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.records, args.workers, args.s3_latency_ms, args.rek_latency_ms, args.tps), indent=2))
@@ -0,0 +1,167 @@
+"""
+bench_aws_clients.py — Shared/aws_clients.py: client แบบ lazy + pool ใหญ่ vs boto3.client() ตอน import
+
+  import     : เวลา import handler ใน process ใหม่ — โค้ดก่อน request นี้ (git HEAD~ ที่ระบุ) vs ปัจจุบัน
+               เดิม import = import boto3 + สร้าง client/resource ทุกตัว แม้ invocation นั้นไม่ได้ใช้
+  first_call : cold start ที่ใช้ client จริง = import + สร้าง client + call แรก (S3 local)
+  pool       : --threads เธรดยิง HeadObject ไป S3 ปลอม (HTTP local, หน่วง --server-ms ต่อ request
+               และ --connect-ms ต่อ connection ใหม่ แทน TCP + TLS handshake ไป AWS จริง)
+               นับ connection ที่ server รับ — pool 10 (ค่าเริ่มต้น boto3) เปิดใหม่ตลอดเมื่อเธรดเกิน pool
+  per_call   : เวลาต่อ call (ไม่หน่วง server) ของ client ธรรมดา vs client ที่มี latency hook
+
+    python bench_aws_clients.py --threads 32 --calls 2000 --server-ms 5 --connect-ms 30
+    (--base ค่าเริ่มต้น = parent ของ commit [user-048] แรก หาจาก git log)
+"""
+import os, sys, json, time, argparse, tarfile, tempfile, threading, subprocess, io
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bench_utils import REPO_ROOT, summarize
+
+HANDLERS = ["Frontend/Py/GenerateRecommendationFile.py", "Frontend/Py/lambda_presigner.py",
+            "Frontend/Py/wait_result.py", "UserUpload/byNammon/uploadToS3Lambda.py",
+            "Product/lambda_tag_index.py", "Dataset/lambda_offline_curator.py"]
+ENV = {"AWS_DEFAULT_REGION": "us-east-1", "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+       "CATALOG_CACHE": "off", "RESULT_NOTIFY_BACKEND": "off", "DETECTOR_BACKEND": "local"}
+
+
+def _tree(rev):
+    """checkout โค้ดของ rev ลงโฟลเดอร์ชั่วคราว (git archive) เพื่อเทียบกับโค้ดปัจจุบัน"""
+    dst = tempfile.mkdtemp(prefix="bench_aws_base_")
+    data = subprocess.run(["git", "-C", str(REPO_ROOT), "archive", rev], check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(data)) as t:
+        t.extractall(dst)
+    return dst
+
+
+def _run(root, rel, extra="", n=3):
+    path = os.path.join(root, rel)
+    code = (f"import sys, time, importlib.util; t0 = time.perf_counter()\n"
+            f"sys.path[:0] = [{os.path.join(root, 'Shared')!r}, {os.path.dirname(path)!r}]\n"
+            f"spec = importlib.util.spec_from_file_location('h', {path!r}); m = importlib.util.module_from_spec(spec)\n"
+            f"spec.loader.exec_module(m)\n{extra}\nprint((time.perf_counter() - t0) * 1000)")
+    env = dict(os.environ, **ENV)
+    runs = []
+    for _ in range(n):
+        out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, env=env)
+        runs.append(float(out.stdout.strip().splitlines()[-1]))
+    return round(min(runs), 1)
+
+
+class _S3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    connect_delay = 0.0
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            type(self).connections += 1
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+
+    def _ok(self):
+        if self.delay:
+            time.sleep(self.delay)
+        n = int(self.headers.get("Content-Length") or 0)
+        if n:
+            self.rfile.read(n)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+
+    do_HEAD = do_GET = do_PUT = _ok
+
+    def log_message(self, *a):
+        pass
+
+
+def _serve(delay_ms, connect_ms):
+    _S3Handler.delay, _S3Handler.connect_delay = delay_ms / 1000, connect_ms / 1000
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _S3Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+
+def _pool(make_client, threads, calls):
+    c = make_client()
+    c.head_object(Bucket="bench", Key="warm")
+    _S3Handler.connections = 0
+    lat = []
+    t0 = time.perf_counter()
+
+    def one(i):
+        s = time.perf_counter()
+        c.head_object(Bucket="bench", Key=f"k{i}")
+        lat.append((time.perf_counter() - s) * 1000)
+
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(one, range(calls)))
+    wall = time.perf_counter() - t0
+    return {**summarize(lat), "calls_per_sec": round(calls / wall, 1), "new_connections": _S3Handler.connections}
+
+
+def _default_base(tag="user-048"):
+    """parent ของ commit แรกที่ subject ขึ้นต้นด้วย [tag] (commit fix ภายหลังใช้ tag เดียวกัน → เอาตัวเก่าสุด)"""
+    revs = subprocess.run(["git", "-C", str(REPO_ROOT), "log", "--format=%H", "--fixed-strings",
+                           f"--grep=[{tag}]"], check=True, capture_output=True, text=True).stdout.split()
+    if not revs:
+        raise SystemExit(f"no commit tagged [{tag}] — pass --base")
+    return revs[-1] + "~1"
+
+
+def run(base, threads, calls, server_ms, connect_ms):
+    import logging
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)   # "Connection pool is full" ทุก call
+    srv, url = _serve(server_ms, connect_ms)
+    os.environ.update(ENV, AWS_ENDPOINT_URL_S3=url)
+    ENV["AWS_ENDPOINT_URL_S3"] = url
+    old = _tree(base)
+    report = {"base": base, "threads": threads, "calls": calls, "server_ms": server_ms, "connect_ms": connect_ms}
+
+    report["import_ms"] = {h: {"before": _run(old, h), "after": _run(str(REPO_ROOT), h)} for h in HANDLERS}
+    first = "m.s3.head_object(Bucket='bench', Key='k')"
+    h = "Frontend/Py/lambda_presigner.py"
+    report["first_call_ms"] = {h: {"before": _run(old, h, first, 5), "after": _run(str(REPO_ROOT), h, first, 5)}}
+
+    import boto3
+    from botocore.config import Config
+    sys.path.insert(0, str(REPO_ROOT / "Shared"))
+    import aws_clients
+    report["pool"] = {
+        "boto3_default": _pool(lambda: boto3.client("s3"), threads, calls),
+        "aws_clients_pool10": _pool(lambda: aws_clients.client("s3", max_pool_connections=10), threads, calls),
+        "aws_clients": _pool(lambda: aws_clients.client("s3"), threads, calls),
+    }
+
+    plain = boto3.client("s3", config=Config(max_pool_connections=aws_clients.AWS_MAX_POOL_CONNECTIONS))
+    hooked = aws_clients.client("s3")
+    _S3Handler.delay = 0.0
+    per = {"no_hook": [], "hook": []}
+    for _ in range(5):   # สลับกันหลายรอบ ลด noise ของเครื่อง
+        for name, c in (("no_hook", plain), ("hook", hooked)):
+            c.head_object(Bucket="bench", Key="warm")
+            t0 = time.perf_counter()
+            for i in range(200):
+                c.head_object(Bucket="bench", Key=f"k{i}")
+            per[name].append((time.perf_counter() - t0) / 200 * 1e6)
+    report["per_call_us"] = {k: round(min(v), 1) for k, v in per.items()}
+    report["latency_stats"] = aws_clients.latency_stats()
+    srv.shutdown()
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default=None,
+                    help="git rev ของโค้ดก่อนเปลี่ยน (ค่าเริ่มต้น = parent ของ commit [user-048] แรก)")
+    ap.add_argument("--threads", type=int, default=32)
+    ap.add_argument("--calls", type=int, default=2000)
+    ap.add_argument("--server-ms", type=float, default=5.0)
+    ap.add_argument("--connect-ms", type=float, default=30.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.base or _default_base(), args.threads, args.calls, args.server_ms, args.connect_ms), indent=2))
@@ -0,0 +1,108 @@
+"""
+bench_batched_recommend.py — GenerateRecommendationFile: หาสินค้าทีละ label (เดิม) vs candidates() ครั้งเดียว
+
+  serial_scan   : โค้ดก่อน request นี้ — Scan ทั้งตารางต่อ label แบบ serial + random.choice
+  batched_scan  : Scan รอบเดียวด้วย OR ของทุก label แล้วแยกตาม tag
+  index_query   : Query tag index ทุก label พร้อมกัน (ThreadPoolExecutor)
+  catalog       : catalog cache warm (ไม่เรียก DynamoDB)
+
+วัด latency p50 ตามจำนวน label (1..--max-labels) + ตรวจว่า seed เดียวกันได้ผลเดิม
+และ ranked_pools ของทุกแหล่งเรียงเหมือนกันทุกชุด label
+
+    python bench_batched_recommend.py --products 811 --runs 20 --ddb-latency-ms 8
+"""
+import io, sys, json, time, random, argparse, contextlib
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3, FakeDynamoTable, s3_put_event
+from catalog_fixture import load_table, LABEL_SKIN_TYPE
+
+BUCKET = "bench-out"
+
+
+def _serial_scan(tag_index, table):
+    def recommend(labels, *a, **kw):
+        out = []
+        for label in labels:
+            items = tag_index.scan_tag(table, label)
+            if items:
+                p = random.choice(items)
+                out.append({"problem": label, "name": p.get("name"), "brand": p.get("brand"),
+                            "price": p.get("price"), "image_url": p.get("image_url"),
+                            "ingredients": p.get("ingredients", "")})
+        return out
+    return recommend
+
+
+def _invoke(mod, s3, labels, i):
+    key = f"results/user=bench/dt=2025/01/01/{len(labels)}-{i:04d}.jpg.json"
+    s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"source": {}, "labels": labels}))
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        mod.lambda_handler(s3_put_event(BUCKET, [key]), None)
+    ms = (time.perf_counter() - t0) * 1000
+    final = json.loads(s3.get_object(Bucket=BUCKET, Key=mod.recommendation_key_for(key))["Body"].read())
+    return ms, final["recommendations"]
+
+
+def run(n_products, runs, max_labels, ddb_ms):
+    mod = load_module("Frontend/Py/GenerateRecommendationFile.py")
+    rec_mod = sys.modules["recommender"]
+    tag_index = sys.modules["tag_index"]
+    cc = sys.modules["catalog_cache"]
+    table = load_table(FakeDynamoTable("SkincareProducts"), n_products)
+    index = FakeDynamoTable("SkincareProductTags", hash_key="tag", range_key="sk")
+    tag_index.backfill(table, index)
+    table.latency_ms = index.latency_ms = ddb_ms
+    s3 = FakeS3()
+    mod.s3, mod.table = s3, table
+    labels_all = sorted(LABEL_SKIN_TYPE)
+    rng = random.Random(0)
+    sets = {n: [rng.sample(labels_all, n) for _ in range(runs)] for n in range(1, max_labels + 1)}
+
+    modes = {
+        "serial_scan": (_serial_scan(tag_index, table), None, None),
+        "batched_scan": (rec_mod.recommend, None, None),
+        "index_query": (rec_mod.recommend, index, None),
+        "catalog": (rec_mod.recommend, None, cc.CatalogCache(table)),
+    }
+    report = {"products": n_products, "ddb_latency_ms": ddb_ms, "runs_per_label_count": runs, "p50_ms": {}}
+    for name, (fn, idx, cat) in modes.items():
+        mod.recommend, mod.index, mod.catalog = fn, idx, cat
+        if cat:
+            cat.get()   # cold load ไม่นับ
+        r0 = table.consumed_rcu + index.consumed_rcu
+        row = {}
+        for n, label_sets in sets.items():
+            row[n] = summarize([_invoke(mod, s3, ls, i)[0] for i, ls in enumerate(label_sets)])["p50_ms"]
+        row["rcu_per_invocation"] = round((table.consumed_rcu + index.consumed_rcu - r0) / (runs * max_labels), 1)
+        report["p50_ms"][name] = row
+
+    # ---- reproducibility: key เดียวกัน → สินค้าชุดเดียวกัน ไม่ว่าจะมาจากแหล่งไหน ----
+    labels = labels_all[:max_labels]
+    outs = []
+    for idx, cat in ((None, None), (index, None), (None, cc.CatalogCache(table)), (None, None)):
+        mod.recommend, mod.index, mod.catalog = rec_mod.recommend, idx, cat
+        outs.append([r["name"] for r in _invoke(mod, s3, labels, 0)[1]])
+    seeds = {tuple(r["name"] for r in rec_mod.recommend(labels, table, index=index, seed=f"s{i}")) for i in range(20)}
+    # pool ที่จัดอันดับแล้วต้องเหมือนกันทุกแหล่ง (scan / index / catalog) ทุกชุด label ที่วัด
+    catalog = cc.CatalogCache(table).get()
+    ids = lambda pools: {l: [p["product_id"] for p in v] for l, v in pools.items()}
+    same_pools = all(ids(rec_mod.ranked_pools(ls, table)) == ids(rec_mod.ranked_pools(ls, index=index))
+                     == ids(rec_mod.ranked_pools(ls, catalog=catalog))
+                     for label_sets in sets.values() for ls in label_sets)
+    report["reproducible"] = {"same_key_same_products": all(o == outs[0] for o in outs),
+                              "same_pools_all_sources": same_pools,
+                              "distinct_products_per_invocation": len(set(outs[0])) == len(outs[0]),
+                              "distinct_sets_over_20_seeds": len(seeds)}
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=811)
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--max-labels", type=int, default=5)
+    ap.add_argument("--ddb-latency-ms", type=float, default=8.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.products, args.runs, args.max_labels, args.ddb_latency_ms), indent=2))
@@ -0,0 +1,121 @@
+"""
+bench_catalog_cache.py — catalog cache ในหน่วยความจำ (Shared/catalog_cache.py) ของลัมบ์ดาแนะนำสินค้า
+
+  load       : เวลาโหลดแคตตาล็อกด้วย scan 1 segment vs CATALOG_SCAN_SEGMENTS segment
+  generate   : GenerateRecommendationFile ต่อ invocation — scan (ไม่มี index) vs cache (cold / warm)
+  recommend  : RecommendSkincare — tag index query vs cache warm
+  refresh    : แก้สินค้า + bump version → invocation ถัดไปหลังรอบเช็ค version เห็นข้อมูลใหม่
+
+    python bench_catalog_cache.py --products 811 --invocations 30 --ddb-latency-ms 8
+"""
+import io, sys, json, time, random, argparse, contextlib
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3, FakeDynamoTable, s3_put_event
+from catalog_fixture import load_table, LABEL_SKIN_TYPE
+
+BUCKET = "bench-out"
+
+
+def _quiet(fn, *a):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*a)
+
+
+def _label_sets(n, seed=0):
+    rng = random.Random(seed)
+    labels = sorted(LABEL_SKIN_TYPE)
+    return [rng.sample(labels, rng.randint(1, 5)) for _ in range(n)]
+
+
+def _generate(mod, s3, table, label_sets):
+    lat, rcu0 = [], table.consumed_rcu
+    for i, labels in enumerate(label_sets):
+        key = f"results/user=bench/dt=2025/01/01/{i:04d}.jpg.json"
+        s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"source": {}, "labels": labels}))
+        t0 = time.perf_counter()
+        _quiet(mod.lambda_handler, s3_put_event(BUCKET, [key]), None)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return lat, (table.consumed_rcu - rcu0) / len(label_sets)
+
+
+def run(n_products, n_inv, ddb_ms, s3_ms, segments):
+    gen = load_module("Frontend/Py/GenerateRecommendationFile.py")
+    rec = load_module("Frontend/Py/RecommendSkincare.py")
+    cc = sys.modules["catalog_cache"]
+    tag_index = sys.modules["tag_index"]
+    table = load_table(FakeDynamoTable("SkincareProducts"), n_products)
+    index = FakeDynamoTable("SkincareProductTags", hash_key="tag", range_key="sk")
+    tag_index.backfill(table, index)
+    table.latency_ms = index.latency_ms = ddb_ms
+    s3 = FakeS3(latency_ms=s3_ms)
+    report = {"products": n_products, "ddb_latency_ms": ddb_ms}
+
+    # ---- load ----
+    load = {}
+    for seg in (1, segments):
+        runs = []
+        for _ in range(3):   # ค่าต่ำสุดของ 3 รอบ (ตัด GC / การแบ่ง segment ครั้งแรกของ stand-in ออก)
+            t0 = time.perf_counter()
+            items = cc.load_catalog(table, seg)
+            runs.append((time.perf_counter() - t0) * 1000)
+        load[f"segments={seg}"] = {"ms": round(min(runs), 1), "items": len(items)}
+    report["load"] = load
+
+    # ---- GenerateRecommendationFile ----
+    sets = _label_sets(n_inv)
+    gen.s3, gen.table, gen.index = s3, table, None   # ไม่มี cache/index → Scan รอบเดียวทุก label
+    gen.catalog = None
+    lat, rcu = _generate(gen, s3, table, sets)
+    report["generate_scan"] = {**summarize(lat), "rcu_per_invocation": round(rcu, 1)}
+    gen.catalog = cc.CatalogCache(table, segments=segments)
+    lat, rcu = _generate(gen, s3, table, sets)
+    report["generate_cache"] = {"cold_ms": round(lat[0], 1), "warm": summarize(lat[1:]),
+                                "rcu_per_invocation": round(rcu, 1), "stats": gen.catalog.snapshot()}
+    by_labels = {}
+    for labels, ms in zip(sets[1:], lat[1:]):
+        by_labels.setdefault(len(labels), []).append(ms)
+    report["generate_cache"]["warm_p50_by_label_count"] = {k: summarize(v)["p50_ms"] for k, v in sorted(by_labels.items())}
+
+    # ---- RecommendSkincare ----
+    events = [{"labels": s[:2]} for s in sets]
+    rec.table, rec.index = table, index
+    out = {}
+    for name, cat in (("index_query", None), ("cache", cc.CatalogCache(table, segments=segments))):
+        rec.catalog = cat
+        if cat:
+            _quiet(rec.lambda_handler, events[0], None)   # cold load ไม่นับ
+        lat, r0 = [], table.consumed_rcu + index.consumed_rcu
+        for ev in events:
+            t0 = time.perf_counter()
+            _quiet(rec.lambda_handler, ev, None)
+            lat.append((time.perf_counter() - t0) * 1000)
+        out[name] = {**summarize(lat),
+                     "rcu_per_request": round((table.consumed_rcu + index.consumed_rcu - r0) / len(events), 2)}
+    report["recommend_skincare"] = out
+
+    # ---- refresh by version marker ----
+    cache = cc.CatalogCache(table, ttl_secs=3600, version_check_secs=0.2, segments=segments)
+    cache.get()
+    pid = "p0000000"
+    item = dict(table.items[pid], name="renamed for refresh test")
+    table.put_item(Item=item)
+    cc.bump_version(table)
+    t0 = time.perf_counter()
+    while cache.get().get(pid)["name"] != item["name"]:
+        time.sleep(0.01)
+    report["refresh"] = {"visible_after_ms": round((time.perf_counter() - t0) * 1000, 1),
+                         "version_check_secs": 0.2, "stats": cache.snapshot()}
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=811)
+    ap.add_argument("--invocations", type=int, default=30)
+    ap.add_argument("--ddb-latency-ms", type=float, default=8.0)
+    ap.add_argument("--s3-latency-ms", type=float, default=0.0)
+    ap.add_argument("--segments", type=int, default=4)
+    args = ap.parse_args()
+    print(json.dumps(run(args.products, args.invocations, args.ddb_latency_ms, args.s3_latency_ms, args.segments),
+                     indent=2))
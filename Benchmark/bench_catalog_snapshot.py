@@ -0,0 +1,124 @@
+"""
+bench_catalog_snapshot.py — lambda_suggestionProduct: pandas.read_csv ทุก invocation vs snapshot คอลัมน์ (memmap)
+
+  legacy        : โค้ดเดิม — สร้าง boto3 client + get_object + pd.read_csv + boolean mask + to_dict ทุกครั้ง
+  snapshot_cold : invocation แรก (ดาวน์โหลด snapshot ลง /tmp + memmap + serialize)
+  snapshot_warm : invocation ถัดไป (body ของประเภทผิว cache ไว้แล้ว) เช็ค ETag ตาม SNAPSHOT_CHECK_SECS
+  revalidate    : SNAPSHOT_CHECK_SECS=0 → conditional GET (304) ทุก invocation
+  import        : เวลา import ใน process ใหม่ — pandas vs numpy + catalog_snapshot
+  same_body     : body ของทุก skin_concern ตรงกับโค้ดเดิม (ต้องมี pandas)
+  update        : อัปโหลด CSV ใหม่ → build_catalog_snapshot → invocation หลังรอบเช็คเห็นข้อมูลใหม่
+
+    python bench_catalog_snapshot.py --invocations 50 --s3-latency-ms 10 --bandwidth-mbps 200
+"""
+import io, os, sys, json, time, argparse, tempfile, subprocess, contextlib
+
+from bench_utils import load_module, summarize, REPO_ROOT
+from local_aws import FakeS3
+from catalog_fixture import CSV_PATH
+
+BUCKET, CSV_KEY = "kaggle-dataset-skincare", "data/product_catalog_clean.csv"
+CONCERNS = ["Oily-Skin", "Dry-Skin", "Acne", "Wrinkles", "Blackheads", "wrinkles-acne-pores", "Dark-Spots",
+            "Englarged-Pores", "Eyebags", "Skin-Redness", "Whiteheads", "Normal", "unknown"]
+SKIN_COLUMN = {"Oily-Skin": "Oily", "Dry-Skin": "Dry", "Normal": "Normal", "Sensitive": "Sensitive", "Acne": "Oily",
+               "Wrinkles": "Dry", "Blackheads": "Oily", "Dark-Spots": "Dry", "Eyebags": "Sensitive",
+               "Skin-Redness": "Sensitive", "Whiteheads": "Oily"}
+
+
+def _legacy(s3, rekognition_results):
+    """โค้ดเดิมก่อน request นี้ (ตัด if/elif เป็น dict — เงื่อนไขเหมือนเดิม)"""
+    import boto3
+    import pandas as pd
+
+    def handler(event, context):
+        skin_concern = event.get('skin_concern', 'Oily-Skin')
+        boto3.client('s3')   # เดิมสร้าง client ใหม่ทุก invocation
+        obj = s3.get_object(Bucket=BUCKET, Key=CSV_KEY)
+        csv_data = pd.read_csv(obj['Body'])
+        if rekognition_results.get(skin_concern, 0) == 1:
+            col = SKIN_COLUMN.get(skin_concern)
+            filtered_data = csv_data[csv_data[col] == 1] if col else pd.DataFrame()
+            if not filtered_data.empty:
+                result = filtered_data[['Label', 'brand', 'name', 'price', 'ingredients']].to_dict(orient='records')
+                return {'statusCode': 200, 'body': json.dumps(result)}
+            return {'statusCode': 404,
+                    'body': json.dumps({"error": f"No suitable products found for {skin_concern}."})}
+        return {'statusCode': 400, 'body': json.dumps({"error": "Invalid skin concern or no data available."})}
+    return handler
+
+
+def _time(fn, events):
+    lat = []
+    for ev in events:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(ev, None)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return summarize(lat)
+
+
+def _import_ms(stmt, n=3):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT / "Shared"))
+    runs = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", stmt], check=True, env=env)
+        runs.append((time.perf_counter() - t0) * 1000)
+    return round(min(runs), 1)
+
+
+def run(n_inv, s3_ms, mbps):
+    tmp = tempfile.mkdtemp(prefix="bench_snapshot_")
+    mod = load_module("Product/lambda_suggestionProduct.py", env={"SNAPSHOT_PATH": os.path.join(tmp, "catalog.dvcs")})
+    builder = load_module("Product/build_catalog_snapshot.py")
+    s3 = FakeS3(latency_ms=s3_ms, bandwidth_mbps=mbps)
+    csv_bytes = CSV_PATH.read_bytes()
+    s3.put_object(Bucket=BUCKET, Key=CSV_KEY, Body=csv_bytes)
+    mod.s3, builder.s3 = s3, s3
+
+    report = {"invocations": n_inv, "s3_latency_ms": s3_ms, "bandwidth_mbps": mbps}
+    with contextlib.redirect_stdout(io.StringIO()):
+        built = builder.lambda_handler({}, None)
+    report["snapshot"] = {"csv_bytes": len(csv_bytes), "snapshot_bytes": built["bytes"], "build_ms": built["build_ms"]}
+
+    events = [{"skin_concern": CONCERNS[i % len(CONCERNS)]} for i in range(n_inv)]
+    try:
+        legacy = _legacy(s3, mod.rekognition_results)
+    except ImportError:
+        legacy = None
+    if legacy:
+        report["legacy"] = _time(legacy, events)
+    report["snapshot_cold"] = _time(mod.lambda_handler, events[:1])
+    report["snapshot_warm"] = _time(mod.lambda_handler, events)
+    mod.SNAPSHOT_CHECK_SECS = 0
+    g0 = s3.calls["get_object"]
+    report["revalidate"] = {**_time(mod.lambda_handler, events), "get_object": s3.calls["get_object"] - g0}
+    report["import_ms"] = {"pandas": _import_ms("import pandas") if legacy else None,
+                           "numpy+catalog_snapshot": _import_ms("import numpy, catalog_snapshot"),
+                           "python_only": _import_ms("pass")}
+
+    if legacy:
+        report["same_body"] = all(legacy({"skin_concern": c}, None) == mod.lambda_handler({"skin_concern": c}, None)
+                                  for c in CONCERNS)
+
+    # ---- CSV ใหม่ → rebuild → ลัมบ์ดาเห็นหลังรอบเช็ค ----
+    mod.SNAPSHOT_CHECK_SECS = 0.2
+    first = csv_bytes.split(b"\n", 2)
+    changed = first[0] + b"\n" + first[1].replace("crème de la mer".encode(), b"creme de la mer v2") + b"\n" + first[2]
+    s3.put_object(Bucket=BUCKET, Key=CSV_KEY, Body=changed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        builder.lambda_handler({}, None)
+    t0 = time.perf_counter()
+    while "creme de la mer v2" not in mod.lambda_handler({"skin_concern": "Oily-Skin"}, None)["body"]:
+        time.sleep(0.01)
+    report["update"] = {"visible_after_ms": round((time.perf_counter() - t0) * 1000, 1), "check_secs": 0.2}
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--invocations", type=int, default=50)
+    ap.add_argument("--s3-latency-ms", type=float, default=10.0)
+    ap.add_argument("--bandwidth-mbps", type=float, default=200.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.invocations, args.s3_latency_ms, args.bandwidth_mbps), indent=2))
@@ -0,0 +1,128 @@
+"""
+bench_catalog_sync.py — โหลด / ซิงก์ CSV แคตตาล็อกเข้า SkincareProducts (Product/catalog_sync.py)
+
+  item_by_item : put_item ทีละสินค้า (1 round trip ต่อ item) — วิธีเดียวที่มีก่อน request นี้
+  initial      : sync เข้าตารางว่าง — BatchWriteItem 25 ต่อครั้ง ขนาน --workers เธรด
+  unchanged    : sync CSV เดิมซ้ำ → scan hash อย่างเดียว ไม่มีการเขียน
+  changed      : แก้ราคา --change-pct % ของแถว + ตัดท้าย CSV 1% → เขียน/ลบเฉพาะส่วนที่ต่าง
+                 (รอบแรกไม่ส่ง prune = dry run นับ prunable, รอบสองส่ง prune=True ลบจริง)
+  existing     : ตารางเดิมจาก catalog_fixture (product_id p0000000.., มี image_url) → ต้องได้ id เดิม ไม่ลบ ไม่เพิ่ม
+  throttled    : FakeDynamoDB(wcu_per_sec) → UnprocessedItems ต้อง retry จนครบ
+  export       : Scan ขนาน 1 vs --segments ส่วน → JSON lines (นับ item + ตรวจว่าตรงกับตาราง)
+
+แคตตาล็อกใหญ่กว่า CSV (811 แถว) = ทำสำเนาแถวโดยเติมเลขท้ายชื่อ (product_id ใหม่)
+
+    python bench_catalog_sync.py --products 20000 --ddb-latency-ms 8 --workers 8 --segments 8
+"""
+import io, csv, json, time, argparse
+
+from bench_utils import load_module
+from local_aws import FakeDynamoDB
+from catalog_fixture import load_rows, load_table
+
+
+def _rows(n):
+    base = load_rows()
+    out = []
+    for i in range(n):
+        row = base[i % len(base)]
+        out.append(row if i < len(base) else dict(row, name=f"{row['name']} #{i // len(base)}"))
+    return out
+
+
+def _csv_bytes(rows):
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=list(rows[0]))
+    w.writeheader()
+    w.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def run(n, ddb_ms, workers, segments, change_pct, throttle_wcu):
+    mod = load_module("Product/catalog_sync.py")
+    rows = _rows(n)
+    csv_bytes = _csv_bytes(rows)
+    report = {"products": n, "csv_bytes": len(csv_bytes), "ddb_latency_ms": ddb_ms, "workers": workers,
+              "segments": segments}
+
+    # ---- item by item (ตัวอย่าง 500 item แล้วคูณกลับ ไม่งั้นรอนาน) ----
+    db = FakeDynamoDB(latency_ms=ddb_ms)
+    table = db.Table("SkincareProducts")
+    sample = rows[:min(n, 500)]
+    t0 = time.perf_counter()
+    for row in sample:
+        table.put_item(Item=mod.item_from_row(row))
+    per_item = (time.perf_counter() - t0) / len(sample)
+    report["item_by_item"] = {"estimated_ms": round(per_item * n * 1000, 1),
+                              "items_per_sec": round(1 / per_item, 1), "requests": n}
+
+    def sync(db, data, **kw):
+        table = db.Table("SkincareProducts")
+        calls0 = db.calls["batch_write_item"]
+        out = mod.sync(mod.iter_rows(io.BytesIO(data)), table=table, resource=db, segments=segments,
+                       workers=workers, **kw)
+        out["batch_write_calls"] = db.calls["batch_write_item"] - calls0
+        out["scan_calls"] = table.calls["scan"]
+        return out
+
+    db = FakeDynamoDB(latency_ms=ddb_ms)
+    report["initial"] = sync(db, csv_bytes)
+    table = db.Table("SkincareProducts")
+    want = {it["product_id"]: it for it in map(mod.item_from_row, rows)}
+    report["initial"]["table_matches_csv"] = {k: v for k, v in table.items.items()
+                                              if k != mod.CATALOG_VERSION_ID} == want
+    table.calls.clear()
+    report["unchanged"] = sync(db, csv_bytes)
+
+    step = max(1, int(100 / change_pct))
+    changed = [dict(r, price=str(float(r["price"] or 0) + 1)) if i % step == 0 else r for i, r in enumerate(rows)]
+    changed = changed[:n - max(1, n // 100)]
+    table.calls.clear()
+    report["changed_dry_run"] = sync(db, _csv_bytes(changed))   # prune ปิดเป็นค่าเริ่มต้น → นับ prunable อย่างเดียว
+    table.calls.clear()
+    report["changed"] = sync(db, _csv_bytes(changed), prune=True)
+    want = {it["product_id"]: it for it in map(mod.item_from_row, changed)}
+    report["changed"]["table_matches_csv"] = {k: v for k, v in table.items.items()
+                                              if k != mod.CATALOG_VERSION_ID} == want
+
+    # ---- ตารางเดิมที่ไม่ได้สร้างด้วย sync (product_id แบบอื่น + image_url) → ใช้ id เดิม ไม่ลบ ไม่เพิ่ม ----
+    db = FakeDynamoDB(latency_ms=ddb_ms)
+    table = load_table(db.Table("SkincareProducts"))
+    before = {k: dict(v) for k, v in table.items.items()}
+    out = sync(db, _csv_bytes(load_rows()))
+    after = {k: v for k, v in table.items.items() if k != mod.CATALOG_VERSION_ID}
+    out["same_ids"] = after.keys() == before.keys()
+    out["image_url_kept"] = all(after[k].get("image_url") == v.get("image_url") for k, v in before.items())
+    report["existing_table"] = out
+
+    # ---- throttled ----
+    db = FakeDynamoDB(latency_ms=ddb_ms, wcu_per_sec=throttle_wcu)
+    out = sync(db, csv_bytes)
+    out["wcu_per_sec"] = throttle_wcu
+    out["throttled_calls"] = db.calls["throttled"]
+    out["all_written"] = len(db.Table("SkincareProducts").items) == n + 1   # + version marker
+    report["throttled"] = out
+
+    # ---- export ----
+    exp = {}
+    for segs in (1, segments):
+        buf = io.StringIO()
+        exp[f"segments_{segs}"] = mod.export(buf, table=table, segments=segs)
+    lines = [json.loads(l) for l in buf.getvalue().splitlines()]
+    exp["complete"] = sorted(l["product_id"] for l in lines) == sorted(
+        k for k in table.items if k != mod.CATALOG_VERSION_ID)
+    report["export"] = exp
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=20000)
+    ap.add_argument("--ddb-latency-ms", type=float, default=8.0)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--segments", type=int, default=8)
+    ap.add_argument("--change-pct", type=float, default=2.0)
+    ap.add_argument("--throttle-wcu", type=float, default=2000.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.products, args.ddb_latency_ms, args.workers, args.segments, args.change_pct,
+                         args.throttle_wcu), indent=2))
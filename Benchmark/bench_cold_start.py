@@ -0,0 +1,142 @@
+"""
+bench_cold_start.py — เวลา init (import handler) ของทุกลัมบ์ดา ใน interpreter ใหม่ทุกครั้ง + breakdown แบบ -X importtime
+
+ต่อ handler ต่อโหมด (รัน --runs ครั้ง เก็บรอบที่ init เร็วสุด):
+  init_ms     : exec_module ของไฟล์ handler (= ส่วน Init Duration ที่เป็นโค้ดเรา)
+  process_ms  : ทั้ง process (เริ่ม interpreter + init) ตามนาฬิกาของ parent
+  deferred_ms : โหมด lazy — เวลา import โมดูลที่เลื่อนไว้ทั้งหมด (lazy_import.load_all) = ต้นทุนที่ย้ายไปอยู่
+                invocation แรกที่ใช้โมดูลนั้นจริง ไม่ได้หายไป
+  by_package  : ผลรวม self time ของ -X importtime ระหว่าง init แยกตาม package บนสุด (boto3, numpy, PIL, ...)
+  heavy       : package หนักที่ถูกโหลดแล้วหลัง init (ก่อน load_all)
+
+โหมด: eager (LAZY_IMPORTS=0, import ทุกอย่างตอนโหลดแบบเดิม) | lazy (LAZY_IMPORTS=1 ค่าเริ่มต้น)
+--base REV เพิ่มคอลัมน์ของโค้ดที่ git rev นั้น (ก่อนมี lazy_import)
+--out ไฟล์.json เก็บรายงาน แล้วรอบหน้าใช้ --compare ไฟล์.json ดูว่า init เปลี่ยนไปเท่าไร
+
+    python bench_cold_start.py --runs 5 --out cold_start.json
+    python bench_cold_start.py --handlers Frontend/Py/analyze_skin.py --compare cold_start.json
+"""
+import os, sys, json, time, argparse, subprocess
+
+from bench_utils import REPO_ROOT
+from bench_aws_clients import _tree
+
+HANDLERS = [
+    # เส้นทางผู้ใช้: presign → analyze → recommend
+    "Frontend/Py/lambda_presigner.py", "Frontend/Py/analyze_skin.py", "Frontend/Py/wait_result.py",
+    "Frontend/Py/GenerateRecommendationFile.py", "Frontend/Py/RecommendSkincare.py",
+    "Product/lambda_suggestionProduct.py",
+    "UserUpload/byNam/lambda_presigner.py", "UserUpload/byNam/analyze_skin.py",
+    "UserUpload/byNammon/uploadToS3Lambda.py",
+    "Frontend/Py/cross-account/forward_to_analyzer.py", "Frontend/Py/cross-account/analyze_skin.py",
+    "Frontend/Py/reanalyze_uploads.py",
+    "Product/lambda_tag_index.py", "Product/materialize_reco_table.py", "Product/build_catalog_snapshot.py",
+    "Product/catalog_sync.py",
+    "Dataset/lambda_dataset_presigner.py", "Dataset/lambda_offline_curator.py",
+    "Dataset/lambda_preprocess_images.py", "Dataset/lambda_coco_to_rek_manifest.py",
+    "Dataset/lambda_validate_dataset.py", "Dataset/notify_curator.py",
+]
+HEAVY = ("boto3", "botocore", "numpy", "PIL", "pandas")
+ENV = {"AWS_DEFAULT_REGION": "us-east-1", "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+       "CATALOG_CACHE": "off", "RESULT_NOTIFY_BACKEND": "off", "DETECTOR_BACKEND": "local",
+       # ENV ที่ handler อ่านแบบบังคับตอน import
+       "MODEL_ARN": "arn:aws:rekognition:us-east-1:000000000000:project/bench/version/bench/1",
+       "PROJECT_VERSION_ARN": "arn:aws:rekognition:us-east-1:000000000000:project/bench/version/bench/1",
+       "RESULT_BUCKET": "bench-results", "API_ENDPOINT": "https://bench.invalid/analyze"}
+
+_CHILD = """\
+import sys, time, importlib.util
+sys.path[:0] = [{shared!r}, {folder!r}]
+sys.stderr.write("@@init\\n"); sys.stderr.flush()
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler", {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+init = (time.perf_counter() - t0) * 1000
+mods = " ".join(sorted({{m.split(".")[0] for m in sys.modules}}))
+sys.stderr.write("@@deferred\\n"); sys.stderr.flush()
+t0 = time.perf_counter()
+if "lazy_import" in sys.modules:
+    sys.modules["lazy_import"].load_all()
+deferred = (time.perf_counter() - t0) * 1000
+print(init, deferred, mods)
+"""
+
+
+def _breakdown(stderr):
+    """self time (µs) ของบรรทัด importtime ที่อยู่ระหว่าง @@init กับ @@deferred รวมตาม package บนสุด"""
+    out, on = {}, False
+    for line in stderr.splitlines():
+        if line.startswith("@@"):
+            on = line == "@@init"
+            continue
+        if not on or not line.startswith("import time:"):
+            continue
+        self_us, _, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        if not self_us.isdigit():
+            continue   # บรรทัดหัวตาราง
+        pkg = name.split(".")[0]
+        out[pkg] = out.get(pkg, 0) + int(self_us)
+    return out
+
+
+def _once(root, rel, lazy):
+    path = os.path.join(root, rel)
+    code = _CHILD.format(shared=os.path.join(root, "Shared"), folder=os.path.dirname(path), path=path)
+    env = dict(os.environ, **ENV, LAZY_IMPORTS="1" if lazy else "0")
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env)
+    wall = (time.perf_counter() - t0) * 1000
+    if p.returncode:
+        raise RuntimeError(f"{rel}: {p.stderr.strip().splitlines()[-1]}")
+    init, deferred, mods = p.stdout.strip().splitlines()[-1].split(" ", 2)
+    return {"init_ms": float(init), "process_ms": wall, "deferred_ms": float(deferred),
+            "by_package": _breakdown(p.stderr), "modules": set(mods.split())}
+
+
+def measure(root, rel, lazy, runs, top):
+    best = min((_once(root, rel, lazy) for _ in range(runs)), key=lambda r: r["init_ms"])
+    pkgs = sorted(best["by_package"].items(), key=lambda kv: -kv[1])[:top]
+    return {"init_ms": round(best["init_ms"], 1), "process_ms": round(best["process_ms"], 1),
+            "deferred_ms": round(best["deferred_ms"], 1),
+            "by_package_ms": {k: round(v / 1000, 1) for k, v in pkgs},
+            "heavy": [m for m in HEAVY if m in best["modules"]]}
+
+
+def compare(report, prev):
+    out = {}
+    for h, modes in report["handlers"].items():
+        old = prev.get("handlers", {}).get(h, {})
+        out[h] = {m: {"init_ms": r["init_ms"], "previous_ms": old[m]["init_ms"],
+                      "delta_ms": round(r["init_ms"] - old[m]["init_ms"], 1)}
+                  for m, r in modes.items() if m in old}
+    return out
+
+
+def run(handlers, runs, base, top):
+    modes = {"eager": (str(REPO_ROOT), False), "lazy": (str(REPO_ROOT), True)}
+    if base:
+        modes = {"base": (_tree(base), False), **modes}
+    report = {"python": sys.version.split()[0], "runs": runs, "base": base, "handlers": {}}
+    for h in handlers:
+        report["handlers"][h] = {m: measure(root, h, lazy, runs, top) for m, (root, lazy) in modes.items()}
+    report["summary"] = {h: {m: r["init_ms"] for m, r in modes.items()} for h, modes in report["handlers"].items()}
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--handlers", nargs="*", default=HANDLERS)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--base", default="", help="git rev ของโค้ดก่อนเปลี่ยนเพื่อเทียบ (เช่น HEAD)")
+    ap.add_argument("--top", type=int, default=6, help="จำนวน package ใน by_package_ms")
+    ap.add_argument("--out", default="", help="เขียนรายงาน JSON ลงไฟล์")
+    ap.add_argument("--compare", default="", help="รายงาน JSON จากรอบก่อน (--out)")
+    args = ap.parse_args()
+    report = run(args.handlers, args.runs, args.base, args.top)
+    if args.compare:
+        with open(args.compare) as f:
+            report["compare"] = compare(report, json.load(f))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,115 @@
+"""
+bench_forwarder.py — end-to-end: forward_to_analyzer (Account A) → HTTP → analyze_skin แบบ cross-account (Account B)
+ทั้งหมดรัน local: FakeS3 + serve_s3_http (แทน presigned GET) + serve_lambda_http (แทน API Gateway)
+และ DETECTOR_BACKEND=local (ไม่ต้องมีโมเดล)
+
+เทียบ legacy (HEAD + urllib POST ทีละ record, เปิด connection ใหม่ทุกครั้ง) กับ FORWARD_MODE ต่างๆ
+stale_pool: server ปิด keep-alive หลัง idle --keepalive-secs → ส่ง burst, รอให้ connection ใน pool ค้าง แล้วส่งอีก 1 record
+            ต้องไม่ fail (ส่งซ้ำบน connection ใหม่โดยไม่เสีย retry)
+
+    python bench_forwarder.py --records 50 --api-latency-ms 40
+"""
+import os, json, time, argparse, urllib.request
+from urllib.parse import unquote_plus
+
+from bench_utils import load_module
+from local_aws import FakeS3, s3_put_event, serve_s3_http, serve_lambda_http
+
+BUCKET = "acct-a-uploads"
+
+
+def legacy_forward(s3, endpoint, event):
+    """พฤติกรรมเดิมของ forward_to_analyzer: presign + HEAD + POST ทีละ record (timeout 10s)"""
+    for rec in event["Records"]:
+        bucket = rec["s3"]["bucket"]["name"]
+        key = unquote_plus(rec["s3"]["object"]["key"])
+        url = s3.generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=300)
+        try:
+            s3.head_object(Bucket=bucket, Key=key)
+        except Exception:
+            pass
+        data = json.dumps({"image_url": url, "source_bucket": bucket, "source_key": key}).encode("utf-8")
+        req = urllib.request.Request(endpoint, data=data, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            resp.read()
+    return {"status": "ok"}
+
+
+def run(n_records, s3_ms, api_ms, detect_ms, batch_size, keepalive_secs=0.5):
+    s3 = FakeS3(latency_ms=s3_ms)
+    keys = [f"uploads/user=bench/dt=2025/01/01/{i:04d}.jpg" for i in range(n_records)]
+    for k in keys:
+        s3.put_object(Bucket=BUCKET, Key=k, Body=os.urandom(30_000))
+    img_server, img_base = serve_s3_http(s3, BUCKET)
+    s3.presign_base = img_base
+
+    analyzer = load_module("Frontend/Py/cross-account/analyze_skin.py", name="bench_xacct_analyze",
+                           env={"MODEL_ARN": "arn:bench", "RESULT_BUCKET": "acct-b-results",
+                                "DETECTOR_BACKEND": "local", "LOCAL_DETECTOR_LATENCY_MS": detect_ms,
+                                "INFERENCE_CACHE": "off"})
+    analyzer.logger.setLevel("ERROR")
+    analyzer.s3 = FakeS3()
+    event = s3_put_event(BUCKET, keys, s3)
+
+    report = {"records": n_records, "api_latency_ms": api_ms, "detect_ms": detect_ms}
+    modes = ["legacy", "sequential", "concurrent", "batch"]
+    for mode in modes:
+        api, base = serve_lambda_http(analyzer.handler, latency_ms=api_ms)
+        endpoint = f"{base}/analyze"
+        analyzer.s3.objects.clear()
+        s3.calls.clear()
+        t0 = time.perf_counter()
+        if mode == "legacy":
+            out = legacy_forward(s3, endpoint, event)
+            failed = 0
+        else:
+            fwd = load_module("Frontend/Py/cross-account/forward_to_analyzer.py", name=f"bench_fwd_{mode}",
+                              env={"API_ENDPOINT": endpoint, "FORWARD_MODE": mode,
+                                   "FORWARD_BATCH_SIZE": batch_size})
+            fwd.logger.setLevel("ERROR")
+            fwd.s3 = s3
+            try:
+                failed = len(fwd.handler(event, None)["failed"])
+            except fwd.ForwardError as e:
+                failed = len(e.failed)
+        wall = time.perf_counter() - t0
+        api.shutdown()
+        report[mode] = {"wall_ms": round(wall * 1000, 1), "records_per_sec": round(n_records / wall, 1),
+                        "failed": failed, "http_requests": api.requests, "tcp_connections": api.connections,
+                        "s3_requests": dict(s3.calls),
+                        "results_written": sum(1 for b, _ in analyzer.s3.objects if b == "acct-b-results")}
+    report["stale_pool"] = run_stale_pool(analyzer, s3, event, keepalive_secs)
+    img_server.shutdown()
+    return report
+
+
+def run_stale_pool(analyzer, s3, event, keepalive_secs, burst=8):
+    api, base = serve_lambda_http(analyzer.handler, keepalive_secs=keepalive_secs)
+    fwd = load_module("Frontend/Py/cross-account/forward_to_analyzer.py", name="bench_fwd_stale",
+                      env={"API_ENDPOINT": f"{base}/analyze", "FORWARD_MODE": "concurrent"})
+    fwd.logger.setLevel("ERROR")
+    fwd.s3 = s3
+    fwd.handler({"Records": event["Records"][:burst]}, None)
+    time.sleep(keepalive_secs * 3)
+    t0 = time.perf_counter()
+    try:
+        failed = len(fwd.handler({"Records": event["Records"][:1]}, None)["failed"])
+    except fwd.ForwardError as e:
+        failed = len(e.failed)
+    out = {"keepalive_secs": keepalive_secs, "burst": burst, "failed_after_idle": failed,
+           "stale_connections_replaced": fwd._pool.stale, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+    api.shutdown()
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=50)
+    ap.add_argument("--s3-latency-ms", type=float, default=10.0)
+    ap.add_argument("--api-latency-ms", type=float, default=40.0)
+    ap.add_argument("--detect-ms", type=float, default=20.0)
+    ap.add_argument("--batch-size", type=int, default=10)
+    ap.add_argument("--keepalive-secs", type=float, default=0.5)
+    args = ap.parse_args()
+    print(json.dumps(run(args.records, args.s3_latency_ms, args.api_latency_ms, args.detect_ms, args.batch_size,
+                         args.keepalive_secs), indent=2))
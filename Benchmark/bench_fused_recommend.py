@@ -0,0 +1,85 @@
+"""
+bench_fused_recommend.py — end-to-end latency ตั้งแต่ภาพถูกอัปโหลดจนถึงมี recommendations/..._final.json
+
+  two-stage : analyze_skin (FUSED_RECOMMEND=off) เขียน results/ → S3 event → GenerateRecommendationFile
+              เวลาส่ง event และ cold start ของลัมบ์ดาตัวที่สองจำลองด้วย --event-delay-ms / --cold-start-ms
+  both      : analyze_skin เขียน results/ (fused) + recommendations/ ใน invocation เดียว
+  final     : analyze_skin เขียนแค่ recommendations/
+
+ใช้ DETECTOR_BACKEND=local, FakeS3 และ FakeDynamoTable ที่โหลดสินค้าจาก Product/.csv
+
+    python bench_fused_recommend.py --images 30 --event-delay-ms 250 --cold-start-ms 600
+"""
+import os, json, time, argparse
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3, FakeDynamoTable, s3_put_event
+from catalog_fixture import load_table
+
+IN_BUCKET, OUT_BUCKET = "bench-in", "bench-out"
+
+
+def _analyzer(mode, s3, table):
+    mod = load_module("Frontend/Py/analyze_skin.py", name=f"bench_analyze_{mode}",
+                      env={"MODEL_ARN": "arn:bench", "RESULT_BUCKET": OUT_BUCKET, "DETECTOR_BACKEND": "local",
+                           "INFERENCE_CACHE": "off", "FUSED_RECOMMEND": mode})
+    from catalog_cache import CatalogCache
+    mod.logger.setLevel("WARNING")
+    mod.s3, mod._products = s3, table
+    if mod._catalog is not None:
+        mod._catalog = CatalogCache(table)
+    return mod
+
+
+def run(n_images, s3_ms, ddb_ms, event_delay_ms, cold_start_ms):
+    table = load_table(FakeDynamoTable("SkincareProducts", latency_ms=ddb_ms))
+    # reco_table import detectors ไปด้วย → ตั้ง backend local ก่อน import ครั้งแรก
+    recommender_mod = load_module("Frontend/Py/GenerateRecommendationFile.py", env={"DETECTOR_BACKEND": "local"})
+    report = {"images": n_images, "products": len(table.items), "event_delay_ms": event_delay_ms,
+              "cold_start_ms": cold_start_ms}
+
+    for mode in ("off", "both", "final"):
+        s3 = FakeS3(latency_ms=s3_ms)
+        mod = _analyzer(mode, s3, table)
+        recommender_mod.s3, recommender_mod.table, recommender_mod.index = s3, table, None
+        recommender_mod.catalog = None   # วัดแบบเดิม (scan) ให้เทียบกับตัวเลขก่อนหน้าได้; ดู bench_catalog_cache.py
+        e2e, traces = [], []
+        for i in range(n_images):
+            key = f"uploads/user=bench/dt=2025/01/01/{mode}-{i:03d}.jpg"
+            s3.put_object(Bucket=IN_BUCKET, Key=key, Body=os.urandom(256))
+            t0 = time.perf_counter()
+            out = mod.handler(s3_put_event(IN_BUCKET, [key], s3), None)
+            rec = out["failed"] or None
+            assert rec is None, rec
+            if mode == "off":
+                # S3 event ของ results/ → ลัมบ์ดาตัวที่สอง (ครั้งแรกเป็น cold start)
+                time.sleep((event_delay_ms + (cold_start_ms if i == 0 else 0)) / 1000.0)
+                results_key = key.replace("uploads/", "results/", 1) + ".json"
+                recommender_mod.lambda_handler(s3_put_event(OUT_BUCKET, [results_key]), None)
+            final_key = key.replace("uploads/", "recommendations/", 1) + "_final.json"
+            e2e.append((s3.written_at[final_key] - t0) * 1000.0)
+            traces.append(out)
+        s3_calls = dict(s3.calls)
+        s3_calls.pop("put_object", None)
+        report[f"fused={mode}"] = {
+            "upload_to_final": summarize(e2e),
+            "s3_puts_per_image": round((s3.calls["put_object"] - n_images) / n_images, 2),
+            "s3_other_requests": s3_calls,
+        }
+    base = report["fused=off"]["upload_to_final"]["p50_ms"]
+    for mode in ("both", "final"):
+        report[f"fused={mode}"]["p50_saved_ms"] = round(base - report[f"fused={mode}"]["upload_to_final"]["p50_ms"], 1)
+    report["scan_rcu_total"] = table.consumed_rcu
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=20)
+    ap.add_argument("--s3-latency-ms", type=float, default=15.0)
+    ap.add_argument("--ddb-latency-ms", type=float, default=8.0)
+    ap.add_argument("--event-delay-ms", type=float, default=250.0)
+    ap.add_argument("--cold-start-ms", type=float, default=600.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.images, args.s3_latency_ms, args.ddb_latency_ms, args.event_delay_ms,
+                         args.cold_start_ms), indent=2))
@@ -0,0 +1,58 @@
+"""
+bench_image_sources.py — เปรียบเทียบ bytes ที่ผ่าน Lambda และ latency ต่อภาพของแต่ละ image source
+ใน Shared/skin_analyzer.py
+
+- s3object      : Rekognition อ่านภาพจาก S3 เอง
+- bytes         : Lambda get_object แล้วส่ง Image.Bytes
+- presigned_url : Lambda ดาวน์โหลดจาก URL (local HTTP server) แล้วส่ง Image.Bytes
+
+    python bench_image_sources.py --images 20 --image-kb 2500 --bandwidth-mbps 400
+"""
+import os, json, argparse
+
+from bench_utils import load_module, summarize, timed
+from local_aws import FakeS3, FakeRekognition, serve_s3_http
+
+
+def run(n, image_kb, s3_ms, bandwidth, rek_ms, rek_ms_per_mb):
+    sa = load_module("Shared/skin_analyzer.py", name="skin_analyzer")
+    from detectors import RekognitionDetector   # Shared/ อยู่ใน sys.path หลัง load_module
+    s3 = FakeS3(latency_ms=s3_ms, bandwidth_mbps=bandwidth)
+    rek = FakeRekognition(latency_ms=rek_ms, s3=s3, ms_per_mb=rek_ms_per_mb)
+    keys = [f"uploads/user=bench/dt=2025/01/01/{i}.jpg" for i in range(n)]
+    for k in keys:
+        s3.put_object(Bucket="bench-in", Key=k, Body=os.urandom(image_kb * 1024))
+    server, base = serve_s3_http(s3, "bench-in")
+
+    report = {"images": n, "image_kb": image_kb}
+    try:
+        for mode in ("s3object", "bytes", "presigned_url"):
+            analyzer = sa.SkinAnalyzer(RekognitionDetector(rek, "arn:bench"), s3, 50.0)   # ไม่ใช้ cache เพื่อวัดทุกภาพ
+            rek.bytes_in = 0
+            samples, moved = [], 0
+            for k in keys:
+                if mode == "presigned_url":
+                    out, ms = timed(analyzer.analyze, sa.PresignedUrlSource(f"{base}/{k}"))
+                else:
+                    out, ms = timed(analyzer.analyze_s3, "bench-in", k, None, mode)
+                samples.append(ms)
+                moved += out["bytes_moved"]
+            report[mode] = dict(summarize(samples),
+                                bytes_through_lambda_per_image=moved // n,
+                                rekognition_payload_per_image=rek.bytes_in // n)
+    finally:
+        server.shutdown()
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=20)
+    ap.add_argument("--image-kb", type=int, default=2500)
+    ap.add_argument("--s3-latency-ms", type=float, default=15.0)
+    ap.add_argument("--bandwidth-mbps", type=float, default=400.0)
+    ap.add_argument("--rek-latency-ms", type=float, default=250.0)
+    ap.add_argument("--rek-ms-per-mb", type=float, default=20.0)
+    a = ap.parse_args()
+    print(json.dumps(run(a.images, a.image_kb, a.s3_latency_ms, a.bandwidth_mbps,
+                         a.rek_latency_ms, a.rek_ms_per_mb), indent=2))
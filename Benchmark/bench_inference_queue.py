@@ -0,0 +1,118 @@
+"""
+bench_inference_queue.py — traffic spike ใส่โมเดลที่ capacity จำกัด (FakeRekognition capacity_tps)
+เทียบ
+  naive      : ทุก request ยิง detect_custom_labels พร้อมกันทันที (แบบเดิม) → ที่โดน throttle = fail
+  dispatcher : LocalDispatcher + Throttle (token bucket + AIMD + backoff)
+วัด success / throttled / throughput และ p50/p99 (จากตอน spike เข้า จนได้ผล)
+
+แล้วรัน analyze_skin.handler ด้วย SQS event เพื่อดู batchItemFailures
+
+    python bench_inference_queue.py --spike 60 --capacity-tps 10 --rek-latency-ms 80
+"""
+import os, sys, json, time, argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_utils import load_module, summarize, REPO_ROOT
+from local_aws import FakeS3, FakeRekognition, s3_put_event, sqs_event
+
+sys.path.insert(0, str(REPO_ROOT / "Shared"))
+from inference_dispatch import Throttle, LocalDispatcher  # noqa: E402
+
+BUCKET = "bench-in"
+
+
+def _seed(n):
+    s3 = FakeS3()
+    keys = [f"uploads/user=bench/dt=2025/01/01/{i:03d}.jpg" for i in range(n)]
+    for k in keys:
+        s3.put_object(Bucket=BUCKET, Key=k, Body=os.urandom(50_000))
+    return s3, keys
+
+
+def _detect(rek, key):
+    return rek.detect_custom_labels(ProjectVersionArn="arn:bench",
+                                    Image={"S3Object": {"Bucket": BUCKET, "Name": key}})
+
+
+def naive(spike, capacity, rek_ms):
+    s3, keys = _seed(spike)
+    rek = FakeRekognition(latency_ms=rek_ms, s3=s3, capacity_tps=capacity)
+    lat, failed = [], 0
+    t0 = time.perf_counter()
+
+    def one(k):
+        try:
+            _detect(rek, k)
+            return (time.perf_counter() - t0) * 1000.0
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=spike) as ex:
+        for ms in ex.map(one, keys):
+            if ms is None:
+                failed += 1
+            else:
+                lat.append(ms)
+    wall = time.perf_counter() - t0
+    return {"ok": len(lat), "failed": failed, "throttled_calls": rek.calls["throttled"],
+            "throughput_rps": round(len(lat) / wall, 2), "latency": summarize(lat)}
+
+
+def dispatcher(spike, capacity, rek_ms, workers):
+    s3, keys = _seed(spike)
+    rek = FakeRekognition(latency_ms=rek_ms, s3=s3, capacity_tps=capacity)
+    # ตั้ง rate ต่ำกว่า capacity เล็กน้อย; AIMD จะจัดการส่วนที่เหลือ
+    throttle = Throttle(rate=capacity * 0.9, burst=max(1.0, capacity * 0.5), max_concurrency=workers,
+                        max_retries=8, base_delay=0.05)
+    d = LocalDispatcher(lambda k: _detect(rek, k), throttle=throttle, workers=workers)
+    t0 = time.perf_counter()
+    done_ms = {}
+    futs = []
+    for k in keys:
+        f = d.submit(k)
+        f.add_done_callback(lambda _f, k=k: done_ms.__setitem__(k, (time.perf_counter() - t0) * 1000.0))
+        futs.append(f)
+    failed = 0
+    for f in futs:
+        try:
+            f.result()
+        except Exception:
+            failed += 1
+    wall = time.perf_counter() - t0
+    d.close()
+    lat = [done_ms[k] for k, f in zip(keys, futs) if not f.exception()]
+    return {"ok": len(lat), "failed": failed, "throttled_calls": rek.calls["throttled"],
+            "throughput_rps": round(len(lat) / wall, 2), "latency": summarize(lat),
+            "throttle": throttle.snapshot()}
+
+
+def handler_sqs(spike, capacity, rek_ms):
+    mod = load_module("Frontend/Py/analyze_skin.py",
+                      env={"MODEL_ARN": "arn:bench", "RESULT_BUCKET": "bench-out", "INFERENCE_CACHE": "off"})
+    mod.logger.setLevel("ERROR")
+    s3, keys = _seed(spike)
+    mod.s3 = s3
+    mod.rekognition = FakeRekognition(latency_ms=rek_ms, s3=s3, capacity_tps=capacity)
+    sys.modules["skin_analyzer"].MAX_WORKERS = 8
+    # retry น้อยๆ เพื่อให้เห็นว่า message ที่ยังโดน throttle ถูกคืนให้ SQS
+    mod._throttle = Throttle(rate=capacity * 4, burst=capacity * 4, max_concurrency=8,
+                             max_retries=1, base_delay=0.01)
+    out = mod.handler(sqs_event(s3_put_event(BUCKET, keys, s3)), None)
+    return {"processed": out["processed"], "failed": len(out["failed"]),
+            "batchItemFailures": len(out.get("batchItemFailures", [])), "throttle": out["throttle"]}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--spike", type=int, default=60)
+    ap.add_argument("--capacity-tps", type=float, default=10.0)
+    ap.add_argument("--rek-latency-ms", type=float, default=80.0)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+    report = {
+        "spike": args.spike, "capacity_tps": args.capacity_tps,
+        "naive": naive(args.spike, args.capacity_tps, args.rek_latency_ms),
+        "dispatcher": dispatcher(args.spike, args.capacity_tps, args.rek_latency_ms, args.workers),
+        "handler_sqs": handler_sqs(args.spike, args.capacity_tps, args.rek_latency_ms),
+    }
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,106 @@
+"""
+bench_ingredient_index.py — กรองสินค้าตามส่วนผสม (avoid / require) ด้วย Shared/ingredient_index.py
+
+  substring_scan : วนทุก row แล้วหา substring ในข้อความ ingredients (วิธีเดียวที่ทำได้ก่อนมี index)
+  bitmap         : IngredientIndex.allowed — AND/OR ของ bitmap (คำค้นแบบ substring resolve ครั้งแรกแล้ว cache)
+  bitmap_first   : ครั้งแรกของคำค้นที่ต้อง resolve substring ใน vocabulary
+
+แคตตาล็อกใหญ่กว่า CSV (811 แถว) = ต่อแถวเดิมซ้ำจนครบ n
+agree = สัดส่วน query ที่ได้ชุด row เท่ากับ substring_scan (ต่างได้เมื่อคำค้นคร่อมระหว่างส่วนผสม 2 ตัว)
+
+    python bench_ingredient_index.py --sizes 811,10000,50000
+"""
+import io, sys, json, time, argparse, tempfile, contextlib
+
+import numpy as np
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3
+from catalog_fixture import load_rows, CSV_PATH
+
+QUERIES = [
+    {"avoid": ["fragrance"]},
+    {"avoid": ["fragrance", "paraben"]},
+    {"require": ["niacinamide"]},
+    {"require": ["glycerin", "hyaluronate"], "avoid": ["alcohol denat"]},
+    {"avoid": ["parfum", "linalool", "limonene", "citral"]},
+    {"require": ["retinol"], "avoid": ["fragrance"]},
+    {"require": ["salicylic acid"]},
+    {"avoid": ["sodium lauryl sulfate", "mineral oil", "petrolatum"]},
+]
+
+
+def _scan(texts, avoid=(), require=()):
+    req = [t.lower() for t in require]
+    avo = [t.lower() for t in avoid]
+    return np.array([all(t in s for t in req) and not any(t in s for t in avo) for s in texts], dtype=bool)
+
+
+def _time(fn, n=5):
+    lat = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        out = fn()
+        lat.append((time.perf_counter() - t0) * 1000)
+    return out, summarize(lat)
+
+
+def _suggestion(ii_mod):
+    """lambda_suggestionProduct: avoid/require บน snapshot (ผลต้องตรงกับกรองเองจาก CSV)"""
+    mod = load_module("Product/lambda_suggestionProduct.py",
+                      env={"SNAPSHOT_PATH": tempfile.mktemp(prefix="bench_ing_", suffix=".dvcs")})
+    s3 = FakeS3()
+    s3.put_object(Bucket=mod.BUCKET, Key=mod.CSV_KEY, Body=CSV_PATH.read_bytes())   # ไม่มี snapshot → แปลงเอง
+    mod.s3 = s3
+    ev = {"skin_concern": "Acne", "avoid": ["fragrance", "paraben"], "require": ["glycerin"]}
+    with contextlib.redirect_stdout(io.StringIO()):
+        mod.lambda_handler({"skin_concern": "Acne"}, None)
+        lat = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            out = mod.lambda_handler(ev, None)
+            lat.append((time.perf_counter() - t0) * 1000)
+    got = [r["name"] for r in json.loads(out["body"])]
+    rows = load_rows()
+    want = [r["name"] for r, ok in zip(rows, _scan([r["ingredients"] for r in rows], ev["avoid"], ev["require"]))
+            if ok and r["Oily"] == "1"]
+    return {**summarize(lat), "products": len(got), "matches_substring_scan": got == want}
+
+
+def run(sizes):
+    load_module("Shared/ingredient_index.py", name="ingredient_index")
+    ii = sys.modules["ingredient_index"]
+    base = [r["ingredients"] for r in load_rows()]
+    report = {"queries": len(QUERIES), "tiers": {}}
+    for n in sizes:
+        texts = [base[i % len(base)] for i in range(n)]
+        t0 = time.perf_counter()
+        index = ii.IngredientIndex(texts)
+        tier = {"build_ms": round((time.perf_counter() - t0) * 1000, 1), "keys": len(index),
+                "bitmap_kb": round(len(index) * index.nbytes / 1024, 1)}
+        lowered = [t.lower() for t in texts]
+        scan_lat, first_lat, warm_lat, agree = [], [], [], 0
+        for q in QUERIES:
+            want, s = _time(lambda: _scan(lowered, **q), 3)
+            scan_lat.append(s["p50_ms"])
+            index._resolved.clear()
+            t0 = time.perf_counter()
+            index.allowed(**q)
+            first_lat.append((time.perf_counter() - t0) * 1000)
+            got, s = _time(lambda: index.allowed(**q), 20)
+            warm_lat.append(s["p50_ms"])
+            agree += bool((got == want).all())
+        tier["substring_scan"] = summarize(scan_lat)
+        tier["bitmap_first"] = summarize(first_lat)
+        tier["bitmap"] = summarize(warm_lat)
+        tier["agree"] = f"{agree}/{len(QUERIES)}"
+        report["tiers"][str(n)] = tier
+    report["suggestion_handler"] = _suggestion(ii)
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="811,10000,50000")
+    args = ap.parse_args()
+    print(json.dumps(run([int(s) for s in args.sizes.split(",")]), indent=2))
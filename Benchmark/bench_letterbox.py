@@ -0,0 +1,70 @@
+"""
+bench_letterbox.py — ผลของการ letterbox ภาพเป็น 640×640 ก่อนเรียก detect_custom_labels
+รายงาน payload ที่ส่งให้ Rekognition และ latency ต่อภาพ (โหลด + normalize + detect)
+
+Rekognition จำลองด้วย FakeRekognition: latency คงที่ + ms ต่อ MB ของ payload
+    python bench_letterbox.py --images 10 --width 3024 --height 4032
+"""
+import io, json, random, argparse
+
+from PIL import Image, ImageFilter
+
+from bench_utils import load_module, summarize, timed
+from local_aws import FakeS3, FakeRekognition
+
+
+def _photo(w, h, seed):
+    # ภาพสังเคราะห์ที่บีบอัดได้ใกล้เคียงภาพถ่ายจริง (gradient + noise ที่ถูก blur)
+    rnd = random.Random(seed)
+    small = Image.effect_noise((w // 8, h // 8), 60).convert("RGB")
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    img = small.resize((w, h), Image.BICUBIC)
+    overlay = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+    img = Image.blend(img, overlay, rnd.uniform(0.3, 0.6))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def run(n, w, h, rek_ms, rek_ms_per_mb, s3_ms, bandwidth):
+    sa = load_module("Shared/skin_analyzer.py", name="skin_analyzer")
+    from detectors import RekognitionDetector   # Shared/ อยู่ใน sys.path หลัง load_module
+    s3 = FakeS3(latency_ms=s3_ms, bandwidth_mbps=bandwidth)
+    keys = []
+    for i in range(n):
+        k = f"uploads/user=bench/dt=2025/01/01/{i}.jpg"
+        s3.put_object(Bucket="bench-in", Key=k, Body=_photo(w, h, i))
+        keys.append(k)
+
+    report = {"images": n, "size": f"{w}x{h}"}
+    for label, normalize in (("original_bytes", False), ("letterbox_640", True)):
+        rek = FakeRekognition(latency_ms=rek_ms, ms_per_mb=rek_ms_per_mb)
+        analyzer = sa.SkinAnalyzer(RekognitionDetector(rek, "arn:bench"), s3, 50.0)
+        samples, payload, load_ms = [], 0, []
+        for k in keys:
+            if normalize:
+                # ไม่ใช้ S3 cache ของภาพ normalize เพื่อวัดต้นทุนการแปลงทุกครั้ง
+                src = sa.NormalizedSource(sa.S3BytesSource("bench-in", k))
+            else:
+                src = sa.S3BytesSource("bench-in", k)
+            out, ms = timed(analyzer.analyze, src)
+            samples.append(ms)
+            payload += out["payload_bytes"]
+            load_ms.append(out["timings_ms"].get("load", 0.0))
+        report[label] = dict(summarize(samples), payload_bytes_per_image=payload // n,
+                             load_and_normalize_p50_ms=sorted(load_ms)[len(load_ms) // 2])
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=10)
+    ap.add_argument("--width", type=int, default=3024)
+    ap.add_argument("--height", type=int, default=4032)
+    ap.add_argument("--rek-latency-ms", type=float, default=250.0)
+    ap.add_argument("--rek-ms-per-mb", type=float, default=60.0)
+    ap.add_argument("--s3-latency-ms", type=float, default=15.0)
+    ap.add_argument("--bandwidth-mbps", type=float, default=400.0)
+    a = ap.parse_args()
+    print(json.dumps(run(a.images, a.width, a.height, a.rek_latency_ms, a.rek_ms_per_mb,
+                         a.s3_latency_ms, a.bandwidth_mbps), indent=2))
@@ -0,0 +1,56 @@
+"""
+bench_local_detector.py — รัน analyze_skin.handler ด้วย DETECTOR_BACKEND=local (ไม่ต้องมีโมเดล Rekognition)
+วัดจำนวนภาพต่อวินาที และการกระจายของ label ที่ stub สร้าง
+
+    python bench_local_detector.py --images 5000 --batch 10 --latency-ms 0
+    python bench_local_detector.py --labels '{"Acne": 0.7, "Oily-Skin": 0.5}'
+"""
+import os, sys, json, time, argparse
+from collections import Counter
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3, s3_put_event
+
+
+def run(n_images, batch, latency_ms, labels):
+    env = {"MODEL_ARN": "arn:bench", "RESULT_BUCKET": "bench-out", "DETECTOR_BACKEND": "local",
+           "LOCAL_DETECTOR_LATENCY_MS": latency_ms, "INFERENCE_CACHE": "off"}
+    if labels:
+        env["LOCAL_DETECTOR_LABELS"] = labels
+    mod = load_module("Frontend/Py/analyze_skin.py", env=env)
+    mod.logger.setLevel("WARNING")
+    sys.modules["skin_analyzer"].logger.setLevel("WARNING")
+
+    s3 = FakeS3()
+    keys = [f"uploads/user=bench/dt=2025/01/01/{i:05d}.jpg" for i in range(n_images)]
+    for k in keys:
+        s3.put_object(Bucket="bench-in", Key=k, Body=os.urandom(64))
+    s3.calls.clear()
+    mod.s3 = s3
+
+    per_batch = []
+    t0 = time.perf_counter()
+    for i in range(0, n_images, batch):
+        t1 = time.perf_counter()
+        out = mod.handler(s3_put_event("bench-in", keys[i:i + batch]), None)
+        per_batch.append((time.perf_counter() - t1) * 1000.0)
+        assert out["ok"], out["failed"]
+    wall = time.perf_counter() - t0
+
+    seen = Counter()
+    for (b, k), obj in s3.objects.items():
+        if b == "bench-out":
+            seen.update(json.loads(obj["Body"])["labels"])
+    return {"images": n_images, "images_per_sec": round(n_images / wall, 1),
+            "handler_latency": summarize(per_batch), "s3_requests": dict(s3.calls),
+            "label_rate": {k: round(v / n_images, 3) for k, v in sorted(seen.items())}}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=2000)
+    ap.add_argument("--batch", type=int, default=10)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--labels", default="", help='JSON เช่น {"Acne": 0.6}')
+    args = ap.parse_args()
+    print(json.dumps(run(args.images, args.batch, args.latency_ms, args.labels), indent=2))
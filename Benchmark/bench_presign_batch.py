@@ -0,0 +1,67 @@
+"""
+bench_presign_batch.py — เวลาที่ใช้ขอ presigned upload สำหรับ N รูปต่อ session
+แบบเดิม (1 HTTP call ต่อรูป) เทียบกับ batch mode (1 HTTP call ต่อ session)
+
+round trip ของ API Gateway + Lambda จำลองด้วย --api-rtt-ms (sleep ก่อนเรียก handler)
+    python bench_presign_batch.py --images 3 --api-rtt-ms 80
+"""
+import json, time, argparse
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3
+
+PRESIGNERS = {
+    "frontend": ("Frontend/Py/lambda_presigner.py", "handler",
+                 lambda: {"queryStringParameters": {"ext": "jpg"}}),
+    "byNam": ("UserUpload/byNam/lambda_presigner.py", "handler",
+              lambda: {"queryStringParameters": {"ext": "jpg", "userId": "bench"}}),
+    "byNammon": ("UserUpload/byNammon/uploadToS3Lambda.py", "lambda_handler",
+                 lambda: {"queryStringParameters": {"filename": "face.jpg", "contentType": "image/jpeg"}}),
+}
+
+
+def _call(fn, event, api_rtt_ms):
+    time.sleep(api_rtt_ms / 1000.0)  # API Gateway + Lambda invoke round trip
+    resp = fn(event, None)
+    assert resp["statusCode"] == 200, resp
+    return json.loads(resp["body"])
+
+
+def run(images, api_rtt_ms, sessions):
+    env = {"RAW_BUCKET": "bench-raw", "UPLOAD_BUCKET": "bench-raw"}
+    report = {"images_per_session": images, "api_rtt_ms": api_rtt_ms}
+    for name, (path, attr, single_event) in PRESIGNERS.items():
+        mod = load_module(path, env=env)
+        if hasattr(mod, "logger"):
+            mod.logger.setLevel("WARNING")
+        fake = FakeS3()
+        mod.s3 = fake
+        fn = getattr(mod, attr)
+
+        single, batch = [], []
+        for _ in range(sessions):
+            t0 = time.perf_counter()
+            for _ in range(images):
+                _call(fn, single_event(), api_rtt_ms)
+            single.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            files = ",".join(["jpg:2500000"] * images)
+            body = _call(fn, {"queryStringParameters": {"files": files, "userId": "bench"}}, api_rtt_ms)
+            assert len(body["uploads"]) == images
+            batch.append((time.perf_counter() - t0) * 1000)
+
+        report[name] = {
+            "single": dict(summarize(single), http_calls_per_session=images),
+            "batch": dict(summarize(batch), http_calls_per_session=1),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=3)
+    ap.add_argument("--api-rtt-ms", type=float, default=60.0)
+    ap.add_argument("--sessions", type=int, default=20)
+    args = ap.parse_args()
+    print(json.dumps(run(args.images, args.api_rtt_ms, args.sessions), indent=2))
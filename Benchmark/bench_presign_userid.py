@@ -0,0 +1,56 @@
+"""
+bench_presign_userid.py — เปรียบเทียบ latency ของ Frontend/Py/lambda_presigner.handler
+ระหว่างวิธีสร้าง userId แบบเดิม (list_objects_v2 เช็คซ้ำใน S3) กับแบบ time-ordered (ไม่มี S3 call)
+
+ใช้ FakeS3 ที่หน่วง latency ต่อ request แทน S3 จริง
+    python bench_presign_userid.py --n 500 --s3-latency-ms 25
+"""
+import json, secrets, argparse
+
+from bench_utils import load_module, summarize, timed
+from local_aws import FakeS3
+
+
+def legacy_generate_unique_user_id(bucket, s3_client):
+    # วิธีเดิมก่อน user-027: สุ่ม 8 hex แล้ว list_objects_v2 เช็คว่า prefix ยังว่าง
+    for _ in range(10):
+        user_id = secrets.token_hex(4)
+        resp = s3_client.list_objects_v2(Bucket=bucket, Prefix=f"uploads/user={user_id}/", MaxKeys=1)
+        if not resp.get("Contents"):
+            return user_id
+    raise Exception("Failed to generate unique user ID (collision)")
+
+
+def run(n, s3_latency_ms):
+    mod = load_module("Frontend/Py/lambda_presigner.py", env={"RAW_BUCKET": "bench-raw"})
+    mod.logger.setLevel("WARNING")
+    event = {"queryStringParameters": {"ext": "jpg"}}
+    report = {}
+
+    new_impl = mod.generate_unique_user_id
+    for label, gen in (("legacy_list_check", lambda: legacy_generate_unique_user_id("bench-raw", mod.s3)),
+                       ("time_ordered", new_impl)):
+        mod.s3 = FakeS3(latency_ms=s3_latency_ms)
+        mod.generate_unique_user_id = gen
+        samples = []
+        for _ in range(n):
+            resp, ms = timed(mod.handler, event, None)
+            assert resp["statusCode"] == 200, resp
+            samples.append(ms)
+        report[label] = dict(summarize(samples), s3_requests=dict(mod.s3.calls))
+    mod.generate_unique_user_id = new_impl
+
+    # ตรวจว่า id ไม่ซ้ำและยังได้ layout uploads/user=<id>/dt=.../
+    ids = {new_impl() for _ in range(100000)}
+    report["unique_ids_of_100000"] = len(ids)
+    body = json.loads(mod.handler(event, None)["body"])
+    report["sample_key"] = body["key"]
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=300)
+    ap.add_argument("--s3-latency-ms", type=float, default=20.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.n, args.s3_latency_ms), indent=2))
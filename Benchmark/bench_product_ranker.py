@@ -0,0 +1,107 @@
+"""
+bench_product_ranker.py — จัดอันดับสินค้าด้วย Shared/product_ranker.py (matrix-vector + argpartition)
+
+  python_topk : ให้คะแนนทีละ dict ใน Python แล้ว heapq.nlargest (เทียบเฉพาะ tier ที่มี dict ครบ)
+  ranker      : ProductRanker.top_k (ไม่กรอง / กรองราคา / กรองแบรนด์)
+
+tier ที่ใหญ่กว่า --materialize-max สร้างด้วย ProductRanker.from_columns จากคอลัมน์ของแคตตาล็อกจริง
+ที่ต่อกันซ้ำจนครบ n (ไม่ต้องมี dict 1M ชิ้นใน RAM) ราคาสุ่มเพิ่ม/ลด 20%
+
+    python bench_product_ranker.py --sizes 10000,100000,1000000 --queries 50
+"""
+import sys, json, time, heapq, random, argparse
+
+import numpy as np
+
+from bench_utils import load_module, summarize
+from catalog_fixture import products, LABEL_SKIN_TYPE
+
+
+def _queries(n, brands, seed=0):
+    rng = random.Random(seed)
+    labels = sorted(LABEL_SKIN_TYPE)
+    out = []
+    for _ in range(n):
+        out.append({"labels": rng.sample(labels, rng.randint(1, 5)),
+                    "price": {"max_price": rng.choice([20, 40, 80])},
+                    "brand": {"brands": rng.sample(brands, 3)}})
+    return out
+
+
+def _python_topk(items, labels, rank_weight, k=10, max_price=None, brands=None):
+    top = max(float(p["rank"]) for p in items) or 1.0
+    want = set(labels)
+    brands = {b.lower() for b in brands} if brands else None
+
+    def ok(p):
+        if not want.intersection(p["tags"]):
+            return False
+        if max_price is not None and not float(p["price"]) <= max_price:
+            return False
+        return brands is None or p["brand"].lower() in brands
+
+    score = lambda p: (len(want.intersection(p["tags"])) + rank_weight * float(p["rank"]) / top,
+                       [-ord(c) for c in p["product_id"]])
+    return heapq.nlargest(k, (p for p in items if ok(p)), key=score)
+
+
+def _time(fn, queries):
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return summarize(lat)
+
+
+def _tiled(pr, base, n, seed=0):
+    reps = -(-n // len(base))
+    rng = np.random.default_rng(seed)
+    price = np.tile(base.price, reps)[:n] * rng.uniform(0.8, 1.2, n).astype(np.float32)
+    return pr.ProductRanker.from_columns(
+        np.tile(base.matrix, (reps, 1))[:n], base.tags, np.tile(base.rank, reps)[:n], price,
+        np.tile(base.brand, reps)[:n], base.brands, np.array([f"p{i:07d}" for i in range(n)]))
+
+
+def run(sizes, n_queries, materialize_max):
+    load_module("Shared/product_ranker.py", name="product_ranker")
+    pr = sys.modules["product_ranker"]
+    base_items = products()
+    base = pr.ProductRanker(base_items)
+    queries = _queries(n_queries, sorted({p["brand"] for p in base_items}))
+    report = {"queries": n_queries, "rank_weight": pr.RANKER_RANK_WEIGHT, "tiers": {}}
+    for n in sizes:
+        tier = {}
+        if n <= materialize_max:
+            items = products(n)
+            t0 = time.perf_counter()
+            ranker = pr.ProductRanker(items)
+            tier["build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            tier["python_topk"] = _time(lambda q: _python_topk(items, q["labels"], ranker.rank_weight), queries)
+            tier["python_topk_price"] = _time(
+                lambda q: _python_topk(items, q["labels"], ranker.rank_weight, **q["price"]), queries)
+            # ลำดับต้องตรงกับ Python (score เท่ากัน → product_id น้อยก่อน)
+            same = all([p["product_id"] for p in ranker.top_k(q["labels"], 10, **q["brand"])]
+                       == [p["product_id"] for p in _python_topk(items, q["labels"], ranker.rank_weight, **q["brand"])]
+                       for q in queries[:10])
+            tier["matches_python_order"] = same
+        else:
+            t0 = time.perf_counter()
+            ranker = _tiled(pr, base, n)
+            tier["build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            tier["build_note"] = "from_columns (tiled catalog)"
+        tier["matrix_mb"] = round(ranker.matrix.nbytes / 2**20, 1)
+        tier["ranker"] = _time(lambda q: ranker.top_k(q["labels"], 10), queries)
+        tier["ranker_price"] = _time(lambda q: ranker.top_k(q["labels"], 10, **q["price"]), queries)
+        tier["ranker_brand"] = _time(lambda q: ranker.top_k(q["labels"], 10, **q["brand"]), queries)
+        report["tiers"][str(n)] = tier
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--materialize-max", type=int, default=100000)
+    args = ap.parse_args()
+    print(json.dumps(run([int(s) for s in args.sizes.split(",")], args.queries, args.materialize_max), indent=2))
@@ -0,0 +1,102 @@
+"""
+bench_quality_gate.py — เวลาที่ quality gate ใช้ และจำนวน detect_custom_labels ที่ประหยัดได้
+
+สร้างภาพสังเคราะห์ (ผิวคมชัด / เบลอ / มืด / สว่างเกิน / เล็ก / ไม่มีผิว) ตามสัดส่วน --bad-ratio
+แล้วรัน analyze_skin.handler ด้วย QUALITY_GATE=off กับ on (FakeRekognition มี latency)
+
+    python bench_quality_gate.py --images 40 --bad-ratio 0.3 --rek-latency-ms 300
+"""
+import io, sys, json, random, argparse
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageEnhance
+
+from bench_utils import load_module, summarize, timed
+from local_aws import FakeS3, FakeRekognition, s3_put_event
+
+IN_BUCKET = "bench-in"
+
+
+def _skin(rng, w=1200, h=1200):
+    tone = np.array([205, 150, 125], np.float32) * rng.uniform(0.7, 1.05)
+    yy, xx = np.mgrid[0:h, 0:w]
+    shade = 0.85 + 0.15 * np.sin(xx / 180.0) * np.cos(yy / 210.0)
+    img = tone * shade[..., None] + rng.normal(0, 9, (h, w, 1))
+    for _ in range(1500):   # รูขุมขน / จุด
+        x, y = rng.integers(0, w - 4), rng.integers(0, h - 4)
+        img[y:y + 3, x:x + 3] *= 0.75
+    return Image.fromarray(np.clip(img, 0, 255).astype(np.uint8))
+
+
+BAD = {
+    "blurry": lambda im, rng: im.filter(ImageFilter.GaussianBlur(6)),
+    "dark": lambda im, rng: ImageEnhance.Brightness(im).enhance(0.15),
+    "bright": lambda im, rng: ImageEnhance.Brightness(im).enhance(2.5),
+    "tiny": lambda im, rng: im.resize((200, 200)),
+    "no_skin": lambda im, rng: Image.fromarray(
+        np.clip(rng.normal(0, 20, (1200, 1200, 3)) + np.array([60, 90, 200]), 0, 255).astype(np.uint8)),
+}
+
+
+def make_images(n, bad_ratio, seed):
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+    out = []
+    for i in range(n):
+        im = _skin(rng)
+        kind = "good"
+        if pick.random() < bad_ratio:
+            kind = pick.choice(sorted(BAD))
+            im = BAD[kind](im, rng)
+        buf = io.BytesIO()
+        im.save(buf, "JPEG", quality=88)
+        out.append((kind, buf.getvalue()))
+    return out
+
+
+def run(images, rek_ms):
+    report = {"images": len(images), "kinds": {}}
+    for kind, _ in images:
+        report["kinds"][kind] = report["kinds"].get(kind, 0) + 1
+
+    for gate in ("off", "on"):
+        mod = load_module("Frontend/Py/analyze_skin.py", name=f"bench_analyze_gate_{gate}",
+                          env={"MODEL_ARN": "arn:bench", "RESULT_BUCKET": "bench-out", "INFERENCE_CACHE": "off",
+                               "QUALITY_GATE": gate})
+        sa = sys.modules["skin_analyzer"]
+        sa.QUALITY_GATE = gate          # skin_analyzer ถูก import ครั้งเดียว → ตั้งค่าตรงๆ
+        mod.logger.setLevel("WARNING")
+        sa.logger.setLevel("WARNING")
+        s3 = FakeS3()
+        rek = FakeRekognition(latency_ms=rek_ms, s3=s3)
+        mod.s3, mod.rekognition = s3, rek
+        per_kind, retakes = {}, 0
+        for i, (kind, data) in enumerate(images):
+            key = f"uploads/user=bench/dt=2025/01/01/{gate}-{i:03d}.jpg"
+            s3.put_object(Bucket=IN_BUCKET, Key=key, Body=data)
+            _, ms = timed(mod.handler, s3_put_event(IN_BUCKET, [key], s3), None)
+            per_kind.setdefault(kind, []).append(ms)
+            res = json.loads(s3.get_object(Bucket="bench-out",
+                                           Key=key.replace("uploads/", "results/", 1) + ".json")["Body"].read())
+            retakes += bool(res.get("retake"))
+        sa.QUALITY_GATE = "off"
+        row = {"detect_calls": rek.calls["detect_custom_labels"], "retake_results": retakes,
+               "handler_ms_by_kind": {k: summarize(v) for k, v in sorted(per_kind.items())}}
+        report[f"gate={gate}"] = row
+
+    # เวลาของ gate อย่างเดียว
+    from image_quality import assess
+    samples = [assess(data)["timings_ms"]["total"] for _, data in images]
+    report["gate_ms"] = summarize(samples)
+    report["detect_calls_saved"] = report["gate=off"]["detect_calls"] - report["gate=on"]["detect_calls"]
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=30)
+    ap.add_argument("--bad-ratio", type=float, default=0.3)
+    ap.add_argument("--rek-latency-ms", type=float, default=300.0)
+    ap.add_argument("--seed", type=int, default=3)
+    args = ap.parse_args()
+    print(json.dumps(run(make_images(args.images, args.bad_ratio, args.seed), args.rek_latency_ms), indent=2))
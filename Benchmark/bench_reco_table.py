@@ -0,0 +1,146 @@
+"""
+bench_reco_table.py — ตารางคำแนะนำที่คำนวณไว้ล่วงหน้า (Shared/reco_table.py + Product/materialize_reco_table.py)
+
+  build     : เวลาสร้าง artifact ทุกชุด label (2048) + ขนาด
+  cold      : เวลาโหลด artifact ตอน cold start (get_object + gunzip + parse)
+  serve     : GenerateRecommendationFile / RecommendSkincare ต่อ invocation — reco table vs catalog cache (warm)
+              vs tag index (ไม่มี cache)
+  same      : ผลจากตารางตรงกับการจัดอันดับสดทุก mask (top-K) และ recommend() ของ seed เดียวกัน
+  stale     : แก้สินค้า + bump version → ลัมบ์ดาเลิกใช้ตาราง (จัดอันดับสด) จน job สร้างใหม่
+
+    python bench_reco_table.py --products 811 --invocations 50 --ddb-latency-ms 8
+"""
+import io, sys, json, time, random, argparse, contextlib
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3, FakeDynamoTable, s3_put_event
+from catalog_fixture import load_table
+
+BUCKET = "bench-out"
+
+
+def _quiet(fn, *a):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*a)
+
+
+def _label_sets(labels, n, seed=0):
+    rng = random.Random(seed)
+    return [rng.sample(labels, rng.randint(1, 5)) for _ in range(n)]
+
+
+def _generate(mod, s3, sets):
+    lat = []
+    for i, labels in enumerate(sets):
+        key = f"results/user=bench/dt=2025/01/01/{i:04d}.jpg.json"
+        s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"source": {}, "labels": labels}))
+        t0 = time.perf_counter()
+        _quiet(mod.lambda_handler, s3_put_event(BUCKET, [key]), None)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return summarize(lat)
+
+
+def _recommend_skincare(mod, sets):
+    lat = []
+    for labels in sets:
+        t0 = time.perf_counter()
+        _quiet(mod.lambda_handler, {"labels": labels}, None)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return summarize(lat)
+
+
+def run(n_products, n_inv, ddb_ms):
+    # โหลด handler โดยไม่ตั้ง RECO_TABLE_BUCKET (ไม่ให้สร้าง RecoTable กับ AWS จริงตอน import) แล้วใส่ของปลอมเอง
+    gen = load_module("Frontend/Py/GenerateRecommendationFile.py")
+    rec = load_module("Frontend/Py/RecommendSkincare.py")
+    job = load_module("Product/materialize_reco_table.py", env={"RECO_SETTLE_SECS": "0"})
+    rt, cc, ti, recommender = (sys.modules[m] for m in ("reco_table", "catalog_cache", "tag_index", "recommender"))
+    rt.RECO_TABLE_BUCKET = BUCKET
+    table = load_table(FakeDynamoTable("SkincareProducts"), n_products)
+    index = FakeDynamoTable("SkincareProductTags", hash_key="tag", range_key="sk")
+    ti.backfill(table, index)
+    cc.bump_version(table)
+    s3 = FakeS3()
+    job.s3, job.products = s3, table
+    report = {"products": n_products, "ddb_latency_ms": ddb_ms}
+
+    # ---- build ----
+    out = _quiet(job.lambda_handler, {}, None)
+    art = rt.loads(s3.objects[(BUCKET, rt.RECO_TABLE_KEY)]["Body"])
+    raw = len(json.dumps(art, separators=(",", ":")))
+    report["build"] = {**out, "raw_bytes": raw, "skip_same_version": _quiet(job.lambda_handler, {}, None)}
+    # version เพิ่งเปลี่ยน (เช่นกลาง sync) → รอ settle ไม่สร้างทันที
+    job.RECO_SETTLE_SECS = 120
+    cc.bump_version(table)
+    report["build"]["skip_settling"] = _quiet(job.lambda_handler, {}, None)
+    job.RECO_SETTLE_SECS = 0
+    _quiet(job.lambda_handler, {}, None)
+
+    # ---- cold start load ----
+    runs = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        reco = rt.RecoTable(s3, BUCKET, table=table)
+        runs.append((time.perf_counter() - t0) * 1000)
+    report["cold_load_ms"] = round(min(runs), 1)
+
+    # ---- serve ----
+    table.latency_ms = index.latency_ms = ddb_ms
+    sets = _label_sets(art["labels"], n_inv)
+    gen.s3, gen.table = s3, table
+    rec.table = table
+    serve = {}
+    for name, cat, idx, use_reco in (("reco_table", None, None, True),
+                                     ("catalog_warm", cc.CatalogCache(table), None, False),
+                                     ("index_query", None, index, False)):
+        if cat:
+            cat.get()   # cold load ไม่นับ
+        gen.catalog, gen.index, gen.reco = cat, idx, reco if use_reco else None
+        rec.catalog, rec.index, rec.reco = cat, idx, reco if use_reco else None
+        r0 = table.consumed_rcu + index.consumed_rcu
+        serve[name] = {"generate": _generate(gen, s3, sets), "recommend_skincare": _recommend_skincare(rec, sets),
+                       "rcu_per_invocation": round((table.consumed_rcu + index.consumed_rcu - r0) / (2 * n_inv), 2)}
+    serve["reco_table"]["stats"] = reco.snapshot()
+    report["serve"] = serve
+
+    # ---- same results as live ranking ----
+    table.latency_ms = index.latency_ms = 0
+    ranker = cc.Catalog(cc.load_catalog(table)).ranker()
+    labels = art["labels"]
+    top_same = all(
+        [p["product_id"] for p in reco.top(chosen, 10)] == [p["product_id"] for p in ranker.top_k(chosen, 10)]
+        for chosen in ([l for i, l in enumerate(labels) if m >> i & 1] for m in range(1, 1 << len(labels))))
+    rec_same = all(
+        [r["name"] for r in recommender.recommend(ls, table, seed=f"k{i}", reco=reco)]
+        == [r["name"] for r in recommender.recommend(ls, catalog=cc.Catalog(cc.load_catalog(table)), seed=f"k{i}")]
+        for i, ls in enumerate(sets[:20]))
+    report["same_as_live"] = {"top_k_all_masks": top_same, "recommend_seeded": rec_same}
+
+    # ---- stale → live fallback → rebuilt ----
+    reco = rt.RecoTable(s3, BUCKET, table=table, version_check_secs=0.2)
+    pid = "p0000000"
+    table.put_item(Item=dict(table.items[pid], rank=0))
+    cc.bump_version(table)
+    t0 = time.perf_counter()
+    while reco.top(["Acne"]) is not None:
+        time.sleep(0.01)
+    stale_after = (time.perf_counter() - t0) * 1000
+    t1 = time.perf_counter()
+    _quiet(job.lambda_handler, {}, None)
+    rebuild_ms = (time.perf_counter() - t1) * 1000
+    while reco.top(["Acne"]) is None:
+        time.sleep(0.01)
+    report["stale"] = {"version_check_secs": 0.2, "fallback_after_ms": round(stale_after, 1),
+                       "rebuild_ms": round(rebuild_ms, 1),
+                       "fresh_again_after_rebuild_ms": round((time.perf_counter() - t1) * 1000, 1),
+                       "stats": reco.snapshot()}
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=811)
+    ap.add_argument("--invocations", type=int, default=50)
+    ap.add_argument("--ddb-latency-ms", type=float, default=8.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.products, args.invocations, args.ddb_latency_ms), indent=2))
@@ -0,0 +1,122 @@
+"""
+bench_result_delivery.py — เวลาที่ผู้ใช้เห็นผล หลังจาก analyze_skin เขียนผลลง S3 แล้ว
+
+เทียบ
+  polling   : แบบเดิมใน script.js รอ 2 วิ แล้ว GET ไฟล์ใน S3 ทุก 3 วิ (ได้ 403/404 จนกว่าไฟล์จะมา)
+  long-poll : GET /result ของ wait_result.py ผ่าน HTTP stand-in (RESULT_NOTIFY_BACKEND=memory)
+              analyze_skin.handler ตัวจริง (DETECTOR_BACKEND=local) เป็นคน publish
+
+--scale ย่อเวลาทั้งหมด (0.2 → 3 วิ กลายเป็น 0.6 วิ) ตัวเลขใน report แปลงกลับเป็นเวลาจริงแล้ว
+
+    python bench_result_delivery.py --users 20 --scale 0.2
+"""
+import json, time, random, argparse, threading, urllib.request
+from urllib.parse import quote
+
+from bench_utils import load_module, summarize
+from local_aws import FakeS3, s3_put_event, serve_lambda_http
+
+IN_BUCKET, OUT_BUCKET = "bench-in", "bench-out"
+
+
+def _setup(s3_ms):
+    env = {"MODEL_ARN": "arn:bench", "RESULT_BUCKET": OUT_BUCKET, "DETECTOR_BACKEND": "local",
+           "INFERENCE_CACHE": "off", "RESULT_NOTIFY_BACKEND": "memory"}
+    analyzer = load_module("Frontend/Py/analyze_skin.py", env=env)
+    waiter = load_module("Frontend/Py/wait_result.py", env=env)
+    analyzer.logger.setLevel("WARNING")
+    s3 = FakeS3(latency_ms=s3_ms)
+    analyzer.s3 = waiter.s3 = s3
+    return analyzer, waiter, s3
+
+
+def _pipeline(analyzer, s3, keys, delays):
+    """จำลองว่าแต่ละภาพใช้เวลาเดินทาง (S3 event + queue + inference) ไม่เท่ากัน แล้วเรียก handler จริง"""
+    def one(k, d):
+        time.sleep(d)
+        s3.put_object(Bucket=IN_BUCKET, Key=k, Body=k.encode())
+        analyzer.handler(s3_put_event(IN_BUCKET, [k], s3), None)
+    threads = [threading.Thread(target=one, args=(k, d)) for k, d in zip(keys, delays)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def run_polling(analyzer, s3, keys, delays, scale):
+    seen, reqs = {}, {"get_object": 0, "not_found": 0}
+    lock = threading.Lock()
+
+    def client(k):
+        out_key = k.replace("uploads/", "results/", 1) + ".json"
+        time.sleep(2 * scale)
+        while True:
+            with lock:
+                reqs["get_object"] += 1
+            try:
+                s3.get_object(Bucket=OUT_BUCKET, Key=out_key)
+                seen[out_key] = time.perf_counter()
+                return
+            except Exception:
+                with lock:
+                    reqs["not_found"] += 1
+            time.sleep(3 * scale)
+
+    clients = [threading.Thread(target=client, args=(k,)) for k in keys]
+    for t in clients:
+        t.start()
+    workers = _pipeline(analyzer, s3, keys, delays)
+    for t in clients + workers:
+        t.join()
+    lag = [(seen[k] - s3.written_at[k]) * 1000 / scale for k in seen]
+    return {"requests": reqs, "extra_latency_real_ms": summarize(lag)}
+
+
+def run_longpoll(analyzer, waiter, s3, keys, delays, scale):
+    server, base = serve_lambda_http(waiter.handler)
+    seen, reqs = {}, {"http_requests": 0, "timeouts_204": 0}
+    lock = threading.Lock()
+
+    def client(k):
+        url = f"{base}/result?key={quote(k, safe='')}&stage=results&timeout={25 * scale}"
+        while True:
+            with lock:
+                reqs["http_requests"] += 1
+            with urllib.request.urlopen(url, timeout=60) as r:
+                status = r.status
+                r.read()
+            if status == 200:
+                seen[k.replace("uploads/", "results/", 1) + ".json"] = time.perf_counter()
+                return
+            with lock:
+                reqs["timeouts_204"] += 1
+
+    clients = [threading.Thread(target=client, args=(k,)) for k in keys]
+    for t in clients:
+        t.start()
+    workers = _pipeline(analyzer, s3, keys, delays)
+    for t in clients + workers:
+        t.join()
+    server.shutdown()
+    lag = [(seen[k] - s3.written_at[k]) * 1000 / scale for k in seen]
+    return {"requests": reqs, "extra_latency_real_ms": summarize(lag)}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--scale", type=float, default=0.2)
+    ap.add_argument("--s3-latency-ms", type=float, default=5.0)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    delays = [rng.uniform(1.0, 8.0) * args.scale for _ in range(args.users)]
+    report = {"users": args.users, "scale": args.scale}
+
+    analyzer, waiter, s3 = _setup(args.s3_latency_ms)
+    keys = [f"uploads/user=u{i}/dt=2025/01/01/poll-{i}.jpg" for i in range(args.users)]
+    report["polling"] = run_polling(analyzer, s3, keys, delays, args.scale)
+
+    keys = [f"uploads/user=u{i}/dt=2025/01/01/lp-{i}.jpg" for i in range(args.users)]
+    report["long_poll"] = run_longpoll(analyzer, waiter, s3, keys, delays, args.scale)
+    print(json.dumps(report, indent=2))
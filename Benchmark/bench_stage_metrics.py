@@ -0,0 +1,196 @@
+"""
+bench_stage_metrics.py — metric ต่อ stage (Shared/metrics.py) ของ pipeline จริงบน S3 / Rekognition ปลอม
+
+  dataset   : curator (ZIP สังเคราะห์ --images ภาพ + COCO) → preprocess → manifest → validate
+              สรุปจาก LocalSink: images/s, bytes, เวลาแต่ละขั้น, จำนวน S3 request ต่อ operation
+              และตรวจว่า metric ตรงกับของจริง (ImagesUploaded = ภาพใน ZIP, s3 request = FakeS3.calls)
+  analyze   : Frontend/Py/analyze_skin.handler --records ภาพ → Images, BytesMoved, rekognition.DetectCustomLabels.Latency
+  recommend : RecommendSkincare.lambda_handler --requests ครั้ง (FakeDynamoTable จาก catalog_fixture)
+  overhead  : µs ต่อภาพของ call metric แบบที่ preprocess ทำ (count ×3, timer ×4, maybe_flush, hook S3 ×3)
+              และ µs ต่อ record ตอน serialize EMF
+
+    python bench_stage_metrics.py --images 200 --records 20 --requests 50 --s3-latency-ms 2 --rek-latency-ms 20
+"""
+import io, os, sys, json, time, random, zipfile, argparse, contextlib
+
+from bench_utils import load_module
+from local_aws import FakeS3, FakeRekognition, FakeDynamoTable, s3_put_event
+from catalog_fixture import load_table
+
+BUCKET, DATASET = "bench-offline", "bench-ds"
+CLASSES = ["Acne", "Dark-Spots", "Wrinkles"]
+
+
+class FakeLambda:
+    def __init__(self):
+        self.invoked = []
+
+    def invoke(self, FunctionName, InvocationType="RequestResponse", Payload=b""):
+        self.invoked.append(FunctionName)
+        return {"StatusCode": 202}
+
+
+def _dataset_zip(n, seed=7):
+    from PIL import Image
+    rnd = random.Random(seed)
+    buf = io.BytesIO()
+    coco = {"images": [], "annotations": [], "categories": [{"id": i + 1, "name": c} for i, c in enumerate(CLASSES)]}
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(n):
+            w, h = rnd.choice([(800, 600), (1024, 768), (640, 640)])
+            img = Image.new("RGB", (w, h), (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+            jb = io.BytesIO()
+            img.save(jb, format="JPEG", quality=85)
+            name = f"img_{i:05d}.jpg"
+            zf.writestr(f"train/{name}", jb.getvalue())
+            coco["images"].append({"id": i + 1, "file_name": name, "width": w, "height": h})
+            for k in range(rnd.randint(1, 3)):
+                bw, bh = rnd.randint(4, 120), rnd.randint(4, 120)
+                coco["annotations"].append({"id": len(coco["annotations"]) + 1, "image_id": i + 1,
+                                            "category_id": rnd.randint(1, len(CLASSES)),
+                                            "bbox": [rnd.randint(0, w - bw), rnd.randint(0, h - bh), bw, bh]})
+        zf.writestr("train/_annotations.coco.json", json.dumps(coco))
+    return buf.getvalue()
+
+
+def _summary():
+    sink = sys.modules["metrics"].local_sink()
+    out = sink.summary()
+    sink.clear()
+    return out
+
+
+def run_dataset(n, s3_ms):
+    env = {"BUCKET": BUCKET, "DATASET_NAME": DATASET, "PREPROCESS_FN": "", "MANIFEST_FN": "",
+           "MIN_CLASS_IMAGES": "1", "PER_CLASS_CAP": str(n), "METRICS_FLUSH_SECS": "0.5"}
+    mods = {name: load_module(f"Dataset/{name}.py", env=env) for name in
+            ("lambda_offline_curator", "lambda_preprocess_images", "lambda_coco_to_rek_manifest",
+             "lambda_validate_dataset")}
+    s3 = FakeS3(latency_ms=s3_ms)
+    for mod in mods.values():
+        mod.s3 = s3
+        if hasattr(mod, "lambda_client"):
+            mod.lambda_client = FakeLambda()
+    zip_key = f"datasets/{DATASET}/ingest/bench.zip"
+    s3.put_object(Bucket=BUCKET, Key=zip_key, Body=_dataset_zip(n))
+    s3.calls.clear()
+    _summary()
+
+    report, calls = {}, {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, event in (("lambda_offline_curator", {"bucket": BUCKET, "key": zip_key}),
+                            ("lambda_preprocess_images", {}),
+                            ("lambda_coco_to_rek_manifest", {}),
+                            ("lambda_validate_dataset", {"bucket": BUCKET, "dataset": DATASET})):
+            before = dict(s3.calls)
+            t0 = time.perf_counter()
+            out = mods[name].handler(event, None)
+            report[name] = {"handler_ms": round((time.perf_counter() - t0) * 1000, 1), "ok": out.get("ok")}
+            calls[name] = {k: v - before.get(k, 0) for k, v in s3.calls.items() if v - before.get(k, 0)}
+    report["metrics"] = _summary()
+
+    # ZIP ที่ไม่มี COCO → curator ตอบ ok: False (ไม่ raise) ต้องยังนับ Errors ให้ alarm เห็น
+    bad_key = f"datasets/{DATASET}-bad/ingest/bad.zip"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("train/img.jpg", b"")
+    s3.put_object(Bucket=BUCKET, Key=bad_key, Body=buf.getvalue())
+    bad_ok = mods["lambda_offline_curator"].handler({"bucket": BUCKET, "key": bad_key}, None).get("ok")
+    bad = _summary()[f"curator/Dataset={DATASET}-bad"]["counts"]
+
+    # metric ต้องตรงกับสิ่งที่เกิดขึ้นจริง
+    cur = report["metrics"][f"curator/Dataset={DATASET}"]["counts"]
+    pre = report["metrics"][f"preprocess/Dataset={DATASET}"]["counts"]
+    pre_calls = {"s3." + "".join(p[:1].upper() + p[1:] for p in k.split("_")): v
+                 for k, v in calls["lambda_preprocess_images"].items()}
+    report["checks"] = {
+        "images_uploaded_matches_zip": cur.get("ImagesUploaded") == n,
+        "curator_errors_zero_on_success": cur.get("Errors") == 0,
+        "curator_errors_on_failure": bad_ok is False and bad.get("Errors") == 1,
+        "images_processed_matches": pre.get("ImagesProcessed") == n,
+        "preprocess_s3_requests_match": all(pre.get(k) == v for k, v in pre_calls.items()),
+        "preprocess_records": report["metrics"][f"preprocess/Dataset={DATASET}"]["records"],
+    }
+    return report
+
+
+def run_analyze(n, s3_ms, rek_ms):
+    mod = load_module("Frontend/Py/analyze_skin.py", env={"MODEL_ARN": "arn:bench", "RESULT_BUCKET": "bench-out"})
+    mod.logger.setLevel("WARNING")
+    s3 = FakeS3(latency_ms=s3_ms)
+    keys = [f"uploads/user=bench/dt=2025/01/01/{i}.jpg" for i in range(n)]
+    for k in keys:
+        s3.put_object(Bucket="bench-in", Key=k, Body=os.urandom(100_000))
+    mod.s3, mod.rekognition = s3, FakeRekognition(latency_ms=rek_ms, s3=s3)
+    Throttle = sys.modules["inference_dispatch"].Throttle
+    mod._throttle, mod._cache = Throttle(rate=1000, burst=1000), None
+    _summary()
+    mod.handler(s3_put_event("bench-in", keys), None)
+    return _summary()
+
+
+def run_recommend(n):
+    mod = load_module("Frontend/Py/RecommendSkincare.py", env={"CATALOG_CACHE": "off", "RECO_TABLE_BUCKET": ""})
+    # catalog_cache ถูก import ไปแล้วตอน analyze → CATALOG_CACHE ตอนนี้ไม่มีผล ตั้ง catalog เองให้จัดอันดับจาก table ปลอม
+    mod.table, mod.index, mod.catalog = load_table(FakeDynamoTable("SkincareProducts")), None, None
+    _summary()
+    rnd = random.Random(3)
+    labels = ["Acne", "Blackheads", "Dark-Spots", "Dry-Skin", "Oily-Skin", "Wrinkles"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            ev = {"labels": rnd.sample(labels, rnd.randint(1, 3))}
+            if i % 3 == 0:
+                ev["max_price"] = 1000
+            mod.lambda_handler(ev, None)
+    return _summary()
+
+
+def run_overhead(n=20000):
+    import metrics, aws_clients
+    per_image = {}
+    for label, sink in (("off", metrics._OffSink()), ("local", metrics.LocalSink())):
+        old = metrics.set_sink(sink)
+        with metrics.stage("bench") as m:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                for op in ("HeadObject", "GetObject", "PutObject"):
+                    aws_clients.record("s3", op, 1.0)
+                for name in ("Download", "Letterbox", "Encode", "Upload"):
+                    with m.timer(name):
+                        pass
+                m.count("ImagesProcessed")
+                m.count("BytesRead", 1000, unit="Bytes")
+                m.count("BytesWritten", 500, unit="Bytes")
+                m.maybe_flush()
+            per_image[label] = round((time.perf_counter() - t0) / n * 1e6, 2)
+        metrics.set_sink(old)
+    m = metrics.Metrics("bench", Dataset="d")
+    for i in range(20):
+        m.count(f"c{i}", i)
+    for _ in range(100):
+        m.timing("t", 1.234)
+    old = metrics.set_sink(metrics.EmfSink())
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(500):
+            m.count("c0")
+            for _ in range(100):
+                m.timing("t", 1.234)   # ครบ 100 ค่า → flush → EMF
+    per_record = round((time.perf_counter() - t0) / 500 * 1e6, 1)
+    metrics.set_sink(old)
+    return {"per_image_us": per_image, "emf_record_us": per_record}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=200)
+    ap.add_argument("--records", type=int, default=20)
+    ap.add_argument("--requests", type=int, default=50)
+    ap.add_argument("--s3-latency-ms", type=float, default=2.0)
+    ap.add_argument("--rek-latency-ms", type=float, default=20.0)
+    args = ap.parse_args()
+    report = {"dataset": run_dataset(args.images, args.s3_latency_ms),
+              "analyze": run_analyze(args.records, args.s3_latency_ms, args.rek_latency_ms),
+              "recommend": run_recommend(args.requests),
+              "overhead": run_overhead()}
+    print(json.dumps(report, indent=2))
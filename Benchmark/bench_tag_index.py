@@ -0,0 +1,141 @@
+"""
+bench_tag_index.py — RecommendSkincare: Scan ทั้งตาราง vs Query ตาราง tag index (Shared/tag_index.py)
+
+  scan_legacy : โค้ดเดิม — scan หน้าเดียว (ไม่สน LastEvaluatedKey) → เกิน 1MB แล้วได้สินค้าไม่ครบ
+  scan_full   : scan ครบทุกหน้า (ถูกต้องแต่แพงตามขนาดตาราง)
+  index_query : lambda_handler ปัจจุบัน — Query partition ของทุก label พร้อมกัน แล้วจัดอันดับด้วย ProductRanker
+
+วัด RCU ต่อ request (FakeDynamoTable คิดแบบ eventual consistency) และ latency ที่ --ddb-latency-ms ต่อ request
+
+ตารางที่ใหญ่กว่า --materialize-max (ค่าเริ่มต้น 100k) ใหญ่เกินจะเก็บใน RAM (1M สินค้า ≈ 9.7M แถว index):
+- scan: คำนวณ RCU/จำนวนหน้าจากขนาด item จริงของทุกสินค้า (สร้างทีละชิ้นแล้วทิ้ง)
+        latency = จำนวนหน้า × เวลาต่อหน้าที่วัดได้จาก tier ก่อนหน้า
+- query: index มีเฉพาะ --partial-rows แถวที่ rank สูงสุดของแต่ละ tag
+        (Query อ่านแค่หน้าแรกของ partition → RCU/latency ไม่ขึ้นกับขนาด partition)
+
+    python bench_tag_index.py --sizes 1000,100000,1000000 --requests 30 --ddb-latency-ms 8
+"""
+import io, sys, json, math, time, heapq, random, argparse, contextlib
+
+from boto3.dynamodb.conditions import Attr
+
+from bench_utils import load_module, summarize
+from local_aws import FakeDynamoTable
+from catalog_fixture import iter_products, LABEL_SKIN_TYPE
+
+
+def _events(n, seed=0):
+    rng = random.Random(seed)
+    labels = sorted(LABEL_SKIN_TYPE)
+    return [{"labels": rng.sample(labels, rng.choice([1, 2, 3]))} for _ in range(n)]
+
+
+def _measure(tables, fn, events):
+    lat, rcu0 = [], sum(t.consumed_rcu for t in tables)
+    for ev in events:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):   # handler print event ทุกครั้ง
+            fn(ev)
+        lat.append((time.perf_counter() - t0) * 1000)
+    rcu = sum(t.consumed_rcu for t in tables) - rcu0
+    return {**summarize(lat), "rcu_per_request": round(rcu / len(events), 1)}
+
+
+def _index_table(ddb_ms=0.0):
+    return FakeDynamoTable("SkincareProductTags", hash_key="tag", range_key="sk", latency_ms=ddb_ms)
+
+
+def _materialized(mod, tag_index, n, events, ddb_ms):
+    table = FakeDynamoTable("SkincareProducts")
+    index = _index_table()
+    for item in iter_products(n):
+        table.put_item(Item=item)
+    t0 = time.perf_counter()
+    built = tag_index.backfill(table, index)
+    tier = {"index_rows": built["rows"], "backfill_s": round(time.perf_counter() - t0, 1)}
+    table.latency_ms = index.latency_ms = ddb_ms
+    mod.table, mod.index = table, index
+
+    legacy = lambda ev: table.scan(FilterExpression=Attr("tags").contains(ev["labels"][0]))
+    full = lambda ev: tag_index.scan_tag(table, ev["labels"][0])
+    tier["scan_legacy"] = _measure([table], legacy, events)
+    seen = len(legacy({"labels": ["Acne"]})["Items"])
+    total = len(tag_index.query_tag(index, "Acne", limit=None))
+    tier["scan_legacy"]["acne_products_seen"] = f"{seen}/{total}"
+
+    scans0 = table.calls["scan"]
+    few = events[:max(3, len(events) // 10)] if n > 10000 else events   # scan 100k ช้ามาก → วัดบางส่วน
+    tier["scan_full"] = _measure([table], full, few)
+    tier["scan_full"]["pages"] = round((table.calls["scan"] - scans0) / len(few), 1)
+    ms_per_page = tier["scan_full"]["mean_ms"] / tier["scan_full"]["pages"]
+
+    q0 = index.calls["query"]
+    tier["index_query"] = _measure([table, index], lambda ev: mod.lambda_handler(ev, None), events)
+    tier["index_query"]["queries_per_request"] = round((index.calls["query"] - q0) / len(events), 2)
+    return tier, ms_per_page
+
+
+def _analytic(mod, tag_index, n, events, ddb_ms, partial_rows, ms_per_page):
+    total_bytes, pages, page_bytes = 0, 0, 0
+    tops = {t: [] for t in LABEL_SKIN_TYPE}   # max-heap (ผ่านค่าลบ) ของแถวที่ rank สูงสุดต่อ tag
+    for item in iter_products(n):
+        size = FakeDynamoTable._size(item)
+        total_bytes += size
+        page_bytes += size
+        if page_bytes >= FakeDynamoTable.PAGE_BYTES:
+            pages, page_bytes = pages + 1, 0
+        inv = int(tag_index.sort_key(item)[:5])
+        entry = (-inv, -int(item["product_id"][1:]), item)
+        for t in item["tags"]:
+            h = tops[t]
+            if len(h) < partial_rows:
+                heapq.heappush(h, entry)
+            elif entry[:2] > h[0][:2]:
+                heapq.heapreplace(h, entry)
+    pages += 1 if page_bytes else 0
+    scan_rcu = math.ceil(total_bytes / 4096) * 0.5
+    tier = {
+        "scan_legacy": {"rcu_per_request": FakeDynamoTable.PAGE_BYTES / 4096 * 0.5,
+                        "note": "1 page only, results truncated"},
+        "scan_full": {"pages": pages, "rcu_per_request": scan_rcu,
+                      "est_mean_ms": round(pages * ms_per_page, 1) if ms_per_page else None,
+                      "note": "computed from item sizes"},
+    }
+    index, rows = _index_table(), 0
+    for t, h in tops.items():
+        for *_, item in h:
+            index.put_item(Item=dict(item, tag=t, sk=tag_index.sort_key(item)))
+            rows += 1
+    index.latency_ms = ddb_ms
+    mod.table, mod.index = None, index
+    tier["index_query"] = _measure([index], lambda ev: mod.lambda_handler(ev, None), events)
+    tier["index_query"]["note"] = f"partial index: top {partial_rows} rows per tag ({rows} rows)"
+    return tier
+
+
+def run(sizes, n_requests, ddb_ms, materialize_max, partial_rows):
+    mod = load_module("Frontend/Py/RecommendSkincare.py", env={"TAG_INDEX_TABLE": "SkincareProductTags"})
+    mod.catalog = None   # วัด index query ตรงๆ (catalog cache ดู bench_catalog_cache.py)
+    tag_index = sys.modules["tag_index"]
+    events = _events(n_requests)
+    report = {"requests": n_requests, "ddb_latency_ms": ddb_ms, "tiers": {}}
+    ms_per_page = None
+    for n in sizes:
+        if n <= materialize_max:
+            tier, ms_per_page = _materialized(mod, tag_index, n, events, ddb_ms)
+        else:
+            tier = _analytic(mod, tag_index, n, events, ddb_ms, partial_rows, ms_per_page)
+        report["tiers"][str(n)] = tier
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,100000,1000000")
+    ap.add_argument("--requests", type=int, default=30)
+    ap.add_argument("--ddb-latency-ms", type=float, default=8.0)
+    ap.add_argument("--materialize-max", type=int, default=100000)
+    ap.add_argument("--partial-rows", type=int, default=200)
+    args = ap.parse_args()
+    print(json.dumps(run([int(s) for s in args.sizes.split(",")], args.requests, args.ddb_latency_ms,
+                         args.materialize_max, args.partial_rows), indent=2))
@@ -0,0 +1,57 @@
+"""
+bench_utils.py — helper ร่วมของสคริปต์ benchmark ในโฟลเดอร์นี้
+"""
+import os, sys, time, statistics, importlib.util
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_module(rel_path: str, env: dict | None = None, name: str | None = None):
+    """
+    import ไฟล์ lambda handler จาก path (โฟลเดอร์ในโปรเจกต์ไม่ใช่ package)
+    - ตั้ง ENV ที่ handler อ่านตอน import
+    - ใส่ region/credential ปลอม ให้ boto3 สร้าง client ได้โดยไม่ต่อ AWS
+    - METRICS_SINK=local (ถ้าไม่ได้ตั้ง) → อ่าน metric ด้วย sys.modules["metrics"].local_sink().summary()
+    - เพิ่มโฟลเดอร์ของไฟล์และ Shared/ ลง sys.path เพื่อให้ import module ข้างเคียงได้
+    """
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("METRICS_SINK", "local")   # EMF record ของ Shared/metrics.py สะสมใน process แทน print
+    for k, v in (env or {}).items():
+        os.environ[k] = str(v)
+    path = REPO_ROOT / rel_path
+    # Shared/ ถูก deploy เป็น Lambda layer → ตอนรัน local ให้ import ได้เหมือนกัน
+    for d in (REPO_ROOT / "Shared", path.parent):
+        if str(d) not in sys.path:
+            sys.path.insert(0, str(d))
+    mod_name = name or "bench_" + path.stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(mod_name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    k = max(0, min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+def summarize(samples_ms):
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def timed(fn, *args, **kw):
+    t0 = time.perf_counter()
+    out = fn(*args, **kw)
+    return out, (time.perf_counter() - t0) * 1000.0
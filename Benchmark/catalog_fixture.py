@@ -0,0 +1,62 @@
+"""
+catalog_fixture.py — สร้าง item ของตาราง SkincareProducts จาก Product/.csv/product_catalog_clean.csv
+ใช้กับ FakeDynamoTable ใน benchmark ฝั่ง recommendation
+
+tags ของสินค้า = label ปัญหาผิวที่สินค้านั้นเหมาะ (map จากคอลัมน์ประเภทผิว แบบเดียวกับ lambda_suggestionProduct.py)
+ถ้าขอ n มากกว่าจำนวนแถวใน CSV จะทำสำเนาสินค้าพร้อม product_id ใหม่ (ใช้ทดสอบ 100k / 1M item)
+"""
+import sys, csv, random
+from decimal import Decimal
+
+from bench_utils import REPO_ROOT
+
+if str(REPO_ROOT / "Shared") not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT / "Shared"))
+from catalog_snapshot import LABEL_SKIN_TYPE, SKIN_TYPES   # label ปัญหาผิว → คอลัมน์ประเภทผิว (ชุดเดียวกับ catalog_sync)
+
+CSV_PATH = REPO_ROOT / "Product" / ".csv" / "product_catalog_clean.csv"
+
+
+def load_rows():
+    with open(CSV_PATH, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _item(row, product_id):
+    skin = {t: row.get(t) == "1" for t in SKIN_TYPES}
+    return {
+        "product_id": product_id,
+        "category": row["Label"],
+        "brand": row["brand"],
+        "name": row["name"],
+        "price": Decimal(row["price"] or "0"),
+        "rank": Decimal(row["rank"] or "0"),
+        "ingredients": row["ingredients"],
+        "image_url": f"https://example.com/img/{product_id}.jpg",
+        "skin_types": [t for t in SKIN_TYPES if skin[t]],
+        "tags": [label for label, t in LABEL_SKIN_TYPE.items() if skin[t]],
+    }
+
+
+def iter_products(n=None, seed=0):
+    """เหมือน products() แต่สร้างทีละชิ้น (ใช้กับ 1M item ที่ไม่ต้องเก็บไว้ทั้งหมด)"""
+    rows = load_rows()
+    n = len(rows) if n is None else n
+    rng = random.Random(seed)
+    for i in range(n):
+        row = rows[i % len(rows)]
+        if i >= len(rows):
+            # สำเนา: สุ่มราคาใหม่เล็กน้อยให้ไม่ซ้ำกันทั้งหมด
+            row = dict(row, price=str(round(float(row["price"] or 0) * rng.uniform(0.8, 1.2), 2)))
+        yield _item(row, f"p{i:07d}")
+
+
+def products(n=None, seed=0):
+    return list(iter_products(n, seed))
+
+
+def load_table(table, n=None, seed=0):
+    with table.batch_writer() as w:
+        for item in iter_products(n, seed):
+            w.put_item(Item=item)
+    return table
@@ -0,0 +1,601 @@
+"""
+local_aws.py — in-memory stand-ins ของ AWS service ที่ lambda ในโปรเจกต์นี้ใช้
+ใช้สำหรับ benchmark / load test แบบ offline (ไม่ต้องมี credential และไม่เสียเงิน)
+
+ทุก stand-in มี:
+- latency_ms : หน่วงเวลาต่อ request เพื่อจำลอง round trip ไป AWS
+- calls      : Counter นับจำนวน request ต่อ operation
+- รายงาน latency ต่อ call เข้า Shared/aws_clients.record เหมือน client จริง (ถ้า import aws_clients ไว้แล้ว)
+  → metric s3.PutObject / rekognition.DetectCustomLabels ของ Shared/metrics.py นับได้ใน benchmark
+"""
+import io, sys, json, math, time, bisect, threading, hashlib
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code, op, msg=""):
+    return ClientError({"Error": {"Code": code, "Message": msg or code}}, op)
+
+
+def _record(service, op, t0):
+    aws_clients = sys.modules.get("aws_clients")
+    if aws_clients is not None:
+        name = "".join(p[:1].upper() + p[1:] for p in op.split("_"))   # put_object → PutObject
+        aws_clients.record(service, name, (time.perf_counter() - t0) * 1000)
+
+
+class _Body(io.BytesIO):
+    """จำลอง StreamingBody (มี .read())"""
+
+
+class FakeS3:
+    def __init__(self, latency_ms: float = 0.0, bandwidth_mbps: float = 0.0):
+        self.latency_ms = latency_ms
+        self.bandwidth_mbps = bandwidth_mbps   # 0 = ไม่จำกัด; ใช้จำลองเวลาโอน body ของ get_object
+        self.presign_base = None   # ตั้งเป็น base_url ของ serve_s3_http → presigned GET ชี้มาที่ server local
+        self.objects = {}          # (bucket, key) -> {"Body": bytes, "ContentType": str, "Metadata": dict, "ETag": str}
+        self.calls = Counter()
+        self.bytes_out = 0         # bytes ที่ถูกอ่านออกจาก "S3"
+        self.bytes_in = 0          # bytes ที่ถูกเขียนเข้า "S3"
+        self.written_at = {}       # key -> time.perf_counter() ตอนเขียนเสร็จ (ใช้วัด end-to-end latency)
+        self._lock = threading.Lock()
+
+    # ---------- internals ----------
+    def _rtt(self, op):
+        t0 = time.perf_counter()
+        with self._lock:
+            self.calls[op] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        _record("s3", op, t0)
+
+    # ---------- object API ----------
+    def put_object(self, Bucket, Key, Body=b"", ContentType="binary/octet-stream", Metadata=None, **kw):
+        self._rtt("put_object")
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        elif hasattr(Body, "read"):
+            Body = Body.read()
+        etag = '"%s"' % hashlib.md5(Body).hexdigest()
+        with self._lock:
+            self.objects[(Bucket, Key)] = {"Body": Body, "ContentType": ContentType,
+                                           "Metadata": dict(Metadata or {}), "ETag": etag}
+            self.bytes_in += len(Body)
+            self.written_at[Key] = time.perf_counter()
+        return {"ETag": etag}
+
+    def get_object(self, Bucket, Key, **kw):
+        self._rtt("get_object")
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise _client_error("NoSuchKey", "GetObject")
+        if kw.get("IfNoneMatch") and kw["IfNoneMatch"] == obj["ETag"]:
+            raise _client_error("304", "GetObject", "Not Modified")
+        with self._lock:
+            self.bytes_out += len(obj["Body"])
+        if self.bandwidth_mbps:
+            time.sleep(len(obj["Body"]) * 8 / (self.bandwidth_mbps * 1e6))
+        return {"Body": _Body(obj["Body"]), "ContentLength": len(obj["Body"]),
+                "ContentType": obj["ContentType"], "Metadata": obj["Metadata"], "ETag": obj["ETag"]}
+
+    def head_object(self, Bucket, Key, **kw):
+        self._rtt("head_object")
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise _client_error("404", "HeadObject", "Not Found")
+        return {"ContentLength": len(obj["Body"]), "ContentType": obj["ContentType"],
+                "Metadata": obj["Metadata"], "ETag": obj["ETag"]}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None, StartAfter=None,
+                        Delimiter=None, **kw):
+        self._rtt("list_objects_v2")
+        keys = sorted(k for (b, k) in self.objects if b == Bucket and k.startswith(Prefix))
+        after = ContinuationToken or StartAfter
+        if after:
+            # token คือ key/prefix ตัวสุดท้ายของหน้าก่อน (ถ้าเป็น prefix ให้ข้ามทุก key ใต้ prefix นั้น)
+            keys = [k for k in keys if k > after and not (Delimiter and after.endswith(Delimiter)
+                                                          and k.startswith(after))]
+        entries, seen = [], set()
+        for k in keys:
+            rest = k[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                cp = Prefix + rest.split(Delimiter, 1)[0] + Delimiter
+                if cp not in seen:
+                    seen.add(cp)
+                    entries.append(("p", cp))
+            else:
+                entries.append(("k", k))
+        page, more = entries[:MaxKeys], len(entries) > MaxKeys
+        resp = {"KeyCount": len(page), "IsTruncated": more}
+        contents = [v for t, v in page if t == "k"]
+        prefixes = [v for t, v in page if t == "p"]
+        if contents:
+            resp["Contents"] = [{"Key": k, "Size": len(self.objects[(Bucket, k)]["Body"]),
+                                 "ETag": self.objects[(Bucket, k)]["ETag"]} for k in contents]
+        if prefixes:
+            resp["CommonPrefixes"] = [{"Prefix": p} for p in prefixes]
+        if more:
+            resp["NextContinuationToken"] = page[-1][1]
+        return resp
+
+    # ---------- managed transfer (boto3 s3transfer: object เล็กกว่า multipart threshold = 1 request) ----------
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, **kw):
+        extra = ExtraArgs or {}
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read(),
+                        ContentType=extra.get("ContentType", "binary/octet-stream"), Metadata=extra.get("Metadata"))
+
+    def download_file(self, Bucket, Key, Filename, **kw):
+        body = self.get_object(Bucket=Bucket, Key=Key)["Body"].read()
+        with open(Filename, "wb") as f:
+            f.write(body)
+
+    # ---------- presign (คำนวณ local ไม่มี round trip เหมือน boto3 จริง) ----------
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        with self._lock:
+            self.calls["generate_presigned_post"] += 1
+        fields = dict(Fields or {})
+        fields.update({"key": Key, "policy": "fake-policy", "x-amz-signature": "fake"})
+        return {"url": f"https://{Bucket}.s3.amazonaws.com/", "fields": fields}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, HttpMethod=None):
+        with self._lock:
+            self.calls["generate_presigned_url"] += 1
+        p = Params or {}
+        if self.presign_base and ClientMethod == "get_object":
+            return f"{self.presign_base}/{p.get('Key')}?X-Amz-Signature=fake"
+        return f"https://{p.get('Bucket')}.s3.amazonaws.com/{p.get('Key')}?X-Amz-Signature=fake"
+
+
+class FakeRekognition:
+    """
+    detect_custom_labels แบบ local: label ขึ้นกับ hash ของภาพ (deterministic)
+    รองรับทั้ง Image={"Bytes": ...} และ Image={"S3Object": ...} (ต้องส่ง s3=FakeS3 มาด้วย)
+    capacity_tps > 0 → จำลอง inference unit ที่มีจำกัด: เกินอัตรานี้ใน 1 วินาทีจะโดน ThrottlingException
+    """
+    LABELS = ["Acne", "Blackheads", "Dark-Spots", "Dry-Skin", "Englarged-Pores", "Eyebags",
+              "Oily-Skin", "Skin-Redness", "Whiteheads", "Wrinkles", "wrinkles-acne-pores"]
+
+    def __init__(self, latency_ms: float = 0.0, s3: "FakeS3 | None" = None, ms_per_mb: float = 0.0,
+                 capacity_tps: float = 0.0):
+        self.latency_ms = latency_ms
+        self.ms_per_mb = ms_per_mb   # เวลาเพิ่มตามขนาด payload (upload + decode)
+        self.capacity_tps = capacity_tps
+        self.s3 = s3
+        self.calls = Counter()
+        self.bytes_in = 0
+        self._window = []            # เวลาของ request ที่รับไว้ใน 1 วินาทีล่าสุด
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        if not self.capacity_tps:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.capacity_tps:
+                self.calls["throttled"] += 1
+                raise _client_error("ThrottlingException", "DetectCustomLabels", "Rate exceeded")
+            self._window.append(now)
+
+    def _image_bytes(self, Image):
+        if "Bytes" in Image:
+            with self._lock:
+                self.bytes_in += len(Image["Bytes"])
+            return Image["Bytes"]
+        ref = Image["S3Object"]
+        obj = self.s3.objects.get((ref["Bucket"], ref["Name"])) if self.s3 else None
+        if obj is None:
+            raise _client_error("InvalidS3ObjectException", "DetectCustomLabels", "Unable to get object metadata from S3")
+        return obj["Body"]
+
+    def detect_custom_labels(self, ProjectVersionArn, Image, MinConfidence=50, **kw):
+        t0 = time.perf_counter()
+        with self._lock:
+            self.calls["detect_custom_labels"] += 1
+        self._admit()
+        data = self._image_bytes(Image)
+        delay = self.latency_ms + self.ms_per_mb * len(data) / 1e6
+        if delay:
+            time.sleep(delay / 1000.0)
+        h = hashlib.sha256(data).digest()
+        labels = []
+        for i, name in enumerate(self.LABELS):
+            conf = h[i] / 255 * 100
+            if conf >= MinConfidence:
+                labels.append({"Name": name, "Confidence": conf})
+        _record("rekognition", "detect_custom_labels", t0)
+        return {"CustomLabels": labels}
+
+
+class FakeDynamoTable:
+    """
+    ตาราง DynamoDB (boto3 resource Table) แบบ in-memory
+    - รองรับ condition ของ boto3.dynamodb.conditions (Attr/Key: eq, contains, begins_with, is_in, & | ~ ...)
+    - scan แบ่งหน้าเมื่อข้อมูลที่อ่านเกิน 1MB เหมือนของจริง (LastEvaluatedKey) รองรับ Segment/TotalSegments
+    - range_key → query ด้วย KeyConditionExpression (hash eq + เงื่อนไขของ sort key) เรียงตาม sort key
+    - consumed_rcu / consumed_wcu คิดจากขนาด item (4KB ต่อ RCU, eventual consistency = 0.5)
+    """
+    PAGE_BYTES = 1 << 20
+
+    def __init__(self, name="table", hash_key="product_id", latency_ms: float = 0.0, range_key=None):
+        self.name, self.hash_key, self.range_key = name, hash_key, range_key
+        self.latency_ms = latency_ms
+        self.items = {}            # key (hash หรือ (hash, range)) -> item
+        self.calls = Counter()
+        self.consumed_rcu = 0.0
+        self.consumed_wcu = 0.0
+        self._sizes = {}
+        self._parts = {}           # hash -> set ของ range key (เฉพาะตารางที่มี range_key)
+        self._sorted = {}          # hash -> list ของ range key ที่เรียงแล้ว (สร้างใหม่เมื่อ partition เปลี่ยน)
+        self._segments = {}        # (Segment, TotalSegments) -> (keys, position) ล้างเมื่อมีการเขียน
+        self._lock = threading.Lock()
+
+    # ---------- internals ----------
+    def _rtt(self, op):
+        t0 = time.perf_counter()
+        with self._lock:
+            self.calls[op] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        _record("dynamodb", op, t0)
+
+    @staticmethod
+    def _size(item):
+        return len(json.dumps(item, default=str).encode("utf-8"))
+
+    def _key(self, d):
+        return (d[self.hash_key], d[self.range_key]) if self.range_key else d[self.hash_key]
+
+    def _key_dict(self, k):
+        return {self.hash_key: k[0], self.range_key: k[1]} if self.range_key else {self.hash_key: k}
+
+    def _read(self, nbytes, consistent=False):
+        units = max(1, math.ceil(nbytes / 4096)) * (1.0 if consistent else 0.5)
+        with self._lock:
+            self.consumed_rcu += units
+        return units
+
+    @classmethod
+    def _value(cls, v, item):
+        name = getattr(v, "name", None)
+        if name is not None and type(v).__name__ in ("Attr", "Key"):
+            return item.get(name)
+        return v
+
+    @classmethod
+    def _eval(cls, cond, item):
+        if cond is None:
+            return True
+        e = cond.get_expression()
+        op, vals = e["operator"], e["values"]
+        if op == "AND":
+            return cls._eval(vals[0], item) and cls._eval(vals[1], item)
+        if op == "OR":
+            return cls._eval(vals[0], item) or cls._eval(vals[1], item)
+        if op == "NOT":
+            return not cls._eval(vals[0], item)
+        args = [cls._value(v, item) for v in vals]
+        if op == "attribute_exists":
+            return args[0] is not None
+        if op == "attribute_not_exists":
+            return args[0] is None
+        if args[0] is None:
+            return False
+        if op == "contains":
+            return args[1] in args[0]
+        if op == "begins_with":
+            return str(args[0]).startswith(args[1])
+        if op == "IN":
+            return args[0] in args[1]
+        if op == "BETWEEN":
+            return args[1] <= args[0] <= args[2]
+        ops = {"=": lambda a, b: a == b, "<>": lambda a, b: a != b, "<": lambda a, b: a < b,
+               "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b}
+        return ops[op](args[0], args[1])
+
+    def _hash_eq(self, cond):
+        """หา value ของ hash key จาก KeyConditionExpression (Key(h).eq(v) หรือ Key(h).eq(v) & ...)"""
+        e = cond.get_expression()
+        if e["operator"] == "AND":
+            h = self._hash_eq(e["values"][0])
+            return h if h is not None else self._hash_eq(e["values"][1])
+        if e["operator"] == "=" and getattr(e["values"][0], "name", None) == self.hash_key:
+            return e["values"][1]
+        return None
+
+    # ---------- item API ----------
+    def put_item(self, Item, **kw):
+        self._rtt("put_item")
+        self._store(Item)
+        return {}
+
+    def _store(self, Item):
+        size = self._size(Item)
+        k = self._key(Item)
+        with self._lock:
+            if k not in self.items:
+                self._segments.clear()   # key ใหม่ → รายการ key ของแต่ละ segment เปลี่ยน
+            self.items[k] = dict(Item)
+            self._sizes[k] = size
+            self.consumed_wcu += max(1, math.ceil(size / 1024))
+            if self.range_key:
+                self._parts.setdefault(k[0], set()).add(k[1])
+                self._sorted.pop(k[0], None)
+
+    def get_item(self, Key, ConsistentRead=False, **kw):
+        self._rtt("get_item")
+        k = self._key(Key)
+        item = self.items.get(k)
+        self._read(self._sizes.get(k, 1), ConsistentRead)
+        return {"Item": dict(item)} if item is not None else {}
+
+    def delete_item(self, Key, **kw):
+        self._rtt("delete_item")
+        self._remove(Key)
+        return {}
+
+    def _remove(self, Key):
+        k = self._key(Key)
+        with self._lock:
+            self.items.pop(k, None)
+            self._sizes.pop(k, None)
+            self.consumed_wcu += 1
+            self._segments.clear()
+            if self.range_key:
+                self._parts.get(k[0], set()).discard(k[1])
+                self._sorted.pop(k[0], None)
+
+    def scan(self, FilterExpression=None, ExclusiveStartKey=None, Limit=None, Segment=None, TotalSegments=None,
+             ReturnConsumedCapacity=None, **kw):
+        self._rtt("scan")
+        keys, pos = self._segment_keys(Segment or 0, TotalSegments or 1)
+        start = pos[self._key(ExclusiveStartKey)] + 1 if ExclusiveStartKey else 0
+        return self._page(keys, start, FilterExpression, Limit, ReturnConsumedCapacity)
+
+    def _segment_keys(self, segment, total):
+        # แบ่ง segment ตาม hash ของ key (ของจริงแบ่งตาม partition); เก็บไว้ใช้ซ้ำทุกหน้าจนกว่าจะมีการเขียน
+        with self._lock:
+            hit = self._segments.get((segment, total))
+            if hit is None:
+                keys = [k for k in self.items if total == 1 or hash(str(k)) % total == segment]
+                hit = self._segments[(segment, total)] = (keys, {k: i for i, k in enumerate(keys)})
+            return hit
+
+    def query(self, KeyConditionExpression, FilterExpression=None, ExclusiveStartKey=None, Limit=None,
+              ScanIndexForward=True, ReturnConsumedCapacity=None, **kw):
+        self._rtt("query")
+        h = self._hash_eq(KeyConditionExpression)
+        if not self.range_key:
+            keys = [h] if h in self.items else []
+        else:
+            with self._lock:
+                ranges = self._sorted.get(h)
+                if ranges is None:
+                    ranges = self._sorted[h] = sorted(self._parts.get(h, ()))
+            if not ScanIndexForward:
+                ranges = ranges[::-1]
+            start = 0
+            if ExclusiveStartKey:
+                r = ExclusiveStartKey[self.range_key]
+                # หา position ถัดจาก start key ด้วย bisect (partition อาจมีหลายแสน item)
+                start = bisect.bisect_right(ranges, r) if ScanIndexForward else \
+                    len(ranges) - bisect.bisect_left(self._sorted[h], r)
+            keys = []
+            for r in ranges[start:]:
+                item = self.items[(h, r)]
+                if self._eval(KeyConditionExpression, item):
+                    keys.append((h, r))
+                elif keys:
+                    break   # เงื่อนไขของ sort key เป็นช่วงต่อเนื่อง → พ้นช่วงแล้วหยุด
+                if Limit and len(keys) >= Limit + 1:
+                    break
+        return self._page(keys, 0, FilterExpression, Limit, ReturnConsumedCapacity)
+
+    def _page(self, keys, start, FilterExpression, Limit, ReturnConsumedCapacity):
+        out, nbytes, scanned, last = [], 0, 0, None
+        for k in keys[start:]:
+            item = self.items[k]
+            nbytes += self._sizes[k]
+            scanned += 1
+            if self._eval(FilterExpression, item):
+                out.append(dict(item))
+            if nbytes >= self.PAGE_BYTES or (Limit and scanned >= Limit):
+                last = k
+                break
+        if last is not None and last == keys[-1]:
+            last = None
+        units = self._read(nbytes)
+        resp = {"Items": out, "Count": len(out), "ScannedCount": scanned}
+        if last is not None:
+            resp["LastEvaluatedKey"] = self._key_dict(last)
+        if ReturnConsumedCapacity:
+            resp["ConsumedCapacity"] = {"TableName": self.name, "CapacityUnits": units}
+        return resp
+
+    def batch_writer(self, overwrite_by_pkeys=None, **kw):
+        table = self
+
+        class _W:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *a):
+                return False
+
+            def put_item(self, Item):
+                table.put_item(Item=Item)
+
+            def delete_item(self, Key):
+                table.delete_item(Key=Key)
+
+        return _W()
+
+
+class FakeDynamoDB:
+    """
+    boto3.resource("dynamodb") แบบ in-memory: Table(name) + batch_write_item (สูงสุด 25 request ต่อครั้ง)
+    batch_write_item นับเป็น 1 round trip ต่อ call (ไม่ใช่ต่อ item แบบ FakeDynamoTable.batch_writer)
+    wcu_per_sec > 0 → จำลอง throughput ที่จำกัด (bucket เติม wcu_per_sec ต่อวินาที จุได้ 1 วินาที)
+      request ที่เกินจะถูกคืนใน UnprocessedItems เหมือนของจริงตอนโดน throttle
+    """
+    MAX_BATCH = 25
+
+    def __init__(self, latency_ms: float = 0.0, wcu_per_sec: float = 0.0):
+        self.latency_ms = latency_ms
+        self.wcu_per_sec = wcu_per_sec
+        self.tables = {}
+        self.calls = Counter()
+        self._tokens = wcu_per_sec
+        self._filled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def Table(self, name, **kw):
+        if name not in self.tables:
+            self.tables[name] = FakeDynamoTable(name, latency_ms=self.latency_ms, **kw)
+        return self.tables[name]
+
+    def _take(self, units):
+        if not self.wcu_per_sec:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.wcu_per_sec, self._tokens + (now - self._filled_at) * self.wcu_per_sec)
+            self._filled_at = now
+            if self._tokens < units:
+                return False
+            self._tokens -= units
+            return True
+
+    def batch_write_item(self, RequestItems, ReturnConsumedCapacity=None, **kw):
+        with self._lock:
+            self.calls["batch_write_item"] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        if sum(len(v) for v in RequestItems.values()) > self.MAX_BATCH:
+            raise _client_error("ValidationException", "BatchWriteItem",
+                                "Too many items requested for the BatchWriteItem call")
+        unprocessed, consumed = {}, []
+        for name, reqs in RequestItems.items():
+            table = self.tables[name]
+            w0 = table.consumed_wcu
+            for r in reqs:
+                put = r.get("PutRequest")
+                cost = max(1, math.ceil(FakeDynamoTable._size(put["Item"]) / 1024)) if put else 1
+                if not self._take(cost):
+                    unprocessed.setdefault(name, []).append(r)
+                    continue
+                if put:   # ไม่ผ่าน put_item / delete_item → ไม่หน่วง latency ซ้ำต่อ item
+                    table._store(put["Item"])
+                else:
+                    table._remove(r["DeleteRequest"]["Key"])
+            consumed.append({"TableName": name, "CapacityUnits": table.consumed_wcu - w0})
+        if unprocessed:
+            with self._lock:
+                self.calls["throttled"] += 1
+        resp = {"UnprocessedItems": unprocessed}
+        if ReturnConsumedCapacity:
+            resp["ConsumedCapacity"] = consumed
+        return resp
+
+
+def s3_put_event(bucket, keys, s3: "FakeS3 | None" = None):
+    """สร้าง S3 ObjectCreated event แบบเดียวกับที่ Lambda ได้รับ (ใส่ eTag ถ้ามี FakeS3)"""
+    records = []
+    for k in keys:
+        obj = {"key": k}
+        if s3 is not None and (bucket, k) in s3.objects:
+            o = s3.objects[(bucket, k)]
+            obj.update({"eTag": o["ETag"].strip('"'), "size": len(o["Body"])})
+        records.append({"eventSource": "aws:s3", "eventName": "ObjectCreated:Post",
+                        "s3": {"bucket": {"name": bucket}, "object": obj}})
+    return {"Records": records}
+
+
+def sqs_event(s3_event, per_message: int = 1):
+    """ห่อ S3 event เป็น SQS event (S3 → SQS → Lambda) ทีละ per_message record ต่อ message"""
+    recs = s3_event["Records"]
+    messages = []
+    for i in range(0, len(recs), per_message):
+        messages.append({"messageId": f"msg-{i // per_message:04d}", "eventSource": "aws:sqs",
+                         "body": json.dumps({"Records": recs[i:i + per_message]})})
+    return {"Records": messages}
+
+
+def serve_s3_http(s3: FakeS3, bucket: str):
+    """
+    เปิด HTTP server บน 127.0.0.1 ที่เสิร์ฟ object ของ FakeS3 (แทน presigned GET URL)
+    คืน (server, base_url) → URL ของ key คือ f"{base_url}/{key}"; ปิดด้วย server.shutdown()
+    """
+    class _H(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            key = self.path.lstrip("/").split("?", 1)[0]
+            try:
+                body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except ClientError:
+                self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _H)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def serve_lambda_http(handler, latency_ms: float = 0.0, keepalive_secs=None):
+    """
+    HTTP server บน 127.0.0.1 ที่ทำตัวเหมือน API Gateway (proxy integration) หน้า lambda handler
+    request → event {"httpMethod", "path", "queryStringParameters", "body"} → handler(event, None)
+    keepalive_secs = ปิด connection ที่ idle นานกว่านี้ (เหมือน idle timeout ของ API Gateway / ALB)
+    คืน (server, base_url); server.connections = จำนวน TCP connection ที่ถูกเปิด, server.requests = จำนวน request
+    """
+    from urllib.parse import urlsplit, parse_qsl
+
+    class _H(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+        disable_nagle_algorithm = True
+        timeout = keepalive_secs
+
+        def setup(self):
+            super().setup()
+            with server.lock:
+                server.connections += 1
+
+        def _handle(self):
+            with server.lock:
+                server.requests += 1
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8") if length else None
+            u = urlsplit(self.path)
+            event = {"httpMethod": self.command, "path": u.path,
+                     "queryStringParameters": dict(parse_qsl(u.query)) or None, "body": body}
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            resp = handler(event, None) or {}
+            out = (resp.get("body") or "").encode("utf-8")
+            self.send_response(int(resp.get("statusCode", 200)))
+            for k, v in (resp.get("headers") or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        do_GET = do_POST = _handle
+
+        def log_message(self, *a):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _H)
+    server.lock, server.connections, server.requests = threading.Lock(), 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
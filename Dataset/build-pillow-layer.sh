@@ -1,7 +1,8 @@
 #!/bin/bash
 # ============================================================
 # 🧱 build-pillow-layer.sh
-# Build Pillow (PIL) layer for AWS Lambda (Python 3.9 / x86_64)
+# Build Pillow (PIL) + NumPy layer for AWS Lambda (Python 3.9 / x86_64)
+# NumPy is used by Shared/image_quality.py (QUALITY_GATE)
 # ============================================================
 
 set -e
@@ -18,6 +19,9 @@ pip install --upgrade pip
 echo "📦 Installing Pillow==10.4.0 to ./python ..."
 pip install "pillow==10.4.0" -t python
 
+echo "📦 Installing numpy==1.26.4 to ./python ..."
+pip install "numpy==1.26.4" -t python
+
 echo "🗜️ Zipping layer..."
 zip -r pillow-layer.zip python > /dev/null
 
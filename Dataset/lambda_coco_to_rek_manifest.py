@@ -1,8 +1,13 @@
-import os, io, json, random, boto3, time, re, difflib
+import os, io, json, random, time, re, difflib
 from datetime import datetime
 from collections import defaultdict
 
-s3 = boto3.client("s3")
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+import metrics
+
+s3 = lazy_client("s3")
+lambda_client = lazy_client("lambda")
 
 # -------- CONFIG --------
 BUCKET    = os.environ.get("BUCKET", "dermavision-offline")
@@ -77,15 +82,26 @@ def _clip_box(x, y, w, h, W, H):
 # ---------------------------
 
 def handler(event, context):
+    # metric (EMF): จำนวนภาพ/กล่องที่ได้-ที่ทิ้ง (แยกเหตุผล), วิธีแมตช์ชื่อไฟล์, เวลาแต่ละช่วง (ดู Shared/metrics.py)
+    with metrics.stage("manifest", Dataset=DATASET) as m:
+        out = _build_manifest(m)
+        if not out.get("ok"):
+            m.count("Errors")   # ok: False ไม่ได้ raise → stage ไม่นับให้
+            m.prop("error", out.get("note"))
+        return out
+
+def _build_manifest(m):
     # 0) รอรูปให้พร้อม (READY + มีไฟล์จริง)
-    for _ in range(12):  # ~60s
-        if _s3_exists(BUCKET, READY_KEY) and _list_keys(IMG_PREFIX):
-            break
-        time.sleep(5)
+    with m.timer("WaitReady"):
+        for _ in range(12):  # ~60s
+            if _s3_exists(BUCKET, READY_KEY) and _list_keys(IMG_PREFIX):
+                break
+            time.sleep(5)
     if not _s3_exists(BUCKET, READY_KEY):
         return {"ok": False, "note": "images not ready (no READY flag)"}
 
     img_keys = _list_keys(IMG_PREFIX)
+    m.count("PreprocessedImages", len(img_keys))
     if not img_keys:
         return {"ok": False, "note": "no preprocessed images found"}
 
@@ -98,8 +114,9 @@ def handler(event, context):
     name_set = set(by_name.keys())
 
     # 1) โหลด COCO
-    coco_obj = s3.get_object(Bucket=BUCKET, Key=ANN_KEY)
-    coco = json.loads(coco_obj["Body"].read().decode("utf-8"))
+    with m.timer("LoadCoco"):
+        coco_obj = s3.get_object(Bucket=BUCKET, Key=ANN_KEY)
+        coco = json.loads(coco_obj["Body"].read().decode("utf-8"))
     print(f"📘 loaded {ANN_KEY}: {len(coco.get('images',[]))} images, {len(coco.get('annotations',[]))} anns, {len(coco.get('categories',[]))} classes")
 
     # 2) map image & category
@@ -116,6 +133,7 @@ def handler(event, context):
         cid = class_to_id[cname]
         x,y,w,h = a["bbox"]
         if w < MIN_BOX_PX or h < MIN_BOX_PX:
+            m.count("BoxesTooSmall")
             continue
         anns_by_img[a["image_id"]].append({"class_id": cid, "left": x, "top": y, "width": w, "height": h})
 
@@ -169,15 +187,22 @@ def handler(event, context):
         hsh = _rf_hash(rf_file)
         if hsh and hsh in by_hash:
             real_key = by_hash[hsh]
+            m.count("MatchedByHash")
         else:
             norm = _normalize_filename(rf_file)
             real_key = by_name.get(norm)
-            if not real_key:
-                cand = _best_match(norm, name_set)
-                if cand: real_key = by_name[cand]
+            if real_key:
+                m.count("MatchedByName")
+            else:
+                with m.timer("FuzzyMatch"):
+                    cand = _best_match(norm, name_set)
+                if cand:
+                    real_key = by_name[cand]
+                    m.count("MatchedFuzzy")
 
         if not real_key:
             dropped += 1
+            m.count("DroppedNoKey")
             print(f"⚠️ drop(no-key): {rf_file}")
             continue
 
@@ -185,6 +210,7 @@ def handler(event, context):
         boxes = anns_by_img.get(img_id, [])
         if not boxes:
             dropped += 1
+            m.count("DroppedNoBoxes")
             print(f"⚠️ drop(no-boxes): s3://{BUCKET}/{real_key}")
             continue
 
@@ -198,10 +224,12 @@ def handler(event, context):
             fixed.append({"class_id": int(bb["class_id"]), "left": x, "top": y, "width": w, "height": h})
         if not fixed:
             dropped += 1
+            m.count("DroppedNoValidBoxes")
             print(f"⚠️ drop(no-valid-boxes): s3://{BUCKET}/{real_key}")
             continue
 
         if len(fixed) > MAX_BOX_PER_IMAGE:
+            m.count("BoxesTruncated", len(fixed) - MAX_BOX_PER_IMAGE)
             fixed = fixed[:MAX_BOX_PER_IMAGE]
 
         entry = {
@@ -220,7 +248,8 @@ def handler(event, context):
             }
         }
         items.append(entry)
-        print(f"✅ {real_key}  boxes={len(fixed)}  size={W}x{H}")
+        m.count("ManifestImages")
+        m.count("Boxes", len(fixed))
 
     if not items:
         return {"ok": False, "note": "no valid items after matching/balancing", "dropped": dropped}
@@ -233,6 +262,9 @@ def handler(event, context):
 
     _put_jsonl(train_items, f"{OUT_PREFIX}train.manifest")
     _put_jsonl(val_items,   f"{OUT_PREFIX}val.manifest")
+    m.count("TrainImages", len(train_items))
+    m.count("ValImages", len(val_items))
+    m.count("Classes", len(cats))
 
     # หลังได้ train_items / val_items
     def count_per_class(items):
@@ -257,7 +289,6 @@ def handler(event, context):
 
     # 7) optional: invoke validate
     try:
-        lambda_client = boto3.client("lambda")
         VALIDATE_FN = os.environ.get("VALIDATE_FN", "validate_dataset")
         payload = {"bucket": BUCKET, "dataset": DATASET,
                 "train": len(train_items), "val": len(val_items), 
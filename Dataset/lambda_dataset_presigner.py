@@ -1,6 +1,9 @@
-import os, json, boto3, datetime as dt
+import os, json, datetime as dt
 
-s3 = boto3.client("s3")
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+
+s3 = lazy_client("s3")
 
 OFFLINE_BUCKET = os.environ.get("OFFLINE_BUCKET", "dermavision-offline")
 MAX_DATASET_SIZE = int(os.environ.get("MAX_DATASET_SIZE", str(500 * 1024 * 1024)))  # 500MB
@@ -3,14 +3,17 @@ import io
 import json
 import zipfile
 import tempfile
-import boto3
 import mimetypes
 from pathlib import Path
 from datetime import datetime
 import time
 
-s3 = boto3.client("s3")
-lambda_client = boto3.client("lambda")
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+import metrics
+
+s3 = lazy_client("s3")
+lambda_client = lazy_client("lambda")
 
 # ---------- ENV ----------
 BUCKET = os.environ.get("BUCKET", "")  # ถ้าไม่ตั้ง จะใช้จาก event
@@ -124,19 +127,30 @@ def handler(event, context):
     else:
         bucket = event.get("bucket") or BUCKET
         key = event.get("key")
-    if not bucket or not key:
-        return {"ok": False, "error": "missing bucket/key"}
 
-    dataset = _derive_dataset_from_key(key)
+    dataset = _derive_dataset_from_key(key or "")
+    # metric (EMF) ต่อ dataset: ImagesUploaded/s, bytes, เวลาแต่ละช่วง, S3 request (ดู Shared/metrics.py)
+    with metrics.stage("curator", rates=("ImagesUploaded", "BytesUploaded"), Dataset=dataset) as m:
+        if not bucket or not key:
+            out = {"ok": False, "error": "missing bucket/key"}
+        else:
+            out = _curate(bucket, key, dataset, m)
+        # ok: False ไม่ได้ raise → นับ Errors เอง ไม่งั้น alarm ไม่เห็น curation ที่ล้มเหลว
+        if not out.get("ok"):
+            m.count("Errors")
+            m.prop("error", out.get("error"))
+        return out
+
+def _curate(bucket, key, dataset, m):
     raw_img_prefix = f"datasets/{dataset}/raw/images/"
     raw_ann_key = f"datasets/{dataset}/raw/annotations/coco.json"
 
-    print(f"📦 offline-curator start: bucket={bucket}, key={key}, dataset={dataset}")
-
     # 2) โหลด ZIP ลง /tmp แล้วแตกไฟล์
     with tempfile.TemporaryDirectory() as td:
         zip_path = os.path.join(td, "ingest.zip")
-        s3.download_file(bucket, key, zip_path)
+        with m.timer("DownloadZip"):
+            s3.download_file(bucket, key, zip_path)
+        m.count("ZipBytes", os.path.getsize(zip_path), unit="Bytes")
         with zipfile.ZipFile(zip_path, "r") as zf:
             names = zf.namelist()
 
@@ -155,8 +169,11 @@ def handler(event, context):
                 return {"ok": False, "error": "no *_annotations.coco.json found in train/valid/test"}
 
             # 3) รวม COCO
-            merged = _merge_cocos(cocos)
-            print(f"🧾 merged COCO: images={len(merged['images'])}, anns={len(merged['annotations'])}, cats={len(merged['categories'])}")
+            with m.timer("MergeCoco"):
+                merged = _merge_cocos(cocos)
+            m.count("CocoImages", len(merged["images"]))
+            m.count("CocoAnnotations", len(merged["annotations"]))
+            m.count("CocoCategories", len(merged["categories"]))
 
             # 4) อัปโหลดภาพที่ถูกอ้างใน COCO เท่านั้น
             needed = {Path(im["file_name"]).name for im in merged["images"]}
@@ -174,23 +191,21 @@ def handler(event, context):
                 if base not in needed:
                     continue
 
-                body = zf.read(n)
+                with m.timer("ExtractImage"):
+                    body = zf.read(n)
                 out_key = raw_img_prefix + base
                 _put_bytes(bucket, out_key, body, _guess_ct(base))
                 sent += 1
-                # log แบบสั้นให้ดูความคืบหน้า
-                if sent % 100 == 0:
-                    print(f"✅ uploaded {sent} images ...")
-
-            print(f"✅ uploaded images: {sent}")
+                m.count("ImagesUploaded")
+                m.count("BytesUploaded", len(body), unit="Bytes")
+                # ความคืบหน้า = record EMF ทุก METRICS_FLUSH_SECS (ImagesUploadedPerSecond)
+                m.maybe_flush()
 
             # 5) อัปโหลด merged COCO
             _put_json(bucket, raw_ann_key, merged)
-            print(f"✅ wrote COCO: s3://{bucket}/{raw_ann_key}")
 
             # 6) เขียน RAW _READY
             _put_bytes(bucket, f"datasets/{dataset}/raw/_READY", b"", "text/plain")
-            print(f"🏁 raw READY flag written")
 
     # 7) invoke preprocess ต่อ (ถ้าตั้ง ENV ไว้)
     if PREPROCESS_FN:
@@ -201,15 +216,18 @@ def handler(event, context):
                 InvocationType="Event",
                 Payload=json.dumps(payload).encode("utf-8")
             )
-            print(f"📤 invoked {PREPROCESS_FN}")
+            m.count("PreprocessInvoked")
         except Exception as e:
-            print("WARN: cannot invoke preprocess:", e)
+            m.count("InvokeErrors")
+            m.prop("invoke_error", f"{PREPROCESS_FN}: {e}")
 
     # 8) (ออปชัน) รอ preprocessed/_READY แล้วค่อย invoke manifest
     if MANIFEST_FN:
-        ready = _wait_for_preprocessed_ready(bucket, dataset, WAIT_PREPROC_READY_SECS)
+        with m.timer("WaitPreprocessed"):
+            ready = _wait_for_preprocessed_ready(bucket, dataset, WAIT_PREPROC_READY_SECS)
         if not ready:
-            print(f"⏱️ preprocessed/_READY not found within {WAIT_PREPROC_READY_SECS}s; skip invoking {MANIFEST_FN}")
+            # preprocessed/_READY ไม่มาภายใน WAIT_PREPROC_READY_SECS → ไม่ invoke manifest
+            m.count("PreprocessNotReady")
         else:
             try:
                 payload2 = {"bucket": bucket, "dataset": dataset}
@@ -218,8 +236,9 @@ def handler(event, context):
                     InvocationType="Event",
                     Payload=json.dumps(payload2).encode("utf-8")
                 )
-                print(f"📤 invoked {MANIFEST_FN}")
+                m.count("ManifestInvoked")
             except Exception as e:
-                print("WARN: cannot invoke manifest:", e)
+                m.count("InvokeErrors")
+                m.prop("invoke_error", f"{MANIFEST_FN}: {e}")
 
     return {"ok": True, "bucket": bucket, "dataset": dataset, "uploaded_images": sent}
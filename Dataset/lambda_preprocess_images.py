@@ -1,8 +1,14 @@
-import os, boto3, json
+import os, json
 from io import BytesIO
-from PIL import Image, ImageOps
 
-s3 = boto3.client("s3")
+# letterbox ใช้ร่วมกับ analyzer ตอน inference (layer dermavision-shared)
+from image_letterbox import resize_letterbox
+import lazy_import
+import metrics
+from aws_clients import lazy_client
+
+s3 = lazy_client("s3")
+Image = lazy_import.module("PIL.Image")   # โหลด Pillow ตอนเจอภาพแรก ไม่ใช่ตอน import
 
 BUCKET = os.getenv("BUCKET", "dermavision-offline")
 DATASET = os.getenv("DATASET_NAME", "skin-2025-09")
@@ -45,21 +51,12 @@ def _out_key_for(raw_key: str) -> str:
         base = os.path.splitext(base)[0] + ".jpg"
     return os.path.join(OUTPUT_PREFIX, base).replace("\\", "/")
 
-def _resize_letterbox(img: Image.Image, target_side: int) -> Image.Image:
-    # แก้ orientation จาก EXIF ก่อน
-    img = ImageOps.exif_transpose(img.convert("RGB"))
-    w, h = img.size
-    scale = min(target_side / w, target_side / h)
-    new_w, new_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
-    img = img.resize((new_w, new_h), Image.BICUBIC)
-
-    canvas = Image.new("RGB", (target_side, target_side), PAD_COLOR)
-    off_x = (target_side - new_w) // 2
-    off_y = (target_side - new_h) // 2
-    canvas.paste(img, (off_x, off_y))
-    return canvas
-
 def handler(event, context):
+    # metric (EMF): ImagesProcessed/s, bytes เข้า/ออก, เวลาต่อขั้น, S3 request (ดู Shared/metrics.py)
+    with metrics.stage("preprocess", rates=("ImagesProcessed", "BytesWritten"), Dataset=DATASET) as m:
+        return _preprocess(m)
+
+def _preprocess(m):
     print(f"🚀 preprocess start dataset={DATASET} target={TARGET_SIDE}×{TARGET_SIDE}")
     processed = 0
     skipped   = 0
@@ -74,22 +71,29 @@ def handler(event, context):
         # ถ้ามีผลลัพธ์อยู่แล้วให้ข้าม
         if _head_ok(BUCKET, out_key):
             skipped += 1
+            m.count("ImagesSkipped")
             continue
 
         # อ่าน + แปลง
-        obj = s3.get_object(Bucket=BUCKET, Key=key)
-        img = Image.open(BytesIO(obj["Body"].read()))
-        img = _resize_letterbox(img, TARGET_SIDE)
+        with m.timer("Download"):
+            data = s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+        with m.timer("Letterbox"):
+            img = resize_letterbox(Image.open(BytesIO(data)), TARGET_SIDE, PAD_COLOR)
 
         # เขียนกลับเป็น JPEG
         buf = BytesIO()
-        img.save(buf, format="JPEG", quality=90, optimize=True)
+        with m.timer("Encode"):
+            img.save(buf, format="JPEG", quality=90, optimize=True)
+        written = buf.tell()
         buf.seek(0)
-        s3.upload_fileobj(buf, BUCKET, out_key, ExtraArgs={"ContentType": "image/jpeg"})
+        with m.timer("Upload"):
+            s3.upload_fileobj(buf, BUCKET, out_key, ExtraArgs={"ContentType": "image/jpeg"})
         processed += 1
-
-        if processed % 100 == 0:
-            print(f"… processed {processed} images")
+        m.count("ImagesProcessed")
+        m.count("BytesRead", len(data), unit="Bytes")
+        m.count("BytesWritten", written, unit="Bytes")
+        # ความคืบหน้า = record EMF ทุก METRICS_FLUSH_SECS (ImagesProcessedPerSecond)
+        m.maybe_flush()
 
         if processed >= MAX_PROCESSED:
             print(f"⏹ reached MAX_PROCESSED={MAX_PROCESSED}, stop this run")
@@ -105,6 +109,7 @@ def handler(event, context):
             if remaining > 0:
                 break
 
+    m.count("RemainingRaw", remaining)
     if remaining == 0:
         s3.put_object(Bucket=BUCKET, Key=READY_MARKER_KEY, Body=b"ready", ContentType="text/plain")
         print(f"🏁 DONE processed={processed} (skipped={skipped}) — wrote {READY_MARKER_KEY}")
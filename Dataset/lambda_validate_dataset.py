@@ -3,10 +3,13 @@ import json
 from collections import Counter, defaultdict
 from datetime import datetime
 
-import boto3
-import botocore
+import botocore.exceptions
 
-s3 = boto3.client("s3")
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+import metrics
+
+s3 = lazy_client("s3")
 
 # ========= DEFAULT ENV (ไม่พังตอน import) =========
 DEFAULT_BUCKET  = os.getenv("BUCKET")
@@ -65,6 +68,16 @@ def _derive_paths(dataset: str, overrides: dict | None = None):
 
 # ========= main =========
 def handler(event, context):
+    # metric (EMF): จำนวนไฟล์ raw/processed, ไฟล์ที่หาย/เกิน, check ที่ไม่ผ่าน (ดู Shared/metrics.py)
+    with metrics.stage("validate") as m:
+        out = _validate(event, m)
+        if not out.get("ok"):
+            m.count("Errors")   # ok: False ไม่ได้ raise → stage ไม่นับให้
+            m.prop("error", out.get("note"))
+        return out
+
+
+def _validate(event, m):
     # ---------- รับค่า config ----------
     bucket  = (event or {}).get("bucket")  or DEFAULT_BUCKET
     dataset = (event or {}).get("dataset") or DEFAULT_DATASET
@@ -73,6 +86,7 @@ def handler(event, context):
             "Missing required config: bucket/dataset. "
             "Set ENV BUCKET & DATASET_NAME or pass in event."
         )
+    m.dimension(Dataset=dataset)
 
     # รองรับ override prefix/key จาก event หรือ ENV (ถ้ามี)
     overrides = {}
@@ -108,8 +122,10 @@ def handler(event, context):
 
     # ---------- 1) โหลด COCO ----------
     try:
-        coco = _get_json(bucket, RAW_COCO_KEY)
+        with m.timer("LoadCoco"):
+            coco = _get_json(bucket, RAW_COCO_KEY)
     except botocore.exceptions.ClientError as e:
+        m.count("ChecksFailed")
         report["checks"].append({
             "name": "load_coco",
             "ok": False,
@@ -154,7 +170,8 @@ def handler(event, context):
     })
 
     # ---------- 4) raw files consistency ----------
-    raw_files = _list_keys(bucket, RAW_IMG_PREFIX)
+    with m.timer("ListRaw"):
+        raw_files = _list_keys(bucket, RAW_IMG_PREFIX)
     raw_names = {k.split("/")[-1].lower() for k in raw_files}
     coco_names = {str(i.get("file_name")).split("/")[-1].lower() for i in imgs}
 
@@ -175,7 +192,8 @@ def handler(event, context):
     })
 
     # ---------- 5) processed (preprocessed) consistency ----------
-    proc_files = _list_keys(bucket, PROC_IMG_PREFIX + "images/")
+    with m.timer("ListProcessed"):
+        proc_files = _list_keys(bucket, PROC_IMG_PREFIX + "images/")
     proc_names = {k.split("/")[-1].lower() for k in proc_files}
 
     missing_in_proc = sorted(list(coco_names - proc_names))
@@ -215,6 +233,12 @@ def handler(event, context):
     if tpc: summary["train_per_class"] = tpc
     if vpc: summary["val_per_class"]   = vpc
     report["summary"] = summary
+    for name, v in (("CocoImages", len(coco_names)), ("RawFiles", len(raw_files)),
+                    ("ProcessedFiles", len(proc_files)), ("Annotations", len(anns)),
+                    ("MissingInRaw", len(missing_in_raw)), ("OrphanInRaw", len(orphan_in_raw)),
+                    ("MissingInProcessed", len(missing_in_proc)), ("OrphanInProcessed", len(orphan_in_proc)),
+                    ("ChecksFailed", sum(1 for c in report["checks"] if not c["ok"]))):
+        m.count(name, v)
 
     # ---------- 7) บันทึกรายงาน ----------
     _put_json(bucket, REPORT_KEY, report)
@@ -0,0 +1,130 @@
+"""
+pack_dataset.py — สร้าง ZIP สำหรับ ingest_dataset.py ในรูปแบบที่ offline_curator อ่านได้เร็ว
+
+layout ที่ curator ต้องการ:
+    train/*.coco.json  + รูป
+    valid/*.coco.json  + รูป
+    test/*.coco.json   + รูป
+
+- รูป (.jpg/.jpeg/.png) ถูกเก็บแบบ ZIP_STORED (JPEG/PNG บีบอัดมาแล้ว DEFLATE ซ้ำไม่ได้อะไร)
+  → curator ไม่ต้อง inflate และอ่าน member ด้วย ranged read ได้ตรงๆ
+- เฉพาะ JSON ที่ถูกบีบอัดด้วย ZIP_DEFLATED
+- hash (sha256 + crc32) ของทุก member ทำแบบขนาน
+- เขียน _manifest.json (ใน ZIP และเป็นไฟล์คู่ <zip>.manifest.json) บอก offset/size/sha256 ของแต่ละ member
+"""
+import os, sys, json, zlib, struct, hashlib, zipfile, argparse, time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+SPLITS = ("train", "valid", "test")
+IMG_EXTS = {".jpg", ".jpeg", ".png"}
+MANIFEST_NAME = "_manifest.json"
+CHUNK = 1024 * 1024
+
+def _hash_file(path: Path):
+    sha = hashlib.sha256()
+    crc = 0
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(CHUNK)
+            if not b:
+                break
+            sha.update(b)
+            crc = zlib.crc32(b, crc)
+            size += len(b)
+    return {"sha256": sha.hexdigest(), "crc32": f"{crc & 0xFFFFFFFF:08x}", "size": size}
+
+def _collect(src: Path):
+    """คืน list ของ (arcname, path) เรียงตามชื่อ เฉพาะไฟล์ใต้ train/valid/test"""
+    members = []
+    for split in SPLITS:
+        d = src / split
+        if not d.is_dir():
+            continue
+        cocos = sorted(d.glob("*.coco.json"))
+        if not cocos:
+            print(f"⚠️ {split}/ has no *.coco.json — curator will skip this split")
+        for p in sorted(d.rglob("*")):
+            if not p.is_file():
+                continue
+            ext = p.suffix.lower()
+            if ext not in IMG_EXTS and not p.name.endswith(".json"):
+                continue
+            members.append((p.relative_to(src).as_posix(), p))
+    return members
+
+def _data_offsets(zip_path: Path, infos):
+    """อ่าน local file header เพื่อหา offset ของข้อมูลจริงของแต่ละ member (ใช้ทำ ranged GET)"""
+    out = {}
+    with open(zip_path, "rb") as f:
+        for zi in infos:
+            f.seek(zi.header_offset)
+            hdr = f.read(30)
+            n_len, x_len = struct.unpack("<HH", hdr[26:30])
+            out[zi.filename] = zi.header_offset + 30 + n_len + x_len
+    return out
+
+def pack(src: Path, out_zip: Path, workers: int = 8):
+    t0 = time.time()
+    members = _collect(src)
+    if not any(a.endswith(".coco.json") for a, _ in members):
+        raise SystemExit(f"❌ no */*.coco.json found under {src} (need train/valid/test)")
+
+    # 1) hash แบบขนาน (hashlib/zlib ปล่อย GIL ระหว่างประมวลผล buffer ใหญ่)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        hashes = list(ex.map(lambda m: _hash_file(m[1]), members))
+    t_hash = time.time() - t0
+
+    # 2) เขียน ZIP: รูป = STORED, JSON = DEFLATED
+    entries = []
+    with zipfile.ZipFile(out_zip, "w", allowZip64=True) as zf:
+        for (arc, path), h in zip(members, hashes):
+            is_img = path.suffix.lower() in IMG_EXTS
+            ctype = zipfile.ZIP_STORED if is_img else zipfile.ZIP_DEFLATED
+            zf.write(path, arc, compress_type=ctype)
+            entries.append({
+                "name": arc,
+                "size": h["size"],
+                "sha256": h["sha256"],
+                "crc32": h["crc32"],
+                "compression": "stored" if is_img else "deflated",
+            })
+
+        zf.fp.flush()
+        infos = {zi.filename: zi for zi in zf.infolist()}
+        offsets = _data_offsets(out_zip, infos.values())
+        for e in entries:
+            zi = infos[e["name"]]
+            e["data_offset"] = offsets[e["name"]]
+            e["compressed_size"] = zi.compress_size
+
+        manifest = {
+            "format": "dermavision-dataset-zip/1",
+            "splits": [s for s in SPLITS if any(e["name"].startswith(s + "/") for e in entries)],
+            "members": entries,
+        }
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2),
+                    compress_type=zipfile.ZIP_DEFLATED)
+
+    sidecar = out_zip.with_name(out_zip.name + ".manifest.json")
+    sidecar.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    n_img = sum(1 for e in entries if e["compression"] == "stored")
+    raw = sum(e["size"] for e in entries)
+    print(f"✅ packed {len(entries)} members ({n_img} images stored) → {out_zip}")
+    print(f"   raw={raw/1e6:.1f}MB zip={out_zip.stat().st_size/1e6:.1f}MB "
+          f"hash={t_hash:.2f}s total={time.time()-t0:.2f}s workers={workers}")
+    print(f"🧾 manifest: {sidecar}")
+    return manifest
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pack a train/valid/test COCO folder into a store-mode ZIP")
+    ap.add_argument("src", help="folder ที่มี train/ valid/ test/")
+    ap.add_argument("out", help="ไฟล์ ZIP ปลายทาง")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = ap.parse_args(argv)
+    pack(Path(args.src), Path(args.out), args.workers)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,7 +1,10 @@
 # notify_curator.py
-import json, os, boto3, traceback
+import json, os, traceback
 
-lam = boto3.client("lambda")
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+
+lam = lazy_client("lambda")
 OFFLINE_FN = os.environ.get("OFFLINE_CURATOR_FN", "offline_curator")
 
 def handler(event, context):
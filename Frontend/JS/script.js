@@ -140,28 +140,63 @@ document.addEventListener('DOMContentLoaded', () => {
 
                 console.log("🎯 รอรับผลลัพธ์ที่:", finalResultUrl);
 
-                // 4. สั่งให้ดึงข้อมูล (Polling)
-                const checkResult = async () => {
+                // 4. รอผลแบบ long-poll (Frontend/Py/wait_result.py)
+                //    server ถือ request ไว้จนผลถูกเขียน แล้วตอบกลับทันที → ไม่ต้องยิง S3 ทุก 3 วิ
+                //    ถ้า endpoint ใช้ไม่ได้ ค่อย fallback ไปอ่านไฟล์จาก S3 แบบเดิม
+                const waitUrl = `${API_BASE}/result?key=${encodeURIComponent(uploadKey)}&stage=recommendations`;
+                const deadline = Date.now() + 3 * 60 * 1000; // รอไม่เกิน 3 นาที
+                const MIN_RETRY_MS = 1000;
+
+                const finish = () => {
+                    processBtn.textContent = originalBtnText;
+                    processBtn.disabled = false;
+                };
+
+                const waitForResult = async () => {
                     // ตรวจสอบว่ามีฟังก์ชัน loadAnalysisResult หรือไม่ (จาก suggestProduct.js)
-                    if (typeof loadAnalysisResult === 'function') {
-                        const isDone = await loadAnalysisResult(finalResultUrl);
-                        
-                        if (isDone) {
-                            // เสร็จแล้ว
-                            processBtn.textContent = originalBtnText;
-                            processBtn.disabled = false;
-                        } else {
-                            // ยังไม่มา รอ 3 วิ แล้วเรียกใหม่
-                            setTimeout(checkResult, 3000);
-                        }
-                    } else {
+                    if (typeof loadAnalysisResult !== 'function') {
                         console.error("Error: หาฟังก์ชัน loadAnalysisResult ไม่เจอ");
                         statusDisplay.textContent = "เกิดข้อผิดพลาด: ไม่พบ Script แสดงผล";
+                        return;
+                    }
+
+                    while (Date.now() < deadline) {
+                        let res = null;
+                        const startedAt = Date.now();
+                        try {
+                            res = await fetch(waitUrl, { cache: "no-store" });
+                        } catch (e) {
+                            console.warn("wait_result ใช้ไม่ได้:", e);
+                        }
+
+                        if (res && res.status === 200) {
+                            // ได้ผลแล้ว ส่ง JSON ให้แสดงผลเลย ไม่ต้อง fetch S3 ซ้ำ
+                            await loadAnalysisResult(finalResultUrl, await res.json());
+                            finish();
+                            return;
+                        }
+                        if (res && res.status === 204) {
+                            // ยังไม่เสร็จภายในรอบนี้ → รอบใหม่ได้ทันทีถ้า server ถือ request ไว้จริง
+                            // ถ้า 204 กลับมาเร็ว (backend ตั้งค่าผิด) เว้นอย่างน้อย 1 วิ กันยิงรัว
+                            const wait = MIN_RETRY_MS - (Date.now() - startedAt);
+                            if (wait > 0) await new Promise(r => setTimeout(r, wait));
+                            continue;
+                        }
+
+                        // endpoint error → fallback อ่านไฟล์ผลลัพธ์จาก S3 ตรงๆ แล้วรอ 3 วิ
+                        if (await loadAnalysisResult(finalResultUrl)) {
+                            finish();
+                            return;
+                        }
+                        await new Promise(r => setTimeout(r, 3000));
                     }
+
+                    statusDisplay.textContent = "❌ หมดเวลารอผลลัพธ์ กรุณาลองใหม่อีกครั้ง";
+                    statusDisplay.style.color = "red";
+                    finish();
                 };
 
-                // เริ่มเช็คครั้งแรก (หน่วง 2 วิ)
-                setTimeout(checkResult, 2000);
+                waitForResult();
 
             } catch (err) {
                 console.error(err);
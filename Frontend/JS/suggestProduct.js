@@ -1,9 +1,10 @@
 // ==========================================================
 // ไฟล์: JS/suggestProduct.js
 // หน้าที่: ดึงข้อมูล JSON จาก S3 และแสดงผลการวิเคราะห์ + สินค้า
+//         (ถ้าได้ JSON มาจาก long-poll แล้ว ส่งเป็น preloadedData ได้เลย)
 // ==========================================================
 
-async function loadAnalysisResult(jsonUrl) {
+async function loadAnalysisResult(jsonUrl, preloadedData) {
     // 1. อ้างอิง Element ตาม HTML ที่คุณส่งมา
     const analysisText = document.getElementById('analysis-text');
     const analysisContainer = document.getElementById('analysis-container');
@@ -26,17 +27,20 @@ async function loadAnalysisResult(jsonUrl) {
     }
 
     try {
-        // 3. พยายามดึงไฟล์ JSON จาก S3
-        const response = await fetch(jsonUrl);
+        // 3. ใช้ข้อมูลจาก long-poll ถ้ามี ไม่งั้นดึงไฟล์ JSON จาก S3
+        let data = preloadedData;
+        if (!data) {
+            const response = await fetch(jsonUrl);
+
+            // กรณี 1: ยังไม่เจอไฟล์ (404/403) -> แปลว่า Lambda ยังสร้างไฟล์ไม่เสร็จ
+            if (!response.ok) {
+                console.log("...รอไฟล์ผลลัพธ์จาก Lambda...");
+                return false; // ⚠️ ส่งค่า false กลับไป เพื่อให้ script.js รู้ว่าต้องวนรอบใหม่
+            }
 
-        // กรณี 1: ยังไม่เจอไฟล์ (404/403) -> แปลว่า Lambda ยังสร้างไฟล์ไม่เสร็จ
-        if (!response.ok) {
-            console.log("...รอไฟล์ผลลัพธ์จาก Lambda...");
-            return false; // ⚠️ ส่งค่า false กลับไป เพื่อให้ script.js รู้ว่าต้องวนรอบใหม่
+            // กรณี 2: เจอไฟล์แล้ว -> แปลงเป็น JSON
+            data = await response.json();
         }
-
-        // กรณี 2: เจอไฟล์แล้ว -> แปลงเป็น JSON
-        const data = await response.json();
         console.log("✅ ได้รับข้อมูลสินค้าแล้ว:", data);
 
         // -------------------------------------------------------
@@ -53,6 +57,19 @@ async function loadAnalysisResult(jsonUrl) {
         }*/
 
 
+        // ภาพไม่ผ่าน quality gate (เบลอ / มืด / เล็ก / ไม่เห็นผิว) → ให้ถ่ายใหม่ ไม่ต้องแสดงสินค้า
+        if (data.retake) {
+            if (analysisText) {
+                analysisText.innerHTML = `<span style="color: #E57373;">📷 ${data.message || 'กรุณาถ่ายรูปใหม่อีกครั้ง'}</span>`;
+            }
+            if (productContainer) productContainer.classList.add('hidden');
+            if (statusDisplay) {
+                statusDisplay.textContent = 'รูปภาพไม่ชัดพอสำหรับการวิเคราะห์';
+                statusDisplay.style.color = '#E57373';
+            }
+            return true; // จบงาน
+        }
+
         const problems = data.analysis_labels || [];
 
         // 1. สร้างดิกชันนารีแปลภาษา
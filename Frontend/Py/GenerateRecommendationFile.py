@@ -1,23 +1,32 @@
 import json
-import boto3
-import random
-from boto3.dynamodb.conditions import Attr
-from decimal import Decimal
 import urllib.parse
 
-# เชื่อมต่อ S3 และ DynamoDB
-s3 = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('SkincareProducts') # ชื่อ Table ของคุณ
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+# recommender.py = logic การเลือกสินค้า (ใช้ร่วมกับ analyze_skin แบบ FUSED_RECOMMEND)
+from recommender import recommend, final_output, recommendation_key_for, dumps, PRODUCT_TABLE
+from result_notify import publish
+from catalog_cache import CatalogCache, CATALOG_CACHE_ENABLED
+from tag_index import TAG_INDEX_TABLE
+from reco_table import RecoTable, RECO_TABLE_BUCKET
+from aws_clients import lazy_client, lazy_table
+import metrics
 
-# Helper แปลง Decimal เป็นเลขปกติ
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# เชื่อมต่อ S3 และ DynamoDB
+s3 = lazy_client('s3')
+table = lazy_table(PRODUCT_TABLE) # ชื่อ Table ของคุณ (ค่าเริ่มต้น SkincareProducts)
+# แคตตาล็อกทั้งตารางในหน่วยความจำ (โหลดครั้งแรกที่ใช้ แล้วอยู่ข้าม warm invocation)
+catalog = CatalogCache(table) if CATALOG_CACHE_ENABLED else None
+# ปิด catalog cache แล้ว → Query tag index ทุก label พร้อมกัน (ถ้าไม่มี index ก็ Scan รอบเดียว)
+index = lazy_table(TAG_INDEX_TABLE) if TAG_INDEX_TABLE else None
+# ผลที่คำนวณไว้ล่วงหน้าของทุกชุด label (Product/materialize_reco_table.py) โหลดตอน cold start
+reco = RecoTable(s3, table=table) if RECO_TABLE_BUCKET else None
 
 def lambda_handler(event, context):
+    # metric (EMF): จำนวน label/สินค้า, เวลาแต่ละช่วง, DynamoDB/S3 request (ดู Shared/metrics.py)
+    with metrics.stage("recommend", Function=getattr(context, "function_name", None)) as m:
+        return _generate(event, m)
+
+def _generate(event, m):
     # รับ Event จาก S3
     bucket = event['Records'][0]['s3']['bucket']['name']
     key = urllib.parse.unquote_plus(event['Records'][0]['s3']['object']['key'])
@@ -26,62 +35,53 @@ def lambda_handler(event, context):
 
     try:
         # อ่านไฟล์ JSON Input
-        response = s3.get_object(Bucket=bucket, Key=key)
-        file_content = response['Body'].read().decode('utf-8')
-        input_data = json.loads(file_content)
+        with m.timer("ReadInput"):
+            response = s3.get_object(Bucket=bucket, Key=key)
+            file_content = response['Body'].read().decode('utf-8')
+            input_data = json.loads(file_content)
         
+        # analyze_skin แบบ FUSED_RECOMMEND=both เขียน recommendations ไปแล้ว ไม่ต้องทำซ้ำ
+        if input_data.get('fused'):
+            print(f"Skip: {key} already has fused recommendations")
+            m.count("SkippedFused")
+            return "Skipped"
+
         # ดึง Labels ปัญหาผิว
         detected_labels = input_data.get('labels', [])
         print(f"Labels found: {detected_labels}")
-        
-        recommendations = []
-        
-        # วนลูปหาปัญหาสินค้า
-        for label in detected_labels:
-            # สุ่มหาสินค้าจาก DynamoDB
-            db_response = table.scan(
-                FilterExpression=Attr('tags').contains(label)
-            )
-            items = db_response.get('Items', [])
-            
-            if items:
-                selected_product = random.choice(items)
-                
-                product_data = {
-                    "problem": label,
-                    "name": selected_product.get('name'),
-                    "brand": selected_product.get('brand'),
-                    "price": selected_product.get('price'),
-                    "image_url": selected_product.get('image_url'),
-                    "ingredients": selected_product.get('ingredients', '') 
-                }
-                recommendations.append(product_data)
+
+        # เปิดตาราง reco ก่อน ถ้า stale ค่อยหาสินค้าของทุกปัญหาผิวในครั้งเดียวแล้วจัดอันดับสด
+        # (seed = key ของไฟล์ → ผลเดิมทุกครั้ง)
+        with m.timer("Recommend"):
+            recommendations = recommend(detected_labels, table, catalog=catalog.get if catalog else None,
+                                        index=index, seed=key, reco=reco)
+        m.count("Labels", len(detected_labels))
+        m.count("Recommendations", len(recommendations))
+        # สถิติสะสมของ cache ต่อ container → field ใน record เดียวกัน (ค้นได้ใน Logs Insights)
+        if catalog:
+            m.prop("catalog_cache", catalog.snapshot())
+        if reco:
+            m.prop("reco_table", reco.snapshot())
 
         # สร้าง JSON ผลลัพธ์
-        final_output = {
-            "user_info": input_data.get('source', {}),
-            "analysis_labels": detected_labels,
-            "recommendations": recommendations
-        }
-        
+        final_output_data = final_output(input_data, recommendations)
+
         # --- ส่วนสำคัญ: กำหนด Path ใหม่ ---
-        # เปลี่ยนโฟลเดอร์จาก results/ เป็น recommendations/
-        new_key = key.replace("results/", "recommendations/")
-        
-        # เปลี่ยนหางไฟล์ให้เป็น _final.json (รองรับทั้ง .jpg.json, .png.json)
-        if new_key.endswith(".json"):
-            new_key = new_key[:-5] + "_final.json"
-        else:
-            new_key = new_key + "_final.json"
-            
+        # เปลี่ยนโฟลเดอร์จาก results/ เป็น recommendations/ และหางไฟล์เป็น _final.json
+        new_key = recommendation_key_for(key)
+
         # บันทึกไฟล์ใหม่ลง S3
-        s3.put_object(
-            Bucket=bucket,
-            Key=new_key,
-            Body=json.dumps(final_output, cls=DecimalEncoder, ensure_ascii=False),
-            ContentType='application/json'
-        )
+        with m.timer("WriteOutput"):
+            s3.put_object(
+                Bucket=bucket,
+                Key=new_key,
+                Body=dumps(final_output_data),
+                ContentType='application/json'
+            )
         
+        # แจ้ง client ที่ long-poll อยู่ ได้ผลทันทีโดยไม่ต้องรอรอบ polling
+        publish("recommendations", bucket, new_key, final_output_data)
+
         print(f"✅ Success! Saved to: {new_key}")
         return "Success"
 
@@ -1,11 +1,43 @@
+import os
 import json
-import boto3
-from boto3.dynamodb.conditions import Attr
 from decimal import Decimal
 
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+# tag_index = ตาราง tag → สินค้า (SkincareProductTags) ดูแลโดย Product/lambda_tag_index.py
+# product_ranker ต้องมี NumPy layer (Dataset/build-pillow-layer.sh)
+from tag_index import TAG_INDEX_TABLE
+from catalog_cache import CatalogCache, CATALOG_CACHE_ENABLED
+from recommender import candidates
+from product_ranker import ProductRanker
+from ingredient_index import IngredientIndex
+from reco_table import RecoTable, RECO_TABLE_BUCKET
+from aws_clients import lazy_client, lazy_table
+import metrics
+
 # เชื่อมต่อ DynamoDB
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('SkincareProducts') # ⚠️ ชื่อ Table ต้องตรงกับที่คุณสร้างเป๊ะๆ
+table = lazy_table(os.environ.get('PRODUCT_TABLE', 'SkincareProducts')) # ⚠️ ชื่อ Table ต้องตรงกับที่คุณสร้างเป๊ะๆ
+# ตั้ง TAG_INDEX_TABLE="" เพื่อกลับไปใช้ Scan (เช่น ระหว่างรอ backfill index ครั้งแรก)
+index = lazy_table(TAG_INDEX_TABLE) if TAG_INDEX_TABLE else None
+# แคตตาล็อกในหน่วยความจำ: warm invocation ตอบได้โดยไม่เรียก DynamoDB เลย (CATALOG_CACHE=off เพื่อปิด)
+catalog = CatalogCache(table) if CATALOG_CACHE_ENABLED else None
+# top-K ของทุกชุด label ที่คำนวณไว้ล่วงหน้า (Product/materialize_reco_table.py) → request ที่ไม่มีตัวกรองเปิด list ได้เลย
+reco = RecoTable(lazy_client('s3'), table=table) if RECO_TABLE_BUCKET else None
+MAX_PRODUCTS = 10
+# ไม่มี catalog cache: จัดอันดับจากสินค้า rank สูงสุด RANKER_CANDIDATES ชิ้นต่อ label
+RANKER_CANDIDATES = int(os.environ.get('RANKER_CANDIDATES', '30'))
+FILTERS = ('min_price', 'max_price', 'brands', 'exclude_brands')
+INGREDIENT_FILTERS = ('avoid', 'require')
+
+
+def _ranker(labels):
+    """(ProductRanker, ฟังก์ชันคืน IngredientIndex ที่ row ตรงกับ ranker)"""
+    if catalog is not None:
+        cat = catalog.get()
+        return cat.ranker(), cat.ingredient_index
+    # Query index ของทุก label พร้อมกัน (หรือ Scan รอบเดียวถ้าไม่มี index) แล้วจัดอันดับเฉพาะชุดนั้น
+    cands = candidates(labels, table, index=index, limit=RANKER_CANDIDATES)
+    ranker = ProductRanker({p['product_id']: p for v in cands.values() for p in v}.values())
+    return ranker, lambda: IngredientIndex([p.get('ingredients') or '' for p in ranker.products])
 
 # ตัวช่วยแปลงตัวเลข Decimal ของ DynamoDB ให้เป็น JSON ที่หน้าเว็บเข้าใจ
 class DecimalEncoder(json.JSONEncoder):
@@ -15,10 +47,19 @@ class DecimalEncoder(json.JSONEncoder):
         return super(DecimalEncoder, self).default(obj)
 
 def lambda_handler(event, context):
+    # metric (EMF): ที่มาของผล (reco table / จัดอันดับสด), จำนวนสินค้า, เวลา (ดู Shared/metrics.py)
+    with metrics.stage("recommend", Function=getattr(context, "function_name", None)) as m:
+        resp = _recommend(event, m)
+        m.count(f"Http{resp['statusCode'] // 100}xx")
+        return resp
+
+def _recommend(event, m):
     print("Received event:", json.dumps(event))
     
     # 1. รับค่า Labels จาก Event (ที่หน้าเว็บ หรือ Rekognition ส่งมา)
     # รูปแบบที่รับ: {"labels": ["Acne", "Oily-Skin"]}
+    # ออปชัน: "weights": {"Acne": 0.9, ...}, "min_price", "max_price", "brands": [...], "exclude_brands": [...]
+    #        "avoid": ["fragrance", "paraben"], "require": ["niacinamide"] (ส่วนผสม — คำบางส่วนก็ได้)
     detected_labels = event.get('labels', [])
     
     # ถ้าไม่มี Label ส่งมา ให้ตอบกลับไปดีๆ ว่าไม่เจอ
@@ -36,30 +77,31 @@ def lambda_handler(event, context):
     print(f"Searching products for: {detected_labels}")
 
     try:
-        # 2. ค้นหา (Logic: เลือกปัญหาแรกที่สำคัญที่สุดมาหาก่อน)
-        # หมายเหตุ: การใช้ Scan เหมาะกับข้อมูลหลักพัน แต่ถ้าข้อมูลหลักล้านควรใช้ Query
-        primary_concern = detected_labels[0] 
-        
-        # คำสั่ง Scan หาแถวที่มี Tag ตรงกับปัญหาแรก
-        response = table.scan(
-            FilterExpression=Attr('tags').contains(primary_concern)
-        )
-        items = response.get('Items', [])
-        
-        # (Optional) ถ้าผลลัพธ์น้อยกว่า 3 ชิ้น และมีปัญหาที่ 2 ให้หาเพิ่ม
-        if len(items) < 3 and len(detected_labels) > 1:
-            secondary_concern = detected_labels[1]
-            print(f"Results low, searching secondary concern: {secondary_concern}")
-            response_2 = table.scan(
-                FilterExpression=Attr('tags').contains(secondary_concern)
-            )
-            items.extend(response_2.get('Items', []))
-
-        # ตัดสินค้าซ้ำออก (เผื่อสินค้าเดียวแก้ได้ 2 ปัญหา)
-        unique_products = list({v['product_id']: v for v in items}.values())
-        
-        # เลือกมาแสดงแค่ 10 ชิ้นพอ (สุ่มหรือเลือกตาม Rank ก็ได้ แต่เอาแบบง่ายก่อน)
-        final_products = unique_products[:10]
+        # 2. ให้คะแนนสินค้าทั้งแคตตาล็อกกับ label ทั้งชุดในครั้งเดียว (สินค้าที่แก้ได้หลายปัญหาขึ้นก่อน)
+        filters = {k: event[k] for k in FILTERS if event.get(k) is not None}
+        ingredients = {k: event[k] for k in INGREDIENT_FILTERS if event.get(k)}
+        final_products = None
+        if reco is not None and not filters and not ingredients and not event.get('weights'):
+            final_products = reco.top(detected_labels, MAX_PRODUCTS)   # None = stale / label นอกตาราง
+        if final_products is not None:
+            m.count("ServedFromRecoTable")
+        else:
+            with m.timer("Rank"):
+                ranker, ingredient_index = _ranker(detected_labels)
+                # avoid/require → AND/OR ของ bitmap ส่วนผสม ได้ bool ต่อ row ส่งให้ ranker ตัดทิ้งก่อน top-K
+                allow = ingredient_index().allowed(**ingredients) if ingredients else None
+                final_products = ranker.top_k(detected_labels, MAX_PRODUCTS, weights=event.get('weights'),
+                                              allow=allow, **filters)
+            m.count("RankedLive")
+        m.count("Labels", len(detected_labels))
+        m.count("Products", len(final_products))
+        if filters or ingredients:
+            m.count("FilteredRequests")
+        # สถิติสะสมของ cache ต่อ container → field ใน record เดียวกัน (ค้นได้ใน Logs Insights)
+        if catalog is not None:
+            m.prop("catalog_cache", catalog.snapshot())
+        if reco is not None:
+            m.prop("reco_table", reco.snapshot())
 
         # 3. ส่งผลลัพธ์กลับไป
         return {
@@ -73,6 +115,7 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'message': 'Success',
                 'search_criteria': detected_labels,
+                'filters': {**filters, **ingredients},
                 'count': len(final_products),
                 'recommended_products': final_products
             }, cls=DecimalEncoder) # ใช้ Encoder เพื่อแก้บั๊กทศนิยม
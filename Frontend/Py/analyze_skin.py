@@ -1,64 +1,121 @@
 # analyze_skin_s3.py  (runtime: Python 3.13)
-import os, json, logging, boto3
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+import os, json, time, logging
 from urllib.parse import unquote_plus
 
+from inference_cache import InferenceCache, CACHE_ENABLED, etag_from_record
+from detectors import get_detector
+from inference_dispatch import Throttle
+from result_notify import publish
+from catalog_cache import CatalogCache, CATALOG_CACHE_ENABLED
+from reco_table import RecoTable, RECO_TABLE_BUCKET
+import recommender
+from skin_analyzer import (SkinAnalyzer, run_records, expand_records, batch_item_failures,
+                           result_key_for, put_json, quality_fields, record_metrics)
+import metrics
+from aws_clients import lazy_client, SINGLE_ATTEMPT
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rekognition = boto3.client("rekognition")
-s3 = boto3.client("s3")
+rekognition = lazy_client("rekognition", retries=SINGLE_ATTEMPT)   # retry throttle = Throttle
+s3 = lazy_client("s3")
 
 MODEL_ARN      = os.environ["MODEL_ARN"]
 RESULT_BUCKET  = os.environ["RESULT_BUCKET"]           # = บัคเก็ตเดียวกับที่เก็บรูปก็ได้
 RESULT_PREFIX  = os.environ.get("RESULT_PREFIX","results/")
 MIN_CONFIDENCE = float(os.environ.get("MIN_CONFIDENCE","50"))
+# off   = เขียน results/ แล้วให้ GenerateRecommendationFile (S3 event) ทำ recommendations/ ต่อ (แบบเดิม)
+# both  = เลือกสินค้าใน invocation นี้เลย เขียนทั้ง results/ (ติด "fused": true ให้ลัมบ์ดาตัวถัดไปข้าม) และ recommendations/
+# final = เขียนแค่ recommendations/ (ต้องไม่มีใครอื่นต้องใช้ results/)
+FUSED_RECOMMEND = os.environ.get("FUSED_RECOMMEND", "off").lower()
+
+# อยู่ระดับ module → ใช้ซ้ำได้ข้าม warm invocation
+# REKOGNITION_TPS / AIMD_MAX_CONCURRENCY ตั้งตาม inference unit ที่ provision ไว้
+_throttle = Throttle()
+_cache = InferenceCache() if CACHE_ENABLED else None
+_products = recommender.product_table() if FUSED_RECOMMEND in ("both", "final") else None
+_catalog = CatalogCache(_products) if _products is not None and CATALOG_CACHE_ENABLED else None
+_reco = RecoTable(s3, table=_products) if _products is not None and RECO_TABLE_BUCKET else None
+
+
+def _analyzer():
+    return SkinAnalyzer(get_detector(rekognition, MODEL_ARN), s3, MIN_CONFIDENCE, cache=_cache, throttle=_throttle)
+
+
+def _process_record(rec):
+    bucket = rec["s3"]["bucket"]["name"]
+    key    = unquote_plus(rec["s3"]["object"]["key"])
+
+    # metadata (sessionid/skintypes) ไม่ได้ถูกใช้ในผลลัพธ์แล้ว จึงไม่ต้อง head_object
+    # ภาพส่งให้ Rekognition ผ่าน S3Object (ไม่ต้องโหลดเข้า Lambda) ถ้าอ่านไม่ได้จะ fallback เป็น bytes
+    out = _analyzer().analyze_s3(bucket, key, etag_from_record(rec))
+    record_metrics(out)
+
+    out_key = result_key_for(key, RESULT_PREFIX)
+    result = {
+        "source": {"bucket": bucket, "key": key, "via": "s3_event"},
+        "labels": out["labels"],
+    }
+    result.update(quality_fields(out))   # QUALITY_GATE: ภาพไม่ผ่าน → retake + เหตุผล
+    trace = {"analyze": out["timings_ms"].get("total", 0.0)}
+
+    if FUSED_RECOMMEND != "final":
+        t0 = time.perf_counter()
+        if FUSED_RECOMMEND == "both":
+            result["fused"] = True
+        put_json(s3, RESULT_BUCKET, out_key, result)
+        publish("results", RESULT_BUCKET, out_key, result)   # ปลุก client ที่รอผลอยู่ (wait_result.py)
+        trace["put_results"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    final_key = None
+    if FUSED_RECOMMEND in ("both", "final"):
+        # เรียก logic ของ GenerateRecommendationFile ตรงนี้เลย: ไม่ต้องรอ S3 event / cold start / GET results/ อีกรอบ
+        t0 = time.perf_counter()
+        # seed = key ของ results/ เหมือน GenerateRecommendationFile → ภาพเดียวกันได้สินค้าชุดเดียวกันทั้งสองทาง
+        recs = recommender.recommend(out["labels"], _products, catalog=_catalog.get if _catalog else None,
+                                     seed=out_key, reco=_reco)
+        final = recommender.final_output(result, recs)
+        trace["recommend"] = round((time.perf_counter() - t0) * 1000, 1)
+        t0 = time.perf_counter()
+        final_key = recommender.recommendation_key_for(out_key)
+        s3.put_object(Bucket=RESULT_BUCKET, Key=final_key, Body=recommender.dumps(final),
+                      ContentType="application/json")
+        publish("recommendations", RESULT_BUCKET, final_key, final)
+        trace["put_final"] = round((time.perf_counter() - t0) * 1000, 1)
+    trace["total"] = round(sum(trace.values()), 1)
+    m = metrics.current()
+    for k in ("put_results", "recommend", "put_final"):
+        if k in trace:
+            m.timing("".join(p.title() for p in k.split("_")), trace[k])   # put_results → PutResults
+
+    logger.info(f"Saved: s3://{RESULT_BUCKET}/{final_key or out_key} via={out['via']} bytes={out['bytes_moved']} "
+                f"cache={out['cache']} fused={FUSED_RECOMMEND} timings_ms={json.dumps(out['timings_ms'])} "
+                f"trace_ms={json.dumps(trace)}")
+    return {"key": key, "result_key": out_key, "final_key": final_key, "via": out["via"], "cache": out["cache"],
+            "bytes_moved": out["bytes_moved"], "timings_ms": out["timings_ms"], "trace_ms": trace}
+
 
 def handler(event, context):
-    for rec in event.get("Records", []):
-        bucket = rec["s3"]["bucket"]["name"]
-        key    = unquote_plus(rec["s3"]["object"]["key"])
-
-        # อ่าน metadata (ถ้ามี)
-        session_id = None
-        user_skin_types = None
-        try:
-            head = s3.head_object(Bucket=bucket, Key=key)
-            md = head.get("Metadata", {})
-            session_id = md.get("sessionid")
-            user_skin_types = md.get("skintypes")
-        except Exception:
-            pass
-
-        # อ่านไฟล์ภาพจาก S3 → bytes
-        obj = s3.get_object(Bucket=bucket, Key=key)
-        img_bytes = obj["Body"].read()
-
-        # วิเคราะห์ด้วยโมเดล
-        resp = rekognition.detect_custom_labels(
-            ProjectVersionArn=MODEL_ARN,
-            Image={"Bytes": img_bytes},
-            MinConfidence=MIN_CONFIDENCE
-        )
-        labels = sorted({lbl["Name"] for lbl in resp.get("CustomLabels", [])})
-
-        # กำหนด key สำหรับผลลัพธ์
-        # แทนที่ "uploads/" → "results/" แล้วเติม .json
-        if key.startswith("uploads/"):
-            out_key = key.replace("uploads/", RESULT_PREFIX, 1) + ".json"
-        else:
-            out_key = f"{RESULT_PREFIX}{key}.json"
-
-        result = {
-            "source": {"bucket": bucket, "key": key, "via": "s3_event"},
-            "labels": labels,
-            #"meta": {"sessionId": session_id, "skinTypes": user_skin_types}
-        }
-
-        s3.put_object(
-            Bucket=RESULT_BUCKET,
-            Key=out_key,
-            Body=json.dumps(result, ensure_ascii=False, indent=2).encode("utf-8"),
-            ContentType="application/json"
-        )
-        logger.info(f"Saved: s3://{RESULT_BUCKET}/{out_key}")
-    return {"ok": True}
+    # metric (EMF): ภาพ/bytes/cache/เวลาแต่ละช่วง + latency ของ Rekognition/S3 (ดู Shared/metrics.py)
+    with metrics.stage("analyze", Function=getattr(context, "function_name", None), Fused=FUSED_RECOMMEND):
+        return _handle(event)
+
+
+def _handle(event):
+    # รับได้ทั้ง S3 event ตรง และ S3 event ที่ผ่าน SQS (durable queue กัน burst)
+    pairs = expand_records(event)
+    outcomes, failed = run_records([rec for _, rec in pairs], _process_record)
+    out = {"ok": not failed, "processed": len(outcomes) - len(failed), "failed": failed,
+           "throttle": _throttle.snapshot()}
+    if _cache:
+        _cache.log_stats()
+        out["cache"] = _cache.snapshot()
+    if _catalog:
+        _catalog.log_stats()
+    if _reco:
+        _reco.log_stats()
+    if any(msg_id for msg_id, _ in pairs):
+        # SQS ต้องเปิด ReportBatchItemFailures → ส่งเฉพาะ message ที่ยังโดน throttle กลับเข้าคิว
+        out["batchItemFailures"] = batch_item_failures(pairs, outcomes)
+    return out
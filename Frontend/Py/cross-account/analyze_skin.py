@@ -2,19 +2,33 @@ import os
 import json
 import base64
 import logging
-import urllib.request
 import urllib.parse
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from inference_cache import InferenceCache, CACHE_ENABLED
+from detectors import get_detector
+from inference_dispatch import Throttle, ThrottledError
+from result_notify import publish
+from skin_analyzer import (SkinAnalyzer, S3ObjectSource, PresignedUrlSource, NormalizedSource,
+                           NORMALIZE_IMAGES, MAX_WORKERS, QUALITY_GATE, gated, quality_fields, record_metrics)
+from aws_clients import lazy_client, SINGLE_ATTEMPT
+import metrics
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rekognition = boto3.client("rekognition")
-s3          = boto3.client("s3")
+rekognition = lazy_client("rekognition", retries=SINGLE_ATTEMPT)   # retry throttle = Throttle
+s3          = lazy_client("s3")
 
 MODEL_ARN      = os.environ["MODEL_ARN"]
 RESULT_BUCKET  = os.environ["RESULT_BUCKET"]
 MIN_CONFIDENCE = float(os.environ.get("MIN_CONFIDENCE", "50"))
+# true = bucket ของ Account A อนุญาตให้ role ของ Account B อ่านได้ → ส่ง S3Object ให้ Rekognition ตรงๆ
+S3OBJECT_CROSS_ACCOUNT = os.environ.get("S3OBJECT_CROSS_ACCOUNT", "false").lower() == "true"
+
+_throttle = Throttle()
+_cache = InferenceCache() if CACHE_ENABLED else None
 
 def _resp(status, body):
     return {
@@ -23,51 +37,95 @@ def _resp(status, body):
         "body": json.dumps(body, ensure_ascii=False),
     }
 
+def _analyze_item(data):
+    image_url       = data["image_url"]          # presigned GET url
+    src_bucket      = data.get("source_bucket")  # optional
+    src_key         = data.get("source_key")     # optional
+
+    # เลือกแหล่งภาพ: S3Object (ไม่ต้องดาวน์โหลด) ถ้าได้รับสิทธิ์ ไม่งั้นดาวน์โหลดจาก presigned URL
+    url_source = PresignedUrlSource(image_url, data.get("etag"))
+    if S3OBJECT_CROSS_ACCOUNT and src_bucket and src_key:
+        source, fallback = S3ObjectSource(src_bucket, src_key, data.get("etag")), url_source
+    else:
+        source, fallback = url_source, None
+    if QUALITY_GATE != "off":
+        # gate ต้องใช้ bytes → ดาวน์โหลดจาก presigned URL ครั้งเดียวแล้วส่ง bytes ต่อ
+        source, fallback = gated(url_source), None
+    if NORMALIZE_IMAGES:
+        # letterbox 640×640 ก่อนส่ง (Account B เขียน bucket ต้นทางไม่ได้ จึงไม่ cache ภาพ normalize)
+        source, fallback = NormalizedSource(source), None
+
+    # วิเคราะห์ด้วยโมเดลใน Account B
+    analyzer = SkinAnalyzer(get_detector(rekognition, MODEL_ARN), s3, MIN_CONFIDENCE, cache=_cache, throttle=_throttle)
+    out = analyzer.analyze(source, fallback)
+    record_metrics(out)
+    labels = out["labels"]
+
+    # สร้าง result key
+    if src_key:
+        out_key = src_key.replace("uploads/", "results/", 1) + ".json"
+    else:
+        # กรณีไม่มี source_key ให้ fallback ชื่อจาก URL
+        filename = os.path.basename(urllib.parse.urlparse(image_url).path) or "image"
+        out_key = f"results/{filename}.json"
+
+    result = {
+        "source": {"bucket": src_bucket, "key": src_key, "via": out["via"]},
+        "labels": list(labels)
+    }
+    result.update(quality_fields(out))
+
+    s3.put_object(
+        Bucket=RESULT_BUCKET,
+        Key=out_key,
+        Body=json.dumps(result, ensure_ascii=False, indent=2),
+        ContentType="application/json"
+    )
+    publish("results", RESULT_BUCKET, out_key, result)
+    logger.info(f"Saved result to s3://{RESULT_BUCKET}/{out_key} via={out['via']} "
+                f"bytes={out['bytes_moved']} cache={out['cache']} timings_ms={json.dumps(out['timings_ms'])}")
+    return {"ok": True, "result_key": out_key}
+
+
+def _safe_item(data):
+    try:
+        return _analyze_item(data)
+    except ThrottledError as e:
+        return {"ok": False, "error": str(e), "retryable": True}
+    except Exception as e:
+        logger.exception(f"Error for {data.get('source_key')}")
+        return {"ok": False, "error": str(e)}
+
+
 def handler(event, context):
+    # metric (EMF): ภาพ/bytes/cache/เวลาแต่ละช่วง + latency ของ Rekognition/S3 (ดู Shared/metrics.py)
+    with metrics.stage("analyze", Function=getattr(context, "function_name", None)) as m:
+        resp = _handle(event)
+        m.count(f"Http{resp['statusCode'] // 100}xx")
+        return resp
+
+
+def _handle(event):
     try:
         body = event.get("body")
         if event.get("isBase64Encoded"):
             body = base64.b64decode(body or "").decode("utf-8")
         data = json.loads(body or "{}")
 
-        image_url       = data["image_url"]          # presigned GET url
-        src_bucket      = data.get("source_bucket")  # optional
-        src_key         = data.get("source_key")     # optional
-
-        # ดาวน์โหลดรูปจาก presigned URL
-        with urllib.request.urlopen(image_url, timeout=15) as r:
-            img_bytes = r.read()
-
-        # วิเคราะห์ด้วยโมเดลใน Account B
-        resp = rekognition.detect_custom_labels(
-            ProjectVersionArn=MODEL_ARN,
-            Image={"Bytes": img_bytes},
-            MinConfidence=MIN_CONFIDENCE
-        )
-        labels = sorted({lbl["Name"] for lbl in resp.get("CustomLabels", [])})
-
-        # สร้าง result key
-        if src_key:
-            out_key = src_key.replace("uploads/", "results/", 1) + ".json"
-        else:
-            # กรณีไม่มี source_key ให้ fallback ชื่อจาก URL
-            filename = os.path.basename(urllib.parse.urlparse(image_url).path) or "image"
-            out_key = f"results/{filename}.json"
-
-        result = {
-            "source": {"bucket": src_bucket, "key": src_key, "via": "presigned_url"},
-            "labels": list(labels)
-        }
-
-        s3.put_object(
-            Bucket=RESULT_BUCKET,
-            Key=out_key,
-            Body=json.dumps(result, ensure_ascii=False, indent=2),
-            ContentType="application/json"
-        )
-        logger.info(f"Saved result to s3://{RESULT_BUCKET}/{out_key}")
-        return _resp(200, {"ok": True, "result_key": out_key})
+        # batch จาก forward_to_analyzer: {"items": [...]} → ผลแยกราย item ตามลำดับเดิม
+        if "items" in data:
+            items = data["items"] or []
+            if not items:
+                return _resp(200, {"ok": True, "results": []})
+            with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(items)))) as ex:
+                results = list(ex.map(_safe_item, items))
+            return _resp(200, {"ok": all(r["ok"] for r in results), "results": results})
+
+        return _resp(200, _analyze_item(data))
 
+    except ThrottledError as e:
+        logger.warning(f"Throttled: {e}")
+        return _resp(429, {"error": str(e)})
     except Exception as e:
         logger.exception("Error")
-        return _resp(500, {"error": str(e)})
\ No newline at end of file
+        return _resp(500, {"error": str(e)})
@@ -1,56 +1,223 @@
 # forward_to_analyzer.py  (Account A)
-import os, json, logging, urllib.request, boto3
-from urllib.parse import unquote_plus
+# ส่งภาพที่อัปโหลด (S3 event) ไปให้ analyze_skin ของ Account B ผ่าน API
+# - connection แบบ keep-alive เก็บใน pool ระดับ module → ใช้ซ้ำข้าม record และข้าม warm invocation
+# - FORWARD_MODE=batch      : รวม record เป็น {"items": [...]} ครั้งละ FORWARD_BATCH_SIZE (ค่าเริ่มต้น)
+#   FORWARD_MODE=concurrent : POST ทีละ record แต่ยิงพร้อมกันหลาย thread
+#   FORWARD_MODE=sequential : ทีละ record (แบบเดิม)
+# - retry มีขอบเขต (FORWARD_MAX_RETRIES) เฉพาะ error ชั่วคราว: ต่อไม่ได้ / timeout / 429 / 502-504
+#   (500 จาก analyzer = error ที่ไม่ใช่ชั่วคราว ส่งซ้ำก็ได้ผลเดิม)
+# - connection ใน pool ที่ server ปิดไปแล้วระหว่าง idle → ส่งใหม่บน connection ใหม่ทันที ไม่นับเป็น retry
+#   และทิ้ง connection ที่ idle นานเกิน FORWARD_MAX_IDLE_SECS ก่อนใช้
+# - มี record ที่ส่งไม่สำเร็จ → raise ForwardError ให้ Lambda retry event (analyzer ใช้ eTag เป็น cache key ส่งซ้ำได้)
+import os, json, time, random, queue, socket, logging, threading, http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus, urlsplit
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client(s3)
-
-API_ENDPOINT    = os.environ[API_ENDPOINT]
-EXPIRES         = int(os.environ.get(PRESIGN_EXPIRES, 300))
-
-def _post_json(url, payload dict)
-    data = json.dumps(payload).encode(utf-8)
-    req = urllib.request.Request(url, data=data, headers={Content-Type applicationjson}, method=POST)
-    with urllib.request.urlopen(req, timeout=10) as resp
-        return resp.read().decode(utf-8)
-
-def handler(event, context)
-    for rec in event[Records]
-        bucket = rec[s3][bucket][name]
-        key    = unquote_plus(rec[s3][object][key])
-
-        # สร้าง presigned GET URL ส่งให้ Account B
-        presigned = s3.generate_presigned_url(
-            get_object,
-            Params={Bucket bucket, Key key},
-            ExpiresIn=EXPIRES
-        )
-
-        # (optional) ดึง metadata เผื่อมี sessionskinTypes แนบมา
-        session_id = None
-        user_skin_types = None
-        try
-            head = s3.head_object(Bucket=bucket, Key=key)
-            md = head.get(Metadata, {})
-            session_id = md.get(sessionid)
-            user_skin_types = md.get(skintypes)
-        except Exception
-            pass
-
-        payload = {
-            image_url presigned,
-            source_bucket bucket,
-            source_key key,
-            sessionId session_id,
-            skinTypes user_skin_types
-        }
-
-        try
-            logger.info(fPOST {API_ENDPOINT} for {key})
-            _post_json(API_ENDPOINT, payload)
-        except Exception as e
-            logger.exception(fCall API failed for {key} {e})
-
-    return {status ok}
\ No newline at end of file
+s3 = lazy_client("s3")
+
+API_ENDPOINT    = os.environ["API_ENDPOINT"]
+EXPIRES         = int(os.environ.get("PRESIGN_EXPIRES", "300"))
+FORWARD_MODE    = os.environ.get("FORWARD_MODE", "batch").lower()
+BATCH_SIZE      = int(os.environ.get("FORWARD_BATCH_SIZE", "10"))
+MAX_WORKERS     = int(os.environ.get("FORWARD_MAX_WORKERS", "8"))
+MAX_RETRIES     = int(os.environ.get("FORWARD_MAX_RETRIES", "3"))
+TIMEOUT         = float(os.environ.get("FORWARD_TIMEOUT", "10"))
+MAX_IDLE_SECS   = float(os.environ.get("FORWARD_MAX_IDLE_SECS", "30"))
+
+RETRY_STATUS = {429, 502, 503, 504}
+
+
+class _TransientError(Exception):
+    pass
+
+
+class ForwardError(Exception):
+    """มี record ที่ส่งไม่สำเร็จ (failed = [{"key", "error"}, ...])"""
+    def __init__(self, failed):
+        super().__init__(f"{len(failed)} record(s) not forwarded: " +
+                         ", ".join(f"{o['key']} ({o['error']})" for o in failed[:5]))
+        self.failed = failed
+
+
+class HttpPool:
+    """pool ของ http.client connection ไปยัง host เดียว (thread-safe)"""
+    def __init__(self, url, size=MAX_WORKERS, timeout=TIMEOUT, max_idle=MAX_IDLE_SECS):
+        u = urlsplit(url)
+        self.scheme, self.host, self.port = u.scheme, u.hostname, u.port
+        self.path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue(maxsize=size)   # (conn, เวลาที่คืนเข้า pool)
+        self.opened = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    def _new(self):
+        with self._lock:
+            self.opened += 1
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        conn.connect()
+        # header กับ body ถูกส่งคนละ send() → ปิด Nagle กันหน่วง ~40ms จาก delayed ACK บน connection ที่ใช้ซ้ำ
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def _take(self):
+        """connection ที่ idle อยู่ (ทิ้งตัวที่ idle นานเกิน max_idle) หรือ None"""
+        while True:
+            try:
+                conn, since = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - since <= self.max_idle:
+                return conn
+            conn.close()
+
+    def _connect(self):
+        try:
+            return self._new()
+        except OSError as e:
+            raise _TransientError(f"connect failed: {e}") from e
+
+    def post_json(self, payload):
+        """คืน (status, body dict); connection ที่ error จะถูกทิ้ง ไม่คืนเข้า pool"""
+        body = json.dumps(payload).encode("utf-8")
+        conn = self._take()
+        reused = conn is not None
+        if not reused:
+            conn = self._connect()
+        while True:
+            try:
+                conn.request("POST", self.path, body=body,
+                             headers={"Content-Type": "application/json", "Connection": "keep-alive"})
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if not reused or isinstance(e, TimeoutError):   # timeout = server ช้า ไม่ใช่ connection ค้าง
+                    raise _TransientError(f"{type(e).__name__}: {e}") from e
+                # server ปิด keep-alive ไปแล้วระหว่าง idle → ส่งซ้ำบน connection ใหม่ ไม่นับเป็น attempt
+                with self._lock:
+                    self.stale += 1
+                conn, reused = self._connect(), False
+        if resp.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait((conn, time.monotonic()))
+            except queue.Full:
+                conn.close()
+        try:
+            parsed = json.loads(data or b"{}")
+        except ValueError:
+            parsed = {"raw": data.decode("utf-8", "replace")}
+        return resp.status, parsed
+
+
+_pool = HttpPool(API_ENDPOINT)
+
+
+def _post_with_retry(payload):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            status, body = _pool.post_json(payload)
+            if status not in RETRY_STATUS:
+                return status, body
+            err = f"HTTP {status}"
+        except _TransientError as e:
+            err = str(e)
+        if attempt == MAX_RETRIES:
+            raise _TransientError(f"gave up after {attempt + 1} attempts: {err}")
+        delay = random.uniform(0, 0.2 * (2 ** attempt))
+        logger.warning(f"🔁 retry {attempt + 1}/{MAX_RETRIES} in {delay:.2f}s ({err})")
+        time.sleep(delay)
+
+
+def _payload(rec):
+    bucket = rec["s3"]["bucket"]["name"]
+    key    = unquote_plus(rec["s3"]["object"]["key"])
+
+    # สร้าง presigned GET URL ส่งให้ Account B (คำนวณ local ไม่มี round trip)
+    presigned = s3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": key},
+        ExpiresIn=EXPIRES
+    )
+    # ไม่ head_object แล้ว: analyzer ไม่ได้ใช้ sessionid/skintypes; ส่ง eTag จาก event ไปใช้เป็น cache key แทน
+    return {
+        "image_url": presigned,
+        "source_bucket": bucket,
+        "source_key": key,
+        "etag": (rec["s3"]["object"].get("eTag") or "").strip('"') or None,
+    }
+
+
+def _send_one(item):
+    try:
+        status, body = _post_with_retry(item)
+    except _TransientError as e:
+        return {"key": item["source_key"], "error": str(e)}
+    if status != 200:
+        return {"key": item["source_key"], "error": body.get("error") or f"HTTP {status}"}
+    return {"key": item["source_key"], "result_key": body.get("result_key")}
+
+
+def _send_batch(items):
+    """ส่ง {"items": [...]}; item ที่ analyzer บอกว่า retryable (โดน throttle) ส่งซ้ำในรอบถัดไป"""
+    results, pending = [None] * len(items), list(range(len(items)))
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            status, body = _post_with_retry({"items": [items[i] for i in pending]})
+        except _TransientError as e:
+            body, status = {"error": str(e)}, None
+        if status != 200:
+            for i in pending:
+                results[i] = {"key": items[i]["source_key"], "error": body.get("error") or f"HTTP {status}"}
+            break
+        got = body.get("results", [])
+        got += [{"error": "missing result"}] * (len(pending) - len(got))
+        retry = []
+        for i, r in zip(pending, got):
+            if r.get("retryable") and attempt < MAX_RETRIES:
+                retry.append(i)
+            else:
+                results[i] = dict(r, key=items[i]["source_key"])
+        if not retry:
+            break
+        pending = retry
+        time.sleep(random.uniform(0, 0.2 * (2 ** attempt)))
+    return results
+
+
+def handler(event, context):
+    items = [_payload(rec) for rec in event.get("Records", [])]
+    if not items:
+        return {"status": "ok", "forwarded": 0, "failed": []}
+
+    t0 = time.perf_counter()
+    if FORWARD_MODE == "sequential":
+        outcomes = [_send_one(it) for it in items]
+    elif FORWARD_MODE == "concurrent":
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(items))) as ex:
+            outcomes = list(ex.map(_send_one, items))
+    else:
+        chunks = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as ex:
+            outcomes = [o for chunk in ex.map(_send_batch, chunks) for o in chunk]
+
+    failed = [o for o in outcomes if "error" in o]
+    for o in failed:
+        logger.error(f"❌ forward failed for {o['key']}: {o['error']}")
+    logger.info(f"📤 POST {API_ENDPOINT} mode={FORWARD_MODE} records={len(items)} failed={len(failed)} "
+                f"connections_opened={_pool.opened} stale={_pool.stale} ms={(time.perf_counter() - t0) * 1000:.1f}")
+    if failed:
+        # ไม่กลืนเป็น "partial": raise → Lambda retry event นี้ (async invoke) แทนที่ record จะหายเงียบๆ
+        raise ForwardError(failed)
+    return {"status": "ok", "forwarded": len(items), "failed": []}
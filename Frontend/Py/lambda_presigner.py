@@ -1,15 +1,19 @@
-import os, json, uuid, datetime as dt, boto3
+import os, json, uuid, time, datetime as dt
 import logging
 import secrets # <- เพิ่ม import นี้
 
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+import upload_batch
+
 # ตั้งค่า logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ALLOWED_EXT = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+ALLOWED_EXT = upload_batch.ALLOWED_EXT
 CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "https://dermavision.s3.us-east-1.amazonaws.com")
 
-s3 = boto3.client("s3") # <- ย้าย s3 client มาไว้ข้างนอก
+s3 = lazy_client("s3") # <- ย้าย s3 client มาไว้ข้างนอก (สร้างตอนใช้ครั้งแรก)
 
 def _resp(status, body):
     return {
@@ -18,37 +22,62 @@ def _resp(status, body):
             "content-type": "application/json",
             "Access-Control-Allow-Origin": CORS_ORIGIN,
             "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
         },
         "body": json.dumps(body, ensure_ascii=False),
     }
 
-def generate_unique_user_id(bucket: str, s3_client) -> str:
+# Crockford base32 (ไม่มี I L O U) ตัวเล็กทั้งหมด → ปลอดภัยสำหรับ S3 key / URL
+_B32 = "0123456789abcdefghjkmnpqrstvwxyz"
+
+def generate_unique_user_id() -> str:
     """
-    สุ่มรหัสผู้ใช้ (8 ตัวอักษร) และตรวจสอบว่ายังไม่มีใน S3 bucket
+    สร้างรหัสผู้ใช้แบบ time-ordered (รูปแบบเดียวกับ ULID, 26 ตัวอักษร)
+    48 bit = เวลาเป็นมิลลิวินาที + 80 bit = สุ่มจาก secrets
+    โอกาสชนกันภายในมิลลิวินาทีเดียวกันต่ำมาก (2^-80) จึงไม่ต้อง list_objects_v2 เช็คใน S3 อีก
+    และเรียงตามเวลาได้เมื่อ list prefix uploads/user=
     """
-    max_tries = 10
-    for _ in range(max_tries):
-        # สุ่มตัวอักษรและตัวเลข 8 ตัว (hex 4 bytes = 8 chars)
-        user_id = secrets.token_hex(4) 
-        prefix = f"uploads/user={user_id}/" # <- นี่คือ "folder" ที่เราจะเช็ก
-
-        # ตรวจสอบว่ามี object ที่ขึ้นต้นด้วย prefix นี้หรือไม่
-        response = s3_client.list_objects_v2(
-            Bucket=bucket,
-            Prefix=prefix,
-            MaxKeys=1 # เราแค่ต้องการรู้ว่ามี "อย่างน้อย 1" หรือไม่
-        )
-        
-        # ถ้า 'Contents' ไม่มีอยู่ หรือเป็น list ว่าง
-        # แปลว่า prefix นี้ยังไม่เคยถูกใช้งาน
-        if 'Contents' not in response or not response['Contents']:
-            logger.info(f"✅ Generated unique userId: {user_id}")
-            return user_id
-
-    # ถ้าวน loop 10 ครั้งแล้วยังชนอยู่ ให้โยน error
-    logger.error(f"❌ Failed to generate unique userId after {max_tries} tries.")
-    raise Exception("Failed to generate unique user ID (collision)")
+    value = (int(time.time() * 1000) << 80) | secrets.randbits(80)
+    chars = []
+    for _ in range(26):
+        chars.append(_B32[value & 0x1F])
+        value >>= 5
+    user_id = "".join(reversed(chars))
+    logger.info(f"✅ Generated userId: {user_id}")
+    return user_id
+
+
+def _presign_post(bucket: str, key: str, ctype: str, max_size: int):
+    return s3.generate_presigned_post(
+        Bucket=bucket,
+        Key=key,
+        Fields={
+          "Content-Type": ctype,
+          "acl": "public-read"  # <-- 1. เพิ่ม Field นี้
+      },
+      Conditions=[
+          ["content-length-range", 0, max_size],
+          {"Content-Type": ctype},
+          {"acl": "public-read"}   # <-- 2. เพิ่ม Condition นี้
+      ],
+      ExpiresIn=300,
+    )
+
+def _handle_batch(bucket, user_id, files, max_size):
+    error = upload_batch.check(files, max_size)
+    if error:
+        return _resp(400, {"error": error})
+
+    now = dt.datetime.utcnow()
+    # ทุกไฟล์ใน session เดียวกันอยู่ใต้ prefix เดียว (ยังคง layout uploads/user=<id>/dt=.../)
+    session_id, prefix, items = upload_batch.plan(files, f"uploads/user={user_id}/dt={now:%Y/%m/%d}/", max_size)
+    logger.info(f"🚀 Batch presign requested | user={user_id}, files={len(files)}, prefix={prefix}")
+
+    # ถ้า client บอกขนาดมา limit = ขนาดนั้น (content-length-range)
+    uploads = [{"key": key, "upload": _presign_post(bucket, key, ctype, limit)} for key, ctype, limit in items]
+
+    logger.info(f"✅ Batch presigned {len(uploads)} uploads under {prefix}")
+    return _resp(200, {"userId": user_id, "sessionId": session_id, "prefix": prefix, "uploads": uploads})
 
 
 def handler(event, context):
@@ -61,13 +90,19 @@ def handler(event, context):
         # --- ส่วนที่เปลี่ยนแปลง ---
         # เราจะไม่รับ userId จาก query string อีกต่อไป
         # แต่จะสร้างขึ้นมาใหม่ทุกครั้งที่เรียก
-        try:
-            user_id = generate_unique_user_id(bucket, s3)
-        except Exception as e:
-            logger.exception("❌ Error during user ID generation")
-            return _resp(500, {"error": "id_generation_failed", "detail": str(e)})
+        user_id = generate_unique_user_id()
         # ------------------------
 
+        max_size = int(os.environ.get("MAX_SIZE", "10000000"))  # 10MB
+
+        try:
+            files = upload_batch.parse(event)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"❌ Invalid batch request: {e}")
+            return _resp(400, {"error": "invalid batch request", "detail": str(e)})
+        if files is not None:
+            return _handle_batch(bucket, user_id, files, max_size)
+
         qs = event.get("queryStringParameters") or {}
         ext = (qs.get("ext") or "jpg").lower() # <- ยังคงรับ ext จาก query string
         ctype = ALLOWED_EXT.get(ext)
@@ -75,7 +110,6 @@ def handler(event, context):
             logger.warning(f"❌ Unsupported ext requested: {ext}")
             return _resp(400, {"error": f"unsupported ext: {ext}"})
 
-        max_size = int(os.environ.get("MAX_SIZE", "10000000"))  # 10MB
         now = dt.datetime.utcnow()
         # สร้าง key โดยใช้ user_id ที่สุ่มมาได้
         key = f"uploads/user={user_id}/dt={now:%Y/%m/%d}/{uuid.uuid4()}.{ext}"
@@ -83,20 +117,7 @@ def handler(event, context):
         # log ข้อมูลสำคัญ
         logger.info(f"🚀 Presign requested | user={user_id}, fileKey={key}")
 
-        presigned = s3.generate_presigned_post(
-            Bucket=bucket,
-            Key=key,
-            Fields={
-              "Content-Type": ctype,
-              "acl": "public-read"  # <-- 1. เพิ่ม Field นี้
-          },
-          Conditions=[
-              ["content-length-range", 0, max_size], 
-              {"Content-Type": ctype},
-              {"acl": "public-read"}   # <-- 2. เพิ่ม Condition นี้
-          ],
-          ExpiresIn=300,
-        )
+        presigned = _presign_post(bucket, key, ctype, max_size)
 
         logger.info(f"✅ Presigned URL generated successfully for {key}")
         
@@ -0,0 +1,310 @@
+# reanalyze_uploads.py  (runtime: Python 3.13)
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+"""
+รัน model version ใหม่ย้อนหลังกับภาพทั้งหมดใน uploads/ (batch job, เรียกด้วยมือหรือ EventBridge)
+
+- หา partition uploads/user=*/dt=YYYY/ แบบขนาน (ListObjectsV2 + Delimiter) แล้ว list key ของ partition ล่วงหน้า
+  ระหว่างที่ partition ก่อนหน้ากำลังถูกวิเคราะห์
+- วิเคราะห์ทีละ chunk ด้วย run_records (worker จำกัด + Throttle เดียวกับ analyze_skin)
+- เขียนผลแยกตาม version: results/<model-version>/user=.../dt=.../x.jpg.json
+  (ถ้า trigger ของ GenerateRecommendationFile ครอบ results/ จะได้ recommendations/<model-version>/ ด้วย
+   ไม่ต้องการก็ตั้ง RESULT_PREFIX เป็น prefix อื่น)
+- checkpoint ใน reanalysis/<model-version>/checkpoint.json: partition ที่ทำถึง + key สุดท้าย
+  ใกล้ timeout → บันทึก checkpoint แล้ว invoke ตัวเองต่อ (SELF_INVOKE) ให้ทำต่อจากจุดเดิม
+- จบแล้วเขียน reanalysis/<model-version>/summary.json: throughput + สัดส่วน label เทียบกับ version ก่อนหน้า
+
+event (ทุก field ไม่บังคับ):
+  {"model_arn": "...", "model_version": "...", "previous_version": "...", "bucket": "...",
+   "max_images": 500, "reset": true}
+"""
+import os, json, math, time, logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from inference_cache import InferenceCache, CACHE_ENABLED
+from detectors import get_detector
+from inference_dispatch import Throttle
+from skin_analyzer import SkinAnalyzer, run_records, result_key_for, put_json, quality_fields
+from aws_clients import lazy_client, SINGLE_ATTEMPT
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+rekognition = lazy_client("rekognition", retries=SINGLE_ATTEMPT)   # retry throttle = Throttle
+s3 = lazy_client("s3")
+lambda_client = lazy_client("lambda")
+
+UPLOAD_BUCKET     = os.environ.get("UPLOAD_BUCKET", "")
+RESULT_BUCKET     = os.environ.get("RESULT_BUCKET", "") or UPLOAD_BUCKET
+UPLOADS_PREFIX    = os.environ.get("UPLOADS_PREFIX", "uploads/")
+RESULT_PREFIX     = os.environ.get("RESULT_PREFIX", "results/")
+REANALYSIS_PREFIX = os.environ.get("REANALYSIS_PREFIX", "reanalysis/")
+MODEL_ARN         = os.environ.get("MODEL_ARN", "")
+MODEL_VERSION     = os.environ.get("MODEL_VERSION", "")       # ว่าง = ตัดจาก MODEL_ARN
+PREVIOUS_VERSION  = os.environ.get("PREVIOUS_VERSION", "")
+MIN_CONFIDENCE    = float(os.environ.get("MIN_CONFIDENCE", "50"))
+LIST_WORKERS      = int(os.environ.get("LIST_WORKERS", "8"))
+CHUNK_SIZE        = int(os.environ.get("CHUNK_SIZE", "64"))
+CHECKPOINT_EVERY  = int(os.environ.get("CHECKPOINT_EVERY", "500"))   # จำนวนภาพระหว่าง checkpoint
+RESERVE_MS        = int(os.environ.get("RESERVE_MS", "30000"))        # เวลาที่เหลือไว้เขียน checkpoint + invoke ต่อ
+SELF_INVOKE       = os.environ.get("SELF_INVOKE", "true").lower() == "true"
+DRIFT_ALERT       = float(os.environ.get("DRIFT_ALERT", "0.05"))      # |Δ สัดส่วนภาพที่มี label| ที่ถือว่า drift
+MAX_FAILED_KEYS   = 1000                                             # เก็บไว้ใน checkpoint ให้รันซ้ำเฉพาะที่พังได้
+IMG_EXTS = tuple(e.strip().lower() for e in os.environ.get("IMG_EXTS", ".jpg,.jpeg,.png").split(","))
+
+_throttle = Throttle()
+_cache = InferenceCache() if CACHE_ENABLED else None   # cache key มี model_id → ไม่ปนกับ version อื่น
+
+
+# ---------- listing ----------
+def _common_prefixes(bucket, prefix):
+    out, token = [], None
+    while True:
+        kw = {"Bucket": bucket, "Prefix": prefix, "Delimiter": "/"}
+        if token:
+            kw["ContinuationToken"] = token
+        resp = s3.list_objects_v2(**kw)
+        out += [p["Prefix"] for p in resp.get("CommonPrefixes", [])]
+        if not resp.get("IsTruncated"):
+            return out
+        token = resp["NextContinuationToken"]
+
+
+def list_partitions(bucket, prefix=UPLOADS_PREFIX):
+    """uploads/user=*/dt=YYYY/ เรียงตามตัวอักษร (list ระดับ user ขนานกัน LIST_WORKERS ตัว)"""
+    users = [p for p in _common_prefixes(bucket, prefix) if p[len(prefix):].startswith("user=")]
+    with ThreadPoolExecutor(max_workers=max(1, LIST_WORKERS)) as ex:
+        per_user = list(ex.map(lambda u: _common_prefixes(bucket, u), users))
+    parts = []
+    for user, subs in zip(users, per_user):
+        parts += [p for p in subs if p[len(user):].startswith("dt=")]
+    return sorted(parts)
+
+
+def list_keys(bucket, partition, after=None):
+    """(key, etag) ของภาพทุกไฟล์ใต้ partition ที่อยู่หลัง after"""
+    out, kw = [], {"Bucket": bucket, "Prefix": partition}
+    if after:
+        kw["StartAfter"] = after
+    while True:
+        resp = s3.list_objects_v2(**kw)
+        out += [(o["Key"], o.get("ETag")) for o in resp.get("Contents", [])
+                if o["Key"].lower().endswith(IMG_EXTS)]
+        if not resp.get("IsTruncated"):
+            return out
+        kw.pop("StartAfter", None)
+        kw["ContinuationToken"] = resp["NextContinuationToken"]
+
+
+# ---------- checkpoint / summary ----------
+def _version_from_arn(arn):
+    # arn:aws:rekognition:...:project/<name>/version/<version-name>/<ts>
+    parts = arn.split("/")
+    return parts[parts.index("version") + 1] if "version" in parts[:-1] else ""
+
+
+def _state_key(version, name):
+    return f"{REANALYSIS_PREFIX}{version}/{name}"
+
+
+def _read_json(bucket, key):
+    try:
+        return json.loads(s3.get_object(Bucket=bucket, Key=key)["Body"].read())
+    except Exception:
+        return None
+
+
+def _new_state(cfg, partitions):
+    return {"model_version": cfg["model_version"], "model_arn": cfg["model_arn"], "bucket": cfg["bucket"],
+            "previous_version": cfg["previous_version"],
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "partitions": partitions, "next_partition": 0, "after": None,
+            "images": 0, "failed": 0, "failed_keys": [], "retake": 0, "empty": 0, "labels": {},
+            "elapsed_s": 0.0, "list_ms": 0.0, "invocations": 0, "done": False}
+
+
+def label_drift(cur, prev):
+    """
+    เทียบสัดส่วนภาพที่มีแต่ละ label ระหว่าง version (ภาพหนึ่งมีได้หลาย label)
+    psi = population stability index ของการกระจาย label (รวม "(none)" = ภาพที่ไม่เจออะไร)
+    """
+    def rates(s):
+        n = max(1, s["images"] - s["failed"])
+        r = {k: v / n for k, v in s["labels"].items()}
+        r["(none)"] = s["empty"] / n
+        return r
+
+    def dist(s):
+        total = sum(s["labels"].values()) + s["empty"]
+        d = {k: v / max(1, total) for k, v in s["labels"].items()}
+        d["(none)"] = s["empty"] / max(1, total)
+        return d
+
+    rc, rp = rates(cur), rates(prev)
+    dc, dp = dist(cur), dist(prev)
+    eps = 1e-4
+    psi = sum((dc.get(k, 0) - dp.get(k, 0)) * math.log((dc.get(k, 0) + eps) / (dp.get(k, 0) + eps))
+              for k in set(dc) | set(dp))
+    delta = {k: round(rc.get(k, 0) - rp.get(k, 0), 4) for k in sorted(set(rc) | set(rp))}
+    return {"previous_version": prev["model_version"], "psi": round(psi, 4),
+            "rate_delta": delta,
+            "alerts": [k for k, d in delta.items() if abs(d) >= DRIFT_ALERT]}
+
+
+def _summary(state):
+    n_ok = max(1, state["images"] - state["failed"])
+    out = {k: state[k] for k in ("model_version", "model_arn", "bucket", "started_at", "images", "failed",
+                                 "retake", "empty", "labels", "invocations", "failed_keys")}
+    out["finished_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    out["label_rate"] = {k: round(v / n_ok, 4) for k, v in sorted(state["labels"].items())}
+    out["throughput"] = {"elapsed_s": round(state["elapsed_s"], 2), "list_ms": round(state["list_ms"], 1),
+                         "partitions": len(state["partitions"]),
+                         "images_per_s": round(state["images"] / state["elapsed_s"], 2) if state["elapsed_s"] else 0.0}
+    if state["previous_version"]:
+        prev = _read_json(RESULT_BUCKET, _state_key(state["previous_version"], "summary.json"))
+        out["drift"] = label_drift(state, prev) if prev else {"previous_version": state["previous_version"],
+                                                               "error": "previous summary not found"}
+    return out
+
+
+# ---------- job ----------
+def _config(event):
+    arn = event.get("model_arn") or MODEL_ARN
+    return {"model_arn": arn,
+            "model_version": event.get("model_version") or MODEL_VERSION or _version_from_arn(arn),
+            "previous_version": event.get("previous_version", PREVIOUS_VERSION),
+            "bucket": event.get("bucket") or UPLOAD_BUCKET,
+            "max_images": int(event.get("max_images") or 0)}
+
+
+def _remaining_ms(context):
+    return context.get_remaining_time_in_millis() if context else float("inf")
+
+
+def _continue(context, event):
+    if not (SELF_INVOKE and context):
+        return False
+    payload = {k: v for k, v in event.items() if k != "reset"}
+    try:
+        lambda_client.invoke(FunctionName=context.invoked_function_arn, InvocationType="Event",
+                             Payload=json.dumps(payload).encode("utf-8"))
+        logger.info(f"📤 re-invoked {context.function_name} to continue")
+        return True
+    except Exception as e:
+        logger.warning(f"cannot re-invoke: {e}")
+        return False
+
+
+def handler(event, context):
+    event = event or {}
+    cfg = _config(event)
+    if not cfg["model_version"] or not cfg["bucket"]:
+        return {"ok": False, "error": "missing model_version/bucket (set MODEL_ARN or MODEL_VERSION, UPLOAD_BUCKET)"}
+    version, bucket = cfg["model_version"], cfg["bucket"]
+    ckpt_key = _state_key(version, "checkpoint.json")
+
+    state = None if event.get("reset") else _read_json(RESULT_BUCKET, ckpt_key)
+    if state and state.get("done"):
+        return {"ok": True, "done": True, "model_version": version, "summary_key": _state_key(version, "summary.json")}
+    if state is None:
+        t0 = time.perf_counter()
+        state = _new_state(cfg, list_partitions(bucket))
+        state["list_ms"] += (time.perf_counter() - t0) * 1000
+        logger.info(f"🗂️ reanalysis {version}: {len(state['partitions'])} partitions in {state['list_ms']:.0f} ms")
+    state["invocations"] += 1
+
+    analyzer = SkinAnalyzer(get_detector(rekognition, cfg["model_arn"]), s3, MIN_CONFIDENCE,
+                            cache=_cache, throttle=_throttle)
+    labels = Counter(state["labels"])
+    result_prefix = f"{RESULT_PREFIX}{version}/"
+
+    def _process(rec):
+        key = rec["s3"]["object"]["key"]
+        out = analyzer.analyze_s3(bucket, key, rec["s3"]["object"].get("eTag"))
+        result = {"source": {"bucket": bucket, "key": key, "via": "reanalysis"},
+                  "model_version": version, "labels": out["labels"]}
+        result.update(quality_fields(out))
+        put_json(s3, RESULT_BUCKET, result_key_for(key, result_prefix), result)
+        return {"key": key, "labels": out["labels"], "retake": bool(out.get("retake"))}
+
+    parts = state["partitions"]
+    start = state["next_partition"]
+    t_start = time.perf_counter()
+    since_ckpt, chunk_ms, budget_hit = 0, 0.0, False
+    limit = cfg["max_images"]
+
+    def _save():
+        state["labels"] = dict(labels)
+        put_json(s3, RESULT_BUCKET, ckpt_key, state)
+
+    # list partition ถัดไปล่วงหน้า LIST_WORKERS ตัว ระหว่างที่ตัวปัจจุบันกำลังวิเคราะห์
+    with ThreadPoolExecutor(max_workers=max(1, LIST_WORKERS)) as lister:
+        pending = {}
+
+        def _prefetch(i):
+            if i < len(parts) and i not in pending:
+                pending[i] = lister.submit(list_keys, bucket, parts[i], state["after"] if i == start else None)
+
+        for i in range(start, min(start + LIST_WORKERS, len(parts))):
+            _prefetch(i)
+
+        for i in range(start, len(parts)):
+            t0 = time.perf_counter()
+            keys = pending.pop(i).result()
+            state["list_ms"] += (time.perf_counter() - t0) * 1000   # เวลาที่ต้องรอ listing จริงๆ
+            _prefetch(i + LIST_WORKERS)
+
+            for c in range(0, len(keys), CHUNK_SIZE):
+                chunk = keys[c:c + CHUNK_SIZE]
+                if limit and state["images"] + len(chunk) > limit:
+                    chunk = chunk[:max(0, limit - state["images"])]
+                if not chunk or _remaining_ms(context) < RESERVE_MS + chunk_ms:
+                    budget_hit = True
+                    break
+                t0 = time.perf_counter()
+                records = [{"s3": {"bucket": {"name": bucket}, "object": {"key": k, "eTag": e}}} for k, e in chunk]
+                outcomes, failed = run_records(records, _process)
+                chunk_ms = (time.perf_counter() - t0) * 1000
+                for o in outcomes:
+                    if "error" in o:
+                        continue
+                    labels.update(o["labels"])
+                    state["empty"] += not o["labels"]
+                    state["retake"] += o["retake"]
+                state["images"] += len(chunk)
+                state["failed"] += len(failed)
+                state["failed_keys"] = (state["failed_keys"] + [o["key"] for o in failed])[-MAX_FAILED_KEYS:]
+                state["after"] = chunk[-1][0]
+                since_ckpt += len(chunk)
+                if since_ckpt >= CHECKPOINT_EVERY:
+                    state["elapsed_s"] += time.perf_counter() - t_start
+                    t_start = time.perf_counter()
+                    _save()
+                    since_ckpt = 0
+                    logger.info(f"💾 checkpoint {version}: partition {i + 1}/{len(parts)} images={state['images']}")
+            if budget_hit:
+                for f in pending.values():
+                    f.cancel()
+                break
+            state["next_partition"], state["after"] = i + 1, None
+
+    state["elapsed_s"] += time.perf_counter() - t_start
+    state["done"] = not budget_hit
+    _save()
+
+    if not state["done"]:
+        limited = limit and state["images"] >= limit
+        resumed = False if limited else _continue(context, event)
+        logger.info(f"⏸️ reanalysis {version} paused at partition {state['next_partition']}/{len(parts)} "
+                    f"images={state['images']} resumed={resumed}")
+        return {"ok": True, "done": False, "model_version": version, "images": state["images"],
+                "checkpoint_key": ckpt_key, "resumed": resumed}
+
+    summary = _summary(state)
+    summary_key = _state_key(version, "summary.json")
+    put_json(s3, RESULT_BUCKET, summary_key, summary)
+    logger.info(f"🏁 reanalysis {version}: images={summary['images']} failed={summary['failed']} "
+                f"throughput={json.dumps(summary['throughput'])} drift={json.dumps(summary.get('drift'))}")
+    return {"ok": True, "done": True, "model_version": version, "summary_key": summary_key,
+            "images": summary["images"], "failed": summary["failed"], "throughput": summary["throughput"]}
@@ -0,0 +1,99 @@
+# wait_result.py  (runtime: Python 3.13)
+# GET /result?key=uploads/user=.../xxx.jpg&stage=recommendations&timeout=25
+# long-poll: ถือ request ไว้จนผลของ stage นั้นถูกเขียน แล้วตอบ JSON ของผลทันที
+#   200 = ได้ผลแล้ว (body = JSON เดียวกับไฟล์ใน S3)
+#   204 = ยังไม่เสร็จภายใน timeout → client เรียกซ้ำ (script.js เว้นอย่างน้อย 1 วิ ถ้า 204 กลับมาเร็ว)
+# ต้องมี layer dermavision-shared; ถ้ามีตาราง RESULT_NOTIFY_TABLE จะรอจาก notification (ดู Shared/result_notify.py)
+# ไม่มี → poll S3 ฝั่ง server ทุก WAIT_S3_POLL_SECS จนครบ timeout (request ยังถูกถือไว้เหมือนกัน)
+# API Gateway จำกัด integration timeout ~29 วินาที → WAIT_TIMEOUT ต้องน้อยกว่านั้น
+import os, json, time, logging
+from botocore.exceptions import ClientError
+
+from result_notify import get_store, STAGES
+from aws_clients import lazy_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+s3 = lazy_client("s3")
+
+CORS_ORIGIN   = os.environ.get("CORS_ORIGIN", "https://dermavision.s3.us-east-1.amazonaws.com")
+WAIT_TIMEOUT  = float(os.environ.get("WAIT_TIMEOUT", "25"))
+RESULT_BUCKET = os.environ.get("RESULT_BUCKET", "skin-analysis-output")
+S3_POLL_SECS  = float(os.environ.get("WAIT_S3_POLL_SECS", "1"))
+
+
+def _resp(status, body=None):
+    return {
+        "statusCode": status,
+        "headers": {
+            "content-type": "application/json",
+            "cache-control": "no-store",
+            "Access-Control-Allow-Origin": CORS_ORIGIN,
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Allow-Methods": "GET,OPTIONS",
+        },
+        "body": body if isinstance(body, str) else ("" if body is None else json.dumps(body, ensure_ascii=False)),
+    }
+
+
+def _s3_key_for(upload_key, stage):
+    # layout เดียวกับที่ analyze_skin / GenerateRecommendationFile เขียน
+    rest = upload_key[len("uploads/"):]
+    if stage == "results":
+        return f"results/{rest}.json"
+    return f"recommendations/{rest}_final.json"
+
+
+def _read_s3(bucket, key):
+    try:
+        return s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "AccessDenied"):
+            return None
+        raise
+
+
+def _poll_s3(bucket, key, timeout):
+    """อ่าน S3 ซ้ำทุก S3_POLL_SECS จนเจอไฟล์หรือครบ timeout (ใช้ตอนไม่มี notification store)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        body = _read_s3(bucket, key)
+        left = deadline - time.monotonic()
+        if body is not None or left <= 0:
+            return body
+        time.sleep(min(S3_POLL_SECS, left))
+
+
+def handler(event, context):
+    qs = event.get("queryStringParameters") or {}
+    upload_key = (qs.get("key") or "").lstrip("/")
+    stage = (qs.get("stage") or "recommendations").lower()
+    if not upload_key.startswith("uploads/") or ".." in upload_key:
+        return _resp(400, {"error": "key must be an uploads/... key"})
+    if stage not in STAGES:
+        return _resp(400, {"error": f"unknown stage: {stage}"})
+    try:
+        timeout = max(0.0, min(WAIT_TIMEOUT, float(qs.get("timeout") or WAIT_TIMEOUT)))
+    except ValueError:
+        return _resp(400, {"error": "invalid timeout"})
+
+    try:
+        store = get_store()
+        if store is None:
+            # ยังไม่ได้เปิด notification → ถือ request ไว้แล้ว poll S3 ฝั่ง server แทน client
+            body = _poll_s3(RESULT_BUCKET, _s3_key_for(upload_key, stage), timeout)
+            return _resp(200, body) if body is not None else _resp(204)
+
+        rec = store.wait(upload_key, stage, timeout)
+        if rec is None:
+            return _resp(204)
+        if "body" in rec:
+            return _resp(200, rec["body"])
+        # ผลใหญ่เกินกว่าจะเก็บใน notification → อ่านจาก S3 ตามตำแหน่งที่แจ้งมา
+        body = _read_s3(rec["bucket"], rec["key"])
+        return _resp(200, body) if body is not None else _resp(204)
+
+    except Exception as e:
+        logger.exception("❌ wait_result failed")
+        return _resp(500, {"error": "internal_error", "detail": str(e)})
@@ -0,0 +1,40 @@
+import os, sys, json, time
+from urllib.parse import unquote_plus
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh) + NumPy layer (Dataset/build-pillow-layer.sh)
+# แปลง data/product_catalog_clean.csv → snapshot แบบคอลัมน์ (Shared/catalog_snapshot.py) ให้ lambda_suggestionProduct ใช้
+#   - trigger: S3 ObjectCreated ของ CATALOG_CSV_KEY (หรือ invoke เปล่าๆ เพื่อสร้างใหม่)
+#   - local: PYTHONPATH=Shared python Product/build_catalog_snapshot.py <in.csv> <out.dvcs>
+import catalog_snapshot
+from aws_clients import lazy_client
+
+BUCKET = os.environ.get("CATALOG_BUCKET", "kaggle-dataset-skincare")
+CSV_KEY = os.environ.get("CATALOG_CSV_KEY", "data/product_catalog_clean.csv")
+SNAPSHOT_KEY = os.environ.get("CATALOG_SNAPSHOT_KEY", "data/product_catalog_clean.dvcs")
+
+s3 = lazy_client("s3")
+
+
+def lambda_handler(event, context):
+    recs = (event or {}).get("Records") or [{"s3": {"bucket": {"name": BUCKET}, "object": {"key": CSV_KEY}}}]
+    bucket = recs[0]["s3"]["bucket"]["name"]
+    key = unquote_plus(recs[0]["s3"]["object"]["key"])
+
+    t0 = time.perf_counter()
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    body = catalog_snapshot.build(obj["Body"].read().decode("utf-8"), source_etag=obj.get("ETag"))
+    s3.put_object(Bucket=bucket, Key=SNAPSHOT_KEY, Body=body, ContentType="application/octet-stream",
+                  Metadata={"source-etag": (obj.get("ETag") or "").strip('"')})
+    out = {"source": f"s3://{bucket}/{key}", "snapshot": f"s3://{bucket}/{SNAPSHOT_KEY}", "bytes": len(body),
+           "build_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    print(f"✅ catalog snapshot: {json.dumps(out)}")
+    return out
+
+
+if __name__ == "__main__":
+    src, dst = sys.argv[1], sys.argv[2]
+    with open(src, encoding="utf-8") as f:
+        data = catalog_snapshot.build(f.read())
+    with open(dst, "wb") as f:
+        f.write(data)
+    print(f"✅ {src} → {dst} ({len(data)} bytes)")
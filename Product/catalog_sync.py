@@ -0,0 +1,311 @@
+import os, sys, csv, json, time, codecs, random, hashlib, tempfile, threading
+from decimal import Decimal, InvalidOperation
+from urllib.parse import unquote_plus
+from concurrent.futures import ThreadPoolExecutor
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+# ซิงก์ data/product_catalog_clean.csv → ตาราง SkincareProducts (ที่ RecommendSkincare / recommender ใช้)
+#   - trigger: S3 ObjectCreated ของ CATALOG_CSV_KEY (หรือ invoke เปล่าๆ) → sync
+#   - invoke {"export": true} → export ทั้งตารางเป็น JSON lines ไปที่ CATALOG_EXPORT_KEY
+#   - local: PYTHONPATH=Shared python Product/catalog_sync.py sync <in.csv> [--prune]
+#            PYTHONPATH=Shared python Product/catalog_sync.py export <out.jsonl>
+# sync
+#   1) Scan ขนาน SYNC_SCAN_SEGMENTS ส่วน: product_id + content_hash + brand/name ของ item ปัจจุบัน
+#      (เก็บ attribute ที่ไม่ได้มาจาก CSV เช่น image_url ไว้เขียนกลับ — Scan คิด RCU ตามขนาด item อยู่แล้ว)
+#   2) อ่าน CSV แบบ stream ทีละแถว → item + content_hash (sha256 ของเนื้อหา) → เขียนเฉพาะแถวที่ hash ต่าง
+#      product_id: คอลัมน์ product_id ใน CSV (ถ้ามี) → id เดิมในตารางของ brand + name เดียวกัน → id ใหม่เฉพาะสินค้าใหม่
+#   3) BatchWriteItem (25 ต่อครั้ง) ขนาน SYNC_WRITE_WORKERS เธรด; UnprocessedItems → retry แบบ backoff + jitter
+#   4) สินค้าในตารางที่ไม่มีใน CSV → รายงานเป็น "prunable" เสมอ (dry run) ลบจริงเมื่อสั่งเท่านั้น
+#      (SYNC_PRUNE=on / event {"prune": true} / --prune) แล้ว bump version ให้ catalog cache โหลดใหม่
+#   การเขียนเข้า DynamoDB Stream → Product/lambda_tag_index.py อัปเดต tag index ตามเอง
+from catalog_cache import CATALOG_VERSION_ID, bump_version
+from catalog_snapshot import LABEL_SKIN_TYPE, SKIN_TYPES
+from recommender import DecimalEncoder
+from aws_clients import lazy_client, lazy_resource, lazy_table
+
+BUCKET = os.environ.get("CATALOG_BUCKET", "kaggle-dataset-skincare")
+CSV_KEY = os.environ.get("CATALOG_CSV_KEY", "data/product_catalog_clean.csv")
+EXPORT_KEY = os.environ.get("CATALOG_EXPORT_KEY", "exports/skincare_products.jsonl")
+PRODUCT_TABLE = os.environ.get("PRODUCT_TABLE", "SkincareProducts")
+SYNC_WRITE_WORKERS = int(os.environ.get("SYNC_WRITE_WORKERS", "8"))
+SYNC_SCAN_SEGMENTS = int(os.environ.get("SYNC_SCAN_SEGMENTS", "8"))
+SYNC_MAX_RETRIES = int(os.environ.get("SYNC_MAX_RETRIES", "10"))
+SYNC_PRUNE = os.environ.get("SYNC_PRUNE", "off").lower() in ("on", "true", "1")
+BATCH_SIZE = 25          # สูงสุดของ BatchWriteItem
+BACKOFF_BASE_SECS = 0.05
+BACKOFF_MAX_SECS = 5.0
+HASH_ATTR = "content_hash"
+
+# attribute ที่ sync เขียนจาก CSV; attribute อื่นของ item เดิม (image_url, ...) ถูกเขียนกลับตามเดิม
+CSV_FIELDS = ("product_id", "category", "brand", "name", "price", "rank", "ingredients", "skin_types", "tags",
+              HASH_ATTR)
+
+dynamodb = lazy_resource('dynamodb')
+products = lazy_table(PRODUCT_TABLE)
+s3 = lazy_client('s3')
+
+
+def _flag(v):
+    try:
+        return float(v) == 1
+    except (TypeError, ValueError):
+        return False
+
+
+def _decimal(v):
+    try:
+        return Decimal(str(v or "0").strip() or "0")
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def natural_key(row) -> str:
+    """brand + name (ตัวพิมพ์เล็ก) ใช้จับคู่แถวใน CSV กับ item ที่มีอยู่แล้วเมื่อ CSV ไม่มี product_id"""
+    return f"{(row.get('brand') or '').strip().lower()}|{(row.get('name') or '').strip().lower()}"
+
+
+def new_product_id(row) -> str:
+    """id ของสินค้าที่ยังไม่มีในตาราง (คงที่จาก brand + name → sync ซ้ำได้ id เดิม)"""
+    return "p" + hashlib.sha1(natural_key(row).encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(item) -> str:
+    body = {k: v for k, v in item.items() if k != HASH_ATTR}
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def item_from_row(row, product_id=None) -> dict:
+    """product_id: id เดิมในตาราง (ถ้ามี) — ไม่งั้นใช้คอลัมน์ product_id ของ CSV หรือ new_product_id"""
+    skin = [t for t in SKIN_TYPES if _flag(row.get(t))]
+    item = {
+        "product_id": (row.get("product_id") or "").strip() or product_id or new_product_id(row),
+        "category": row.get("Label") or "",
+        "brand": row.get("brand") or "",
+        "name": row.get("name") or "",
+        "price": _decimal(row.get("price")),
+        "rank": _decimal(row.get("rank")),
+        "ingredients": row.get("ingredients") or "",
+        "skin_types": skin,
+        "tags": [label for label, t in LABEL_SKIN_TYPE.items() if t in skin],
+    }
+    item[HASH_ATTR] = content_hash(item)
+    return item
+
+
+def iter_rows(stream):
+    """แถวของ CSV จาก stream แบบ bytes (S3 StreamingBody / ไฟล์ที่เปิดแบบ rb) ทีละแถว ไม่โหลดทั้งไฟล์"""
+    yield from csv.DictReader(codecs.getreader("utf-8-sig")(stream))
+
+
+class _Stats:
+    def __init__(self):
+        self.values = {"rcu": 0.0, "wcu": 0.0, "scanned": 0, "batches": 0, "retried": 0}
+        self._lock = threading.Lock()
+
+    def add(self, **kw):
+        with self._lock:
+            for k, v in kw.items():
+                self.values[k] = self.values.get(k, 0) + v
+
+
+def _capacity(resp):
+    cc = resp.get("ConsumedCapacity") or []
+    return sum(c.get("CapacityUnits", 0) for c in (cc if isinstance(cc, list) else [cc]))
+
+
+def _scan_segment(table, segment, total, fn, stats, kw):
+    kw = dict(kw, ReturnConsumedCapacity="TOTAL")
+    if total > 1:
+        kw.update(Segment=segment, TotalSegments=total)
+    while True:
+        resp = table.scan(**kw)
+        items = resp.get("Items", [])
+        stats.add(rcu=_capacity(resp), scanned=len(items))
+        for item in items:
+            if item.get("product_id") != CATALOG_VERSION_ID:
+                fn(item)
+        if "LastEvaluatedKey" not in resp:
+            return
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def parallel_scan(table, fn, segments, stats, **kw):
+    """Scan ทั้งตารางแบบขนาน segments ส่วน; fn(item) ถูกเรียกจากหลายเธรด"""
+    segments = max(1, segments)
+    with ThreadPoolExecutor(max_workers=segments) as ex:
+        list(ex.map(lambda s: _scan_segment(table, s, segments, fn, stats, kw), range(segments)))
+
+
+class _Writer:
+    """BatchWriteItem ขนาน workers เธรด (รอคิวไม่เกิน 2 batch ต่อเธรด → ไม่ต้องเก็บทั้ง CSV ไว้ใน memory)"""
+
+    def __init__(self, resource, table_name, workers, stats):
+        self.resource, self.table_name, self.stats = resource, table_name, stats
+        self.workers = max(1, workers)
+        self._ex = ThreadPoolExecutor(max_workers=self.workers)
+        self._slots = threading.BoundedSemaphore(self.workers * 2)
+        self._buf, self._futures = [], []
+
+    def put(self, item):
+        self._add({"PutRequest": {"Item": item}})
+
+    def delete(self, key):
+        self._add({"DeleteRequest": {"Key": key}})
+
+    def _add(self, request):
+        self._buf.append(request)
+        if len(self._buf) >= BATCH_SIZE:
+            self._submit()
+
+    def _submit(self):
+        batch, self._buf = self._buf, []
+        self._slots.acquire()
+        fut = self._ex.submit(self._write, batch)
+        fut.add_done_callback(lambda f: self._slots.release())
+        self._futures.append(fut)
+
+    def _write(self, batch):
+        for attempt in range(SYNC_MAX_RETRIES + 1):
+            resp = self.resource.batch_write_item(RequestItems={self.table_name: batch},
+                                                  ReturnConsumedCapacity="TOTAL")
+            self.stats.add(wcu=_capacity(resp), batches=1)
+            batch = (resp.get("UnprocessedItems") or {}).get(self.table_name) or []
+            if not batch:
+                return
+            # โดน throttle → รอแบบ exponential backoff + full jitter แล้วส่งเฉพาะที่ยังไม่ได้เขียน
+            self.stats.add(retried=len(batch))
+            time.sleep(random.uniform(0, min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * 2 ** attempt)))
+        raise RuntimeError(f"{len(batch)} items still unprocessed after {SYNC_MAX_RETRIES} retries")
+
+    def close(self):
+        if self._buf:
+            self._submit()
+        try:
+            for fut in self._futures:
+                fut.result()
+        finally:
+            self._ex.shutdown(wait=True)
+
+
+def sync(rows, table=None, resource=None, segments=None, workers=None, prune=None) -> dict:
+    """rows = dict ต่อแถวของ CSV (iterable) → เขียนเฉพาะที่เปลี่ยน; คืนรายงาน throughput"""
+    table = table if table is not None else products
+    resource = resource if resource is not None else dynamodb
+    segments = segments or SYNC_SCAN_SEGMENTS
+    workers = workers or SYNC_WRITE_WORKERS
+    prune = SYNC_PRUNE if prune is None else prune
+    stats = _Stats()
+
+    t0 = time.perf_counter()
+    current, ids, extras = {}, {}, {}
+    lock = threading.Lock()
+
+    def index(it):
+        pid = it["product_id"]
+        extra = {k: v for k, v in it.items() if k not in CSV_FIELDS}
+        with lock:
+            current[pid] = it.get(HASH_ATTR)
+            ids.setdefault(natural_key(it), pid)
+            if extra:
+                extras[pid] = extra
+
+    parallel_scan(table, index, segments, stats)
+    scan_ms = (time.perf_counter() - t0) * 1000
+
+    t1 = time.perf_counter()
+    counts = {"rows": 0, "unchanged": 0, "inserted": 0, "updated": 0, "deleted": 0, "prunable": 0, "duplicates": 0}
+    seen = set()
+    writer = _Writer(resource, table.name, workers, stats)
+    try:
+        for row in rows:
+            counts["rows"] += 1
+            item = item_from_row(row, ids.get(natural_key(row)))
+            pid = item["product_id"]
+            if pid in seen:
+                counts["duplicates"] += 1   # id ซ้ำใน batch เดียวกัน DynamoDB จะปฏิเสธทั้ง batch
+                continue
+            seen.add(pid)
+            old = current.get(pid, False)
+            if old == item[HASH_ATTR]:
+                counts["unchanged"] += 1
+                continue
+            counts["updated" if old is not False else "inserted"] += 1
+            writer.put({**extras.get(pid, {}), **item})
+        stale = current.keys() - seen
+        counts["prunable"] = len(stale)
+        if prune and stale:
+            if not seen:
+                raise ValueError("CSV has no rows; refusing to prune the whole table")
+            for pid in stale:
+                counts["deleted"] += 1
+                writer.delete({"product_id": pid})
+    finally:
+        writer.close()
+    write_ms = (time.perf_counter() - t1) * 1000
+
+    writes = counts["inserted"] + counts["updated"] + counts["deleted"]
+    version = bump_version(table) if writes else None
+    elapsed = time.perf_counter() - t0
+    s = stats.values
+    return {**counts, "existing": len(current), "writes": writes, "batches": s["batches"], "retried": s["retried"],
+            "scan_ms": round(scan_ms, 1), "diff_write_ms": round(write_ms, 1), "elapsed_ms": round(elapsed * 1000, 1),
+            "rows_per_sec": round(counts["rows"] / elapsed, 1) if elapsed else None,
+            "writes_per_sec": round(writes / (write_ms / 1000), 1) if writes and write_ms else 0.0,
+            "consumed_rcu": round(s["rcu"], 1), "consumed_wcu": round(s["wcu"], 1), "catalog_version": version}
+
+
+def export(fileobj, table=None, segments=None) -> dict:
+    """เขียนทุก item เป็น JSON lines ลง fileobj (โหมดข้อความ) ด้วย Scan ขนาน; ลำดับแถวไม่แน่นอน"""
+    table = table if table is not None else products
+    segments = segments or SYNC_SCAN_SEGMENTS
+    stats, lock = _Stats(), threading.Lock()
+
+    def write(item):
+        line = json.dumps(item, cls=DecimalEncoder, ensure_ascii=False) + "\n"
+        with lock:
+            fileobj.write(line)
+
+    t0 = time.perf_counter()
+    parallel_scan(table, write, segments, stats)
+    elapsed = time.perf_counter() - t0
+    s = stats.values
+    return {"items": s["scanned"], "segments": segments, "elapsed_ms": round(elapsed * 1000, 1),
+            "items_per_sec": round(s["scanned"] / elapsed, 1) if elapsed else None,
+            "consumed_rcu": round(s["rcu"], 1)}
+
+
+def lambda_handler(event, context):
+    event = event or {}
+    if event.get("export"):
+        path = os.path.join(tempfile.gettempdir(), "catalog_export.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            out = export(f, segments=event.get("segments"))
+        with open(path, "rb") as f:
+            s3.put_object(Bucket=BUCKET, Key=EXPORT_KEY, Body=f, ContentType="application/x-ndjson")
+        os.remove(path)
+        out["export"] = f"s3://{BUCKET}/{EXPORT_KEY}"
+        print(f"📤 catalog export: {json.dumps(out)}")
+        return out
+
+    recs = event.get("Records") or [{"s3": {"bucket": {"name": BUCKET}, "object": {"key": CSV_KEY}}}]
+    bucket = recs[0]["s3"]["bucket"]["name"]
+    key = unquote_plus(recs[0]["s3"]["object"]["key"])
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    out = sync(iter_rows(obj["Body"]), prune=event.get("prune"))
+    out["source"] = f"s3://{bucket}/{key}"
+    print(f"✅ catalog sync: {json.dumps(out)}")
+    return out
+
+
+if __name__ == "__main__":
+    cmd, path = sys.argv[1], sys.argv[2]
+    if cmd == "sync":
+        with open(path, "rb") as f:
+            out = sync(iter_rows(f), prune="--prune" in sys.argv)
+    elif cmd == "export":
+        with open(path, "w", encoding="utf-8") as f:
+            out = export(f)
+    else:
+        sys.exit(f"usage: {sys.argv[0]} sync <in.csv> [--prune] | export <out.jsonl>")
+    print(json.dumps(out, indent=2))
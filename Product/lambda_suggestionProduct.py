@@ -1,6 +1,23 @@
+import os, time
 import json
-import pandas as pd
-import boto3
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh) + NumPy layer (Dataset/build-pillow-layer.sh)
+# แคตตาล็อกอ่านจาก snapshot แบบคอลัมน์ (Shared/catalog_snapshot.py) ที่ Product/build_catalog_snapshot.py แปลงจาก CSV
+#   - ดาวน์โหลดลง /tmp แล้ว memmap ใช้ข้าม warm invocation (ไม่ต้อง import pandas / parse CSV ทุกครั้ง)
+#   - เช็ค ETag กับ S3 ทุก SNAPSHOT_CHECK_SECS (conditional GET → 304 ไม่ต้องโหลดซ้ำ)
+#   - ยังไม่มี snapshot ใน S3 → แปลงจาก CSV เองใน invocation นี้ (ไม่ใช้ pandas เช่นกัน)
+import catalog_snapshot
+from ingredient_index import IngredientIndex
+from aws_clients import lazy_client
+
+BUCKET = os.environ.get('CATALOG_BUCKET', 'kaggle-dataset-skincare')  # เปลี่ยนเป็นชื่อ S3 bucket ของคุณ
+CSV_KEY = os.environ.get('CATALOG_CSV_KEY', 'data/product_catalog_clean.csv')  # path ของไฟล์ CSV ใน S3
+SNAPSHOT_KEY = os.environ.get('CATALOG_SNAPSHOT_KEY', 'data/product_catalog_clean.dvcs')
+SNAPSHOT_CHECK_SECS = float(os.environ.get('SNAPSHOT_CHECK_SECS', '60'))
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', '/tmp/product_catalog_clean.dvcs')
+
+# client ระดับ module → ใช้ซ้ำข้าม warm invocation (สร้างตอนใช้ครั้งแรก)
+s3 = lazy_client('s3')
 
 # Step 1: จำลองข้อมูลจาก Rekognition
 rekognition_results = {
@@ -17,55 +34,102 @@ rekognition_results = {
     "Whiteheads": 1
 }
 
+# ปัญหาผิว → คอลัมน์ประเภทผิวที่ใช้กรอง (ไม่มีในนี้ = ไม่มีข้อมูลที่กรองได้ → 404)
+CONCERN_SKIN_TYPE = {
+    **catalog_snapshot.LABEL_SKIN_TYPE,   # mapping เดียวกับ tags ใน SkincareProducts (Product/catalog_sync.py)
+    'Normal': 'Normal',                   # ส่งประเภทผิวมาตรงๆ ก็ได้
+    'Sensitive': 'Sensitive',
+}
+
+_state = {"snapshot": None, "etag": None, "csv_etag": None, "checked_at": 0.0, "bodies": {}, "ingredients": None}
+
+
+def _error_code(e):
+    return getattr(e, "response", {}).get("Error", {}).get("Code")
+
+
+def _open(data):
+    # เขียนไฟล์ใหม่แล้ว rename ทับ → memmap ของ snapshot เดิมยังอ่าน inode เดิมได้ปลอดภัย
+    tmp = SNAPSHOT_PATH + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, SNAPSHOT_PATH)
+    _state["snapshot"] = catalog_snapshot.Snapshot(SNAPSHOT_PATH)
+    _state["bodies"], _state["ingredients"] = {}, None
+
+
+def _get(key, etag):
+    """get_object แบบมีเงื่อนไข → None ถ้า ETag ยังเหมือนเดิม"""
+    kw = {"Bucket": BUCKET, "Key": key}
+    if etag and _state["snapshot"] is not None:
+        kw["IfNoneMatch"] = etag
+    try:
+        return s3.get_object(**kw)
+    except Exception as e:
+        if _error_code(e) in ("304", "NotModified"):
+            return None
+        raise
+
+
+def _snapshot():
+    now = time.time()
+    if _state["snapshot"] is not None and now - _state["checked_at"] < SNAPSHOT_CHECK_SECS:
+        return _state["snapshot"]
+    _state["checked_at"] = now
+    try:
+        obj = _get(SNAPSHOT_KEY, _state["etag"])
+        if obj is not None:
+            _open(obj['Body'].read())
+            _state["etag"], _state["csv_etag"] = obj.get('ETag'), None
+            print(f"📦 catalog snapshot loaded: rows={_state['snapshot'].rows} etag={_state['etag']}")
+    except Exception as e:
+        if _error_code(e) not in ("NoSuchKey", "404"):
+            if _state["snapshot"] is not None:
+                print(f"⚠️ snapshot revalidation failed, serving cached copy: {e}")
+                return _state["snapshot"]
+            raise
+        # ยังไม่มี snapshot → แปลงจาก CSV ครั้งเดียว (เช็ค ETag ของ CSV แทนในรอบถัดไป)
+        obj = _get(CSV_KEY, _state["csv_etag"])
+        if obj is not None:
+            _open(catalog_snapshot.build(obj['Body'].read().decode('utf-8'), source_etag=obj.get('ETag')))
+            _state["etag"], _state["csv_etag"] = None, obj.get('ETag')
+            print(f"📦 catalog snapshot built from CSV: rows={_state['snapshot'].rows}")
+    return _state["snapshot"]
+
+
+def _ingredient_index(snap):
+    # สร้างครั้งแรกที่มีคนกรองส่วนผสม แล้วใช้ซ้ำจนกว่า snapshot จะเปลี่ยน
+    if _state["ingredients"] is None:
+        _state["ingredients"] = IngredientIndex(snap.text("ingredients", i) for i in range(snap.rows))
+    return _state["ingredients"]
+
+
 def lambda_handler(event, context):
     # Step 2: รับข้อมูลจาก event (รับค่าปัญหาผิวจากการส่งข้อมูล API)
     skin_concern = event.get('skin_concern', 'Oily-Skin')  # Default เป็น 'Oily-Skin' หากไม่ได้ส่งข้อมูล
+    # ออปชัน: กรองส่วนผสม เช่น {"avoid": ["fragrance", "paraben"], "require": ["niacinamide"]}
+    avoid, require = event.get('avoid') or [], event.get('require') or []
 
-    # Step 3: เชื่อมต่อกับ S3 เพื่อดึงข้อมูล CSV
-    s3 = boto3.client('s3')
-    bucket_name = 'kaggle-dataset-skincare'  # เปลี่ยนเป็นชื่อ S3 bucket ของคุณ
-    file_key = 'data/product_catalog_clean.csv'  # เปลี่ยนเป็น path ของไฟล์ใน S3
-
-    # โหลดไฟล์ CSV จาก S3
-    obj = s3.get_object(Bucket=bucket_name, Key=file_key)
-    csv_data = pd.read_csv(obj['Body'])
-
-    # Step 4: กรองผลิตภัณฑ์ที่เหมาะสมกับประเภทผิวจาก Rekognition
+    # Step 3: กรองผลิตภัณฑ์ที่เหมาะสมกับประเภทผิวจาก Rekognition
     if rekognition_results.get(skin_concern, 0) == 1:
-        # กรองข้อมูลตามประเภทผิว (คอลัมน์ที่ตรงกับผลการวิเคราะห์จาก Rekognition)
-        
-        if skin_concern == 'Oily-Skin':
-            filtered_data = csv_data[csv_data['Oily'] == 1]
-        elif skin_concern == 'Dry-Skin':
-            filtered_data = csv_data[csv_data['Dry'] == 1]
-        elif skin_concern == 'Normal':
-            filtered_data = csv_data[csv_data['Normal'] == 1]
-        elif skin_concern == 'Sensitive':
-            filtered_data = csv_data[csv_data['Sensitive'] == 1]
-        elif skin_concern == 'Acne':
-            filtered_data = csv_data[csv_data['Oily'] == 1]  # สิวมักเกี่ยวข้องกับผิวมัน
-        elif skin_concern == 'Wrinkles':
-            filtered_data = csv_data[csv_data['Dry'] == 1]  # ริ้วรอยมักเกี่ยวข้องกับผิวแห้ง
-        elif skin_concern == 'Blackheads':
-            filtered_data = csv_data[csv_data['Oily'] == 1]  # สิวเสี้ยนมักเกี่ยวข้องกับผิวมัน
-        elif skin_concern == 'Dark-Spots':
-            filtered_data = csv_data[csv_data['Dry'] == 1]  # จุดด่างดำมักเกิดกับผิวแห้ง
-        elif skin_concern == 'Eyebags':
-            filtered_data = csv_data[csv_data['Sensitive'] == 1]  # ถุงใต้ตามักเกี่ยวข้องกับผิวบอบบาง
-        elif skin_concern == 'Skin-Redness':
-            filtered_data = csv_data[csv_data['Sensitive'] == 1]  # ผิวแดงมักเกี่ยวข้องกับผิวบอบบาง
-        elif skin_concern == 'Whiteheads':
-            filtered_data = csv_data[csv_data['Oily'] == 1]  # สิวหัวขาวมักเกี่ยวข้องกับผิวมัน
-
-        else:
-            filtered_data = pd.DataFrame()  # ไม่มีข้อมูลที่กรองได้
+        snap = _snapshot()
+        skin_type = CONCERN_SKIN_TYPE.get(skin_concern)
+        # row index ของแต่ละประเภทผิวคำนวณไว้แล้วใน snapshot
+        rows = snap.rows_for(skin_type) if skin_type else None
+        if rows is not None and (avoid or require):
+            rows = rows[_ingredient_index(snap).allowed(avoid, require)[rows]]
 
-        # Step 5: หากกรองข้อมูลได้, ส่งข้อมูลผลิตภัณฑ์ที่เหมาะสมกลับ
-        if not filtered_data.empty:
-            result = filtered_data[['Label', 'brand', 'name', 'price', 'ingredients']].to_dict(orient='records')
+        # Step 4: หากกรองข้อมูลได้, ส่งข้อมูลผลิตภัณฑ์ที่เหมาะสมกลับ (body ของแต่ละประเภทผิว cache ไว้ต่อ snapshot)
+        if rows is not None and len(rows):
+            if avoid or require:
+                body = json.dumps(snap.records(rows))
+            else:
+                body = _state["bodies"].get(skin_type)
+                if body is None:
+                    body = _state["bodies"][skin_type] = json.dumps(snap.records(rows))
             return {
                 'statusCode': 200,
-                'body': json.dumps(result)
+                'body': body
             }
         else:
             return {
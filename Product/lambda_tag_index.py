@@ -0,0 +1,54 @@
+import os, json
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+# ดูแลตาราง SkincareProductTags (tag → สินค้า) ให้ตรงกับ SkincareProducts
+#   - trigger: DynamoDB Stream ของ SkincareProducts (StreamViewType = NEW_AND_OLD_IMAGES)
+#   - backfill: invoke ด้วย {"backfill": true} (ออปชัน "segment"/"segments" เพื่อแบ่งงานหลาย invocation)
+# สินค้าเปลี่ยน → bump version marker ให้ catalog cache ของลัมบ์ดาแนะนำสินค้าโหลดใหม่ (Shared/catalog_cache.py)
+# ตาราง reco ไม่ได้สั่งสร้างจากที่นี่: sync ทั้งแคตตาล็อกเข้ามาเป็นหลายร้อย batch → จะได้ materialize ทีละ batch
+# แข่งกันเอง; Product/materialize_reco_table.py รันตาม schedule แล้วเทียบ version เอง
+import tag_index
+import lazy_import
+from catalog_cache import bump_version, CATALOG_VERSION_ID
+from aws_clients import lazy_table
+
+PRODUCT_TABLE = os.environ.get("PRODUCT_TABLE", "SkincareProducts")
+
+products = lazy_table(PRODUCT_TABLE)
+index = lazy_table(tag_index.TAG_INDEX_TABLE)
+
+_types = lazy_import.module("boto3.dynamodb.types")
+_deser = None
+
+
+def _image(rec, which):
+    global _deser
+    img = rec.get("dynamodb", {}).get(which)
+    if not img:
+        return None
+    if _deser is None:
+        _deser = _types.TypeDeserializer()
+    return {k: _deser.deserialize(v) for k, v in img.items()}
+
+
+def lambda_handler(event, context):
+    if event.get("backfill"):
+        out = tag_index.backfill(products, index, int(event.get("segments", 1)), event.get("segment"))
+        print(f"✅ backfill {PRODUCT_TABLE} → {tag_index.TAG_INDEX_TABLE}: {json.dumps(out)}")
+        return out
+
+    deleted = put = changed = 0
+    # error → ทั้ง batch ถูกส่งมาใหม่ (การเขียน index เป็น idempotent จึงทำซ้ำได้)
+    with index.batch_writer(overwrite_by_pkeys=list(tag_index.INDEX_FIELDS)) as w:
+        for rec in event.get("Records", []):
+            old, new = _image(rec, "OldImage"), _image(rec, "NewImage")
+            if (new or old or {}).get("product_id") == CATALOG_VERSION_ID:
+                continue   # การ bump version เองก็เข้า stream นี้ → ข้าม
+            if rec.get("eventName") == "REMOVE":
+                new = None
+            d, p = tag_index.apply(index, old, new, w)
+            deleted, put, changed = deleted + d, put + p, changed + 1
+
+    version = bump_version(products) if changed else None
+    print(f"🏷️ tag index: records={len(event.get('Records', []))} put={put} deleted={deleted} catalog_version={version}")
+    return {"records": len(event.get("Records", [])), "put": put, "deleted": deleted, "catalog_version": version}
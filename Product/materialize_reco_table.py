@@ -0,0 +1,63 @@
+import os, json, time
+
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh) + NumPy layer (Dataset/build-pillow-layer.sh)
+# สร้างตาราง reco (Shared/reco_table.py): top-K ของทุกชุด label (2^11) จากแคตตาล็อกปัจจุบัน
+#   - trigger: EventBridge schedule (เช่น rate(5 minutes); ให้รอบถี่กว่า RECO_TABLE_MAX_AGE_SECS)
+#   - artifact ของ version นี้มีอยู่แล้ว → ข้าม; ส่ง {"force": true} เพื่อสร้างใหม่
+#   - version เพิ่งถูก bump ไม่ถึง RECO_SETTLE_SECS → ข้ามรอบนี้ (แคตตาล็อกยังเปลี่ยนอยู่ เช่น sync ทั้ง CSV
+#     ที่ไหลเข้า stream หลาย batch) รอบถัดไปค่อยสร้างครั้งเดียวจาก version สุดท้าย
+import reco_table
+from catalog_cache import Catalog, load_catalog, read_version
+from aws_clients import lazy_client, lazy_table
+
+PRODUCT_TABLE = os.environ.get("PRODUCT_TABLE", "SkincareProducts")
+RECO_SETTLE_SECS = float(os.environ.get("RECO_SETTLE_SECS", "120"))
+
+s3 = lazy_client("s3")
+products = lazy_table(PRODUCT_TABLE)
+
+
+def _artifact_version():
+    try:
+        head = s3.head_object(Bucket=reco_table.RECO_TABLE_BUCKET, Key=reco_table.RECO_TABLE_KEY)
+    except Exception:
+        return None
+    return head.get("Metadata", {}).get("catalog-version")
+
+
+def _version_age_secs(version):
+    """อายุของ version marker (bump_version ใช้เวลาเป็น ms) หรือ None ถ้า version ไม่ใช่เวลา"""
+    try:
+        return time.time() - int(version) / 1000
+    except (TypeError, ValueError):
+        return None
+
+
+def lambda_handler(event, context):
+    if not reco_table.RECO_TABLE_BUCKET:
+        raise ValueError("RECO_TABLE_BUCKET is not set")
+    # อ่าน version ก่อน scan: ถ้ามีการแก้ระหว่างสร้าง ลัมบ์ดาจะเห็นว่า version ไม่ตรงแล้วจัดอันดับสดจนกว่ารอบถัดไปจะสร้างใหม่
+    version = read_version(products)
+    if not (event or {}).get("force"):
+        if version is not None and _artifact_version() == version:
+            print(f"⏭️ reco table already at catalog_version={version}")
+            return {"skipped": True, "catalog_version": version}
+        age = _version_age_secs(version)
+        if age is not None and age < RECO_SETTLE_SECS:
+            print(f"⏳ catalog_version={version} changed {age:.0f}s ago; waiting for it to settle")
+            return {"skipped": True, "settling": True, "catalog_version": version}
+
+    t0 = time.perf_counter()
+    cat = Catalog(load_catalog(products), version)
+    t1 = time.perf_counter()
+    art = reco_table.build(cat.ranker(), version)
+    t2 = time.perf_counter()
+    body = reco_table.dumps(art)
+    s3.put_object(Bucket=reco_table.RECO_TABLE_BUCKET, Key=reco_table.RECO_TABLE_KEY, Body=body,
+                  ContentType="application/gzip", Metadata={"catalog-version": str(version)})
+    out = {"catalog_version": version, "products": len(cat.products), "masks": len(art["top"]),
+           "referenced_products": len(art["products"]), "bytes": len(body),
+           "load_ms": round((t1 - t0) * 1000, 1), "build_ms": round((t2 - t1) * 1000, 1),
+           "total_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    print(f"✅ reco table → s3://{reco_table.RECO_TABLE_BUCKET}/{reco_table.RECO_TABLE_KEY}: {json.dumps(out)}")
+    return out
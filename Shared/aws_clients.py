@@ -0,0 +1,204 @@
+"""
+aws_clients.py — boto3 client / resource ที่ใช้ร่วมกันทุกลัมบ์ดา (layer dermavision-shared)
+
+- สร้างตอนใช้ครั้งแรก (lazy) แล้ว cache ต่อ container → import handler ไม่ต้องสร้าง client / โหลด boto3
+- config เดียวกันทุก service:
+    AWS_MAX_POOL_CONNECTIONS (50)   ค่าเริ่มต้น boto3 = 10 → เธรดที่เกินต้องรอ connection
+    AWS_RETRY_MODE (adaptive)       + AWS_MAX_ATTEMPTS (5 ครั้งรวมครั้งแรก) แทน legacy retry
+    AWS_CONNECT_TIMEOUT (2s) / AWS_READ_TIMEOUT (30s)
+  ปรับราย client ได้: client("rekognition", read_timeout=60)
+- ยกเว้น client ที่เรียกผ่าน inference_dispatch.Throttle (Rekognition): lazy_client("rekognition", retries=SINGLE_ATTEMPT)
+  ไม่งั้น botocore retry ThrottlingException + rate limit เองก่อน Throttle เห็น error → AIMD ถอยช้าและผิดสัญญาณ
+  และ 1 ภาพเรียกได้ถึง AWS_MAX_ATTEMPTS × (THROTTLE_MAX_RETRIES + 1) ครั้ง
+- latency ต่อ call (รวม retry): latency_stats() ต่อ "service.Operation"; add_latency_hook(fn) เรียก
+  fn(service, operation, ms, retries) ทุก call; AWS_SLOW_CALL_MS > 0 → log call ที่ช้ากว่านั้น
+
+ใช้ในลัมบ์ดา (ระดับ module):
+    s3 = lazy_client("s3")                      # ยังไม่สร้างจนกว่าจะเรียก s3.get_object(...)
+    products = lazy_table("SkincareProducts")
+benchmark แทนด้วยของปลอมได้ตามเดิม (mod.s3 = FakeS3())
+"""
+import os, time, logging, threading
+
+logger = logging.getLogger(__name__)
+
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_RETRY_MODE = os.environ.get("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "2"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "30"))
+AWS_SLOW_CALL_MS = float(os.environ.get("AWS_SLOW_CALL_MS", "0"))
+# retry policy สำหรับ client ที่ Throttle เป็นคนคุม retry/backoff เอง (ครั้งเดียว ไม่มี adaptive rate limit)
+SINGLE_ATTEMPT = {"mode": "standard", "total_max_attempts": 1}
+
+_lock = threading.RLock()
+_session = None
+_clients = {}     # (kind, service, region, overrides) -> client / resource
+_tables = {}
+_hooks = []
+_stats = {}       # "service.Operation" -> {"calls", "total_ms", "max_ms", "retries", "errors"}
+
+
+def config(**overrides):
+    from botocore.config import Config
+    kw = {"max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+          "retries": {"mode": AWS_RETRY_MODE, "total_max_attempts": AWS_MAX_ATTEMPTS},
+          "connect_timeout": AWS_CONNECT_TIMEOUT, "read_timeout": AWS_READ_TIMEOUT,
+          "tcp_keepalive": True}
+    kw.update(overrides)
+    return Config(**kw)
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def _start(model=None, context=None, **kw):
+    # before-parameter-build: ยิงทุก call ก่อน before-call (ที่ Stubber / hook อื่นตัดจบได้)
+    if context is not None and model is not None:
+        context["_aws_clients"] = (model.service_model.endpoint_prefix, model.name, time.perf_counter())
+
+
+def _after_call(context=None, parsed=None, http_response=None, **kw):
+    started = (context or {}).pop("_aws_clients", None)
+    if started:
+        service, op, t0 = started
+        retries = ((parsed or {}).get("ResponseMetadata") or {}).get("RetryAttempts", 0)
+        failed = getattr(http_response, "status_code", 200) >= 300
+        record(service, op, (time.perf_counter() - t0) * 1000, retries, error=failed)
+
+
+def _after_error(context=None, **kw):
+    started = (context or {}).pop("_aws_clients", None)
+    if started:
+        service, op, t0 = started
+        record(service, op, (time.perf_counter() - t0) * 1000, error=True)
+
+
+def record(service, operation, ms, retries=0, error=False):
+    """บันทึก latency ของ 1 call (ใช้กับ hook ของ botocore หรือเรียกเองจากโค้ดที่ไม่ผ่าน boto3)"""
+    name = f"{service}.{operation}"
+    with _lock:
+        s = _stats.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "retries": 0, "errors": 0})
+        s["calls"] += 1
+        s["total_ms"] += ms
+        s["max_ms"] = max(s["max_ms"], ms)
+        s["retries"] += retries
+        s["errors"] += error
+    if AWS_SLOW_CALL_MS and ms >= AWS_SLOW_CALL_MS:
+        logger.warning(f"🐢 slow AWS call {name}: {ms:.0f} ms retries={retries}")
+    for fn in list(_hooks):
+        try:
+            fn(service, operation, ms, retries)
+        except Exception as e:   # hook พังต้องไม่ทำให้ request พัง
+            logger.warning(f"⚠️ latency hook failed: {e}")
+
+
+def _instrument(c):
+    c.meta.events.register("before-parameter-build", _start)
+    c.meta.events.register("after-call", _after_call)
+    c.meta.events.register("after-call-error", _after_error)
+    return c
+
+
+def _key(kind, service, region, overrides):
+    # ค่า dict (เช่น retries=SINGLE_ATTEMPT) → tuple ให้ใช้เป็น key ได้
+    return (kind, service, region, tuple(sorted(
+        (k, tuple(sorted(v.items())) if isinstance(v, dict) else v) for k, v in overrides.items())))
+
+
+def client(service, region=None, **overrides):
+    """client ที่ cache ไว้ (สร้างครั้งเดียวต่อ service + region + config)"""
+    k = _key("client", service, region, overrides)
+    c = _clients.get(k)
+    if c is None:
+        with _lock:   # Session ไม่ thread-safe ตอนสร้าง client
+            c = _clients.get(k)
+            if c is None:
+                c = _clients[k] = _instrument(
+                    _get_session().client(service, region_name=region, config=config(**overrides)))
+    return c
+
+
+def resource(service, region=None, **overrides):
+    k = _key("resource", service, region, overrides)
+    r = _clients.get(k)
+    if r is None:
+        with _lock:
+            r = _clients.get(k)
+            if r is None:
+                r = _get_session().resource(service, region_name=region, config=config(**overrides))
+                _instrument(r.meta.client)
+                _clients[k] = r
+    return r
+
+
+def table(name, region=None):
+    """dynamodb Table ที่ cache ไว้ (ใช้ resource ตัวเดียวกันทุกตาราง)"""
+    k = (name, region)
+    t = _tables.get(k)
+    if t is None:
+        t = _tables[k] = resource("dynamodb", region).Table(name)
+    return t
+
+
+class _Lazy:
+    """ตัวแทนที่สร้างของจริงตอนเข้าถึง attribute ครั้งแรก (client.get_object, table.query, ...)"""
+
+    def __init__(self, factory, label):
+        self._factory = factory
+        self._label = label
+        self._target = None
+
+    def _get(self):
+        if self._target is None:
+            self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __repr__(self):
+        return f"<lazy {self._label}{'' if self._target is None else ' (created)'}>"
+
+
+def lazy_client(service, region=None, **overrides):
+    return _Lazy(lambda: client(service, region, **overrides), f"client {service}")
+
+
+def lazy_resource(service, region=None, **overrides):
+    return _Lazy(lambda: resource(service, region, **overrides), f"resource {service}")
+
+
+def lazy_table(name, region=None):
+    return _Lazy(lambda: table(name, region), f"table {name}")
+
+
+def add_latency_hook(fn):
+    _hooks.append(fn)
+
+
+def remove_latency_hook(fn):
+    if fn in _hooks:
+        _hooks.remove(fn)
+
+
+def latency_stats(reset=False) -> dict:
+    with _lock:
+        out = {k: {**v, "total_ms": round(v["total_ms"], 1), "max_ms": round(v["max_ms"], 1),
+                   "mean_ms": round(v["total_ms"] / v["calls"], 1) if v["calls"] else 0.0}
+               for k, v in _stats.items()}
+        if reset:
+            _stats.clear()
+    return out
+
+
+def log_stats(reset=True):
+    stats = latency_stats(reset)
+    if stats:
+        logger.info(f"📡 AWS calls: {stats}")
+    return stats
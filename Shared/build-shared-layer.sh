@@ -0,0 +1,27 @@
+#!/bin/bash
+# ============================================================
+# 🧱 build-shared-layer.sh
+# Build the shared DermaVision modules (Shared/*.py) as a Lambda layer
+# ============================================================
+
+set -e
+cd "$(dirname "$0")"
+
+echo "🧹 Cleaning old build..."
+rm -rf python shared-layer.zip
+
+echo "📁 Creating directory structure..."
+mkdir -p python
+
+echo "📦 Copying shared modules to ./python ..."
+cp *.py python/
+
+echo "🗜️ Zipping layer..."
+zip -r shared-layer.zip python > /dev/null
+rm -rf python
+
+echo ""
+echo "✅ Done! Layer package created: Shared/shared-layer.zip"
+echo "   ➤ Upload this ZIP in Lambda > Layers > Create layer (name: dermavision-shared)"
+echo "   ➤ Add the layer to every function that imports a Shared module"
+echo "   ➤ Compatible runtime: Python 3.10+"
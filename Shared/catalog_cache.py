@@ -0,0 +1,180 @@
+"""
+catalog_cache.py — สำเนาแคตตาล็อก SkincareProducts ทั้งตารางในหน่วยความจำของ container
+
+แคตตาล็อกเล็ก (หลักพันชิ้น) และเปลี่ยนไม่บ่อย → โหลดครั้งเดียวต่อ container แล้วตอบจาก memory
+- โหลดด้วย parallel segmented scan (CATALOG_SCAN_SEGMENTS thread, อ่านครบทุกหน้า)
+- index ในหน่วยความจำ: by_tag (tag → สินค้าเรียงตาม rank สูง → ต่ำ) และ by_id
+- refresh เมื่อ
+    * อายุเกิน CATALOG_TTL_SECS หรือ
+    * version marker เปลี่ยน: item product_id = CATALOG_VERSION_ID ในตารางเดียวกัน
+      (Product/lambda_tag_index.py bump ให้ทุกครั้งที่สินค้าเปลี่ยน) เช็คด้วย get_item ทุก CATALOG_VERSION_CHECK_SECS
+  ถ้าโหลดใหม่ไม่สำเร็จ ใช้ snapshot เดิมตอบต่อไป
+
+CATALOG_CACHE=off ปิด (ใช้ DynamoDB ตรงเหมือนเดิม)
+"""
+import os, time, json, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_ENABLED = os.environ.get("CATALOG_CACHE", "on").lower() not in ("off", "false", "0")
+CATALOG_TTL_SECS = float(os.environ.get("CATALOG_TTL_SECS", "900"))
+CATALOG_VERSION_CHECK_SECS = float(os.environ.get("CATALOG_VERSION_CHECK_SECS", "30"))
+CATALOG_SCAN_SEGMENTS = int(os.environ.get("CATALOG_SCAN_SEGMENTS", "4"))
+CATALOG_VERSION_ID = "__catalog_version__"
+
+
+def _rank(p):
+    try:
+        return float(p.get("rank") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Catalog:
+    """snapshot ที่โหลดแล้ว (ไม่ถูกแก้หลังสร้าง → อ่านจากหลาย thread ได้โดยไม่ต้อง lock)"""
+
+    def __init__(self, items, version=None, load_ms=0.0):
+        self.products = [p for p in items if p.get("product_id") != CATALOG_VERSION_ID]
+        self.by_id = {p["product_id"]: p for p in self.products}
+        by_tag = {}
+        for p in self.products:
+            for t in set(p.get("tags") or []):
+                by_tag.setdefault(t, []).append(p)
+        for lst in by_tag.values():
+            lst.sort(key=lambda p: (-_rank(p), p["product_id"]))
+        self.by_tag = by_tag
+        self.version = version
+        self.loaded_at = time.time()
+        self.load_ms = load_ms
+        self._ranker = None
+        self._ingredients = None
+
+    def ranker(self):
+        """ProductRanker ของ snapshot นี้ (สร้างครั้งแรกที่ใช้ แล้วใช้ซ้ำจนกว่าจะโหลดแคตตาล็อกใหม่)"""
+        if self._ranker is None:
+            from product_ranker import ProductRanker   # ต้องมี NumPy เฉพาะตอนใช้ ranker
+            self._ranker = ProductRanker(self.products)
+        return self._ranker
+
+    def ingredient_index(self):
+        """IngredientIndex เรียง row ตรงกับ ranker() (ใช้กับ select(allow=...))"""
+        if self._ingredients is None:
+            from ingredient_index import IngredientIndex
+            self._ingredients = IngredientIndex([p.get("ingredients") or "" for p in self.ranker().products])
+        return self._ingredients
+
+    def tag(self, tag, limit=None):
+        items = self.by_tag.get(tag, [])
+        return items[:limit] if limit else list(items)
+
+    def get(self, product_id):
+        return self.by_id.get(product_id)
+
+
+def _scan_segment(table, segment, segments):
+    out, kw = [], ({"Segment": segment, "TotalSegments": segments} if segments > 1 else {})
+    while True:
+        resp = table.scan(**kw)
+        out += resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return out
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def load_catalog(table, segments=CATALOG_SCAN_SEGMENTS) -> list:
+    """scan ทั้งตารางแบบขนาน segments ส่วน"""
+    segments = max(1, segments)
+    if segments == 1:
+        return _scan_segment(table, 0, 1)
+    with ThreadPoolExecutor(max_workers=segments) as ex:
+        parts = list(ex.map(lambda s: _scan_segment(table, s, segments), range(segments)))
+    return [item for part in parts for item in part]
+
+
+def read_version(table):
+    item = table.get_item(Key={"product_id": CATALOG_VERSION_ID}).get("Item")
+    return str(item["version"]) if item and "version" in item else None
+
+
+def bump_version(table, version=None):
+    """ให้ทุก container โหลดแคตตาล็อกใหม่ในรอบเช็คถัดไป"""
+    version = version or str(int(time.time() * 1000))
+    table.put_item(Item={"product_id": CATALOG_VERSION_ID, "version": version})
+    return version
+
+
+class CatalogCache:
+    def __init__(self, table, ttl_secs: float = CATALOG_TTL_SECS,
+                 version_check_secs: float = CATALOG_VERSION_CHECK_SECS, segments: int = CATALOG_SCAN_SEGMENTS):
+        self.table = table
+        self.ttl = ttl_secs
+        self.version_check = version_check_secs
+        self.segments = segments
+        self._catalog = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "refreshes": 0, "version_checks": 0, "errors": 0}
+
+    def _load(self):
+        t0 = time.perf_counter()
+        version = None
+        if self.version_check:
+            # อ่าน version ก่อน scan: ถ้ามีการแก้ระหว่าง scan รอบเช็คถัดไปจะเห็น version ใหม่แล้วโหลดซ้ำ
+            try:
+                version = read_version(self.table)
+            except Exception:
+                version = None
+        items = load_catalog(self.table, self.segments)
+        cat = Catalog(items, version, (time.perf_counter() - t0) * 1000)
+        logger.info(f"📦 catalog loaded: products={len(cat.products)} tags={len(cat.by_tag)} "
+                    f"version={version} load_ms={cat.load_ms:.0f}")
+        return cat
+
+    def _stale(self, cat, now):
+        if now - cat.loaded_at >= self.ttl:
+            return True
+        if self.version_check and now - self._checked_at >= self.version_check:
+            self._checked_at = now
+            self.stats["version_checks"] += 1
+            try:
+                v = read_version(self.table)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"catalog version check failed: {e}")
+                return False
+            return v != cat.version
+        return False
+
+    def get(self) -> Catalog:
+        """snapshot ปัจจุบัน (โหลด/รีเฟรชเมื่อจำเป็น)"""
+        with self._lock:
+            cat, now = self._catalog, time.time()
+            if cat is None:
+                self._catalog = cat = self._load()
+                self._checked_at = now
+                self.stats["loads"] += 1
+                return cat
+            if self._stale(cat, now):
+                try:
+                    self._catalog = cat = self._load()
+                    self.stats["refreshes"] += 1
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.warning(f"catalog refresh failed, serving snapshot age={now - cat.loaded_at:.0f}s: {e}")
+                    return cat
+            else:
+                self.stats["hits"] += 1
+            return cat
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            s = dict(self.stats)
+            cat = self._catalog
+        if cat is not None:
+            s.update(products=len(cat.products), tags=len(cat.by_tag), version=cat.version,
+                     age_s=round(time.time() - cat.loaded_at, 1), load_ms=round(cat.load_ms, 1))
+        return s
+
+    def log_stats(self):
+        logger.info(f"📊 catalog_cache {json.dumps(self.snapshot())}")
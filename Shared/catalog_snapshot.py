@@ -0,0 +1,133 @@
+"""
+catalog_snapshot.py — แคตตาล็อก CSV (product_catalog_clean.csv) ในรูปแบบคอลัมน์ที่ memory-map ได้
+
+แปลง CSV ครั้งเดียว (Product/build_catalog_snapshot.py) แล้วลัมบ์ดาเปิดไฟล์ด้วย np.memmap
+ไม่ต้อง import pandas / parse CSV ทุก invocation
+
+รูปแบบไฟล์ (.dvcs)
+  MAGIC | ความยาว header (uint64 LE) | header JSON | padding ถึง ALIGN | คอลัมน์ต่อกัน (แต่ละคอลัมน์ align ALIGN bytes)
+  header = {"rows": n, "source_etag": ..., "columns": {ชื่อ: {"dtype", "shape", "offset" (นับจากต้นส่วนข้อมูล)}}}
+คอลัมน์
+  <text>.data / <text>.offsets : ข้อความ UTF-8 ต่อกัน + offset (int64, n+1) แบบ Arrow — Label, brand, name, ingredients
+  price                        : int64 ถ้าทุกแถวเป็นจำนวนเต็ม ไม่งั้น float64 (NaN = ว่าง) เหมือนที่ pandas อ่าน
+  rank                         : float64
+  idx.<skin type>              : row index (int32) ของสินค้าที่คอลัมน์ประเภทผิวนั้น = 1 (คำนวณไว้ล่วงหน้า)
+"""
+import io, csv, json, struct
+
+import lazy_import
+
+np = lazy_import.module("numpy")
+
+MAGIC = b"DVCS1\n"
+ALIGN = 64
+TEXT_COLUMNS = ("Label", "brand", "name", "ingredients")
+SKIN_TYPES = ("Combination", "Dry", "Normal", "Oily", "Sensitive")
+# label ปัญหาผิว (detectors.SKIN_LABELS) → คอลัมน์ประเภทผิวใน CSV ที่สินค้าเหมาะกับปัญหานั้น
+# ใช้ทั้งกรองของ lambda_suggestionProduct และ tags ของ item ที่ catalog_sync เขียนลง SkincareProducts
+LABEL_SKIN_TYPE = {
+    "Oily-Skin": "Oily", "Acne": "Oily", "Blackheads": "Oily", "Whiteheads": "Oily", "Englarged-Pores": "Oily",
+    "Dry-Skin": "Dry", "Wrinkles": "Dry", "Dark-Spots": "Dry",
+    "Eyebags": "Sensitive", "Skin-Redness": "Sensitive",
+    "wrinkles-acne-pores": "Combination",
+}
+
+
+def _pad(n):
+    return -n % ALIGN
+
+
+def _text(values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _price(values):
+    if all(v.strip().lstrip("-").isdigit() for v in values):
+        return np.array([int(v) for v in values], dtype=np.int64)
+    return np.array([float(v) if v.strip() else np.nan for v in values], dtype=np.float64)
+
+
+def _flag(v):
+    try:
+        return float(v) == 1
+    except (TypeError, ValueError):
+        return False
+
+
+def columns_from_rows(rows) -> dict:
+    rows = list(rows)
+    cols = {}
+    for c in TEXT_COLUMNS:
+        cols[f"{c}.data"], cols[f"{c}.offsets"] = _text([r.get(c) or "" for r in rows])
+    cols["price"] = _price([r.get("price") or "" for r in rows])
+    cols["rank"] = np.array([float(r.get("rank") or 0) for r in rows], dtype=np.float64)
+    for t in SKIN_TYPES:
+        cols[f"idx.{t}"] = np.array([i for i, r in enumerate(rows) if _flag(r.get(t))], dtype=np.int32)
+    return cols
+
+
+def build(csv_text: str, source_etag=None) -> bytes:
+    """CSV (ข้อความ) → bytes ของ snapshot"""
+    cols = columns_from_rows(csv.DictReader(io.StringIO(csv_text)))
+    meta, pos = {}, 0
+    for name, a in cols.items():
+        meta[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": pos}
+        pos += a.nbytes + _pad(a.nbytes)
+    rows = len(cols["price"])
+    header = json.dumps({"rows": rows, "source_etag": source_etag, "columns": meta}).encode("utf-8")
+    head = MAGIC + struct.pack("<Q", len(header)) + header
+    out = io.BytesIO()
+    out.write(head + b"\0" * _pad(len(head)))
+    for a in cols.values():
+        out.write(a.tobytes())
+        out.write(b"\0" * _pad(a.nbytes))
+    return out.getvalue()
+
+
+class Snapshot:
+    """snapshot ที่เปิดด้วย memmap (อ่านเฉพาะหน้าที่ใช้จริง) — ใช้ข้าม warm invocation ได้"""
+
+    def __init__(self, path):
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(mm[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path}: not a catalog snapshot")
+        (hlen,) = struct.unpack("<Q", bytes(mm[len(MAGIC):len(MAGIC) + 8]))
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(mm[start:start + hlen]))
+        base = start + hlen + _pad(start + hlen)
+        self.cols = {}
+        for name, m in header["columns"].items():
+            dt = np.dtype(m["dtype"])
+            n = int(np.prod(m["shape"])) * dt.itemsize
+            off = base + m["offset"]
+            self.cols[name] = mm[off:off + n].view(dt).reshape(m["shape"])
+        self.rows = header["rows"]
+        self.source_etag = header.get("source_etag")
+        self.path = path
+
+    def text(self, column, i) -> str:
+        offs = self.cols[f"{column}.offsets"]
+        return bytes(self.cols[f"{column}.data"][offs[i]:offs[i + 1]]).decode("utf-8")
+
+    def rows_for(self, skin_type):
+        """row index ของสินค้าที่เหมาะกับประเภทผิว (None = ไม่มีประเภทผิวนี้)"""
+        return self.cols.get(f"idx.{skin_type}")
+
+    def records(self, idx, fields=("Label", "brand", "name", "price", "ingredients")) -> list:
+        price = self.cols["price"]
+        rank = self.cols["rank"]
+        out = []
+        for i in np.asarray(idx).tolist():
+            rec = {}
+            for f in fields:
+                if f == "price":
+                    rec[f] = price[i].item()
+                elif f == "rank":
+                    rec[f] = rank[i].item()
+                else:
+                    rec[f] = self.text(f, i)
+            out.append(rec)
+        return out
@@ -0,0 +1,94 @@
+"""
+detectors.py — backend สำหรับตรวจ label ของภาพผิว
+
+- RekognitionDetector : detect_custom_labels ของโมเดลจริง (Rekognition Custom Labels)
+- LocalStubDetector   : ไม่ต้องมีโมเดล / ไม่เสียเงิน ใช้ load test, profile, benchmark
+                        label ขึ้นกับ hash ของภาพ (deterministic) ปรับ latency และความถี่ของแต่ละ label ได้
+
+เลือกด้วย DETECTOR_BACKEND=rekognition (ค่าเริ่มต้น) | local
+ทุก detector มี
+  detect(image, min_confidence) → [{"Name": ..., "Confidence": ...}]
+  model_id      : ใช้ทำ key ของ inference cache
+  rate_limited  : True = ต้องผ่าน Throttle (inference_dispatch.py)
+"""
+import os, json, time, random, hashlib
+
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "rekognition").lower()
+
+# ชื่อ label เดียวกับ Dataset/annotations/labels.json
+SKIN_LABELS = ["wrinkles-acne-pores", "Acne", "Blackheads", "Dark-Spots", "Dry-Skin", "Englarged-Pores",
+               "Eyebags", "Oily-Skin", "Skin-Redness", "Whiteheads", "Wrinkles"]
+
+LOCAL_LATENCY_MS = float(os.environ.get("LOCAL_DETECTOR_LATENCY_MS", "0"))
+LOCAL_JITTER_MS  = float(os.environ.get("LOCAL_DETECTOR_JITTER_MS", "0"))
+LOCAL_PREVALENCE = float(os.environ.get("LOCAL_DETECTOR_PREVALENCE", "0.3"))
+# เช่น {"Acne": 0.6, "Oily-Skin": 0.4} → label ที่ไม่ได้ระบุใช้ LOCAL_DETECTOR_PREVALENCE
+LOCAL_LABEL_PROBS = os.environ.get("LOCAL_DETECTOR_LABELS", "")
+
+
+class RekognitionDetector:
+    rate_limited = True
+
+    def __init__(self, rekognition, model_arn):
+        self.rekognition = rekognition
+        self.model_id = model_arn
+
+    def detect(self, image, min_confidence):
+        resp = self.rekognition.detect_custom_labels(
+            ProjectVersionArn=self.model_id,
+            Image=image,
+            MinConfidence=min_confidence
+        )
+        return resp.get("CustomLabels", [])
+
+
+class LocalStubDetector:
+    """
+    label ของภาพ = ฟังก์ชันของ sha256(ภาพ) → ภาพเดิมได้ผลเดิมเสมอ
+    Image={"S3Object": ...} ใช้ bucket/key เป็น seed แทน (ไม่อ่าน S3 จึงรันได้หลายพันภาพต่อวินาที)
+    """
+    rate_limited = False
+
+    def __init__(self, latency_ms: float = LOCAL_LATENCY_MS, jitter_ms: float = LOCAL_JITTER_MS,
+                 label_probs: dict = None, prevalence: float = LOCAL_PREVALENCE, model_id: str = "local-stub"):
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        if label_probs is None:
+            label_probs = json.loads(LOCAL_LABEL_PROBS) if LOCAL_LABEL_PROBS else {}
+        self.probs = [(name, float(label_probs.get(name, prevalence))) for name in SKIN_LABELS]
+        self.model_id = model_id
+
+    @staticmethod
+    def _digest(image):
+        if "Bytes" in image:
+            return hashlib.sha256(image["Bytes"]).digest()
+        ref = image["S3Object"]
+        return hashlib.sha256(f"s3://{ref['Bucket']}/{ref['Name']}".encode("utf-8")).digest()
+
+    def detect(self, image, min_confidence):
+        h = self._digest(image)
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000.0)
+        labels = []
+        for i, (name, p) in enumerate(self.probs):
+            # byte คู่ของ digest: ตัวแรกตัดสินว่ามี label ไหม, ตัวที่สองคือ confidence
+            if h[2 * i] / 256.0 < p:
+                conf = min_confidence + (100.0 - min_confidence) * h[2 * i + 1] / 255.0
+                labels.append({"Name": name, "Confidence": round(conf, 3)})
+        return labels
+
+
+_local = None
+
+
+def get_detector(rekognition=None, model_arn=None, backend=None):
+    """เลือก detector ตาม DETECTOR_BACKEND; local stub ใช้ instance เดียวทั้ง container"""
+    global _local
+    backend = (backend or DETECTOR_BACKEND).lower()
+    if backend == "local":
+        if _local is None:
+            _local = LocalStubDetector()
+        return _local
+    if backend != "rekognition":
+        raise ValueError(f"unknown DETECTOR_BACKEND: {backend}")
+    return RekognitionDetector(rekognition, model_arn)
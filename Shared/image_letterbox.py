@@ -0,0 +1,42 @@
+"""
+image_letterbox.py — letterbox transform ที่ใช้ตอนเตรียม dataset (lambda_preprocess_images)
+และตอน inference (skin_analyzer เมื่อ NORMALIZE_IMAGES=true) ให้ภาพ input ตรงกับตอน train
+
+ต้องมี Pillow (Dataset/build-pillow-layer.sh)
+"""
+from __future__ import annotations
+from io import BytesIO
+
+import lazy_import
+
+Image = lazy_import.module("PIL.Image")
+ImageOps = lazy_import.module("PIL.ImageOps")
+
+DEFAULT_SIDE = 640
+PAD_COLOR = (0, 0, 0)   # black pad
+
+
+def resize_letterbox(img: Image.Image, target_side: int = DEFAULT_SIDE, pad_color=PAD_COLOR) -> Image.Image:
+    # แก้ orientation จาก EXIF ก่อน
+    img = ImageOps.exif_transpose(img.convert("RGB"))
+    w, h = img.size
+    scale = min(target_side / w, target_side / h)
+    new_w, new_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    img = img.resize((new_w, new_h), Image.BICUBIC)
+
+    canvas = Image.new("RGB", (target_side, target_side), pad_color)
+    off_x = (target_side - new_w) // 2
+    off_y = (target_side - new_h) // 2
+    canvas.paste(img, (off_x, off_y))
+    return canvas
+
+
+def letterbox_jpeg(data: bytes, target_side: int = DEFAULT_SIDE, quality: int = 90) -> bytes:
+    """bytes ของภาพ (jpg/png) → bytes JPEG ขนาด target_side×target_side"""
+    img = Image.open(BytesIO(data))
+    # ให้ decoder ย่อ JPEG ตั้งแต่ตอน decode (เร็วกว่าการ decode เต็มขนาดมาก) แล้วค่อย resize ละเอียด
+    img.draft("RGB", (target_side, target_side))
+    out = resize_letterbox(img, target_side)
+    buf = BytesIO()
+    out.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
@@ -0,0 +1,97 @@
+"""
+image_quality.py — ตรวจคุณภาพภาพก่อนส่งเข้าโมเดล (quality gate)
+
+ภาพเบลอ มืด/สว่างเกิน เล็กเกิน หรือไม่มีผิวหน้าในภาพ มักได้ labels ว่างกลับมา
+→ ตัดสินจากภาพย่อ (QUALITY_SIDE px) ด้วย NumPy ใช้เวลาไม่กี่ ms แล้วตอบ "ถ่ายรูปใหม่" ได้ทันทีโดยไม่ต้องเรียก Rekognition
+
+เกณฑ์
+- resolution : ด้านสั้นของภาพต้นฉบับ >= QUALITY_MIN_SIDE
+- blur       : variance ของ Laplacian (4-neighbour) บนภาพ grayscale ที่ย่อแล้ว >= QUALITY_BLUR_MIN
+- exposure   : ค่าเฉลี่ยความสว่างอยู่ใน [QUALITY_DARK_MAX, QUALITY_BRIGHT_MIN] และ pixel ที่มืด/สว่างจนตัดไม่เกิน QUALITY_CLIP_MAX
+- skin       : สัดส่วน pixel ที่อยู่ในช่วงสีผิว (YCbCr: Cr 133–173, Cb 77–127) >= QUALITY_MIN_SKIN
+
+QUALITY_GATE=off (ค่าเริ่มต้น) | shadow (คำนวณ + log แต่ไม่บล็อก) | on
+ต้องมี Pillow + NumPy layer (Dataset/build-pillow-layer.sh)
+"""
+from __future__ import annotations
+import os, time
+from io import BytesIO
+
+import lazy_import
+
+np = lazy_import.module("numpy")
+Image = lazy_import.module("PIL.Image")
+ImageOps = lazy_import.module("PIL.ImageOps")
+
+QUALITY_GATE       = os.environ.get("QUALITY_GATE", "off").lower()
+QUALITY_SIDE       = int(os.environ.get("QUALITY_SIDE", "256"))
+QUALITY_MIN_SIDE   = int(os.environ.get("QUALITY_MIN_SIDE", "320"))
+QUALITY_BLUR_MIN   = float(os.environ.get("QUALITY_BLUR_MIN", "15"))
+QUALITY_DARK_MAX   = float(os.environ.get("QUALITY_DARK_MAX", "45"))
+QUALITY_BRIGHT_MIN = float(os.environ.get("QUALITY_BRIGHT_MIN", "220"))
+QUALITY_CLIP_MAX   = float(os.environ.get("QUALITY_CLIP_MAX", "0.5"))
+QUALITY_MIN_SKIN   = float(os.environ.get("QUALITY_MIN_SKIN", "0.08"))
+
+RETAKE_MESSAGE = "กรุณาถ่ายรูปใหม่ให้เห็นผิวหน้าชัดเจน ในที่มีแสงเพียงพอ"
+
+
+def laplacian_var(gray: np.ndarray) -> float:
+    """variance ของ Laplacian แบบ 4-neighbour (ใช้ slicing ไม่ต้องมี OpenCV/SciPy)"""
+    lap = (gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]) - 4.0 * gray[1:-1, 1:-1]
+    return float(lap.var())
+
+
+def skin_ratio(rgb: np.ndarray) -> float:
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    cr = 128.0 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    cb = 128.0 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    mask = (cr >= 133) & (cr <= 173) & (cb >= 77) & (cb <= 127)
+    return float(mask.mean())
+
+
+def assess(data: bytes, side: int = QUALITY_SIDE) -> dict:
+    """
+    คืน {"ok": bool, "reasons": [...], "metrics": {...}, "timings_ms": {"decode", "metrics", "total"}}
+    """
+    t0 = time.perf_counter()
+    img = Image.open(BytesIO(data))
+    orig_w, orig_h = img.size
+    # decode แบบย่อ (JPEG DCT scaling) แล้วค่อยย่อละเอียด → ไม่ต้อง decode ภาพเต็ม
+    img.draft("RGB", (side, side))
+    img = ImageOps.exif_transpose(img.convert("RGB"))
+    img.thumbnail((side, side), Image.BILINEAR)
+    rgb = np.asarray(img, dtype=np.float32)
+    t1 = time.perf_counter()
+
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    metrics = {
+        "width": orig_w,
+        "height": orig_h,
+        "blur_var": round(laplacian_var(gray), 2),
+        "brightness": round(float(gray.mean()), 2),
+        "clipped": round(float(((gray < 8) | (gray > 247)).mean()), 4),
+        "skin_ratio": round(skin_ratio(rgb), 4),
+    }
+    t2 = time.perf_counter()
+
+    reasons = []
+    if min(orig_w, orig_h) < QUALITY_MIN_SIDE:
+        reasons.append("low_resolution")
+    if metrics["blur_var"] < QUALITY_BLUR_MIN:
+        reasons.append("blurry")
+    if metrics["brightness"] < QUALITY_DARK_MAX:
+        reasons.append("too_dark")
+    elif metrics["brightness"] > QUALITY_BRIGHT_MIN:
+        reasons.append("too_bright")
+    if metrics["clipped"] > QUALITY_CLIP_MAX and not {"too_dark", "too_bright"} & set(reasons):
+        reasons.append("bad_exposure")
+    if metrics["skin_ratio"] < QUALITY_MIN_SKIN:
+        reasons.append("no_skin_region")
+
+    return {
+        "ok": not reasons,
+        "reasons": reasons,
+        "metrics": metrics,
+        "timings_ms": {"decode": round((t1 - t0) * 1000, 2), "metrics": round((t2 - t1) * 1000, 2),
+                       "total": round((t2 - t0) * 1000, 2)},
+    }
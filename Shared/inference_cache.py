@@ -0,0 +1,125 @@
+"""
+inference_cache.py — cache ผลลัพธ์ detect_custom_labels ตาม hash ของเนื้อภาพ
+
+key = <model version>#<MinConfidence>#<content hash>
+- content hash ใช้ ETag ของ S3 (มีใน S3 event อยู่แล้ว ไม่ต้องเรียก API เพิ่ม) หรือ sha256 ของ bytes
+- ชั้นที่ 1: LRU ในหน่วยความจำของ container (อยู่ข้าม warm invocation) มี TTL + จำกัดจำนวน entry
+- ชั้นที่ 2 (ถ้าตั้ง INFERENCE_CACHE_TABLE): ตาราง DynamoDB ที่ใช้ร่วมกันทุก container
+  partition key = cache_key (S), เปิด TTL ที่ attribute expires_at เพื่อให้ DynamoDB ลบของหมดอายุเอง
+"""
+import os, time, json, hashlib, logging, threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get("INFERENCE_CACHE", "on").lower() not in ("off", "false", "0")
+CACHE_TABLE   = os.environ.get("INFERENCE_CACHE_TABLE", "").strip()
+CACHE_TTL     = int(os.environ.get("INFERENCE_CACHE_TTL_SECS", "86400"))
+CACHE_MAX     = int(os.environ.get("INFERENCE_CACHE_MAX_ENTRIES", "2048"))
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def etag_from_record(rec: dict) -> str | None:
+    """ETag ที่ S3 ใส่มาใน event (ไม่มีเครื่องหมายคำพูด)"""
+    etag = (rec.get("s3", {}).get("object", {}) or {}).get("eTag")
+    return etag.strip('"') if etag else None
+
+
+def model_version(model_arn: str) -> str:
+    # arn:aws:rekognition:...:project/<name>/version/<version-name>/<ts> → <version-name>/<ts>
+    return model_arn.split("/version/", 1)[-1]
+
+
+class InferenceCache:
+    def __init__(self, ttl_secs: int = CACHE_TTL, max_entries: int = CACHE_MAX,
+                 table_name: str = CACHE_TABLE, table=None):
+        self.ttl = ttl_secs
+        self.max_entries = max_entries
+        self.table_name = table_name
+        self._table = table
+        self._mem = OrderedDict()          # key -> (expires_at, labels)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "table_hits": 0,
+                      "evictions": 0, "expired": 0, "errors": 0}
+
+    @staticmethod
+    def make_key(content_hash: str, model_arn: str, min_confidence: float) -> str:
+        return f"{model_version(model_arn)}#{min_confidence:g}#{content_hash}"
+
+    # ---------- internals ----------
+    def _get_table(self):
+        if self._table is None and self.table_name:
+            import aws_clients
+            self._table = aws_clients.table(self.table_name)
+        return self._table
+
+    def _count(self, *names):
+        with self._lock:
+            for n in names:
+                self.stats[n] += 1
+
+    def _remember(self, key, labels, expires_at):
+        with self._lock:
+            self._mem[key] = (expires_at, labels)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    # ---------- public ----------
+    def get(self, key: str):
+        """คืน list ของ labels ถ้าเจอใน cache (ยังไม่หมดอายุ) ไม่เจอคืน None"""
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit and hit[0] <= now:
+                del self._mem[key]
+                self.stats["expired"] += 1
+                hit = None
+            if hit:
+                self._mem.move_to_end(key)
+        if hit:
+            self._count("hits", "memory_hits")
+            return list(hit[1])
+
+        table = self._get_table()
+        if table is not None:
+            try:
+                item = table.get_item(Key={"cache_key": key}).get("Item")
+                # TTL ของ DynamoDB ลบแบบ lazy จึงต้องเช็ค expires_at เองด้วย
+                if item and int(item.get("expires_at", 0)) > now:
+                    labels = json.loads(item["labels"])
+                    self._remember(key, labels, int(item["expires_at"]))
+                    self._count("hits", "table_hits")
+                    return list(labels)
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"inference cache get failed: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, labels):
+        expires_at = int(time.time()) + self.ttl
+        self._remember(key, list(labels), expires_at)
+        table = self._get_table()
+        if table is not None:
+            try:
+                table.put_item(Item={"cache_key": key, "labels": json.dumps(list(labels)),
+                                     "expires_at": expires_at})
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"inference cache put failed: {e}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            s = dict(self.stats, entries=len(self._mem))
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / lookups, 3) if lookups else 0.0
+        return s
+
+    def log_stats(self):
+        logger.info(f"📊 inference_cache {json.dumps(self.snapshot())}")
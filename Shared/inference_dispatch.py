@@ -0,0 +1,164 @@
+"""
+inference_dispatch.py — คุมอัตราการเรียก detect_custom_labels ไม่ให้เกิน capacity ของโมเดล
+
+- TokenBucket   : จำกัดจำนวน request ต่อวินาที (rate) และ burst
+- AimdLimiter   : จำกัดจำนวน request ที่วิ่งพร้อมกัน ปรับเองแบบ AIMD
+                  สำเร็จ → เพิ่มทีละ 1 (additive increase), โดน throttle → คูณ 0.5 (multiplicative decrease)
+- Throttle      : รวม 2 ตัวบน + retry แบบ exponential backoff เมื่อเจอ ThrottlingException
+- LocalDispatcher: คิวในโปรเซส + worker thread สำหรับทดสอบ throughput/tail latency แบบ offline
+
+บน AWS ตัวคิวที่ทนทาน (durable) คือ SQS: S3 event → SQS → analyze_skin
+record ที่ยังโดน throttle หลัง retry ครบจะถูกคืนใน batchItemFailures เพื่อให้ SQS ส่งใหม่ภายหลัง
+"""
+import os, time, random, threading, queue
+from concurrent.futures import Future
+
+REKOGNITION_TPS      = float(os.environ.get("REKOGNITION_TPS", "5"))
+REKOGNITION_BURST    = float(os.environ.get("REKOGNITION_BURST", str(max(1.0, REKOGNITION_TPS))))
+AIMD_MAX_CONCURRENCY = int(os.environ.get("AIMD_MAX_CONCURRENCY", "8"))
+THROTTLE_MAX_RETRIES = int(os.environ.get("THROTTLE_MAX_RETRIES", "5"))
+THROTTLE_BASE_DELAY  = float(os.environ.get("THROTTLE_BASE_DELAY", "0.2"))
+
+THROTTLE_CODES = {"ThrottlingException", "ProvisionedThroughputExceededException",
+                  "LimitExceededException", "TooManyRequestsException"}
+
+
+def is_throttle(e) -> bool:
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLE_CODES
+
+
+class ThrottledError(Exception):
+    """ยังโดน throttle หลัง retry ครบ → caller ควรส่งงานกลับเข้าคิว"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def acquire(self, timeout: float = None) -> bool:
+        """รอจนได้ 1 token; คืน False ถ้าเกิน timeout"""
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class AimdLimiter:
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = AIMD_MAX_CONCURRENCY,
+                 decrease: float = 0.5):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum, self.maximum, self.decrease = minimum, maximum, decrease
+        self.inflight = 0
+        self.throttles = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+    def release(self):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            # +1 ต่อ "หนึ่งรอบ" ของ window → เพิ่ม 1/limit ต่อ request ที่สำเร็จ
+            self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.throttles += 1
+            self.limit = max(self.minimum, self.limit * self.decrease)
+
+
+class Throttle:
+    """token bucket + AIMD + exponential backoff ครอบการเรียก API ตัวเดียว"""
+    def __init__(self, rate=REKOGNITION_TPS, burst=REKOGNITION_BURST, max_concurrency=AIMD_MAX_CONCURRENCY,
+                 max_retries=THROTTLE_MAX_RETRIES, base_delay=THROTTLE_BASE_DELAY):
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AimdLimiter(initial=min(2, max_concurrency), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    def call(self, fn):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.limiter.acquire()
+            try:
+                out = fn()
+            except Exception as e:
+                if not is_throttle(e):
+                    raise
+                self.limiter.on_throttle()
+                if attempt == self.max_retries:
+                    raise ThrottledError(str(e)) from e
+                # full jitter backoff
+                time.sleep(random.uniform(0, self.base_delay * (2 ** attempt)))
+                continue
+            finally:
+                self.limiter.release()
+            self.limiter.on_success()
+            return out
+
+    def snapshot(self):
+        return {"concurrency_limit": round(self.limiter.limit, 2), "inflight": self.limiter.inflight,
+                "throttles": self.limiter.throttles, "rate": self.bucket.rate}
+
+
+class LocalDispatcher:
+    """
+    คิวในโปรเซส: submit(job) → Future; worker ดึงงานจากคิวแล้วเรียก fn(job) ผ่าน Throttle
+    ใช้กับ detector ปลอมเพื่อวัด throughput / tail latency ตอนมี traffic spike
+    """
+    def __init__(self, fn, throttle: Throttle = None, workers: int = AIMD_MAX_CONCURRENCY):
+        self.fn = fn
+        self.throttle = throttle or Throttle()
+        self._q = queue.Queue()
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def _worker(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            job, fut = item
+            try:
+                fut.set_result(self.throttle.call(lambda: self.fn(job)))
+            except Exception as e:
+                fut.set_exception(e)
+
+    def submit(self, job) -> Future:
+        fut = Future()
+        self._q.put((job, fut))
+        return fut
+
+    def close(self):
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join()
@@ -0,0 +1,114 @@
+"""
+ingredient_index.py — inverted index ของส่วนผสม (ingredient → bitmap ของ row สินค้า) สำหรับกรอง avoid / require
+
+tokenize: ข้อความ ingredients ในแคตตาล็อกคั่นด้วย " | " (ไม่มี | → คั่นด้วย ", ")
+  แต่ละส่วนผสม normalize (NFKC, ตัวพิมพ์เล็ก, ช่องว่างเดียว, ตัด . * ท้าย) แล้วเก็บเป็นหลาย key
+  "citrus aurantifolia (lime) extract" → ชื่อเต็ม, ชื่อที่ตัดวงเล็บ ("citrus aurantifolia extract"), ชื่อในวงเล็บ ("lime")
+bitmap: np.packbits ของ row (bitorder little) → n สินค้าใช้ n/8 bytes ต่อ ingredient
+  คำค้น → OR ของทุก key ที่มีคำนั้นเป็น substring (ค้นใน vocabulary ไม่ใช่ทุก row) แล้ว cache
+  เช่น "paraben" → methylparaben | propylparaben | ..., "fragrance" → fragrance | parfum/fragrance | ...
+  ผลเท่ากับหา substring ในข้อความ ingredients ของทุก row ยกเว้นคำที่คร่อมระหว่างส่วนผสม 2 ตัว
+allowed(avoid, require): AND ของ require แล้วตัด OR ของ avoid → bool ต่อ row
+  สินค้าที่ไม่มีข้อมูลส่วนผสม ไม่ผ่าน require แต่ผ่าน avoid
+"""
+from __future__ import annotations
+import re, bisect, unicodedata
+
+import lazy_import
+
+np = lazy_import.module("numpy")
+
+MAX_RESOLVED = 1024   # cache ของคำค้นแบบ substring (คำค้นมาจากผู้ใช้ → จำกัดขนาด)
+_SPACE = re.compile(r"\s+")
+_PAREN = re.compile(r"\(([^)]*)\)")
+
+
+def normalize(name: str) -> str:
+    name = unicodedata.normalize("NFKC", name or "").lower()
+    return _SPACE.sub(" ", name).strip(" .*")
+
+
+def _parts(text):
+    text = text or ""
+    return text.split("|") if "|" in text else re.split(r",\s+", text)
+
+
+def split(text: str) -> list:
+    return [p for p in (normalize(p) for p in _parts(text)) if p]
+
+
+def keys(ingredient: str) -> set:
+    """key ทั้งหมดของส่วนผสม 1 ตัว (ที่ normalize แล้ว)"""
+    out = {ingredient}
+    bare = normalize(_PAREN.sub(" ", ingredient))
+    if bare:
+        out.add(bare)
+    out.update(k for k in (normalize(m) for m in _PAREN.findall(ingredient)) if k)
+    return out
+
+
+class IngredientIndex:
+    def __init__(self, texts):
+        """texts[i] = ข้อความ ingredients ของ row i (ลำดับเดียวกับแคตตาล็อกที่จะกรอง)"""
+        rows = {}
+        seen = {}   # ส่วนผสมเดิมซ้ำกันมากข้ามสินค้า → normalize ครั้งเดียวต่อข้อความดิบ
+        n = 0
+        for i, text in enumerate(texts):
+            n = i + 1
+            for part in _parts(text):
+                ks = seen.get(part)
+                if ks is None:
+                    ing = normalize(part)
+                    ks = seen[part] = tuple(keys(ing)) if ing else ()
+                for k in ks:
+                    rows.setdefault(k, []).append(i)
+        self.n = n
+        self.nbytes = (n + 7) // 8
+        self.bitmaps = {}
+        for k, idx in rows.items():
+            idx = np.asarray(idx, dtype=np.int64)
+            bits = np.zeros(self.nbytes, dtype=np.uint8)
+            np.bitwise_or.at(bits, idx >> 3, (1 << (idx & 7)).astype(np.uint8))
+            self.bitmaps[k] = bits
+        self._empty = np.zeros(self.nbytes, dtype=np.uint8)
+        self._resolved = {}
+        # vocabulary ต่อกันเป็นสตริงเดียว → ค้น substring ด้วย str.find (C) แทนวน Python ทุก key
+        self._keys = list(self.bitmaps)
+        self._blob = "\n".join(self._keys)
+        self._starts = []
+        pos = 0
+        for k in self._keys:
+            self._starts.append(pos)
+            pos += len(k) + 1
+
+    def __len__(self):
+        return len(self.bitmaps)
+
+    def bitmap(self, term):
+        """bitmap ของคำค้น 1 คำ (OR ของทุก key ที่มีคำนี้อยู่ รวม key ที่ตรงทั้งคำ)"""
+        term = normalize(term)
+        hit = self._resolved.get(term)
+        if hit is None:
+            hit = self._empty.copy()
+            pos = self._blob.find(term) if term and "\n" not in term else -1
+            while pos >= 0:
+                j = bisect.bisect_right(self._starts, pos) - 1
+                np.bitwise_or(hit, self.bitmaps[self._keys[j]], out=hit)
+                nxt = self._starts[j + 1] if j + 1 < len(self._starts) else len(self._blob)
+                pos = self._blob.find(term, nxt)
+            if len(self._resolved) >= MAX_RESOLVED:
+                self._resolved.clear()
+            self._resolved[term] = hit
+        return hit
+
+    def allowed(self, avoid=(), require=()) -> np.ndarray:
+        """bool ต่อ row: มีทุกตัวใน require และไม่มีตัวใดใน avoid"""
+        acc = np.full(self.nbytes, 0xFF, dtype=np.uint8)
+        for term in require or ():
+            np.bitwise_and(acc, self.bitmap(term), out=acc)
+        for term in avoid or ():
+            np.bitwise_and(acc, np.invert(self.bitmap(term)), out=acc)
+        return np.unpackbits(acc, count=self.n, bitorder="little").view(bool)
+
+    def rows(self, avoid=(), require=()) -> np.ndarray:
+        return np.flatnonzero(self.allowed(avoid, require))
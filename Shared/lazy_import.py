@@ -0,0 +1,72 @@
+"""
+lazy_import.py — เลื่อน import โมดูลหนักไปตอนใช้ครั้งแรก (layer dermavision-shared)
+
+cold start ส่วนใหญ่ของ handler มาจาก import ไม่ใช่โค้ดของเรา (วัดด้วย Benchmark/bench_cold_start.py):
+  boto3.dynamodb.conditions / types  ~250 ms  (ลาก boto3 + botocore ทั้งก้อน)
+  numpy                              ~100 ms
+  PIL.Image                           ~50 ms
+invocation ที่ไม่ได้ใช้โมดูลนั้น (เช่น cache hit, request ที่ตอบ error เร็ว) ไม่ต้องจ่ายเลย
+
+    np = lazy_import.module("numpy")            # ใช้ np.xxx ได้เหมือนเดิม
+    Image = lazy_import.module("PIL.Image")
+
+LAZY_IMPORTS (1) — 0 = import ทันทีตอนโหลดโมดูลแบบเดิม (ไว้เทียบ cold start / debug)
+ข้อควรระวัง: ห้ามใช้ของจากโมดูล lazy ระดับ module (default argument, annotation, ค่าคงที่) ไม่งั้นโหลดทันที
+"""
+import os, sys, time, importlib, threading
+
+LAZY_IMPORTS = os.environ.get("LAZY_IMPORTS", "1") != "0"
+
+_lock = threading.RLock()
+_deferred = {}    # ชื่อโมดูล -> _LazyModule ที่ยังไม่ได้โหลด
+_loaded_ms = {}   # ชื่อโมดูล -> ms ที่ใช้ import ตอนใช้ครั้งแรก
+
+
+class _LazyModule:
+    """ตัวแทนโมดูล — import จริงตอนเข้าถึง attribute ครั้งแรก"""
+
+    def __init__(self, name):
+        self._name = name
+        self._mod = None
+
+    def _load(self):
+        if self._mod is None:
+            with _lock:   # สองเธรดใช้ครั้งแรกพร้อมกัน → import ครั้งเดียว
+                if self._mod is None:
+                    t0 = time.perf_counter()
+                    mod = importlib.import_module(self._name)
+                    _loaded_ms[self._name] = round((time.perf_counter() - t0) * 1000, 1)
+                    _deferred.pop(self._name, None)
+                    self._mod = mod
+        return self._mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return f"<lazy module {self._name}{'' if self._mod is None else ' (loaded)'}>"
+
+
+def module(name):
+    """โมดูลจริงถ้า import ไปแล้ว / ปิด LAZY_IMPORTS ไม่งั้นตัวแทนที่ import ตอนใช้ครั้งแรก"""
+    if not LAZY_IMPORTS or name in sys.modules:
+        return importlib.import_module(name)
+    with _lock:
+        m = _deferred.get(name)
+        if m is None:
+            m = _deferred[name] = _LazyModule(name)
+    return m
+
+
+def load_all():
+    """import ทุกโมดูลที่ยังค้างอยู่ (เช่น warm-up ตอน provisioned concurrency / วัดเวลาที่เลื่อนไป)"""
+    for m in list(_deferred.values()):
+        m._load()
+    return dict(_loaded_ms)
+
+
+def stats() -> dict:
+    return {"enabled": LAZY_IMPORTS, "pending": sorted(_deferred), "loaded_ms": dict(_loaded_ms)}
@@ -0,0 +1,278 @@
+"""
+metrics.py — metric ต่อ stage ในรูป CloudWatch Embedded Metric Format (EMF) (layer dermavision-shared)
+
+ลัมบ์ดา print JSON 1 บรรทัดต่อ record → CloudWatch Logs แตกเป็น metric ให้เอง ไม่ต้องเรียก PutMetricData
+
+    with metrics.stage("preprocess", rates=("ImagesProcessed",), Dataset=DATASET) as m:
+        for ...:
+            with m.timer("Resize"):
+                ...
+            m.count("ImagesProcessed")
+            m.count("BytesWritten", n, unit="Bytes")
+            m.maybe_flush()            # loop ยาว: ส่ง record ทุก METRICS_FLUSH_SECS แทน print ความคืบหน้า
+
+- count() รวมค่าใน record เดียว / timing() และ put() เก็บเป็น array (สูงสุด MAX_VALUES ค่าต่อ metric ตาม EMF แล้ว flush)
+- ทุก record มี IntervalMs = ช่วงเวลาที่ record ครอบ; ชื่อใน rates= ได้ <name>PerSecond มาด้วย (images/s, bytes/s)
+- stage() ใส่ Duration (ms) และ Errors ให้เอง; call ผ่าน aws_clients ระหว่าง stage ถูกนับเป็น
+  <service>.<Operation> (Count) + <service>.<Operation>.Latency (ms) เช่น s3.PutObject, rekognition.DetectCustomLabels
+- dimension = Stage + ที่ส่งมา (Dataset, Source, ...) ; prop() = field ที่ไม่ใช่ metric (ค้นใน Logs Insights ได้)
+- โค้ดใน Shared/ ที่ไม่ได้ถือ m ใช้ current() (stage ที่เปิดอยู่ หรือตัวเปล่าที่ไม่ทำอะไร)
+
+METRICS_SINK       emf (ค่าเริ่มต้น, stdout) | local (สะสมใน process → local_sink().summary() ให้ benchmark) | off
+METRICS_NAMESPACE  DermaVision
+METRICS_FLUSH_SECS 10
+"""
+import os, sys, json, time, threading
+from contextlib import contextmanager
+
+METRICS_SINK = os.environ.get("METRICS_SINK", "emf").lower()
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "DermaVision")
+METRICS_FLUSH_SECS = float(os.environ.get("METRICS_FLUSH_SECS", "10"))
+MAX_VALUES = 100    # EMF: ค่าใน array ต่อ metric ต่อ record
+MAX_METRICS = 100   # EMF: metric ต่อ record
+
+_lock = threading.RLock()
+_active = []        # stage ที่เปิดอยู่ (ซ้อนได้ ตัวในสุดได้ call ของ AWS)
+_hooked = False
+
+
+class EmfSink:
+    """print EMF ลง stdout (Lambda ส่งเข้า CloudWatch Logs)"""
+
+    def emit(self, record):
+        sys.stdout.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str) + "\n")
+        sys.stdout.flush()
+
+
+class LocalSink:
+    """เก็บ record ไว้ใน memory แล้วสรุปรวมต่อ stage + dimensions (ใช้ใน Benchmark/)"""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    def summary(self) -> dict:
+        """{"Stage[/dim=value...]": {"records", "interval_ms", "counts", "rates_per_sec", "timers"}}"""
+        out = {}
+        with self._lock:
+            records = list(self.records)
+        for rec in records:
+            spec = rec["_aws"]["CloudWatchMetrics"][0]
+            dims = spec["Dimensions"][0]
+            name = "/".join([rec[dims[0]]] + [f"{d}={rec[d]}" for d in dims[1:]])
+            s = out.setdefault(name, {"records": 0, "interval_ms": 0.0, "counts": {}, "timers": {}})
+            s["records"] += 1
+            for m in spec["Metrics"]:
+                n, unit, v = m["Name"], m.get("Unit", "None"), rec.get(m["Name"])
+                if n == "IntervalMs":
+                    s["interval_ms"] += v
+                elif unit.endswith("/Second"):
+                    continue   # คำนวณใหม่จากผลรวม
+                elif unit == "Milliseconds" or isinstance(v, list):
+                    s["timers"].setdefault(n, []).extend(v if isinstance(v, list) else [v])
+                else:
+                    s["counts"][n] = s["counts"].get(n, 0) + v
+        for s in out.values():
+            secs = s["interval_ms"] / 1000
+            s["interval_ms"] = round(s["interval_ms"], 1)
+            s["rates_per_sec"] = {n: round(v / secs, 1) for n, v in s["counts"].items()} if secs else {}
+            s["timers"] = {n: _dist(v) for n, v in s["timers"].items()}
+        return out
+
+
+class _OffSink:
+    def emit(self, record):
+        pass
+
+
+def _dist(values):
+    v = sorted(values)
+    pick = lambda p: v[min(len(v) - 1, int(round(p / 100 * (len(v) - 1))))]
+    return {"n": len(v), "mean": round(sum(v) / len(v), 3), "p50": round(pick(50), 3),
+            "p99": round(pick(99), 3), "max": round(v[-1], 3)}
+
+
+_sink = {"emf": EmfSink, "local": LocalSink}.get(METRICS_SINK, _OffSink)()
+
+
+def set_sink(sink):
+    """เปลี่ยนปลายทางของ record (คืนตัวเดิม)"""
+    global _sink
+    old, _sink = _sink, sink
+    return old
+
+
+def local_sink() -> LocalSink:
+    """LocalSink ที่ใช้อยู่ (สลับมาใช้ตัวใหม่ถ้ายังไม่ใช่)"""
+    if not isinstance(_sink, LocalSink):
+        set_sink(LocalSink())
+    return _sink
+
+
+class Metrics:
+    def __init__(self, stage, rates=(), namespace=None, **dimensions):
+        self.namespace = namespace or METRICS_NAMESPACE
+        self.dimensions = {"Stage": stage}
+        self.dimensions.update({k: str(v) for k, v in dimensions.items() if v not in (None, "")})
+        self.rates = tuple(rates)
+        self._props = {}
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._counts = {}    # name -> [value, unit]
+        self._values = {}    # name -> [[values], unit]
+        self._t0 = time.perf_counter()
+
+    def dimension(self, **dims):
+        """เพิ่ม dimension ที่เพิ่งรู้ (เช่น Dataset หลังอ่าน event) — มีผลกับ record ถัดไป"""
+        with self._lock:
+            self.dimensions.update({k: str(v) for k, v in dims.items() if v not in (None, "")})
+
+    def prop(self, key, value):
+        with self._lock:
+            self._props[key] = value
+
+    def count(self, name, value=1, unit="Count"):
+        with self._lock:
+            c = self._counts.get(name)
+            if c is None:
+                self._counts[name] = [value, unit]
+            else:
+                c[0] += value
+            full = len(self._counts) + len(self._values) >= MAX_METRICS
+        if full:
+            self.flush()
+
+    def put(self, name, value, unit="None"):
+        with self._lock:
+            v = self._values.setdefault(name, [[], unit])
+            v[0].append(round(value, 3) if isinstance(value, float) else value)
+            full = len(v[0]) >= MAX_VALUES or len(self._counts) + len(self._values) >= MAX_METRICS
+        if full:
+            self.flush()
+
+    def timing(self, name, ms):
+        self.put(name, ms, "Milliseconds")
+
+    @contextmanager
+    def timer(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(name, (time.perf_counter() - t0) * 1000)
+
+    def maybe_flush(self, every_secs=None):
+        if time.perf_counter() - self._t0 >= (METRICS_FLUSH_SECS if every_secs is None else every_secs):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, values, t0 = self._counts, self._values, self._t0
+            self._reset()
+            props = dict(self._props)
+            dims = dict(self.dimensions)
+        if not counts and not values:
+            return None
+        interval = (time.perf_counter() - t0) * 1000
+        body, defs = {}, []
+        for name, (v, unit) in counts.items():
+            body[name] = v
+            defs.append({"Name": name, "Unit": unit})
+        for name, (v, unit) in values.items():
+            body[name] = v if len(v) > 1 else v[0]
+            defs.append({"Name": name, "Unit": unit})
+        body["IntervalMs"] = round(interval, 1)
+        defs.append({"Name": "IntervalMs", "Unit": "Milliseconds"})
+        for name in self.rates:
+            if name in counts and interval > 0:
+                v, unit = counts[name]
+                body[f"{name}PerSecond"] = round(v / interval * 1000, 3)
+                defs.append({"Name": f"{name}PerSecond", "Unit": f"{unit if unit != 'None' else 'Count'}/Second"})
+        record = {"_aws": {"Timestamp": int(time.time() * 1000),
+                           "CloudWatchMetrics": [{"Namespace": self.namespace, "Dimensions": [list(dims)],
+                                                  "Metrics": defs}]},
+                  **props, **dims, **body}
+        _sink.emit(record)
+        return record
+
+
+class _NullMetrics(Metrics):
+    """current() นอก stage: รับทุก call แต่ไม่ส่งอะไรออกไป"""
+
+    def __init__(self):
+        super().__init__("none")
+
+    def dimension(self, **dims):
+        pass
+
+    def prop(self, key, value):
+        pass
+
+    def count(self, *a, **kw):
+        pass
+
+    def put(self, *a, **kw):
+        pass
+
+    def flush(self):
+        return None
+
+
+_NULL = _NullMetrics()
+
+
+def current() -> Metrics:
+    return _active[-1] if _active else _NULL
+
+
+def _on_aws_call(service, operation, ms, retries):
+    m = current()
+    m.count(f"{service}.{operation}")
+    m.timing(f"{service}.{operation}.Latency", ms)
+    if retries:
+        m.count(f"{service}.{operation}.Retries", retries)
+
+
+def _hook_aws():
+    global _hooked
+    if _hooked:
+        return
+    with _lock:
+        if not _hooked:
+            try:
+                import aws_clients
+                aws_clients.add_latency_hook(_on_aws_call)
+            except ImportError:
+                pass
+            _hooked = True
+
+
+@contextmanager
+def stage(name, rates=(), **dimensions):
+    """เปิด stage: นับ Duration / Errors และ call ของ AWS ระหว่างนั้น แล้ว flush ตอนจบ"""
+    _hook_aws()
+    m = Metrics(name, rates=rates, **dimensions)
+    with _lock:
+        _active.append(m)
+    t0, failed = time.perf_counter(), False
+    try:
+        yield m
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        m.count("Errors", int(failed))   # 0 ด้วย → alarm เห็นว่ามี invocation ที่ไม่พัง
+        m.timing("Duration", (time.perf_counter() - t0) * 1000)
+        with _lock:
+            _active.remove(m)
+        m.flush()
@@ -0,0 +1,159 @@
+"""
+product_ranker.py — จัดอันดับสินค้าจาก label ปัญหาผิวทั้งชุดด้วย NumPy
+
+แคตตาล็อกเป็นคอลัมน์:
+- matrix : product × tag (float32) ค่า = น้ำหนักของ tag นั้นในสินค้า (1.0 หรือจาก item["tag_weights"])
+- rank   : rank ของสินค้า normalize เป็น 0..1
+- price  : ราคา (NaN = ไม่มีราคา)
+- brand  : รหัสแบรนด์ (int32) ของ brands (ตัวพิมพ์เล็ก)
+
+score = matrix @ label_vector + RANKER_RANK_WEIGHT * rank
+  label_vector มีค่าไม่เป็นศูนย์แค่ไม่กี่ช่อง → เก็บ matrix แบบ column-major แล้วบวกเฉพาะคอลัมน์ของ label ที่ขอ
+  (ได้ผลเท่า matmul แต่ไม่ต้องอ่านคอลัมน์ที่ไม่เกี่ยว)
+  สินค้าที่แก้ได้หลายปัญหาที่ตรวจเจอได้คะแนนก่อน rank ช่วยตัดสินในกลุ่มที่ตรงเท่ากัน
+  สินค้าที่ไม่ตรง label ใดเลยได้ -inf (ไม่ถูกเลือก)
+top-K ด้วย np.argpartition (O(n)) แล้วเรียงเฉพาะ K ชิ้นนั้น (score สูง → ต่ำ, เสมอกันเรียงตาม product_id)
+
+ใช้โดย RecommendSkincare (top-K ตาม label ทั้งชุด + ตัวกรองราคา/แบรนด์) และ recommender.recommend
+(เลือก 1 ชิ้นต่อ label จากสินค้าที่มี tag นั้น เรียงตามคะแนนของ label ทั้งชุด)
+ต้องมี NumPy layer (Dataset/build-pillow-layer.sh)
+"""
+from __future__ import annotations
+import os
+
+import lazy_import
+
+np = lazy_import.module("numpy")
+
+RANKER_RANK_WEIGHT = float(os.environ.get("RANKER_RANK_WEIGHT", "0.25"))
+
+
+def _num(v, default=float("nan")):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+class ProductRanker:
+    def __init__(self, products, rank_weight: float = RANKER_RANK_WEIGHT):
+        # เรียงตาม product_id ก่อน → index ต่ำ = product_id น้อย ใช้ตัดสินคะแนนเสมอได้เลย
+        products = sorted(products, key=lambda p: str(p.get("product_id", "")))
+        tags = sorted({t for p in products for t in (p.get("tags") or [])})
+        col = {t: j for j, t in enumerate(tags)}
+        rows, cols, vals = [], [], []
+        for i, p in enumerate(products):
+            tw = p.get("tag_weights") or {}
+            for t in set(p.get("tags") or []):
+                rows.append(i)
+                cols.append(col[t])
+                vals.append(_num(tw.get(t), 1.0))
+        matrix = np.zeros((len(products), len(tags)), dtype=np.float32)
+        if rows:
+            matrix[rows, cols] = vals
+        brands = sorted({str(p.get("brand") or "").lower() for p in products})
+        bcode = {b: k for k, b in enumerate(brands)}
+        self._init(
+            matrix, tags,
+            np.array([_num(p.get("rank"), 0.0) for p in products], dtype=np.float32),
+            np.array([_num(p.get("price")) for p in products], dtype=np.float32),
+            np.array([bcode[str(p.get("brand") or "").lower()] for p in products], dtype=np.int32),
+            brands, np.array([str(p.get("product_id", "")) for p in products]), products, rank_weight)
+
+    @classmethod
+    def from_columns(cls, matrix, tags, rank, price, brand_codes, brands, ids, products=None,
+                     rank_weight: float = RANKER_RANK_WEIGHT):
+        """สร้างจากคอลัมน์ที่มีอยู่แล้ว (ids ต้องเรียงจากน้อยไปมาก) — ไม่ต้องมี dict ของสินค้าทุกชิ้น"""
+        self = cls.__new__(cls)
+        self._init(np.asarray(matrix, dtype=np.float32), list(tags), np.asarray(rank, dtype=np.float32),
+                   np.asarray(price, dtype=np.float32), np.asarray(brand_codes, dtype=np.int32),
+                   [str(b).lower() for b in brands], np.asarray(ids), products, rank_weight)
+        return self
+
+    def _init(self, matrix, tags, rank, price, brand_codes, brands, ids, products, rank_weight):
+        self.matrix = np.asfortranarray(matrix)
+        self.tags = tags
+        self.tag_col = {t: j for j, t in enumerate(tags)}
+        top = float(rank.max()) if len(rank) else 0.0
+        self.rank = rank / top if top > 0 else np.zeros_like(rank)
+        self.price = price
+        self.brand = brand_codes
+        self.brands = brands
+        self.brand_code = {b: k for k, b in enumerate(brands)}
+        self.ids = ids
+        self.products = products
+        self.rank_weight = rank_weight
+
+    def __len__(self):
+        return len(self.ids)
+
+    def label_vector(self, labels, weights=None) -> np.ndarray:
+        """label → น้ำหนัก (ค่าเริ่มต้น 1.0; label ที่ไม่มีในแคตตาล็อกถูกข้าม)"""
+        vec = np.zeros(len(self.tags), dtype=np.float32)
+        for label in labels:
+            j = self.tag_col.get(label)
+            if j is not None:
+                vec[j] += (weights or {}).get(label, 1.0)
+        return vec
+
+    def scores(self, labels, weights=None) -> np.ndarray:
+        vec = self.label_vector(labels, weights)
+        match = np.zeros(len(self.ids), dtype=np.float32)
+        for j in np.flatnonzero(vec):
+            col = self.matrix[:, j]
+            match += col if vec[j] == 1 else vec[j] * col
+        s = match + np.float32(self.rank_weight) * self.rank
+        s[match <= 0] = -np.inf
+        return s
+
+    def _brand_mask(self, names):
+        lut = np.zeros(len(self.brands), dtype=bool)
+        lut[[self.brand_code[b] for b in (str(n).lower() for n in names) if b in self.brand_code]] = True
+        return lut[self.brand]
+
+    def select(self, scores, k=10, require=None, min_price=None, max_price=None, brands=None,
+               exclude_brands=None, allow=None) -> np.ndarray:
+        """
+        index ของ top-K ตาม scores หลังกรอง
+        require = tag ที่สินค้าต้องมี, allow = bool ต่อ row (เช่น ingredient_index.allowed)
+        """
+        s = scores
+        if require is not None or min_price is not None or max_price is not None or brands or exclude_brands \
+                or allow is not None:
+            s = scores.copy()
+            if allow is not None:
+                s[~allow] = -np.inf
+            if require is not None:
+                j = self.tag_col.get(require)
+                if j is None:
+                    return np.empty(0, dtype=np.int64)
+                s[self.matrix[:, j] <= 0] = -np.inf
+            # NaN เทียบแล้วได้ False → สินค้าไม่มีราคาถูกตัดเมื่อกรองราคา
+            if min_price is not None:
+                s[~(self.price >= float(min_price))] = -np.inf
+            if max_price is not None:
+                s[~(self.price <= float(max_price))] = -np.inf
+            if brands:
+                s[~self._brand_mask(brands)] = -np.inf
+            if exclude_brands:
+                s[self._brand_mask(exclude_brands)] = -np.inf
+        # ตัดชิ้นที่ -inf ออกก่อน: argpartition ช้ามากเมื่อมีค่าซ้ำกันจำนวนมาก (เช่นหลังกรองแบรนด์)
+        cand = np.flatnonzero(np.isfinite(s))
+        k = min(int(k), len(cand))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        sc = s[cand]
+        top = np.argpartition(sc, len(sc) - k)[len(sc) - k:]
+        # argpartition เลือกชิ้นที่ score เท่ากับอันดับ K แบบไม่แน่นอน → เอา product_id น้อยสุดของกลุ่มนั้นแทน
+        thr = sc[top].min()
+        above = top[sc[top] > thr]
+        top = np.concatenate([above, np.flatnonzero(sc == thr)[:k - len(above)]])
+        idx = cand[top]
+        return idx[np.lexsort((idx, -s[idx]))]
+
+    def top_k(self, labels, k=10, weights=None, **filters) -> list:
+        """สินค้า (dict) หรือ product_id (ถ้าสร้างจาก from_columns โดยไม่มี products) k ชิ้นแรก"""
+        idx = self.select(self.scores(labels, weights), k, **filters)
+        if self.products is not None:
+            return [self.products[i] for i in idx]
+        return [str(self.ids[i]) for i in idx]
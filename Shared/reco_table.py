@@ -0,0 +1,181 @@
+"""
+reco_table.py — ตารางคำแนะนำที่คำนวณไว้ล่วงหน้าสำหรับทุกชุด label (2^11 = 2048 ชุด)
+
+โมเดลมี 11 class (detectors.SKIN_LABELS) และแคตตาล็อกเปลี่ยนไม่บ่อย
+→ Product/materialize_reco_table.py จัดอันดับ (product_ranker) ทุกชุด label ครั้งเดียวต่อ catalog version
+  แล้วเขียน artifact (JSON gzip) ลง s3://RECO_TABLE_BUCKET/RECO_TABLE_KEY
+→ ลัมบ์ดาแนะนำสินค้าโหลด artifact ตอน cold start แล้วตอบด้วยการเปิด list ตาม bitmask ของ label
+
+artifact
+  labels          : ลำดับ bit (bit i = labels[i])
+  catalog_version : version marker ของ SkincareProducts ตอนสร้าง (catalog_cache.read_version)
+  products        : สินค้าที่ถูกอ้างถึง (เก็บครั้งเดียว) ทุก list ด้านล่างเป็น index ของ list นี้
+  top[mask]       : top-K (RECO_TOP_K) ของชุด label   → RecommendSkincare
+  pools[mask]     : ต่อ label ใน mask (เรียงตาม bit) สินค้าที่มี tag นั้น RECOMMEND_TOP_K + จำนวน label ชิ้นแรก
+                    → recommender.recommend (ยังเลือกด้วย seed ตอน serve เหมือนเดิม)
+
+stale เมื่อ version marker ในตารางไม่ตรงกับ artifact (เช็คทุก CATALOG_VERSION_CHECK_SECS) หรืออายุเกิน
+RECO_TABLE_MAX_AGE_SECS → ลองโหลด artifact ใหม่จาก S3 ถ้ายังไม่ตรงก็ตอบ None ให้ผู้เรียกจัดอันดับสดแทน
+
+ปิดได้ด้วย RECO_TABLE_BUCKET="" (ค่าเริ่มต้น)
+"""
+import os, time, json, gzip, logging, threading
+
+from detectors import SKIN_LABELS
+from catalog_cache import read_version, CATALOG_VERSION_CHECK_SECS
+from recommender import RECOMMEND_TOP_K, DecimalEncoder
+
+logger = logging.getLogger(__name__)
+
+RECO_TABLE_BUCKET = os.environ.get("RECO_TABLE_BUCKET", "").strip()
+RECO_TABLE_KEY = os.environ.get("RECO_TABLE_KEY", "artifacts/reco_table.json.gz")
+RECO_TABLE_MAX_AGE_SECS = float(os.environ.get("RECO_TABLE_MAX_AGE_SECS", "86400"))
+RECO_TOP_K = int(os.environ.get("RECO_TOP_K", "10"))
+FORMAT = 1
+
+
+def label_mask(labels, order=SKIN_LABELS):
+    """bitmask ของชุด label หรือ None ถ้ามี label ที่ไม่อยู่ใน order"""
+    bit = {l: i for i, l in enumerate(order)}
+    mask = 0
+    for l in labels:
+        if l not in bit:
+            return None
+        mask |= 1 << bit[l]
+    return mask
+
+
+def build(ranker, version=None, labels=SKIN_LABELS, top_k=RECO_TOP_K, pool_k=None):
+    """จัดอันดับทุกชุด label ด้วย ProductRanker → dict ของ artifact"""
+    pool_k = RECOMMEND_TOP_K if pool_k is None else pool_k
+    ref = {}   # index ใน ranker → index ใน products ของ artifact
+
+    def ids(idx):
+        return [ref.setdefault(int(i), len(ref)) for i in idx]
+
+    top, pools = [], []
+    for mask in range(1 << len(labels)):
+        chosen = [l for i, l in enumerate(labels) if mask >> i & 1]
+        if not chosen:
+            top.append([])
+            pools.append([])
+            continue
+        s = ranker.scores(chosen)
+        top.append(ids(ranker.select(s, top_k)))
+        # เท่ากับที่ recommender.recommend ขอเมื่อจัดอันดับสด: RECOMMEND_TOP_K + จำนวน label
+        pools.append([ids(ranker.select(s, pool_k + len(chosen), require=l)) for l in chosen])
+    products = [None] * len(ref)
+    for i, j in ref.items():
+        products[j] = ranker.products[i]
+    return {"format": FORMAT, "labels": list(labels), "catalog_version": version, "built_at": time.time(),
+            "top_k": top_k, "pool_k": pool_k, "rank_weight": ranker.rank_weight,
+            "products": products, "top": top, "pools": pools}
+
+
+def dumps(artifact) -> bytes:
+    return gzip.compress(json.dumps(artifact, cls=DecimalEncoder, ensure_ascii=False,
+                                    separators=(",", ":")).encode("utf-8"))
+
+
+def loads(body: bytes) -> dict:
+    return json.loads(gzip.decompress(body))
+
+
+class RecoTable:
+    """artifact ที่โหลดไว้ในหน่วยความจำ + เช็คว่ายังตรงกับแคตตาล็อก"""
+
+    def __init__(self, s3, bucket=RECO_TABLE_BUCKET, key=RECO_TABLE_KEY, table=None,
+                 version_check_secs: float = CATALOG_VERSION_CHECK_SECS, max_age_secs: float = RECO_TABLE_MAX_AGE_SECS):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.table = table                 # SkincareProducts (อ่าน version marker) — None = ไม่เช็ค version
+        self.version_check = version_check_secs
+        self.max_age = max_age_secs
+        self._art = None
+        self._etag = None
+        self._stale = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "fallbacks": 0, "loads": 0, "errors": 0}
+        with self._lock:
+            self._refresh(time.time())     # โหลดตอน cold start
+
+    def _load(self):
+        kw = {"Bucket": self.bucket, "Key": self.key}
+        if self._etag:
+            kw["IfNoneMatch"] = self._etag
+        try:
+            resp = self.s3.get_object(**kw)
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") in ("304", "NotModified"):
+                return False   # artifact เดิม (ETag เดิม) → ไม่ต้อง parse ซ้ำ
+            raise
+        t0 = time.perf_counter()
+        art = loads(resp["Body"].read())
+        if art.get("format") != FORMAT:
+            raise ValueError(f"unsupported reco table format {art.get('format')}")
+        self._art, self._etag = art, resp.get("ETag")
+        self.stats["loads"] += 1
+        logger.info(f"📦 reco table loaded: version={art.get('catalog_version')} masks={len(art['top'])} "
+                    f"products={len(art['products'])} parse_ms={(time.perf_counter() - t0) * 1000:.0f}")
+        return True
+
+    def _outdated(self, art, current, now):
+        return art is None or (self.table is not None and art.get("catalog_version") != current) \
+            or now - art.get("built_at", 0) >= self.max_age
+
+    def _refresh(self, now):
+        self._checked_at = now
+        try:
+            current = read_version(self.table) if self.table is not None else None
+            if self._outdated(self._art, current, now):
+                self._load()   # job อาจเขียน artifact ของ version ใหม่แล้ว
+            self._stale = self._outdated(self._art, current, now)
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._stale = True
+            logger.warning(f"reco table refresh failed: {e}")
+
+    def _entry(self, labels):
+        with self._lock:
+            now = time.time()
+            if now - self._checked_at >= self.version_check:
+                self._refresh(now)
+            art, stale = self._art, self._stale
+        if art is None or stale:
+            self.stats["fallbacks"] += 1
+            return None, None
+        mask = label_mask(labels, art["labels"])
+        if mask is None:
+            self.stats["misses"] += 1
+            return None, None
+        self.stats["hits"] += 1
+        return art, mask
+
+    def top(self, labels, k=RECO_TOP_K):
+        """top-k ของชุด label หรือ None (stale / label นอกตาราง / k เกินที่คำนวณไว้) → ให้จัดอันดับสด"""
+        art, mask = self._entry(labels) if labels else (None, None)
+        if art is None or k > art["top_k"]:
+            return None
+        return [art["products"][i] for i in art["top"][mask][:k]]
+
+    def pools(self, labels):
+        """{label: สินค้าเรียงตามคะแนน} สำหรับ recommender.pick หรือ None → ให้จัดอันดับสด"""
+        art, mask = self._entry(labels) if labels else (None, None)
+        if art is None or art["pool_k"] < RECOMMEND_TOP_K:
+            return None
+        chosen = [l for i, l in enumerate(art["labels"]) if mask >> i & 1]
+        prods = art["products"]
+        return {l: [prods[i] for i in ids] for l, ids in zip(chosen, art["pools"][mask])}
+
+    def snapshot(self) -> dict:
+        s = dict(self.stats)
+        art = self._art
+        if art is not None:
+            s.update(version=art.get("catalog_version"), age_s=round(time.time() - art.get("built_at", 0), 1),
+                     stale=self._stale)
+        return s
+
+    def log_stats(self):
+        logger.info(f"📊 reco_table {json.dumps(self.snapshot())}")
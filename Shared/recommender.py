@@ -0,0 +1,167 @@
+"""
+recommender.py — logic ของ GenerateRecommendationFile ที่เรียกใช้ซ้ำได้
+
+ใช้โดย
+- Frontend/Py/GenerateRecommendationFile.py (S3 event ของ results/...json)
+- Frontend/Py/analyze_skin.py เมื่อ FUSED_RECOMMEND=both|final (เรียกใน invocation เดียวกับการวิเคราะห์)
+
+หาสินค้าของทุก label ในครั้งเดียว (candidates) ตามแหล่งที่มี:
+  catalog (snapshot จาก catalog_cache.CatalogCache) → หน่วยความจำ ไม่เรียก DynamoDB
+  index   (ตาราง tag_index)                          → Query ทุก label พร้อมกัน
+  table   (SkincareProducts)                          → Scan รอบเดียวด้วย OR ของทุก label แล้วแยกตาม tag
+แล้วจัดอันดับด้วย product_ranker.ProductRanker (คะแนนต่อ label ทั้งชุด: สินค้าที่แก้ได้หลายปัญหาขึ้นก่อน)
+และเลือกแบบ deterministic จาก RECOMMEND_TOP_K อันดับแรกของแต่ละ label ด้วย hash ของ seed + label
+(seed เดียวกัน → ได้สินค้าเดิมเสมอ; ค่าเริ่มต้นใช้ key ของไฟล์ผลวิเคราะห์)
+"""
+import os, json, hashlib
+from decimal import Decimal
+from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
+
+from tag_index import query_tag, conditions
+from product_ranker import ProductRanker
+
+PRODUCT_TABLE = os.environ.get("PRODUCT_TABLE", "SkincareProducts")
+RECOMMEND_TOP_K = int(os.environ.get("RECOMMEND_TOP_K", "5"))
+RECOMMEND_SEED  = os.environ.get("RECOMMEND_SEED", "")          # ว่าง = ใช้ seed ที่ผู้เรียกส่งมา (key ของภาพ)
+LOOKUP_WORKERS  = int(os.environ.get("RECOMMEND_LOOKUP_WORKERS", "8"))
+
+
+# Helper แปลง Decimal เป็นเลขปกติ
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+
+def product_table():
+    import aws_clients
+    return aws_clients.table(PRODUCT_TABLE)
+
+
+def rank_key(p):
+    try:
+        r = float(p.get('rank') or 0)
+    except (TypeError, ValueError):
+        r = 0.0
+    return (-r, str(p.get('product_id', '')))
+
+
+def _scan_tags(table, labels):
+    """Scan รอบเดียว (ทุกหน้า) แล้วแยกสินค้าตาม label ที่ต้องการ"""
+    wanted = set(labels)
+    out = {l: [] for l in labels}
+    kw = {"FilterExpression": reduce(lambda a, b: a | b, [conditions.Attr('tags').contains(l) for l in labels])}
+    while True:
+        resp = table.scan(**kw)
+        for item in resp.get('Items', []):
+            for t in wanted.intersection(item.get('tags') or []):
+                out[t].append(item)
+        if "LastEvaluatedKey" not in resp:
+            break
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    for lst in out.values():
+        lst.sort(key=rank_key)
+    return out
+
+
+def candidates(labels, table=None, catalog=None, index=None, limit=None):
+    """{label: [สินค้าเรียงตาม rank]} ของทุก label ด้วย lookup ชุดเดียว (ไม่วนทีละ label แบบ serial)"""
+    labels = list(dict.fromkeys(labels))
+    if not labels:
+        return {}
+    if catalog is not None:
+        return {l: catalog.tag(l, limit) for l in labels}
+    if index is not None:
+        with ThreadPoolExecutor(max_workers=max(1, min(LOOKUP_WORKERS, len(labels)))) as ex:
+            return dict(zip(labels, ex.map(lambda l: query_tag(index, l, limit=limit), labels)))
+    out = _scan_tags(table, labels)
+    return {l: v[:limit] if limit else v for l, v in out.items()}
+
+
+def pick(label, items, seed=None, taken=()):
+    """
+    สินค้า 1 ชิ้นสำหรับ label: ตัดชิ้นที่ label อื่นเลือกไปแล้ว (ถ้ายังมีตัวเลือกอื่น)
+    แล้วเลือกจาก RECOMMEND_TOP_K อันดับแรกด้วย hash(seed|label) — seed=None เลือกอันดับ 1
+    """
+    pool = [p for p in items if p.get('product_id') not in taken] or items
+    pool = pool[:max(1, RECOMMEND_TOP_K)]
+    if not pool:
+        return None
+    if seed is None:
+        return pool[0]
+    h = int(hashlib.sha256(f"{seed}|{label}".encode("utf-8")).hexdigest()[:12], 16)
+    return pool[h % len(pool)]
+
+
+def ranked_pools(labels, table=None, catalog=None, index=None):
+    """
+    {label: สินค้าที่มี tag นั้น เรียงตามคะแนนของ label ทั้งชุด} (จัดอันดับสด)
+    ไม่มี catalog → โหลดสินค้า "ทุกชิ้น" ที่มี tag ใด tag หนึ่งของชุด (ไม่ตัดที่ top-K ต่อ label)
+    สินค้านอกชุดนี้ได้ -inf อยู่แล้ว จึงได้ลำดับเดียวกับการจัดอันดับทั้งแคตตาล็อก
+    (ต่างกันแค่ตัวหาร normalize rank ซึ่งไม่เปลี่ยนลำดับเมื่อน้ำหนัก tag = 1 และ RANKER_RANK_WEIGHT < 1)
+    """
+    # เผื่อชิ้นที่ซ้ำกับ label อื่นไว้ len(labels) ชิ้น
+    k = RECOMMEND_TOP_K + len(labels)
+    if catalog is not None:
+        ranker = catalog.ranker()
+    else:
+        # ตัดที่ k ต่อ label ไม่ได้: ชิ้น rank ต่ำที่ตรงหลาย label ชนะชิ้น rank สูงที่ตรง label เดียว
+        cands = candidates(labels, table, catalog, index)
+        ranker = ProductRanker({p['product_id']: p for v in cands.values() for p in v}.values())
+    scores = ranker.scores(labels)   # คำนวณครั้งเดียว ใช้กับทุก label
+    return {label: [ranker.products[i] for i in ranker.select(scores, k, require=label)] for label in labels}
+
+
+def recommend(labels, table=None, catalog=None, index=None, seed=None, reco=None):
+    """
+    สินค้า 1 ชิ้นต่อปัญหาผิว จากสินค้าที่มี tag ตรงกับ label (ผลเหมือนเดิมทุกครั้งสำหรับ seed เดียวกัน)
+    reco    : reco_table.RecoTable — ถ้ามีผลของชุด label นี้และยังไม่ stale ใช้เลยโดยไม่ต้องจัดอันดับ
+    catalog : Catalog snapshot หรือฟังก์ชันที่คืน snapshot (เช่น CatalogCache.get) → โหลดเมื่อ reco ใช้ไม่ได้เท่านั้น
+    """
+    if not labels:
+        return []   # ไม่ต้องโหลด catalog / reco เปล่าๆ
+    seed = RECOMMEND_SEED or seed
+    pools = reco.pools(labels) if reco is not None else None
+    if pools is None:
+        pools = ranked_pools(labels, table, catalog() if callable(catalog) else catalog, index)
+    recommendations, taken = [], set()
+    for label in labels:
+        selected_product = pick(label, pools.get(label) or [], seed, taken)
+        if selected_product:
+            taken.add(selected_product.get('product_id'))
+            recommendations.append({
+                "problem": label,
+                "name": selected_product.get('name'),
+                "brand": selected_product.get('brand'),
+                "price": selected_product.get('price'),
+                "image_url": selected_product.get('image_url'),
+                "ingredients": selected_product.get('ingredients', '')
+            })
+    return recommendations
+
+
+def final_output(input_data, recommendations):
+    out = {
+        "user_info": input_data.get('source', {}),
+        "analysis_labels": input_data.get('labels', []),
+        "recommendations": recommendations
+    }
+    # ภาพไม่ผ่าน quality gate → ส่งต่อให้หน้าเว็บบอกผู้ใช้ถ่ายใหม่
+    for k in ("retake", "message", "quality"):
+        if k in input_data:
+            out[k] = input_data[k]
+    return out
+
+
+def recommendation_key_for(results_key: str) -> str:
+    # results/.../a.jpg.json → recommendations/.../a.jpg_final.json
+    new_key = results_key.replace("results/", "recommendations/")
+    if new_key.endswith(".json"):
+        return new_key[:-5] + "_final.json"
+    return new_key + "_final.json"
+
+
+def dumps(data) -> str:
+    return json.dumps(data, cls=DecimalEncoder, ensure_ascii=False)
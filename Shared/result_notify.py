@@ -0,0 +1,157 @@
+"""
+result_notify.py — แจ้งว่าผลของภาพที่อัปโหลดพร้อมแล้ว แทนการให้ browser poll S3 ทุก 3 วินาที
+
+ฝั่งเขียน (analyze_skin, GenerateRecommendationFile) เรียก publish(stage, bucket, key, data)
+หลังเขียน results/... หรือ recommendations/... ลง S3
+ฝั่งอ่าน (Frontend/Py/wait_result.py) เรียก wait(upload_key, stage, timeout) แบบ long-poll
+
+ทุก stage ของภาพเดียวกันใช้ item เดียว key = upload key (uploads/user=.../xxx.jpg)
+backend (RESULT_NOTIFY_BACKEND):
+- dynamodb : ตาราง RESULT_NOTIFY_TABLE, partition key = upload_key (S), เปิด TTL ที่ expires_at
+             ฝั่ง wait อ่านแบบ ConsistentRead ถี่ๆ ฝั่ง server (client ถือ connection เดียว)
+- memory   : dict + Condition ในโปรเซส (push จริง) ใช้ตอนรัน local / benchmark
+- off      : ไม่ส่งอะไร (ค่าเริ่มต้นเมื่อไม่ได้ตั้ง RESULT_NOTIFY_TABLE)
+"""
+import os, json, time, logging, threading
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_TABLE    = os.environ.get("RESULT_NOTIFY_TABLE", "").strip()
+NOTIFY_BACKEND  = os.environ.get("RESULT_NOTIFY_BACKEND", "dynamodb" if NOTIFY_TABLE else "off").lower()
+NOTIFY_TTL_SECS = int(os.environ.get("RESULT_NOTIFY_TTL_SECS", "3600"))
+POLL_MIN_SECS   = float(os.environ.get("RESULT_NOTIFY_POLL_SECS", "0.1"))
+POLL_MAX_SECS   = 0.5
+# DynamoDB item จำกัด 400KB → ผลที่ใหญ่กว่านี้เก็บแค่ตำแหน่งใน S3
+MAX_INLINE_BYTES = 300_000
+
+STAGES = ("results", "recommendations")
+
+
+def upload_key_for(key: str) -> str:
+    """
+    results/user=.../a.jpg.json             → uploads/user=.../a.jpg
+    recommendations/user=.../a.jpg_final.json → uploads/user=.../a.jpg
+    uploads/user=.../a.jpg                  → เหมือนเดิม
+    """
+    key = key.lstrip("/")
+    for prefix in ("results/", "recommendations/"):
+        if key.startswith(prefix):
+            key = "uploads/" + key[len(prefix):]
+            break
+    for suffix in ("_final.json", ".json"):
+        if key.endswith(suffix):
+            key = key[:-len(suffix)]
+            break
+    return key
+
+
+def _json_default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+
+def _record(bucket, key, data):
+    rec = {"bucket": bucket, "key": key, "at": round(time.time(), 3)}
+    if data is not None:
+        body = json.dumps(data, ensure_ascii=False, default=_json_default)
+        if len(body.encode("utf-8")) <= MAX_INLINE_BYTES:
+            rec["body"] = body
+    return rec
+
+
+class MemoryStore:
+    def __init__(self):
+        self._items = {}
+        self._cond = threading.Condition()
+
+    def put(self, upload_key, stage, rec):
+        with self._cond:
+            self._items.setdefault(upload_key, {})[stage] = rec
+            self._cond.notify_all()
+
+    def get(self, upload_key, stage):
+        with self._cond:
+            return self._items.get(upload_key, {}).get(stage)
+
+    def wait(self, upload_key, stage, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                rec = self._items.get(upload_key, {}).get(stage)
+                left = deadline - time.monotonic()
+                if rec is not None or left <= 0:
+                    return rec
+                self._cond.wait(left)
+
+
+class DynamoStore:
+    def __init__(self, table_name=NOTIFY_TABLE, table=None, ttl_secs=NOTIFY_TTL_SECS):
+        self.table_name = table_name
+        self._table = table
+        self.ttl = ttl_secs
+
+    def _get_table(self):
+        if self._table is None:
+            import aws_clients
+            self._table = aws_clients.table(self.table_name)
+        return self._table
+
+    def put(self, upload_key, stage, rec):
+        # update แทน put → stage อื่นของภาพเดียวกันไม่ถูกเขียนทับ
+        self._get_table().update_item(
+            Key={"upload_key": upload_key},
+            UpdateExpression="SET #s = :r, expires_at = :e",
+            ExpressionAttributeNames={"#s": stage},
+            ExpressionAttributeValues={":r": json.dumps(rec, ensure_ascii=False),
+                                       ":e": int(time.time()) + self.ttl},
+        )
+
+    def get(self, upload_key, stage):
+        item = self._get_table().get_item(Key={"upload_key": upload_key}, ConsistentRead=True,
+                                          ProjectionExpression="#s",
+                                          ExpressionAttributeNames={"#s": stage}).get("Item")
+        return json.loads(item[stage]) if item and stage in item else None
+
+    def wait(self, upload_key, stage, timeout):
+        deadline = time.monotonic() + timeout
+        delay = POLL_MIN_SECS
+        while True:
+            rec = self.get(upload_key, stage)
+            left = deadline - time.monotonic()
+            if rec is not None or left <= 0:
+                return rec
+            time.sleep(min(delay, left))
+            delay = min(POLL_MAX_SECS, delay * 1.5)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """store ตาม RESULT_NOTIFY_BACKEND (None = ปิด) ใช้ instance เดียวทั้ง container"""
+    global _store
+    if NOTIFY_BACKEND == "off":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = MemoryStore() if NOTIFY_BACKEND == "memory" else DynamoStore()
+    return _store
+
+
+def publish(stage, bucket, key, data=None, store=None) -> bool:
+    """
+    แจ้งว่าเขียน s3://bucket/key ของ stage นี้แล้ว (data = เนื้อ JSON ที่เพิ่งเขียน)
+    best effort: S3 ยังเป็นที่เก็บผลหลัก ถ้าแจ้งไม่สำเร็จ client ยัง fallback ไปอ่าน S3 ได้
+    """
+    store = store or get_store()
+    if store is None:
+        return False
+    try:
+        store.put(upload_key_for(key), stage, _record(bucket, key, data))
+        return True
+    except Exception as e:
+        logger.warning(f"result notify failed for {key}: {e}")
+        return False
@@ -0,0 +1,392 @@
+"""
+skin_analyzer.py — แกนกลางของ analyze_skin ที่ใช้ร่วมกันทุกเวอร์ชัน
+(Frontend/Py/analyze_skin.py, Frontend/Py/cross-account/analyze_skin.py, UserUpload/byNam/analyze_skin.py)
+
+แหล่งภาพ (image source) เลือกได้ 3 แบบ:
+- S3ObjectSource    : ส่ง {"S3Object": ...} ให้ Rekognition อ่านเอง → ภาพไม่ผ่าน Lambda เลย (0 bytes)
+- S3BytesSource     : get_object แล้วส่ง {"Bytes": ...}
+- PresignedUrlSource: ดาวน์โหลดจาก presigned URL แล้วส่ง {"Bytes": ...} (กรณี cross-account)
+
+IMAGE_SOURCE=auto (ค่าเริ่มต้น) ใช้ S3Object ก่อน ถ้า Rekognition อ่าน bucket ไม่ได้จะ fallback เป็น bytes ให้เอง
+
+การตรวจ label ทำผ่าน detector (Shared/detectors.py) → DETECTOR_BACKEND=local ใช้ stub แทนโมเดลจริงได้
+
+QUALITY_GATE=on|shadow ครอบ source ด้วย GatedSource: ตรวจเบลอ/แสง/ขนาด/ผิว (Shared/image_quality.py) ก่อนเรียกโมเดล
+ภาพที่ไม่ผ่านได้ผล retake ทันทีโดยไม่เรียก Rekognition
+
+NORMALIZE_IMAGES=true ครอบ source ด้วย NormalizedSource: letterbox ภาพเป็น 640×640 แบบเดียวกับตอน train
+(Shared/image_letterbox.py, ต้องมี Pillow layer) และเก็บภาพที่ normalize แล้วไว้ใต้ NORMALIZED_PREFIX เพื่อใช้ซ้ำ
+"""
+import os, json, time, logging, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_cache import InferenceCache, sha256_hex
+from inference_dispatch import Throttle, ThrottledError
+import metrics
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SOURCE    = os.environ.get("IMAGE_SOURCE", "auto").lower()   # auto | s3object | bytes
+MAX_WORKERS     = int(os.environ.get("MAX_WORKERS", "4"))
+URL_TIMEOUT     = float(os.environ.get("IMAGE_URL_TIMEOUT", "15"))
+NORMALIZE_IMAGES  = os.environ.get("NORMALIZE_IMAGES", "false").lower() == "true"
+NORMALIZE_SIDE    = int(os.environ.get("NORMALIZE_SIDE", "640"))
+NORMALIZED_PREFIX = os.environ.get("NORMALIZED_PREFIX", "normalized/")   # ว่าง = ไม่เก็บลง S3
+QUALITY_GATE      = os.environ.get("QUALITY_GATE", "off").lower()         # off | shadow | on
+
+# error ที่แปลว่า Rekognition อ่าน object ใน S3 เองไม่ได้ → ลองส่ง bytes แทน
+_S3OBJECT_ERRORS = {"InvalidS3ObjectException", "AccessDeniedException", "AccessDenied"}
+
+
+# ---------- image sources ----------
+class S3ObjectSource:
+    mode = "s3object"
+
+    def __init__(self, bucket, key, etag=None):
+        self.bucket, self.key, self.content_hash = bucket, key, etag
+
+    def load(self, s3):
+        return {"S3Object": {"Bucket": self.bucket, "Name": self.key}}, 0
+
+
+class S3BytesSource:
+    mode = "bytes"
+
+    def __init__(self, bucket, key, etag=None):
+        self.bucket, self.key, self.content_hash = bucket, key, etag
+
+    def load(self, s3):
+        data = s3.get_object(Bucket=self.bucket, Key=self.key)["Body"].read()
+        self.content_hash = self.content_hash or sha256_hex(data)
+        return {"Bytes": data}, len(data)
+
+
+class PresignedUrlSource:
+    mode = "presigned_url"
+
+    def __init__(self, url, etag=None):
+        self.url, self.content_hash = url, etag
+
+    def load(self, s3):
+        with urllib.request.urlopen(self.url, timeout=URL_TIMEOUT) as r:
+            data = r.read()
+        self.content_hash = self.content_hash or sha256_hex(data)
+        return {"Bytes": data}, len(data)
+
+
+class NormalizedSource:
+    """
+    letterbox ภาพจาก source ข้างใน แล้วส่ง bytes ที่เล็กลงให้ Rekognition
+    ถ้ามี cache_bucket/cache_key: ครั้งแรกเขียนภาพ normalize ลง S3, ครั้งต่อไปส่งเป็น S3Object ได้เลย
+    """
+    mode = "normalized"
+
+    def __init__(self, inner, side=NORMALIZE_SIDE, cache_bucket=None, cache_key=None):
+        self.inner, self.side = inner, side
+        self.cache_bucket, self.cache_key = cache_bucket, cache_key
+
+    @property
+    def content_hash(self):
+        # ผลของภาพ normalize ต่างจากภาพต้นฉบับ → แยก key ใน inference cache
+        h = self.inner.content_hash
+        return f"{h}#lb{self.side}" if h else None
+
+    def load(self, s3):
+        if self.cache_bucket and self.cache_key:
+            try:
+                s3.head_object(Bucket=self.cache_bucket, Key=self.cache_key)
+                return {"S3Object": {"Bucket": self.cache_bucket, "Name": self.cache_key}}, 0
+            except Exception:
+                pass
+        from image_letterbox import letterbox_jpeg
+        image, moved = self.inner.load(s3)
+        data = image.get("Bytes")
+        if data is None:  # inner เป็น S3Object → ต้องโหลด bytes มาแปลง
+            data = s3.get_object(Bucket=self.inner.bucket, Key=self.inner.key)["Body"].read()
+            moved = len(data)
+        small = letterbox_jpeg(data, self.side)
+        if self.cache_bucket and self.cache_key:
+            try:
+                s3.put_object(Bucket=self.cache_bucket, Key=self.cache_key, Body=small, ContentType="image/jpeg")
+            except Exception as e:
+                logger.warning(f"cannot cache normalized image: {e}")
+        return {"Bytes": small}, moved
+
+
+class RetakePhoto(Exception):
+    """ภาพไม่ผ่าน quality gate → ไม่ต้องเรียกโมเดล"""
+    def __init__(self, report):
+        super().__init__(",".join(report["reasons"]))
+        self.report = report
+
+
+class GatedSource:
+    """
+    โหลด bytes จาก source ข้างใน แล้วตรวจคุณภาพก่อนส่งเข้าโมเดล
+    ต้องใช้ bytes อยู่แล้ว → ส่ง {"Bytes": ...} ให้ Rekognition เลย (ไม่ให้ภาพวิ่งสองรอบ)
+    enforce=False (shadow) = คำนวณ + log อย่างเดียว
+    """
+    def __init__(self, inner, enforce=True):
+        self.inner, self.enforce = inner, enforce
+        self.mode = inner.mode
+        self.report = None
+
+    @property
+    def content_hash(self):
+        return self.inner.content_hash
+
+    def load(self, s3):
+        from image_quality import assess
+        image, moved = self.inner.load(s3)
+        data = image.get("Bytes")
+        if data is None:
+            data = s3.get_object(Bucket=self.inner.bucket, Key=self.inner.key)["Body"].read()
+            image, moved = {"Bytes": data}, len(data)
+        self.report = assess(data)
+        m = self.report["metrics"]
+        logger.info(f"🔎 quality ok={self.report['ok']} reasons={self.report['reasons']} "
+                    f"blur={m['blur_var']} bright={m['brightness']} skin={m['skin_ratio']} "
+                    f"gate_ms={self.report['timings_ms']['total']}")
+        if self.enforce and not self.report["ok"]:
+            raise RetakePhoto(self.report)
+        return image, moved
+
+
+def gated(source, mode=None):
+    """ครอบ source ด้วย GatedSource ตาม QUALITY_GATE (off = คืน source เดิม)"""
+    mode = (mode or QUALITY_GATE).lower()
+    if mode == "off":
+        return source
+    return GatedSource(source, enforce=(mode == "on"))
+
+
+def quality_fields(out) -> dict:
+    """field ที่ใส่เพิ่มในไฟล์ผลเมื่อภาพไม่ผ่าน gate (โหมด shadow ไม่มี retake)"""
+    if not out.get("retake"):
+        return {}
+    q = out["quality"]
+    from image_quality import RETAKE_MESSAGE
+    return {"retake": True, "message": RETAKE_MESSAGE, "quality": {"reasons": q["reasons"], "metrics": q["metrics"]}}
+
+
+def normalized_key_for(src_key: str, prefix: str = None) -> str:
+    prefix = NORMALIZED_PREFIX if prefix is None else prefix
+    if not prefix:
+        return None
+    rest = src_key[len("uploads/"):] if src_key.startswith("uploads/") else src_key
+    return f"{prefix}{rest}.jpg"
+
+
+def s3_source(bucket, key, etag=None, mode=None):
+    """เลือก source สำหรับภาพที่อยู่ใน S3 ตาม IMAGE_SOURCE"""
+    mode = (mode or IMAGE_SOURCE).lower()
+    if mode == "bytes":
+        return S3BytesSource(bucket, key, etag)
+    return S3ObjectSource(bucket, key, etag)
+
+
+def _error_code(e):
+    return getattr(e, "response", {}).get("Error", {}).get("Code") or type(e).__name__
+
+
+# ---------- analyzer ----------
+class SkinAnalyzer:
+    def __init__(self, detector, s3, min_confidence, cache=None, throttle: Throttle = None):
+        self.detector = detector
+        self.s3 = s3
+        self.min_confidence = min_confidence
+        self.cache = cache
+        # local stub ไม่มี capacity จำกัด → ไม่ต้องผ่าน throttle
+        self.throttle = throttle if getattr(detector, "rate_limited", True) else None
+
+    def _cache_key(self, content_hash):
+        if self.cache is None or not content_hash:
+            return None
+        return InferenceCache.make_key(content_hash, self.detector.model_id, self.min_confidence)
+
+    def _detect(self, image):
+        def call():
+            return self.detector.detect(image, self.min_confidence)
+        # token bucket + AIMD + backoff เมื่อโดน ThrottlingException (ดู inference_dispatch.py)
+        found = self.throttle.call(call) if self.throttle else call()
+        return sorted({lbl["Name"] for lbl in found})
+
+    def analyze(self, source, fallback=None):
+        """
+        คืน dict: labels, via (โหมดที่ใช้จริง), cache (hit/miss/off), bytes_moved, payload_bytes, timings_ms
+        fallback = source สำรองเมื่อ Rekognition อ่าน S3Object ไม่ได้
+        """
+        t = {}
+        t0 = time.perf_counter()
+
+        # ถ้ารู้ hash ก่อนโหลดภาพ (ETag) เช็ค cache ได้ทันที
+        cache_key = self._cache_key(source.content_hash)
+        labels = self.cache.get(cache_key) if cache_key else None
+        if labels is not None:
+            t["total"] = time.perf_counter() - t0
+            return self._out(labels, source.mode, "hit", 0, t)
+
+        t1 = time.perf_counter()
+        try:
+            image, moved = source.load(self.s3)
+        except RetakePhoto as e:
+            # ไม่ผ่าน quality gate → ตอบ retake ทันที (ไม่ cache เพื่อให้ภาพเดิมถูกตรวจซ้ำได้ถ้าปรับเกณฑ์)
+            t["load"] = time.perf_counter() - t1
+            t["quality_gate"] = e.report["timings_ms"]["total"] / 1000.0
+            t["total"] = time.perf_counter() - t0
+            out = self._out([], source.mode, "off", 0, t)
+            out["quality"], out["retake"] = e.report, True
+            return out
+        t["load"] = time.perf_counter() - t1
+        payload = len(image.get("Bytes", b""))
+
+        if cache_key is None and self.cache is not None and source.content_hash:
+            cache_key = self._cache_key(source.content_hash)
+            labels = self.cache.get(cache_key)
+            if labels is not None:
+                t["total"] = time.perf_counter() - t0
+                return self._out(labels, source.mode, "hit", moved, t, payload)
+
+        t1 = time.perf_counter()
+        try:
+            labels = self._detect(image)
+        except Exception as e:
+            if fallback is None or _error_code(e) not in _S3OBJECT_ERRORS:
+                raise
+            logger.warning(f"⚠️ {source.mode} not readable by Rekognition ({_error_code(e)}); fallback to {fallback.mode}")
+            out = self.analyze(fallback)
+            out["timings_ms"]["failed_attempt"] = round((time.perf_counter() - t1) * 1000, 1)
+            return out
+        t["detect"] = time.perf_counter() - t1
+
+        if cache_key:
+            self.cache.put(cache_key, labels)
+        report = _gate_report(source)
+        if report:
+            t["quality_gate"] = report["timings_ms"]["total"] / 1000.0
+        t["total"] = time.perf_counter() - t0
+        out = self._out(labels, source.mode, "miss" if cache_key else "off", moved, t, payload)
+        if report:
+            out["quality"] = report
+        return out
+
+    @staticmethod
+    def _out(labels, via, cache_state, moved, t, payload=0):
+        return {"labels": labels, "via": via, "cache": cache_state, "bytes_moved": moved,
+                "payload_bytes": payload, "timings_ms": {k: round(v * 1000, 1) for k, v in t.items()}}
+
+    def analyze_s3(self, bucket, key, etag=None, mode=None, normalize=None):
+        """
+        ภาพใน S3: ใช้ S3Object ก่อน แล้ว fallback เป็น bytes (เมื่อ IMAGE_SOURCE=auto)
+        normalize=True (หรือ NORMALIZE_IMAGES) → letterbox ก่อนส่ง และเก็บภาพ normalize ไว้ใน bucket เดียวกัน
+        """
+        mode = (mode or IMAGE_SOURCE).lower()
+        if NORMALIZE_IMAGES if normalize is None else normalize:
+            # gate อยู่ข้างใน → ภาพที่ไม่ผ่านจะไม่ถูก normalize/เก็บลง S3
+            source = NormalizedSource(gated(S3BytesSource(bucket, key, etag)),
+                                      cache_bucket=bucket, cache_key=normalized_key_for(key))
+            return self.analyze(source)
+        if QUALITY_GATE != "off":
+            # gate ต้องใช้ bytes ของภาพ → ส่ง bytes ต่อให้ Rekognition เลย
+            return self.analyze(gated(S3BytesSource(bucket, key, etag)))
+        source = s3_source(bucket, key, etag, mode)
+        fallback = S3BytesSource(bucket, key, etag) if mode == "auto" else None
+        return self.analyze(source, fallback)
+
+
+def _gate_report(source):
+    while source is not None:
+        if isinstance(source, GatedSource):
+            return source.report
+        source = getattr(source, "inner", None)
+    return None
+
+
+# ---------- helpers ----------
+def result_key_for(src_key: str, prefix: str = "results/") -> str:
+    # แทนที่ "uploads/" → "results/" แล้วเติม .json
+    if src_key.startswith("uploads/"):
+        return src_key.replace("uploads/", prefix, 1) + ".json"
+    return f"{prefix}{src_key}.json"
+
+
+def put_json(s3, bucket, key, data):
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+        ContentType="application/json"
+    )
+
+
+def record_metrics(out, m=None):
+    """metric ต่อภาพ (Shared/metrics.py) จากผลของ SkinAnalyzer.analyze*: ภาพ, bytes, cache, retake, เวลาแต่ละช่วง"""
+    m = m or metrics.current()
+    m.count("Images")
+    m.count("BytesMoved", out.get("bytes_moved", 0), unit="Bytes")
+    m.count("PayloadBytes", out.get("payload_bytes", 0), unit="Bytes")
+    if out.get("cache") in ("hit", "miss"):
+        m.count("CacheHits" if out["cache"] == "hit" else "CacheMisses")
+    if out.get("retake"):
+        m.count("Retakes")
+    for k, ms in (out.get("timings_ms") or {}).items():
+        m.timing("Analyze" + "".join(p.title() for p in k.split("_")), ms)   # total → AnalyzeTotal
+
+
+def expand_records(event):
+    """
+    รองรับทั้ง S3 event ตรงๆ และ S3 event ที่ผ่าน SQS (S3 → SQS → Lambda)
+    คืน list ของ (sqs message id หรือ None, s3 record)
+    """
+    out = []
+    for rec in event.get("Records", []):
+        if rec.get("eventSource") == "aws:sqs":
+            body = json.loads(rec.get("body") or "{}")
+            if isinstance(body.get("Message"), str):   # ถ้าผ่าน SNS มาก่อน
+                body = json.loads(body["Message"])
+            for inner in body.get("Records", []):       # s3:TestEvent ไม่มี Records → ข้าม
+                out.append((rec.get("messageId"), inner))
+        else:
+            out.append((None, rec))
+    return out
+
+
+def batch_item_failures(pairs, outcomes):
+    """message id ของ SQS ที่ควรส่งใหม่ (เฉพาะงานที่ล้มเพราะ throttle)"""
+    ids = []
+    for (msg_id, _), o in zip(pairs, outcomes):
+        if msg_id and o.get("retryable") and msg_id not in ids:
+            ids.append(msg_id)
+    return [{"itemIdentifier": i} for i in ids]
+
+
+def run_records(records, fn, max_workers=None):
+    """
+    ประมวลผล record ด้วย thread pool ที่จำกัดจำนวน worker
+    error ของ record หนึ่งไม่กระทบ record อื่น → คืน (outcomes, failed)
+    """
+    if not records:
+        return [], []
+
+    def _safe(rec):
+        try:
+            return fn(rec)
+        except ThrottledError as e:
+            key = (rec.get("s3", {}).get("object", {}) or {}).get("key") if isinstance(rec, dict) else None
+            logger.warning(f"⏳ still throttled after retries: {key}")
+            return {"key": key, "error": str(e), "retryable": True}
+        except Exception as e:
+            key = (rec.get("s3", {}).get("object", {}) or {}).get("key") if isinstance(rec, dict) else None
+            logger.exception(f"❌ analyze failed for {key}")
+            return {"key": key, "error": str(e)}
+
+    workers = max(1, min(max_workers or MAX_WORKERS, len(records)))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        outcomes = list(ex.map(_safe, records))
+    failed = [o for o in outcomes if "error" in o]
+    m = metrics.current()
+    m.count("Records", len(records))
+    m.count("RecordsFailed", len(failed))
+    m.count("RecordsThrottled", sum(1 for o in failed if o.get("retryable")))
+    logger.info(f"📊 records={len(records)} failed={len(failed)} workers={workers}")
+    return outcomes, failed
@@ -0,0 +1,115 @@
+"""
+tag_index.py — inverted index: tag ปัญหาผิว → สินค้า (แทนการ Scan ทั้งตาราง SkincareProducts)
+
+ตาราง TAG_INDEX_TABLE (ค่าเริ่มต้น SkincareProductTags, on-demand)
+  partition key : tag (String)  เช่น "Acne"
+  sort key      : sk  (String)  = "<rank กลับด้าน 5 หลัก>#<product_id>" → Query ได้สินค้า rank สูงก่อน
+  attribute อื่น : สำเนา item สินค้าทั้งก้อน (เหมือน projection ALL) → Query ครั้งเดียวได้ข้อมูลครบ ไม่ต้อง BatchGetItem
+
+สินค้าที่มี n tag = n แถวในตารางนี้ ดูแลโดย Product/lambda_tag_index.py
+(DynamoDB Stream NEW_AND_OLD_IMAGES ของ SkincareProducts และโหมด backfill)
+"""
+import os
+
+import lazy_import
+
+conditions = lazy_import.module("boto3.dynamodb.conditions")   # Key / Attr (ลาก boto3 ทั้งก้อน)
+
+TAG_INDEX_TABLE = os.environ.get("TAG_INDEX_TABLE", "SkincareProductTags")
+RANK_SCALE = 1000          # rank 4.1 → 4100
+RANK_MAX   = 99999
+INDEX_FIELDS = ("tag", "sk")
+
+
+def index_table(name=None):
+    import aws_clients
+    return aws_clients.table(name or TAG_INDEX_TABLE)
+
+
+def sort_key(product) -> str:
+    try:
+        r = int(round(float(product.get("rank") or 0) * RANK_SCALE))
+    except (TypeError, ValueError):
+        r = 0
+    return f"{RANK_MAX - max(0, min(RANK_MAX, r)):05d}#{product['product_id']}"
+
+
+def index_rows(product) -> list:
+    """แถวของสินค้าใน index (1 แถวต่อ tag)"""
+    if not product:
+        return []
+    sk = sort_key(product)
+    return [dict(product, tag=t, sk=sk) for t in sorted(set(product.get("tags") or []))]
+
+
+def strip(row) -> dict:
+    """แถวของ index → item สินค้าตามเดิม"""
+    return {k: v for k, v in row.items() if k not in INDEX_FIELDS}
+
+
+def diff(old, new):
+    """
+    (deletes, puts) ที่ต้องทำกับ index เมื่อสินค้าเปลี่ยนจาก old เป็น new (None = ไม่มี)
+    ทุกแถวของ new ถูกเขียนใหม่ เพราะเป็นสำเนาของ item (ชื่อ/ราคาเปลี่ยนก็ต้องตาม)
+    """
+    puts = index_rows(new) if new != old else []
+    keep = {(r["tag"], r["sk"]) for r in index_rows(new)}
+    deletes = [{"tag": r["tag"], "sk": r["sk"]} for r in index_rows(old) if (r["tag"], r["sk"]) not in keep]
+    return deletes, puts
+
+
+def apply(table, old, new, writer=None):
+    """ใช้ diff กับตาราง index (ส่ง writer = batch_writer ที่เปิดอยู่แล้วได้) → คืน (deleted, put)"""
+    deletes, puts = diff(old, new)
+    if writer is None:
+        with table.batch_writer(overwrite_by_pkeys=list(INDEX_FIELDS)) as w:
+            return apply(table, old, new, w)
+    for k in deletes:
+        writer.delete_item(Key=k)
+    for row in puts:
+        writer.put_item(Item=row)
+    return len(deletes), len(puts)
+
+
+def query_tag(table, tag, limit=10):
+    """
+    สินค้าที่มี tag นี้ เรียงตาม rank (สูง → ต่ำ) สูงสุด limit ชิ้น (None = ทั้งหมด)
+    อ่านหน้าถัดไปตาม LastEvaluatedKey จนครบ → ไม่ถูกตัดเงียบๆ ที่ 1MB
+    """
+    out, kw = [], {"KeyConditionExpression": conditions.Key("tag").eq(tag)}
+    while True:
+        if limit:
+            kw["Limit"] = limit - len(out)
+        resp = table.query(**kw)
+        out += [strip(r) for r in resp.get("Items", [])]
+        if (limit and len(out) >= limit) or "LastEvaluatedKey" not in resp:
+            return out[:limit] if limit else out
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def scan_tag(table, tag, limit=None):
+    """ทางเดิม (ไม่มี index): Scan ทั้งตารางสินค้า แต่อ่านครบทุกหน้า"""
+    out, kw = [], {"FilterExpression": conditions.Attr("tags").contains(tag)}
+    while True:
+        resp = table.scan(**kw)
+        out += resp.get("Items", [])
+        if (limit and len(out) >= limit) or "LastEvaluatedKey" not in resp:
+            return out[:limit] if limit else out
+        kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def backfill(product_table, table, segments=1, segment=None):
+    """สร้าง index จากสินค้าทั้งหมด (รันครั้งแรก หรือหลังแก้ schema); segment = แบ่งงานให้หลาย invocation"""
+    kw = {}
+    if segment is not None:
+        kw.update(Segment=segment, TotalSegments=segments)
+    products = rows = 0
+    with table.batch_writer(overwrite_by_pkeys=list(INDEX_FIELDS)) as w:
+        while True:
+            resp = product_table.scan(**kw)
+            for item in resp.get("Items", []):
+                rows += apply(table, None, item, w)[1]
+                products += 1
+            if "LastEvaluatedKey" not in resp:
+                return {"products": products, "rows": rows}
+            kw["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
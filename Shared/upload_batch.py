@@ -0,0 +1,62 @@
+"""
+upload_batch.py — batch mode ของ presigner ทุกตัว (layer dermavision-shared)
+
+ขอ presigned upload หลายไฟล์ใน request เดียว แทน 1 HTTP call ต่อรูป
+  GET  ?files=jpg:2500000,jpg:1800000,png:900000
+  POST {"files": [{"ext": "jpg", "size": 2500000}, ...]}
+
+    files = upload_batch.parse(event)             # None = request แบบไฟล์เดียว, ValueError = รูปแบบผิด
+    error = upload_batch.check(files, max_size)   # ข้อความสำหรับตอบ 400 หรือ None
+    session_id, prefix, items = upload_batch.plan(files, "uploads/user=.../dt=.../", max_size)
+    for key, content_type, limit in items:         # presigner เซ็นแบบของตัวเอง (POST policy / PUT URL)
+        ...
+
+ทุกไฟล์ของ session เดียวกันอยู่ใต้ <base_prefix>session=<id>/ และ key ขึ้นต้นด้วยลำดับไฟล์ (00-, 01-, ...)
+MAX_BATCH_FILES (10)
+"""
+import os, json, uuid, base64
+
+ALLOWED_EXT = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", "10"))
+
+
+def parse(event):
+    """list ของ (ext, size) หรือ None ถ้าไม่ใช่ batch request (ValueError/TypeError ถ้ารูปแบบผิด)"""
+    qs = event.get("queryStringParameters") or {}
+    if qs.get("files"):
+        files = []
+        for part in qs["files"].split(","):
+            ext, _, size = part.strip().partition(":")
+            files.append({"ext": ext, "size": size or 0})
+    else:
+        body = event.get("body")
+        if not body:
+            return None
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body).decode("utf-8")
+        files = (json.loads(body) or {}).get("files")
+        if not files:
+            return None
+    return [((f.get("ext") or "jpg").lower(), int(f.get("size") or 0)) for f in files]
+
+
+def check(files, max_size, max_files=None):
+    """ข้อความ error ของไฟล์แรกที่ไม่ผ่าน หรือ None"""
+    max_files = MAX_BATCH_FILES if max_files is None else max_files
+    if len(files) > max_files:
+        return f"too many files: {len(files)} > {max_files}"
+    for ext, size in files:
+        if ext not in ALLOWED_EXT:
+            return f"unsupported ext: {ext}"
+        if size > max_size:
+            return f"file too large: {size} > {max_size}"
+    return None
+
+
+def plan(files, base_prefix, max_size):
+    """(session_id, prefix, [(key, content_type, size_limit), ...]) — size_limit = ขนาดที่ client บอก หรือ max_size"""
+    session_id = uuid.uuid4().hex
+    prefix = f"{base_prefix}session={session_id}/"
+    items = [(f"{prefix}{i:02d}-{uuid.uuid4()}.{ext}", ALLOWED_EXT[ext], size if size > 0 else max_size)
+             for i, (ext, size) in enumerate(files)]
+    return session_id, prefix, items
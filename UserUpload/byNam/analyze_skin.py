@@ -1,19 +1,31 @@
 import os
 import json
 import logging
-import boto3
 from urllib.parse import unquote_plus
 
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from inference_cache import InferenceCache, CACHE_ENABLED, etag_from_record
+from detectors import get_detector
+from inference_dispatch import Throttle, ThrottledError
+from result_notify import publish
+from skin_analyzer import (SkinAnalyzer, run_records, expand_records, batch_item_failures, put_json, quality_fields,
+                           record_metrics)
+import metrics
+from aws_clients import lazy_client, SINGLE_ATTEMPT
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rekognition = boto3.client("rekognition")
-s3 = boto3.client("s3")
+rekognition = lazy_client("rekognition", retries=SINGLE_ATTEMPT)   # retry throttle = Throttle
+s3 = lazy_client("s3")
 
 PROJECT_VERSION_ARN = os.environ["PROJECT_VERSION_ARN"]
 OUTPUT_BUCKET = os.environ.get("OUTPUT_BUCKET", "").strip()
 MIN_CONFIDENCE = float(os.environ.get("MIN_CONFIDENCE", "50"))
 
+_throttle = Throttle()
+_cache = InferenceCache() if CACHE_ENABLED else None
+
 def _build_result_key(src_key: str) -> str:
     clean_key = src_key.lstrip("/")
     if not clean_key.startswith("uploads/"):
@@ -27,47 +39,55 @@ def _parse_user_id_from_key(src_key: str) -> str | None:
             return p.split("=", 1)[1]
     return None
 
+def _process_record(rec) -> dict:
+    bucket = rec["s3"]["bucket"]["name"]
+    key = unquote_plus(rec["s3"]["object"]["key"])
+    out_bucket = OUTPUT_BUCKET or bucket
+    out_key = _build_result_key(key)
+    user_id = _parse_user_id_from_key(key)
+
+    logger.info(f"🖼️ Analyze s3://{bucket}/{key}")
+
+    analyzer = SkinAnalyzer(get_detector(rekognition, PROJECT_VERSION_ARN), s3, MIN_CONFIDENCE, cache=_cache, throttle=_throttle)
+    try:
+        out = analyzer.analyze_s3(bucket, key, etag_from_record(rec))
+        record_metrics(out)
+    except ThrottledError:
+        raise  # ไม่เขียนผล error → ให้ SQS ส่งใหม่ภายหลัง
+    except Exception as e:
+        logger.exception("❌ Rekognition error")
+        put_json(s3, out_bucket, out_key, {"error": str(e)})
+        publish("results", out_bucket, out_key, {"error": str(e)})
+        return {"key": key, "error": str(e)}
+
+    result = {
+        "source": {"bucket": bucket, "key": key},
+        "userId": user_id,
+        "labels": out["labels"]
+    }
+    result.update(quality_fields(out))
+
+    put_json(s3, out_bucket, out_key, result)
+    publish("results", out_bucket, out_key, result)
+    logger.info(f"✅ Saved to s3://{out_bucket}/{out_key} via={out['via']} cache={out['cache']} "
+                f"timings_ms={json.dumps(out['timings_ms'])}")
+    return {"key": key, "result_key": out_key, "via": out["via"], "cache": out["cache"],
+            "timings_ms": out["timings_ms"]}
+
 def handler(event, context):
+    # metric (EMF): ภาพ/bytes/cache/เวลาแต่ละช่วง + latency ของ Rekognition/S3 (ดู Shared/metrics.py)
+    with metrics.stage("analyze", Function=getattr(context, "function_name", None)):
+        return _handle(event)
+
+def _handle(event):
     logger.info("📥 Event: %s", json.dumps(event, ensure_ascii=False))
 
-    for rec in event.get("Records", []):
-        bucket = rec["s3"]["bucket"]["name"]
-        key = unquote_plus(rec["s3"]["object"]["key"])
-        out_bucket = OUTPUT_BUCKET or bucket
-        out_key = _build_result_key(key)
-        user_id = _parse_user_id_from_key(key)
-
-        logger.info(f"🖼️ Analyze s3://{bucket}/{key}")
-
-        try:
-            response = rekognition.detect_custom_labels(
-                ProjectVersionArn=PROJECT_VERSION_ARN,
-                Image={"S3Object": {"Bucket": bucket, "Name": key}},
-                MinConfidence=MIN_CONFIDENCE
-            )
-        except Exception as e:
-            logger.exception("❌ Rekognition error")
-            _put_json(out_bucket, out_key, {"error": str(e)})
-            continue
-
-        # ดึงเฉพาะชื่อ label และกรองซ้ำ
-        labels = sorted(list({lbl["Name"] for lbl in response.get("CustomLabels", [])}))
-
-        result = {
-            "source": {"bucket": bucket, "key": key},
-            "userId": user_id,
-            "labels": labels
-        }
-
-        _put_json(out_bucket, out_key, result)
-        logger.info(f"✅ Saved to s3://{out_bucket}/{out_key}")
-
-    return {"statusCode": 200, "body": "ok"}
-
-def _put_json(bucket: str, key: str, data: dict):
-    s3.put_object(
-        Bucket=bucket,
-        Key=key,
-        Body=json.dumps(data, ensure_ascii=False, indent=2),
-        ContentType="application/json"
-    )
+    pairs = expand_records(event)
+    outcomes, failed = run_records([rec for _, rec in pairs], _process_record)
+    if _cache and outcomes:
+        _cache.log_stats()
+
+    resp = {"statusCode": 200, "body": "ok" if not failed else json.dumps({"failed": failed}, ensure_ascii=False)}
+    if any(msg_id for msg_id, _ in pairs):
+        resp["batchItemFailures"] = batch_item_failures(pairs, outcomes)
+    return resp
@@ -1,15 +1,21 @@
-import os, json, uuid, datetime as dt, boto3
+import os, json, uuid, datetime as dt
 import logging
 
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+import upload_batch
+
 
 # ตั้งค่า logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-ALLOWED_EXT = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+ALLOWED_EXT = upload_batch.ALLOWED_EXT
 CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "https://staticwebdermavision.s3.us-east-1.amazonaws.com")
 
+s3 = lazy_client("s3")   # เดิมสร้าง client ใหม่ทุก invocation
+
 
 def _resp(status, body):
     return {
@@ -18,12 +24,35 @@ def _resp(status, body):
             "content-type": "application/json",
             "Access-Control-Allow-Origin": CORS_ORIGIN,
             "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
+            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
         },
         "body": json.dumps(body, ensure_ascii=False),
     }
 
 
+def _presign(s3, bucket, key, ctype, max_size):
+    return s3.generate_presigned_post(
+        Bucket=bucket,
+        Key=key,
+        Fields={"Content-Type": ctype},
+        Conditions=[["content-length-range", 0, max_size], {"Content-Type": ctype}],
+        ExpiresIn=300,
+    )
+
+
+def _handle_batch(s3, bucket, user_id, files, max_size):
+    error = upload_batch.check(files, max_size)
+    if error:
+        return _resp(400, {"error": error})
+
+    now = dt.datetime.utcnow()
+    session_id, prefix, items = upload_batch.plan(files, f"uploads/user={user_id}/dt={now:%Y/%m/%d}/", max_size)
+    logger.info(f"🚀 Batch presign requested | user={user_id}, files={len(files)}, prefix={prefix}")
+    uploads = [{"key": key, "upload": _presign(s3, bucket, key, ctype, limit)} for key, ctype, limit in items]
+    logger.info(f"✅ Batch presigned {len(uploads)} uploads under {prefix}")
+    return _resp(200, {"sessionId": session_id, "prefix": prefix, "uploads": uploads})
+
+
 def handler(event, context):
     try:
         bucket = os.environ.get("RAW_BUCKET")
@@ -34,6 +63,18 @@ def handler(event, context):
 
         qs = event.get("queryStringParameters") or {}
         user_id = (qs.get("userId") or "anonymous").strip()
+        max_size = int(os.environ.get("MAX_SIZE", "10000000"))  # 10MB
+
+
+        try:
+            files = upload_batch.parse(event)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"❌ Invalid batch request: {e}")
+            return _resp(400, {"error": "invalid batch request", "detail": str(e)})
+        if files is not None:
+            return _handle_batch(s3, bucket, user_id, files, max_size)
+
+
         ext = (qs.get("ext") or "jpg").lower()
         ctype = ALLOWED_EXT.get(ext)
         if not ctype:
@@ -41,7 +82,6 @@ def handler(event, context):
             return _resp(400, {"error": f"unsupported ext: {ext}"})
 
 
-        max_size = int(os.environ.get("MAX_SIZE", "10000000"))  # 10MB
         now = dt.datetime.utcnow()
         key = f"uploads/user={user_id}/dt={now:%Y/%m/%d}/{uuid.uuid4()}.{ext}"
 
@@ -50,14 +90,7 @@ def handler(event, context):
         logger.info(f"🚀 Presign requested | user={user_id}, fileKey={key}")
 
 
-        s3 = boto3.client("s3")
-        presigned = s3.generate_presigned_post(
-            Bucket=bucket,
-            Key=key,
-            Fields={"Content-Type": ctype},
-            Conditions=[["content-length-range", 0, max_size], {"Content-Type": ctype}],
-            ExpiresIn=300,
-        )
+        presigned = _presign(s3, bucket, key, ctype, max_size)
 
 
         logger.info(f"✅ Presigned URL generated successfully for {key}")
@@ -1,25 +1,58 @@
 import json
 import os
-import boto3
 from urllib.parse import unquote
 
-s3 = boto3.client('s3')
+# ต้องมี layer dermavision-shared (Shared/build-shared-layer.sh)
+from aws_clients import lazy_client
+import upload_batch
+
+s3 = lazy_client('s3')
 BUCKET = os.environ.get("UPLOAD_BUCKET", "user-pic-dermavision")
 KEY_PREFIX = os.environ.get("KEY_PREFIX", "uploads/")
 CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "*")
+MAX_SIZE = int(os.environ.get("MAX_SIZE", "10000000"))
 
 def _headers():
     return {
         "Access-Control-Allow-Origin": CORS_ORIGIN,
-        "Access-Control-Allow-Methods": "GET,OPTIONS",
+        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
         "Access-Control-Allow-Headers": "Content-Type"
     }
 
+def _batch_response(files):
+    error = upload_batch.check(files, MAX_SIZE)
+    if error:
+        return {"statusCode": 400, "headers": _headers(), "body": json.dumps({"error": error})}
+
+    # ทุกไฟล์ของ session เดียวกันอยู่ใต้ prefix เดียว
+    session_id, prefix, items = upload_batch.plan(files, KEY_PREFIX, MAX_SIZE)
+    uploads = []
+    for (key, ctype, _), (_, size) in zip(items, files):
+        params = {"Bucket": BUCKET, "Key": key, "ContentType": ctype}
+        if size > 0:
+            params["ContentLength"] = size  # ถูก sign ไปด้วย → อัปโหลดขนาดอื่นไม่ได้
+        url = s3.generate_presigned_url(ClientMethod="put_object", Params=params, ExpiresIn=3600)
+        uploads.append({"uploadUrl": url, "objectKey": key, "contentType": ctype})
+
+    return {
+        "statusCode": 200,
+        "headers": _headers(),
+        "body": json.dumps({"sessionId": session_id, "prefix": prefix, "uploads": uploads})
+    }
+
 def lambda_handler(event, context):
     # รองรับ preflight จากเบราว์เซอร์
     if event.get("httpMethod") == "OPTIONS":
         return {"statusCode": 200, "headers": _headers(), "body": ""}
 
+    try:
+        files = upload_batch.parse(event)
+    except (ValueError, TypeError, AttributeError) as e:
+        return {"statusCode": 400, "headers": _headers(),
+                "body": json.dumps({"error": f"invalid batch request: {e}"})}
+    if files is not None:
+        return _batch_response(files)
+
     qs = event.get("queryStringParameters") or {}
     filename = qs.get("filename")
     content_type = qs.get("contentType", "application/octet-stream")